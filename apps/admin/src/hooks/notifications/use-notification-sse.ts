@@ -27,6 +27,7 @@ interface UseNotificationSSEReturn {
 
   // Callbacks
   setOnNotification: (callback: (notification: Notification) => void) => void;
+  setOnResync: (callback: () => void) => void;
   setOnConnected: (callback: () => void) => void;
   setOnDisconnected: (callback: () => void) => void;
   setOnError: (callback: (error: Event) => void) => void;
@@ -46,7 +47,11 @@ export const useNotificationSSE = (
     queryClient.invalidateQueries({ queryKey: ['notifications'] });
   }, [queryClient]);
 
-
+  // El servidor pide recargar: se perdieron eventos que ya no puede reenviar
+  const handleResync = useCallback(() => {
+    // Invalida el listado y el contador de no leídas (['notifications', 'unread-count'])
+    queryClient.invalidateQueries({ queryKey: ['notifications'] });
+  }, [queryClient]);
 
   const handleError = useCallback((error: Event) => {
     console.error('SSE: Error de conexión', error);
@@ -62,12 +67,13 @@ export const useNotificationSSE = (
 
     // Configurar callbacks
     client.setOnNotification(handleNotification);
+    client.setOnResync(handleResync);
     client.setOnError(handleError);
     client.setOnStateChange(handleStateChange);
 
     // Conectar
     client.connect();
-  }, [config, handleNotification, handleStateChange, handleError]);
+  }, [config, handleNotification, handleResync, handleStateChange, handleError]);
 
   // Función para desconectar
   const disconnect = useCallback(() => {
@@ -80,6 +86,12 @@ export const useNotificationSSE = (
     client.setOnNotification(callback);
   }, []);
 
+  // Función para configurar callback de resincronización
+  const setOnResync = useCallback((callback: () => void) => {
+    const client = getSSEClient();
+    client.setOnResync(callback);
+  }, []);
+
   // Función para configurar callback de conexión
   const setOnConnected = useCallback((callback: () => void) => {
     const client = getSSEClient();
@@ -125,6 +137,7 @@ export const useNotificationSSE = (
 
     // Callbacks
     setOnNotification,
+    setOnResync,
     setOnConnected,
     setOnDisconnected,
     setOnError,
@@ -16,6 +16,8 @@ export class NotificationSSEClient {
   private reconnectAttempts = 0;
   private reconnectTimeout: NodeJS.Timeout | null = null;
   private heartbeatTimeout: NodeJS.Timeout | null = null;
+  // Último id recibido; se envía como Last-Event-ID al reconectar
+  private lastEventId: string | null = null;
 
   // Estado del cliente
   private state: SSEState = {
@@ -24,6 +26,7 @@ export class NotificationSSEClient {
 
   // Callbacks
   private onNotification?: (notification: Notification) => void;
+  private onResync?: () => void;
   private onConnected?: () => void;
   private onDisconnected?: () => void;
   private onError?: (error: Event) => void;
@@ -64,12 +67,17 @@ export class NotificationSSEClient {
 
       this.abortController = new AbortController();
 
+      const headers: Record<string, string> = {
+        'Authorization': `Bearer ${token}`,
+        'Accept': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+      };
+      if (this.lastEventId) {
+        headers['Last-Event-ID'] = this.lastEventId;
+      }
+
       const response = await fetch(sseUrl, {
-        headers: {
-          'Authorization': `Bearer ${token}`,
-          'Accept': 'text/event-stream',
-          'Cache-Control': 'no-cache',
-        },
+        headers,
         signal: this.abortController.signal,
       });
 
@@ -100,20 +108,39 @@ export class NotificationSSEClient {
         buffer = chunks.pop() || '';
 
         for (const chunk of chunks) {
-          // Handle heartbeat event
-          if (chunk.includes('event: heartbeat')) {
+          const lines = chunk.split('\n');
+          const eventLine = lines.find(l => l.startsWith('event: '));
+          const event = eventLine ? eventLine.slice(7) : 'message';
+
+          if (event === 'heartbeat') {
             this.state.lastHeartbeat = new Date().toISOString();
             this.onStateChange?.(this.state);
             this.resetHeartbeatTimeout();
             continue;
           }
 
-          const dataLine = chunk.split('\n').find(l => l.startsWith('data: '));
+          const idLine = lines.find(l => l.startsWith('id: '));
+          if (idLine) {
+            this.lastEventId = idLine.slice(4);
+          }
+          this.resetHeartbeatTimeout();
+
+          if (event === 'resync') {
+            // Parte de lo perdido ya no está en el buffer del servidor:
+            // hay que recargar las notificaciones y el contador por la API
+            this.onResync?.();
+            continue;
+          }
+
+          // Solo los eventos de notificación llegan a onNotification
+          // (connected, error y otros eventos de control se ignoran)
+          if (event !== 'notification') continue;
+
+          const dataLine = lines.find(l => l.startsWith('data: '));
           if (dataLine) {
             try {
               const data = JSON.parse(dataLine.slice(6));
               this.onNotification?.(data);
-              this.resetHeartbeatTimeout();
             } catch {
               // Skip invalid JSON
             }
@@ -212,6 +239,10 @@ export class NotificationSSEClient {
     this.onNotification = callback;
   }
 
+  setOnResync(callback: () => void): void {
+    this.onResync = callback;
+  }
+
   setOnConnected(callback: () => void): void {
     this.onConnected = callback;
   }
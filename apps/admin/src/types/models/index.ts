@@ -160,6 +160,7 @@ export type {
   NotificationPreference,
   UpdateNotificationPreferenceData,
   NotificationGroup,
+  NotificationGroupSummary,
   GroupedNotificationsResponse,
   MarkAsReadData,
   UnreadCountResponse,
@@ -119,6 +119,14 @@ export interface UpdateNotificationPreferenceData {
   digest_frequency?: 'immediate' | 'daily' | 'weekly' | 'never';
 }
 
+// Resumen precalculado de un grupo (últimas notificaciones)
+export interface NotificationGroupSummary {
+  preview?: { id: ID; title: string }[];
+  last_message?: string;
+  last_action_url?: string | null;
+  last_created_at?: DateTime;
+}
+
 // Grupo de notificaciones (para agrupación inteligente)
 export interface NotificationGroup {
   id: ID;
@@ -128,7 +136,7 @@ export interface NotificationGroup {
   count: number;
   first_notification: ID;
   last_notification: ID;
-  aggregated_data: unknown[];
+  summary: NotificationGroupSummary;
   is_read: boolean;
   created_at: DateTime;
   updated_at: DateTime;
@@ -71,6 +71,8 @@ urlpatterns = [
     path("api_data/reports/clients/balances/", views.ClientBalancesReportView.as_view(), name="client_balances_report"),
     path("api_data/reports/clients/operations/", views.ClientOperationsStatementView.as_view(), name="client_operations_statement"),
     path("api_data/system/info/", views.SystemInfoView.as_view(), name="system_info"),
+    # Búsqueda unificada (usuarios, pedidos, productos)
+    path("api_data/search/", views.GlobalSearchView.as_view(), name="global_search"),
     # URLs de notificaciones (incluidas bajo el mismo prefijo `api_data/`)
     path("api_data/", include("api.notifications.urls_notifications")),
 
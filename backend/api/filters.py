@@ -0,0 +1,26 @@
+"""
+Filtros compartidos por los viewsets de la API.
+"""
+from rest_framework.filters import SearchFilter
+
+from api.services.search_service import SearchService
+
+
+class IndexedSearchFilter(SearchFilter):
+    """
+    `?search=` resuelto con el índice de búsqueda (SearchDocument) en lugar de
+    un icontains por cada campo de `search_fields`.
+
+    La vista indica el tipo de documento con `search_entity_type`; sin él se
+    comporta como el SearchFilter de DRF.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        entity_type = getattr(view, 'search_entity_type', None)
+        if entity_type is None:
+            return super().filter_queryset(request, queryset, view)
+
+        query = request.query_params.get(self.search_param, '')
+        if not query.strip():
+            return queryset
+        return SearchService.filter_queryset(queryset, entity_type, query)
@@ -0,0 +1,53 @@
+"""
+Management command: backfill_financial_rollups
+
+Reconstruye la tabla DailyFinancialRollup a partir de las entregas, pedidos,
+compras y facturas existentes. Útil tras la migración inicial o para corregir
+desvíos causados por escrituras masivas que no disparan signals
+(queryset.update, bulk_create, etc.).
+
+Uso:
+    python manage.py backfill_financial_rollups
+    python manage.py backfill_financial_rollups --start 2025-01-01 --end 2025-12-31
+"""
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.services.rollup_service import FinancialRollupService
+
+
+class Command(BaseCommand):
+    help = "Reconstruye el resumen financiero diario (DailyFinancialRollup)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--start',
+            help='Fecha de inicio (YYYY-MM-DD). Por defecto, todo el histórico.',
+        )
+        parser.add_argument(
+            '--end',
+            help='Fecha de fin (YYYY-MM-DD). Por defecto, todo el histórico.',
+        )
+
+    def _parse_date(self, value, name):
+        if not value:
+            return None
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f"Formato de fecha inválido para --{name}. Use YYYY-MM-DD")
+
+    def handle(self, *args, **options):
+        start = self._parse_date(options.get('start'), 'start')
+        end = self._parse_date(options.get('end'), 'end')
+
+        if start and end and start > end:
+            raise CommandError('La fecha de inicio no puede ser posterior a la fecha de fin')
+
+        self.stdout.write('Reconstruyendo resumen financiero diario...')
+        days = FinancialRollupService.backfill(start=start, end=end)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Completado. {days} día(s) con datos reconstruidos.'
+        ))
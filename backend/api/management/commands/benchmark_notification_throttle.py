@@ -0,0 +1,178 @@
+"""
+Management command: benchmark_notification_throttle
+
+Mide el throttling de notificaciones con escritores concurrentes contra la
+cache configurada (CACHES['default']):
+
+1. Contadores: varios hilos registran envíos para el mismo usuario con el
+   esquema anterior (cache.get + cache.set) y con NotificationThrottle
+   (cache.incr atómico), y se comparan las cuentas perdidas.
+2. Límite: varios hilos intentan enviar a la vez a un usuario con un límite
+   bajo; con acquire nunca se admiten más envíos que el límite.
+3. Envío masivo: operaciones de cache para evaluar y registrar N
+   destinatarios uno a uno frente a acquire_bulk (un get_many para evaluar,
+   un incr atómico por contador y un set_many para las marcas de duplicado).
+
+Uso:
+    python manage.py benchmark_notification_throttle
+    python manage.py benchmark_notification_throttle --threads 16 --operations 500 --recipients 2000
+"""
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+
+from api.notifications.models_notifications import NotificationType
+from api.notifications.throttling_notifications import NotificationThrottle
+
+# Ids fuera del rango habitual para no tocar contadores de usuarios reales
+BENCH_USER_ID = 900_000_000
+
+
+class Command(BaseCommand):
+    help = "Compara los contadores de throttling (get/set frente a incr atómico) con escritores concurrentes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Hilos escritores (8).')
+        parser.add_argument('--operations', type=int, default=250, help='Envíos por hilo (250).')
+        parser.add_argument('--limit', type=int, default=50, help='Límite por tipo en la prueba de admisión (50).')
+        parser.add_argument('--recipients', type=int, default=1000, help='Destinatarios del envío masivo (1000).')
+
+    @staticmethod
+    def _concurrently(threads, target):
+        barrier = threading.Barrier(threads)
+
+        def run():
+            barrier.wait()
+            target()
+
+        workers = [threading.Thread(target=run) for _ in range(threads)]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return time.perf_counter() - start
+
+    def _counters(self, threads, operations):
+        legacy_key = f'notif_throttle_bench:legacy:{BENCH_USER_ID}'
+        cache.delete(legacy_key)
+        NotificationThrottle.reset_user_throttle(BENCH_USER_ID)
+
+        def legacy():
+            for _ in range(operations):
+                # Esquema anterior: lectura y escritura separadas
+                count = cache.get(legacy_key, 0)
+                time.sleep(0)
+                cache.set(legacy_key, count + 1, NotificationThrottle.CACHE_TTL)
+
+        def atomic():
+            for _ in range(operations):
+                NotificationThrottle.record_notification(BENCH_USER_ID, NotificationType.SYSTEM_MESSAGE)
+
+        expected = threads * operations
+        legacy_seconds = self._concurrently(threads, legacy)
+        legacy_count = cache.get(legacy_key, 0)
+        atomic_seconds = self._concurrently(threads, atomic)
+        atomic_count = NotificationThrottle.get_user_stats(BENCH_USER_ID)['total_sent_last_hour']
+
+        cache.delete(legacy_key)
+        NotificationThrottle.reset_user_throttle(BENCH_USER_ID)
+
+        self.stdout.write(f"Contadores ({threads} hilos x {operations} envíos = {expected}):")
+        self.stdout.write(f"  get/set:      {legacy_count:>6} contados, {expected - legacy_count:>6} perdidos, "
+                          f"{expected / legacy_seconds:,.0f} ops/s")
+        self.stdout.write(f"  incr atómico: {atomic_count:>6} contados, {expected - atomic_count:>6} perdidos, "
+                          f"{expected / atomic_seconds:,.0f} ops/s")
+        return atomic_count == expected
+
+    def _admission(self, threads, operations, limit):
+        user_id = BENCH_USER_ID + 1
+        NotificationThrottle.reset_user_throttle(user_id)
+        admitted = []
+        lock = threading.Lock()
+
+        def writer():
+            for _ in range(operations):
+                allowed, _ = NotificationThrottle.acquire(user_id, NotificationType.SYSTEM_MESSAGE)
+                if allowed:
+                    with lock:
+                        admitted.append(1)
+
+        original = NotificationThrottle.DEFAULT_TYPE_LIMIT
+        NotificationThrottle.DEFAULT_TYPE_LIMIT = limit
+        try:
+            self._concurrently(threads, writer)
+        finally:
+            NotificationThrottle.DEFAULT_TYPE_LIMIT = original
+            NotificationThrottle.reset_user_throttle(user_id)
+
+        self.stdout.write(f"Admisión (límite {limit}, {threads * operations} intentos concurrentes): "
+                          f"{len(admitted)} admitidos")
+        return len(admitted) <= limit
+
+    def _bulk(self, recipients):
+        recipient_ids = list(range(BENCH_USER_ID + 10, BENCH_USER_ID + 10 + recipients))
+        arguments = dict(notification_type=NotificationType.SYSTEM_MESSAGE,
+                         title='Benchmark', message='Envío masivo')
+
+        def count_calls(func):
+            calls = {'count': 0, 'depth': 0}
+            originals = {name: getattr(cache, name) for name in ('get', 'get_many', 'set', 'set_many', 'add', 'incr')}
+
+            def wrap(name):
+                def wrapper(*args, **kwargs):
+                    # Solo las llamadas externas (get_many de algunos backends llama a get)
+                    calls['count'] += calls['depth'] == 0
+                    calls['depth'] += 1
+                    try:
+                        return originals[name](*args, **kwargs)
+                    finally:
+                        calls['depth'] -= 1
+                return wrapper
+
+            with mock.patch.multiple(cache, **{name: wrap(name) for name in originals}):
+                start = time.perf_counter()
+                func()
+                return calls['count'], time.perf_counter() - start
+
+        def one_by_one():
+            # Flujo anterior de create_bulk_throttled_notifications
+            for recipient_id in recipient_ids:
+                if NotificationThrottle.can_send_notification(recipient_id, **arguments)[0]:
+                    NotificationThrottle.record_notification(recipient_id, **arguments)
+
+        single_calls, single_seconds = count_calls(one_by_one)
+        for recipient_id in recipient_ids:
+            NotificationThrottle.reset_user_throttle(recipient_id)
+        cache.delete_many([
+            NotificationThrottle._get_duplicate_key(recipient_id, **arguments) for recipient_id in recipient_ids
+        ])
+        bulk_calls, bulk_seconds = count_calls(
+            lambda: NotificationThrottle.acquire_bulk(recipient_ids, **arguments)
+        )
+        for recipient_id in recipient_ids:
+            NotificationThrottle.reset_user_throttle(recipient_id)
+        cache.delete_many([
+            NotificationThrottle._get_duplicate_key(recipient_id, **arguments) for recipient_id in recipient_ids
+        ])
+
+        self.stdout.write(f"Envío masivo a {recipients} destinatarios (evaluación + registro):")
+        self.stdout.write(f"  uno a uno:    {single_calls:>6} operaciones de cache, {single_seconds * 1000:.1f} ms")
+        self.stdout.write(f"  acquire_bulk: {bulk_calls:>6} operaciones de cache, "
+                          f"{bulk_seconds * 1000:.1f} ms")
+
+    def handle(self, *args, **options):
+        if min(options['threads'], options['operations'], options['recipients'], options['limit']) < 1:
+            raise CommandError('Los parámetros deben ser mayores que 0')
+
+        ok = self._counters(options['threads'], options['operations'])
+        ok = self._admission(options['threads'], options['operations'], options['limit']) and ok
+        self._bulk(options['recipients'])
+
+        if ok:
+            self.stdout.write(self.style.SUCCESS('Completado.'))
+        else:
+            raise CommandError('El throttling perdió cuentas o superó el límite.')
@@ -0,0 +1,122 @@
+"""
+Management command: benchmark_renderers
+
+Compara el tiempo de serialización de las respuestas más grandes de la API con
+el JSONRenderer de DRF (json de la librería estándar), OrjsonRenderer y
+MessagePackRenderer. Cada vista se ejecuta una vez contra la base de datos
+actual; solo se mide el renderizado de `response.data`.
+
+Uso:
+    python manage.py benchmark_renderers
+    python manage.py benchmark_renderers --iterations 50 --user admin@example.com
+    python manage.py benchmark_renderers --path /arye_system/api_data/order/?page_size=500
+"""
+import time
+from urllib.parse import urlsplit
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.urls import resolve
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.renderers import MessagePackRenderer, OrjsonRenderer, msgpack
+
+API = '/arye_system/api_data'
+
+DEFAULT_PATHS = [
+    f'{API}/order/?page_size=1000',
+    f'{API}/product/?page_size=1000',
+    f'{API}/delivery_receips/?page_size=1000',
+    f'{API}/reports/profits/',
+    f'{API}/reports/orders/',
+    f'{API}/reports/purchases/',
+    f'{API}/reports/clients/balances/',
+]
+
+
+class Command(BaseCommand):
+    help = "Compara el tiempo de serialización JSON (stdlib), orjson y MessagePack en los endpoints más grandes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path', action='append', dest='paths',
+            help='Ruta a medir (repetible). Por defecto, los listados y reportes más grandes.',
+        )
+        parser.add_argument('--iterations', type=int, default=20, help='Renderizados por endpoint (20).')
+        parser.add_argument('--user', help='Email del usuario con el que se ejecutan las vistas (por defecto, un admin).')
+
+    def _get_user(self, email):
+        User = get_user_model()
+        if email:
+            user = User.objects.filter(email=email).first()
+            if user is None:
+                raise CommandError(f'No existe el usuario {email}')
+            return user
+        user = User.objects.filter(is_staff=True).order_by('id').first() or User.objects.filter(role='admin').first()
+        if user is None:
+            raise CommandError('No hay ningún usuario administrador; use --user')
+        return user
+
+    def _default_paths(self):
+        paths = list(DEFAULT_PATHS)
+        # Estado de cuenta del cliente con más pedidos
+        client = (
+            get_user_model().objects.filter(role='client')
+            .annotate(orders_count=Count('orders')).order_by('-orders_count').first()
+        )
+        if client is not None:
+            paths.append(f'{API}/reports/clients/operations/?client_id={client.id}')
+        return paths
+
+    def _fetch(self, factory, user, path):
+        parts = urlsplit(path)
+        match = resolve(parts.path)
+        request = factory.get(path)
+        force_authenticate(request, user=user)
+        response = match.func(request, *match.args, **match.kwargs)
+        if response.status_code >= 400:
+            raise CommandError(f'{path} respondió {response.status_code}')
+        return response.data
+
+    def _measure(self, renderer, data, iterations):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            body = renderer.render(data, renderer.media_type, {})
+        elapsed = (time.perf_counter() - start) / iterations
+        return elapsed * 1000, len(body)
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        if iterations < 1:
+            raise CommandError('--iterations debe ser mayor que 0')
+
+        user = self._get_user(options.get('user'))
+        paths = options.get('paths') or self._default_paths()
+        factory = APIRequestFactory()
+
+        renderers = [('json', JSONRenderer()), ('orjson', OrjsonRenderer())]
+        if msgpack is not None:
+            renderers.append(('msgpack', MessagePackRenderer()))
+        else:
+            self.stdout.write(self.style.WARNING('msgpack no está instalado; se omite MessagePack.'))
+
+        header = f"{'endpoint':<60}" + ''.join(f'{name + " ms":>12}{name + " KB":>12}' for name, _ in renderers)
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+
+        for path in paths:
+            try:
+                data = self._fetch(factory, user, path)
+            except CommandError as e:
+                self.stdout.write(self.style.WARNING(f'{path}: {e}'))
+                continue
+
+            row = f'{path[len(API):]:<60}'
+            for name, renderer in renderers:
+                ms, size = self._measure(renderer, data, iterations)
+                row += f'{ms:>12.2f}{size / 1024:>12.1f}'
+            self.stdout.write(row)
+
+        self.stdout.write(self.style.SUCCESS(f'Completado ({iterations} renderizados por endpoint).'))
@@ -6,12 +6,20 @@ Uso:
     python manage.py clean_notifications --days 60
     python manage.py clean_notifications --expired-only
     python manage.py clean_notifications --dry-run
+    python manage.py clean_notifications --batch-size 500 --pause 0.5
+    python manage.py clean_notifications --archive --archive-months 12
+    python manage.py clean_notifications --groups
+
+Los borrados se hacen por lotes (ver NotificationRetentionService), cada uno
+en su propia transacción, para no bloquear la tabla durante la limpieza.
 """
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Sum
 from django.utils import timezone
 from datetime import timedelta
-from api.notifications.models_notifications import Notification
+from api.notifications.models_notifications import Notification, NotificationArchive, NotificationCounter
+from api.notifications.retention_notifications import NotificationRetentionService
 
 
 class Command(BaseCommand):
@@ -43,11 +51,52 @@ class Command(BaseCommand):
             help='Eliminar todas las notificaciones leídas sin importar la fecha'
         )
 
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=NotificationRetentionService.BATCH_SIZE,
+            help=f'Filas eliminadas por lote (default: {NotificationRetentionService.BATCH_SIZE})'
+        )
+
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=NotificationRetentionService.PAUSE_SECONDS,
+            help=f'Segundos de pausa entre lotes (default: {NotificationRetentionService.PAUSE_SECONDS})'
+        )
+
+        parser.add_argument(
+            '--archive',
+            action='store_true',
+            help='Copiar las notificaciones a NotificationArchive antes de eliminarlas'
+        )
+
+        parser.add_argument(
+            '--archive-months',
+            type=int,
+            help='Eliminar del archivo las notificaciones de más de N meses'
+        )
+
+        parser.add_argument(
+            '--groups',
+            action='store_true',
+            help='Eliminar también los grupos leídos sin actividad en --days días'
+        )
+
     def handle(self, *args, **options):
         days = options['days']
         expired_only = options['expired_only']
         dry_run = options['dry_run']
         all_read = options['all_read']
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size debe ser mayor que 0')
+        if options['pause'] < 0:
+            raise CommandError('--pause no puede ser negativo')
+        batch_options = {
+            'batch_size': options['batch_size'],
+            'pause': options['pause'],
+            'archive': options['archive'],
+        }
         
         self.stdout.write(self.style.HTTP_INFO('🔍 Iniciando limpieza de notificaciones...'))
         
@@ -61,7 +110,7 @@ class Command(BaseCommand):
         if expired_count > 0:
             self.stdout.write(f'\n📋 Notificaciones expiradas encontradas: {expired_count}')
             if not dry_run:
-                deleted = Notification.objects.delete_expired()
+                deleted = Notification.objects.delete_expired(**batch_options)
                 total_deleted += deleted
                 self.stdout.write(self.style.SUCCESS(f'✅ Eliminadas {deleted} notificaciones expiradas'))
             else:
@@ -75,7 +124,9 @@ class Command(BaseCommand):
                 old_read_count = Notification.objects.filter(is_read=True).count()
                 self.stdout.write(f'\n📋 Todas las notificaciones leídas: {old_read_count}')
                 if not dry_run and old_read_count > 0:
-                    deleted = Notification.objects.filter(is_read=True).delete()[0]
+                    deleted = NotificationRetentionService.delete_in_batches(
+                        Notification.objects.filter(is_read=True), **batch_options
+                    )
                     total_deleted += deleted
                     self.stdout.write(self.style.SUCCESS(f'✅ Eliminadas {deleted} notificaciones leídas'))
                 elif old_read_count > 0:
@@ -90,7 +141,7 @@ class Command(BaseCommand):
                 if old_read_count > 0:
                     self.stdout.write(f'\n📋 Notificaciones leídas más antiguas que {days} días: {old_read_count}')
                     if not dry_run:
-                        deleted = Notification.objects.delete_old_read(days=days)
+                        deleted = Notification.objects.delete_old_read(days=days, **batch_options)
                         total_deleted += deleted
                         self.stdout.write(self.style.SUCCESS(f'✅ Eliminadas {deleted} notificaciones leídas antiguas'))
                     else:
@@ -98,7 +149,39 @@ class Command(BaseCommand):
                 else:
                     self.stdout.write(f'✓ No hay notificaciones leídas más antiguas que {days} días')
         
-        # 3. Resumen final
+        # 3. Grupos leídos antiguos
+        if options['groups']:
+            from api.notifications.grouping_notifications import NotificationGroup, NotificationGrouper
+
+            cutoff_date = timezone.now() - timedelta(days=days)
+            groups_count = NotificationGroup.objects.filter(is_read=True, updated_at__lt=cutoff_date).count()
+            self.stdout.write(f'\n📋 Grupos leídos sin actividad en {days} días: {groups_count}')
+            if groups_count and not dry_run:
+                deleted = NotificationGrouper.cleanup_old_groups(
+                    days=days, batch_size=options['batch_size'], pause=options['pause']
+                )
+                self.stdout.write(self.style.SUCCESS(f'✅ Eliminados {deleted} grupos'))
+            elif groups_count:
+                self.stdout.write(self.style.WARNING(f'🔸 Se eliminarían {groups_count} grupos'))
+
+        # 4. Archivo: meses antiguos
+        if options['archive_months'] is not None:
+            archive_cutoff = timezone.now() - timedelta(days=30 * options['archive_months'])
+            if dry_run:
+                archived_count = NotificationArchive.objects.filter(created_at__lt=archive_cutoff).count()
+                self.stdout.write(self.style.WARNING(
+                    f'\n🔸 Se eliminarían {archived_count} notificaciones archivadas de más de '
+                    f'{options["archive_months"]} meses'
+                ))
+            else:
+                result = NotificationRetentionService.drop_archive_before(
+                    archive_cutoff, batch_size=options['batch_size'], pause=options['pause']
+                )
+                self.stdout.write(self.style.SUCCESS(
+                    f'\n✅ Archivo: {result["partitions"]} particiones y {result["rows"]} filas eliminadas'
+                ))
+
+        # 5. Resumen final
         self.stdout.write('\n' + '='*60)
         if dry_run:
             self.stdout.write(self.style.HTTP_INFO(f'📊 RESUMEN (DRY-RUN): Se eliminarían {expired_count + (old_read_count if not expired_only else 0)} notificaciones en total'))
@@ -108,9 +191,10 @@ class Command(BaseCommand):
             else:
                 self.stdout.write(self.style.SUCCESS('✨ No se encontraron notificaciones para eliminar'))
         
-        # 4. Estadísticas adicionales
-        remaining = Notification.objects.count()
-        unread = Notification.objects.unread().count()
+        # 6. Estadísticas adicionales (desde los contadores, sin COUNT(*) sobre la tabla)
+        counters = NotificationCounter.objects.aggregate(total=Sum('total'), unread=Sum('unread'))
+        remaining = counters['total'] or 0
+        unread = counters['unread'] or 0
         
         self.stdout.write('\n📈 Estadísticas actuales:')
         self.stdout.write(f'   Total de notificaciones: {remaining}')
@@ -0,0 +1,85 @@
+"""
+Management command: dispatch_notifications
+
+Worker del outbox de notificaciones. Procesa por lotes los eventos pendientes
+(inserción masiva de notificaciones y emails), con reintentos.
+
+Uso:
+    python manage.py dispatch_notifications              # worker continuo
+    python manage.py dispatch_notifications --once       # procesa lo pendiente y termina (cron)
+    python manage.py dispatch_notifications --stats      # pendientes, fallidos y retraso de despacho
+    python manage.py dispatch_notifications --once --purge-days 7
+
+Con NOTIFICATION_OUTBOX_WORKER=True los procesos web solo escriben el outbox
+y este comando es el único que lo procesa. El worker no publica en SSE (no
+atiende conexiones): cada proceso web lee de la tabla las notificaciones
+nuevas de sus usuarios conectados y las publica (NotificationRelay).
+"""
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.utils import timezone
+
+from api.notifications.models_notifications import NotificationOutbox
+from api.notifications.outbox_notifications import OutboxDispatcher
+
+
+class Command(BaseCommand):
+    help = "Procesa los eventos pendientes del outbox de notificaciones."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Procesar lo pendiente y terminar.')
+        parser.add_argument('--batch-size', type=int, default=OutboxDispatcher.BATCH_SIZE,
+                            help=f'Eventos por lote ({OutboxDispatcher.BATCH_SIZE}).')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Segundos de espera cuando no hay eventos (1).')
+        parser.add_argument('--stats', action='store_true', help='Mostrar métricas del outbox y terminar.')
+        parser.add_argument('--purge-days', type=int,
+                            help='Eliminar eventos procesados con más de N días.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size debe ser mayor que 0')
+        OutboxDispatcher.BATCH_SIZE = options['batch_size']
+
+        if options['stats']:
+            self._print_stats()
+            return
+
+        if options['purge_days'] is not None:
+            self._purge(options['purge_days'])
+
+        if options['once']:
+            total = OutboxDispatcher.dispatch_pending()
+            self.stdout.write(self.style.SUCCESS(f'Eventos procesados: {total}'))
+            return
+
+        self.stdout.write(f"Worker del outbox iniciado (lotes de {options['batch_size']})")
+        try:
+            while True:
+                close_old_connections()
+                if OutboxDispatcher.dispatch_pending() == 0:
+                    time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Worker detenido.')
+
+    def _purge(self, days):
+        cutoff = timezone.now() - timedelta(days=days)
+        deleted, _ = NotificationOutbox.objects.filter(
+            status=NotificationOutbox.Status.DONE, processed_at__lt=cutoff
+        ).delete()
+        self.stdout.write(f'Eventos procesados eliminados: {deleted}')
+
+    def _print_stats(self):
+        def fmt(value):
+            return '-' if value is None else f'{value:.2f} s'
+
+        stats = OutboxDispatcher.stats()
+        self.stdout.write(f"Pendientes: {stats['pending']} (el más antiguo hace {fmt(stats['oldest_pending_seconds'])})")
+        self.stdout.write(f"Fallidos: {stats['failed']}")
+        self.stdout.write(
+            f"Retraso de despacho (última hora): medio {fmt(stats['avg_lag_seconds'])}, "
+            f"máx. {fmt(stats['max_lag_seconds'])}"
+        )
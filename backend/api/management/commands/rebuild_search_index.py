@@ -0,0 +1,29 @@
+"""
+Management command: rebuild_search_index
+
+Reconstruye el índice de búsqueda (SearchDocument) de usuarios, pedidos y
+productos. Útil tras la migración inicial o para corregir desvíos causados por
+escrituras que no disparan signals (queryset.update, etc.).
+
+Uso:
+    python manage.py rebuild_search_index
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api.services.search_service import SearchService
+
+
+class Command(BaseCommand):
+    help = "Reconstruye el índice de búsqueda de usuarios, pedidos y productos."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Documentos por lote (500).')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Reconstruyendo índice de búsqueda...')
+        with transaction.atomic():
+            counts = SearchService.rebuild(batch_size=options['batch_size'])
+
+        summary = ', '.join(f'{entity_type}: {count}' for entity_type, count in counts.items())
+        self.stdout.write(self.style.SUCCESS(f'Completado. {summary}'))
@@ -0,0 +1,50 @@
+"""
+Management command: reconcile_notification_counters
+
+Recalcula los contadores de notificaciones por usuario (NotificationCounter)
+a partir de la tabla de notificaciones y corrige los que se hayan desviado,
+por ejemplo tras escrituras con SQL directo o restauraciones parciales.
+
+Uso:
+    python manage.py reconcile_notification_counters
+    python manage.py reconcile_notification_counters --user 12 --user 15
+    python manage.py reconcile_notification_counters --batch-size 1000
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from api.notifications.counters_notifications import NotificationCounterService
+
+
+class Command(BaseCommand):
+    help = "Recalcula los contadores de notificaciones no leídas por usuario y corrige los desvíos."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            action='append',
+            dest='users',
+            help='ID de usuario a reconciliar (se puede repetir). Por defecto, todos.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Usuarios por bloque (default: 500)'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size debe ser mayor que 0')
+
+        totals = NotificationCounterService.reconcile(
+            user_ids=options.get('users'), batch_size=options['batch_size']
+        )
+        message = (
+            f"Usuarios revisados: {totals['users']}. "
+            f"Contadores corregidos: {totals['fixed']} ({totals['users_fixed']} usuarios con desvío)."
+        )
+        if totals['fixed']:
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,40 @@
+"""
+Management command: send_notification_digests
+
+Envía el resumen de notificaciones no leídas a los usuarios con frecuencia de
+resumen diaria o semanal (NotificationPreference.digest_frequency). Pensado
+para ejecutarse de forma programada (cron o scheduler de la plataforma):
+
+    0 8 * * *   python manage.py send_notification_digests --frequency daily
+    0 8 * * 1   python manage.py send_notification_digests --frequency weekly
+"""
+from django.core.management.base import BaseCommand
+
+from api.notifications.email_notifications import NotificationEmailService
+
+
+class Command(BaseCommand):
+    help = 'Envía los resúmenes programados de notificaciones no leídas por email'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--frequency',
+            choices=sorted(NotificationEmailService.DIGEST_PERIODS),
+            default='daily',
+            help='Frecuencia de resumen a procesar (default: daily)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Usuarios por bloque de consulta y envío (default: 200)'
+        )
+
+    def handle(self, *args, **options):
+        totals = NotificationEmailService.send_digests(
+            options['frequency'], users_per_batch=max(options['batch_size'], 1)
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Resúmenes enviados: {totals['users']} "
+            f"({totals['notifications']} notificaciones, {totals['failed']} fallidos)"
+        ))
@@ -0,0 +1,153 @@
+"""
+Management command: sse_load_test
+
+Prueba de carga del stream SSE de notificaciones contra un servidor en marcha
+(gunicorn/uvicorn con config.asgi). Abre muchas conexiones SSE autenticadas,
+las mantiene inactivas y, mientras tanto, mide la latencia de peticiones
+normales a la API para comprobar que las conexiones abiertas no la bloquean.
+
+Uso:
+    gunicorn -k uvicorn.workers.UvicornWorker -w 1 config.asgi:application &
+    python manage.py sse_load_test --connections 5000 --hold 30
+    python manage.py sse_load_test --url http://127.0.0.1:8000 --token <jwt> --probe-path /health/
+"""
+import asyncio
+import resource
+import statistics
+import time
+from urllib.parse import urlsplit
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+STREAM_PATH = '/arye_system/api_data/notifications/stream/'
+
+
+class Command(BaseCommand):
+    help = "Abre miles de conexiones SSE inactivas y mide la latencia de la API mientras siguen abiertas."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='URL base del servidor (http://127.0.0.1:8000).')
+        parser.add_argument('--connections', type=int, default=2000, help='Conexiones SSE simultáneas (2000).')
+        parser.add_argument('--hold', type=float, default=10, help='Segundos que se mantienen abiertas (10).')
+        parser.add_argument('--probe-path', default='/health/', help='Ruta que se mide mientras tanto (/health/).')
+        parser.add_argument('--concurrency', type=int, default=200, help='Conexiones que se abren a la vez (200).')
+        parser.add_argument('--token', help='JWT de acceso. Por defecto se genera para --user.')
+        parser.add_argument('--user', help='Email del usuario para generar el JWT (por defecto, un admin).')
+
+    def _token(self, options):
+        if options.get('token'):
+            return options['token']
+        from rest_framework_simplejwt.tokens import RefreshToken
+
+        User = get_user_model()
+        if options.get('user'):
+            user = User.objects.filter(email=options['user']).first()
+        else:
+            user = User.objects.filter(is_staff=True).order_by('id').first()
+        if user is None:
+            raise CommandError('No se encontró el usuario; use --user o --token')
+        return str(RefreshToken.for_user(user).access_token)
+
+    def _raise_fd_limit(self, needed):
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft >= needed:
+            return
+        target = needed if hard == resource.RLIM_INFINITY else min(needed, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+        if target < needed:
+            self.stdout.write(self.style.WARNING(f'Límite de descriptores {target} < {needed}; algunas conexiones fallarán.'))
+
+    @staticmethod
+    def _request(host, path, token=None, accept='*/*'):
+        lines = [f'GET {path} HTTP/1.1', f'Host: {host}', f'Accept: {accept}']
+        if token:
+            lines.append(f'Authorization: Bearer {token}')
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode()
+
+    async def _open_stream(self, host, port, token, semaphore, streams, failures):
+        async with semaphore:
+            try:
+                reader, writer = await asyncio.open_connection(host, port)
+                writer.write(self._request(f'{host}:{port}', STREAM_PATH, token, 'text/event-stream'))
+                await writer.drain()
+                received = b''
+                while b'event: connected' not in received:
+                    chunk = await asyncio.wait_for(reader.read(4096), timeout=30)
+                    if not chunk:
+                        raise ConnectionError(received.split(b'\r\n', 1)[0].decode(errors='replace') or 'cerrada')
+                    received += chunk
+                streams.append(writer)
+            except Exception as e:
+                failures.append(str(e) or type(e).__name__)
+
+    async def _probe(self, host, port, path):
+        start = time.perf_counter()
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(self._request(f'{host}:{port}', path).replace(b'\r\n\r\n', b'\r\nConnection: close\r\n\r\n'))
+        await writer.drain()
+        status_line = await asyncio.wait_for(reader.readline(), timeout=30)
+        await reader.read()
+        writer.close()
+        return (time.perf_counter() - start) * 1000, status_line.decode(errors='replace').strip()
+
+    async def _run(self, options, token):
+        parts = urlsplit(options['url'])
+        host, port = parts.hostname, parts.port or 80
+        streams, failures = [], []
+
+        baseline, _ = await self._probe(host, port, options['probe_path'])
+
+        semaphore = asyncio.Semaphore(options['concurrency'])
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            self._open_stream(host, port, token, semaphore, streams, failures)
+            for _ in range(options['connections'])
+        ))
+        open_seconds = time.perf_counter() - start
+
+        latencies, statuses = [], set()
+        deadline = time.perf_counter() + options['hold']
+        while time.perf_counter() < deadline:
+            latency, status = await self._probe(host, port, options['probe_path'])
+            latencies.append(latency)
+            statuses.add(status)
+            await asyncio.sleep(0.5)
+
+        for writer in streams:
+            writer.close()
+        return {
+            'opened': len(streams),
+            'failures': failures,
+            'open_seconds': open_seconds,
+            'baseline_ms': baseline,
+            'latencies': latencies,
+            'statuses': statuses,
+        }
+
+    def handle(self, *args, **options):
+        if options['connections'] < 1:
+            raise CommandError('--connections debe ser mayor que 0')
+
+        token = self._token(options)
+        self._raise_fd_limit(options['connections'] + 100)
+        result = asyncio.run(self._run(options, token))
+
+        self.stdout.write(f"Conexiones SSE abiertas: {result['opened']}/{options['connections']} "
+                          f"en {result['open_seconds']:.2f} s")
+        if result['failures']:
+            sample = ', '.join(sorted(set(result['failures']))[:3])
+            self.stdout.write(self.style.WARNING(f"Fallidas: {len(result['failures'])} ({sample})"))
+
+        latencies = result['latencies'] or [0.0]
+        self.stdout.write(f"{options['probe_path']} sin conexiones: {result['baseline_ms']:.1f} ms")
+        self.stdout.write(
+            f"{options['probe_path']} con {result['opened']} conexiones abiertas: "
+            f"mediana {statistics.median(latencies):.1f} ms, máx {max(latencies):.1f} ms "
+            f"({len(result['latencies'])} peticiones, {', '.join(sorted(result['statuses']))})"
+        )
+
+        if result['opened'] == options['connections']:
+            self.stdout.write(self.style.SUCCESS('Completado.'))
+        else:
+            raise CommandError('No se pudieron abrir todas las conexiones.')
@@ -0,0 +1,247 @@
+"""
+Compresión br/gzip de las respuestas de la API.
+
+Negocia la codificación con `Accept-Encoding` (br tiene preferencia sobre gzip a
+igual calidad), comprime las respuestas normales que superan un tamaño mínimo y
+las StreamingHttpResponse (exportaciones) bloque a bloque. El stream SSE de
+notificaciones (`text/event-stream`) nunca se comprime: cada evento tiene que
+llegar al cliente en cuanto se envía.
+
+Configuración (settings):
+    COMPRESSION_MIN_SIZE         bytes mínimos para comprimir (1024)
+    COMPRESSION_BROTLI_QUALITY   calidad de brotli, 0-11 (4)
+    COMPRESSION_GZIP_LEVEL       nivel de gzip, 1-9 (6)
+    COMPRESSION_EXCLUDED_PATHS   prefijos de ruta que no se comprimen
+    COMPRESSION_CONTENT_TYPES    tipos de contenido comprimibles
+
+Las métricas (bytes antes/después, ratio y tiempo de CPU por codificación) se
+acumulan por proceso y se consultan con CompressionMiddleware.stats().
+"""
+
+import re
+import threading
+import time
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dependencia opcional
+    brotli = None
+
+DEFAULT_CONTENT_TYPES = (
+    'application/json',
+    'application/msgpack',
+    'application/javascript',
+    'application/xml',
+    'text/',
+)
+
+_ACCEPT_ENCODING_RE = re.compile(r'^\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*$')
+
+
+class _Compressor:
+    """Interfaz común sobre brotli y zlib para comprimir por bloques."""
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(
+                quality=getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 4)
+            )
+        else:
+            # wbits 16 + MAX_WBITS: cabecera y cola gzip
+            self._compressor = zlib.compressobj(
+                getattr(settings, 'COMPRESSION_GZIP_LEVEL', 6), zlib.DEFLATED, 16 + zlib.MAX_WBITS
+            )
+
+    def compress(self, data):
+        if self.encoding == 'br':
+            return self._compressor.process(data)
+        return self._compressor.compress(data)
+
+    def finish(self):
+        if self.encoding == 'br':
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+class CompressionMiddleware:
+    """
+    Middleware de compresión br/gzip para respuestas normales y streaming.
+    """
+
+    _lock = threading.Lock()
+    _stats = {}
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        if not self._should_compress(request, response):
+            return response
+
+        # La respuesta depende de Accept-Encoding aunque esta vez no se comprima
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = self._negotiate(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if not encoding:
+            return response
+
+        if response.streaming:
+            self._compress_streaming(response, encoding)
+        elif len(response.content) < getattr(settings, 'COMPRESSION_MIN_SIZE', 1024):
+            return response
+        elif not self._compress_content(response, encoding):
+            return response
+
+        response.headers['Content-Encoding'] = encoding
+
+        # El cuerpo ya no es el mismo byte a byte: el ETag pasa a ser débil
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+
+        return response
+
+    # ------------------------------------------------------------------
+    # Negociación
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _negotiate(accept_encoding):
+        """Devuelve 'br', 'gzip' o None según Accept-Encoding y las calidades (q)."""
+        qualities = {}
+        for part in accept_encoding.split(','):
+            match = _ACCEPT_ENCODING_RE.match(part)
+            if not match:
+                continue
+            try:
+                quality = float(match.group(2)) if match.group(2) is not None else 1.0
+            except ValueError:
+                continue
+            qualities[match.group(1).lower()] = quality
+
+        wildcard = qualities.get('*', 0)
+        candidates = ['br', 'gzip'] if brotli is not None else ['gzip']
+        best, best_quality = None, 0
+        for encoding in candidates:
+            quality = qualities.get(encoding, wildcard)
+            if quality > best_quality:
+                best, best_quality = encoding, quality
+        return best
+
+    def _is_compressible_type(self, response):
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        if not content_type or content_type == 'text/event-stream':
+            return False
+        allowed = getattr(settings, 'COMPRESSION_CONTENT_TYPES', DEFAULT_CONTENT_TYPES)
+        return any(content_type.startswith(prefix) for prefix in allowed)
+
+    def _should_compress(self, request, response):
+        if response.has_header('Content-Encoding') or response.status_code in (204, 304):
+            return False
+        excluded = getattr(settings, 'COMPRESSION_EXCLUDED_PATHS', ())
+        if any(request.path.startswith(prefix) for prefix in excluded):
+            return False
+        return self._is_compressible_type(response)
+
+    # ------------------------------------------------------------------
+    # Compresión
+    # ------------------------------------------------------------------
+
+    def _compress_content(self, response, encoding):
+        """Comprime el cuerpo completo; no lo sustituye si no gana tamaño."""
+        content = response.content
+        start = time.process_time()
+        compressor = _Compressor(encoding)
+        compressed = compressor.compress(content) + compressor.finish()
+        self._record(encoding, len(content), len(compressed), time.process_time() - start)
+
+        if len(compressed) >= len(content):
+            return False
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        return True
+
+    def _compress_streaming(self, response, encoding):
+        """Comprime un StreamingHttpResponse bloque a bloque (síncrono o asíncrono)."""
+        compressor = _Compressor(encoding)
+        record = self._record
+
+        def compress_chunk(chunk, totals):
+            start = time.process_time()
+            data = compressor.compress(chunk)
+            totals[0] += len(chunk)
+            totals[1] += len(data)
+            totals[2] += time.process_time() - start
+            return data
+
+        def finish(totals):
+            start = time.process_time()
+            data = compressor.finish()
+            record(encoding, totals[0], totals[1] + len(data), totals[2] + time.process_time() - start)
+            return data
+
+        original = response.streaming_content
+        if response.is_async:
+            async def compressed_stream():
+                totals = [0, 0, 0.0]
+                async for chunk in original:
+                    data = compress_chunk(chunk, totals)
+                    if data:
+                        yield data
+                yield finish(totals)
+        else:
+            def compressed_stream():
+                totals = [0, 0, 0.0]
+                for chunk in original:
+                    data = compress_chunk(chunk, totals)
+                    if data:
+                        yield data
+                yield finish(totals)
+
+        response.streaming_content = compressed_stream()
+        del response['Content-Length']
+
+    # ------------------------------------------------------------------
+    # Métricas
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def _record(cls, encoding, original_size, compressed_size, cpu_seconds):
+        with cls._lock:
+            stats = cls._stats.setdefault(encoding, {
+                'responses': 0, 'original_bytes': 0, 'compressed_bytes': 0, 'cpu_seconds': 0.0,
+            })
+            stats['responses'] += 1
+            stats['original_bytes'] += original_size
+            stats['compressed_bytes'] += compressed_size
+            stats['cpu_seconds'] += cpu_seconds
+
+    @classmethod
+    def stats(cls):
+        """
+        Métricas acumuladas en este proceso por codificación.
+
+        Returns:
+            dict: codificación → respuestas, bytes originales y comprimidos,
+            ratio (comprimido / original) y tiempo de CPU total y medio en ms
+        """
+        with cls._lock:
+            snapshot = {encoding: dict(values) for encoding, values in cls._stats.items()}
+
+        for values in snapshot.values():
+            original = values['original_bytes']
+            values['ratio'] = round(values['compressed_bytes'] / original, 4) if original else None
+            values['cpu_ms'] = round(values.pop('cpu_seconds') * 1000, 3)
+            values['avg_cpu_ms'] = round(values['cpu_ms'] / values['responses'], 3) if values['responses'] else None
+        return snapshot
+
+    @classmethod
+    def reset_stats(cls):
+        with cls._lock:
+            cls._stats.clear()
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.1 on 2026-10-19 00:19
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0039_deliverreceip_balance_applied_order_balance_applied_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyFinancialRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(help_text='Día (zona horaria del sistema) que resume esta fila', unique=True)),
+                ('deliveries_count', models.IntegerField(default=0)),
+                ('total_weight', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Peso total entregado en el día', max_digits=14)),
+                ('total_delivery_cost', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Suma de weight_cost de las entregas del día', max_digits=14)),
+                ('orders_count', models.IntegerField(default=0)),
+                ('total_revenue', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Suma de received_value_of_client de los pedidos del día', max_digits=14)),
+                ('total_order_balance', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Suma del balance (recibido + saldo aplicado - costo) de los pedidos del día', max_digits=14)),
+                ('shopping_receipts_count', models.IntegerField(default=0)),
+                ('products_bought_count', models.IntegerField(default=0)),
+                ('total_purchase_cost', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Suma de total_cost_of_purchase de los recibos de compra del día', max_digits=14)),
+                ('invoices_count', models.IntegerField(default=0)),
+                ('total_invoices_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Suma del total de las facturas del día', max_digits=14)),
+                ('tags_count', models.IntegerField(default=0)),
+                ('total_tag_weight', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Peso total de los tags de las facturas del día', max_digits=14)),
+                ('total_fixed_cost', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Costo fijo total de los tags del día', max_digits=14)),
+                ('total_tag_subtotal', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Subtotal de los tags del día', max_digits=14)),
+                ('total_shipping_cost', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Suma de peso × costo por libra de los tags del día', max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Resumen Financiero Diario',
+                'verbose_name_plural': 'Resúmenes Financieros Diarios',
+                'ordering': ['-day'],
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+from django.db import migrations, models
+
+
+def populate_product_financials(apps, schema_editor):
+    """Calcula system_expenses y system_profit para los productos existentes."""
+    Product = apps.get_model('api', 'Product')
+    batch = []
+    for product in Product.objects.only(
+        'id', 'shop_cost', 'shop_delivery_cost', 'charge_iva', 'added_taxes', 'own_taxes', 'total_cost'
+    ).iterator(chunk_size=1000):
+        base_price = product.shop_cost or 0.0
+        base_tax = (base_price * 0.07) if product.charge_iva else 0
+        expenses = round(base_price + (product.shop_delivery_cost or 0.0) + base_tax + (product.added_taxes or 0.0), 2)
+        product.system_expenses = expenses
+        product.system_profit = round(float(product.total_cost or 0.0) - expenses + (product.own_taxes or 0.0), 2)
+        batch.append(product)
+        if len(batch) >= 1000:
+            Product.objects.bulk_update(batch, ['system_expenses', 'system_profit'])
+            batch = []
+    if batch:
+        Product.objects.bulk_update(batch, ['system_expenses', 'system_profit'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0040_daily_financial_rollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='system_expenses',
+            field=models.FloatField(default=0, help_text='Gastos del sistema por unidad (se recalcula al guardar)'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='system_profit',
+            field=models.FloatField(default=0, help_text='Ganancia del sistema por unidad (se recalcula al guardar)'),
+        ),
+        migrations.RunPython(populate_product_financials, migrations.RunPython.noop),
+    ]
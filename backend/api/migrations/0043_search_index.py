@@ -0,0 +1,105 @@
+# Generated by Django 5.1.1 on 2026-10-19 01:32
+
+from django.db import migrations, models
+
+
+# Índices específicos de cada motor (ver api.models.search.SearchDocument)
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS search_doc_trgm_idx ON api_searchdocument USING gin (content gin_trgm_ops)",
+]
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS search_doc_trgm_idx",
+    "DROP INDEX IF EXISTS search_doc_vector_idx",
+]
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS api_searchdocument_fts USING fts5(
+        content, content='api_searchdocument', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_searchdocument_fts_ai AFTER INSERT ON api_searchdocument BEGIN
+        INSERT INTO api_searchdocument_fts(rowid, content) VALUES (new.id, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_searchdocument_fts_ad AFTER DELETE ON api_searchdocument BEGIN
+        INSERT INTO api_searchdocument_fts(api_searchdocument_fts, rowid, content) VALUES ('delete', old.id, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS api_searchdocument_fts_au AFTER UPDATE OF content ON api_searchdocument BEGIN
+        INSERT INTO api_searchdocument_fts(api_searchdocument_fts, rowid, content) VALUES ('delete', old.id, old.content);
+        INSERT INTO api_searchdocument_fts(rowid, content) VALUES (new.id, new.content);
+    END
+    """,
+]
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS api_searchdocument_fts_ai",
+    "DROP TRIGGER IF EXISTS api_searchdocument_fts_ad",
+    "DROP TRIGGER IF EXISTS api_searchdocument_fts_au",
+    "DROP TABLE IF EXISTS api_searchdocument_fts",
+]
+
+
+def create_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        from django.contrib.postgres.indexes import GinIndex
+        from django.contrib.postgres.search import SearchVector
+
+        for statement in POSTGRES_FORWARD:
+            schema_editor.execute(statement)
+        # Mismo SearchVector que usa SearchService, para que el planner use el índice
+        SearchDocument = apps.get_model('api', 'SearchDocument')
+        schema_editor.add_index(
+            SearchDocument,
+            GinIndex(SearchVector('content', config='simple'), name='search_doc_vector_idx'),
+        )
+    elif vendor == 'sqlite':
+        from django.db.utils import OperationalError
+
+        try:
+            for statement in SQLITE_FORWARD:
+                schema_editor.execute(statement)
+        except OperationalError:
+            # SQLite sin FTS5: SearchService recurre a LIKE sobre content
+            pass
+
+
+def drop_search_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {'postgresql': POSTGRES_BACKWARD, 'sqlite': SQLITE_BACKWARD}.get(vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0042_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity_type', models.CharField(choices=[('user', 'Usuario'), ('order', 'Pedido'), ('product', 'Producto')], max_length=20)),
+                ('object_id', models.CharField(help_text='Clave primaria del objeto indexado', max_length=64)),
+                ('title', models.CharField(blank=True, default='', max_length=255)),
+                ('subtitle', models.CharField(blank=True, default='', max_length=255)),
+                ('content', models.TextField(blank=True, default='', help_text='Texto buscable normalizado')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Documento de Búsqueda',
+                'verbose_name_plural': 'Documentos de Búsqueda',
+                'constraints': [models.UniqueConstraint(fields=('entity_type', 'object_id'), name='search_doc_entity_unique')],
+            },
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
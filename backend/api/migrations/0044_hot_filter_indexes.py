@@ -0,0 +1,57 @@
+# Generated by Django 5.1.1 on 2026-10-19 01:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0043_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='deliverreceip',
+            index=models.Index(fields=['-deliver_date'], name='deliver_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deliverreceip',
+            index=models.Index(fields=['client', '-deliver_date'], name='deliver_client_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='deliverreceip',
+            index=models.Index(fields=['payment_status', '-deliver_date'], name='deliver_paystatus_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['-date'], name='expense_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['client', '-created_at'], name='order_client_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['sales_manager', 'status'], name='order_manager_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status'], name='order_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['status'], name='product_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['order', 'status'], name='product_order_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shoppingreceip',
+            index=models.Index(fields=['-buy_date'], name='shopping_buy_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shoppingreceip',
+            index=models.Index(fields=['card_id', '-buy_date'], name='shopping_card_date_idx'),
+        ),
+    ]
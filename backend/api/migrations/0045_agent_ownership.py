@@ -0,0 +1,65 @@
+# Generated by Django 5.1.1 on 2026-10-19 01:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_agents(apps, schema_editor):
+    """Asigna el agente a los datos existentes: cliente → pedidos/entregas → productos → movimientos."""
+    CustomUser = apps.get_model('api', 'CustomUser')
+    Order = apps.get_model('api', 'Order')
+    Product = apps.get_model('api', 'Product')
+
+    client_agent = CustomUser.objects.filter(pk=OuterRef('client_id')).values('assigned_agent_id')[:1]
+    Order.objects.update(agent_id=Subquery(client_agent))
+    apps.get_model('api', 'DeliverReceip').objects.update(agent_id=Subquery(client_agent))
+
+    order_agent = Order.objects.filter(pk=OuterRef('order_id')).values('agent_id')[:1]
+    Product.objects.update(agent_id=Subquery(order_agent))
+
+    product_agent = Product.objects.filter(pk=OuterRef('original_product_id')).values('agent_id')[:1]
+    for model_name in ('ProductBuyed', 'ProductReceived', 'ProductDelivery'):
+        apps.get_model('api', model_name).objects.update(agent_id=Subquery(product_agent))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0044_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deliverreceip',
+            name='agent',
+            field=models.ForeignKey(blank=True, editable=False, help_text='Agente del cliente (client.assigned_agent). Desnormalizado para filtrar por rol sin joins', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='agent',
+            field=models.ForeignKey(blank=True, editable=False, help_text='Agente del cliente (client.assigned_agent). Desnormalizado para filtrar por rol sin joins', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='agent',
+            field=models.ForeignKey(blank=True, editable=False, help_text='Agente del cliente (order.agent). Desnormalizado para filtrar por rol sin joins', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='productbuyed',
+            name='agent',
+            field=models.ForeignKey(blank=True, editable=False, help_text='Agente del cliente (original_product.agent). Desnormalizado para filtrar por rol sin joins', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='productdelivery',
+            name='agent',
+            field=models.ForeignKey(blank=True, editable=False, help_text='Agente del cliente (original_product.agent). Desnormalizado para filtrar por rol sin joins', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='productreceived',
+            name='agent',
+            field=models.ForeignKey(blank=True, editable=False, help_text='Agente del cliente (original_product.agent). Desnormalizado para filtrar por rol sin joins', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(backfill_agents, migrations.RunPython.noop),
+    ]
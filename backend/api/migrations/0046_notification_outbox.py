@@ -0,0 +1,34 @@
+# Generated by Django 5.1.1 on 2026-10-19 02:24
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0045_agent_ownership'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_type', models.CharField(max_length=50, verbose_name='Evento')),
+                ('payload', models.JSONField(blank=True, default=dict, verbose_name='Datos')),
+                ('status', models.CharField(choices=[('pending', 'Pendiente'), ('done', 'Procesado'), ('failed', 'Fallido')], default='pending', max_length=10, verbose_name='Estado')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Intentos')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='Último error')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Creado en')),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Disponible desde')),
+                ('processed_at', models.DateTimeField(blank=True, null=True, verbose_name='Procesado en')),
+            ],
+            options={
+                'verbose_name': 'Evento de notificación',
+                'verbose_name_plural': 'Outbox de notificaciones',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['status', 'available_at', 'id'], name='notif_outbox_queue_idx')],
+            },
+        ),
+    ]
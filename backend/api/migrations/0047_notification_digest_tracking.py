@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-19 02:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0046_notification_outbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationpreference',
+            name='last_digest_sent_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Último resumen enviado'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.1.1 on 2026-10-19 02:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_counters(apps, schema_editor):
+    """Crea los contadores a partir de las notificaciones existentes (un GROUP BY)."""
+    Notification = apps.get_model('api', 'Notification')
+    NotificationCounter = apps.get_model('api', 'NotificationCounter')
+
+    rows = (
+        Notification.objects.order_by()
+        .values('recipient_id', 'notification_type', 'priority')
+        .annotate(total=Count('id'), unread=Count('id', filter=Q(is_read=False)))
+    )
+    NotificationCounter.objects.bulk_create(
+        (
+            NotificationCounter(
+                user_id=row['recipient_id'],
+                notification_type=row['notification_type'],
+                priority=row['priority'],
+                total=row['total'],
+                unread=row['unread'],
+            )
+            for row in rows.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0047_notification_digest_tracking'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('notification_type', models.CharField(choices=[('order_created', 'Orden creada'), ('order_status_changed', 'Estado de orden cambiado'), ('order_assigned', 'Orden asignada'), ('order_completed', 'Orden completada'), ('order_cancelled', 'Orden cancelada'), ('product_added', 'Producto añadido'), ('product_purchased', 'Producto comprado'), ('product_received', 'Producto recibido'), ('product_delivered', 'Producto entregado'), ('product_out_of_stock', 'Producto agotado'), ('payment_received', 'Pago recibido'), ('payment_pending', 'Pago pendiente'), ('payment_overdue', 'Pago vencido'), ('package_shipped', 'Paquete enviado'), ('package_in_transit', 'Paquete en tránsito'), ('package_delivered', 'Paquete entregado'), ('package_delayed', 'Paquete retrasado'), ('user_registered', 'Usuario registrado'), ('user_verified', 'Usuario verificado'), ('user_role_changed', 'Rol de usuario cambiado'), ('system_message', 'Mensaje del sistema'), ('system_alert', 'Alerta del sistema'), ('system_maintenance', 'Mantenimiento del sistema')], max_length=50, verbose_name='Tipo')),
+                ('priority', models.CharField(choices=[('low', 'Baja'), ('normal', 'Normal'), ('high', 'Alta'), ('urgent', 'Urgente')], max_length=20, verbose_name='Prioridad')),
+                ('total', models.IntegerField(default=0, verbose_name='Total')),
+                ('unread', models.IntegerField(default=0, verbose_name='No leídas')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notification_counters', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Contador de notificaciones',
+                'verbose_name_plural': 'Contadores de notificaciones',
+                'constraints': [models.UniqueConstraint(fields=('user', 'notification_type', 'priority'), name='notif_counter_user_type_priority_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,79 @@
+# Generated by Django 5.1.1 on 2026-10-19 03:02
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+# En PostgreSQL la tabla se crea particionada por mes de created_at. La clave
+# primaria de una tabla particionada debe incluir la columna de partición; las
+# particiones mensuales las crea NotificationRetentionService al archivar.
+POSTGRES_ARCHIVE_TABLE = '''
+CREATE TABLE "api_notificationarchive" (
+    "id" bigserial NOT NULL,
+    "original_id" bigint NOT NULL,
+    "recipient_id" bigint NOT NULL,
+    "sender_id" bigint NULL,
+    "notification_type" varchar(50) NOT NULL,
+    "priority" varchar(20) NOT NULL,
+    "title" varchar(200) NOT NULL,
+    "message" text NOT NULL,
+    "is_read" boolean NOT NULL,
+    "read_at" timestamp with time zone NULL,
+    "created_at" timestamp with time zone NOT NULL,
+    "archived_at" timestamp with time zone NOT NULL,
+    PRIMARY KEY ("id", "created_at")
+) PARTITION BY RANGE ("created_at")
+'''
+
+
+def create_archive_table(apps, schema_editor):
+    NotificationArchive = apps.get_model('api', 'NotificationArchive')
+    if schema_editor.connection.vendor != 'postgresql':
+        schema_editor.create_model(NotificationArchive)
+        return
+    schema_editor.execute(POSTGRES_ARCHIVE_TABLE)
+    for index in NotificationArchive._meta.indexes:
+        schema_editor.add_index(NotificationArchive, index)
+
+
+def drop_archive_table(apps, schema_editor):
+    # En PostgreSQL elimina también las particiones
+    schema_editor.delete_model(apps.get_model('api', 'NotificationArchive'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0048_notification_counters'),
+    ]
+
+    operations = [
+        # Solo estado: la tabla la crea create_archive_table según el motor
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='NotificationArchive',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('original_id', models.BigIntegerField(verbose_name='ID original')),
+                        ('recipient_id', models.BigIntegerField(verbose_name='Destinatario')),
+                        ('sender_id', models.BigIntegerField(blank=True, null=True, verbose_name='Remitente')),
+                        ('notification_type', models.CharField(choices=[('order_created', 'Orden creada'), ('order_status_changed', 'Estado de orden cambiado'), ('order_assigned', 'Orden asignada'), ('order_completed', 'Orden completada'), ('order_cancelled', 'Orden cancelada'), ('product_added', 'Producto añadido'), ('product_purchased', 'Producto comprado'), ('product_received', 'Producto recibido'), ('product_delivered', 'Producto entregado'), ('product_out_of_stock', 'Producto agotado'), ('payment_received', 'Pago recibido'), ('payment_pending', 'Pago pendiente'), ('payment_overdue', 'Pago vencido'), ('package_shipped', 'Paquete enviado'), ('package_in_transit', 'Paquete en tránsito'), ('package_delivered', 'Paquete entregado'), ('package_delayed', 'Paquete retrasado'), ('user_registered', 'Usuario registrado'), ('user_verified', 'Usuario verificado'), ('user_role_changed', 'Rol de usuario cambiado'), ('system_message', 'Mensaje del sistema'), ('system_alert', 'Alerta del sistema'), ('system_maintenance', 'Mantenimiento del sistema')], max_length=50, verbose_name='Tipo')),
+                        ('priority', models.CharField(choices=[('low', 'Baja'), ('normal', 'Normal'), ('high', 'Alta'), ('urgent', 'Urgente')], max_length=20, verbose_name='Prioridad')),
+                        ('title', models.CharField(max_length=200, verbose_name='Título')),
+                        ('message', models.TextField(verbose_name='Mensaje')),
+                        ('is_read', models.BooleanField(default=False, verbose_name='Leída')),
+                        ('read_at', models.DateTimeField(blank=True, null=True, verbose_name='Leída en')),
+                        ('created_at', models.DateTimeField(verbose_name='Creada en')),
+                        ('archived_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Archivada en')),
+                    ],
+                    options={
+                        'verbose_name': 'Notificación archivada',
+                        'verbose_name_plural': 'Notificaciones archivadas',
+                        'indexes': [models.Index(fields=['created_at'], name='notif_archive_created_idx'), models.Index(fields=['recipient_id', '-created_at'], name='notif_archive_recip_idx')],
+                    },
+                ),
+            ],
+        ),
+        migrations.RunPython(create_archive_table, drop_archive_table),
+    ]
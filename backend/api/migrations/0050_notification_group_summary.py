@@ -0,0 +1,47 @@
+# Generated by Django 5.1.1 on 2026-10-19 03:13
+
+from django.db import migrations, models
+
+SUMMARY_PREVIEW = 3
+
+
+def backfill_summaries(apps, schema_editor):
+    """Calcula el resumen de los grupos existentes a partir de aggregated_data."""
+    NotificationGroup = apps.get_model('api', 'NotificationGroup')
+
+    batch = []
+    for group in NotificationGroup.objects.only('id', 'aggregated_data').iterator(chunk_size=500):
+        entries = group.aggregated_data if isinstance(group.aggregated_data, list) else []
+        if not entries:
+            continue
+        last = entries[-1]
+        group.summary = {
+            'preview': [
+                {'id': entry.get('id'), 'title': entry.get('title')}
+                for entry in reversed(entries[-SUMMARY_PREVIEW:])
+            ],
+            'last_message': last.get('message'),
+            'last_action_url': last.get('action_url'),
+            'last_created_at': last.get('created_at'),
+        }
+        batch.append(group)
+        if len(batch) >= 500:
+            NotificationGroup.objects.bulk_update(batch, ['summary'])
+            batch = []
+    NotificationGroup.objects.bulk_update(batch, ['summary'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0049_notification_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationgroup',
+            name='summary',
+            field=models.JSONField(default=dict, verbose_name='Resumen'),
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
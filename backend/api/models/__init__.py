@@ -10,8 +10,10 @@ from .invoice import Invoice, Tag
 from .expenses import Expense
 
 # Import existing models
-from ..notifications.models_notifications import Notification, NotificationPreference
+from ..notifications.models_notifications import Notification, NotificationPreference, NotificationOutbox
 from .balance import Balance
+from .rollup import DailyFinancialRollup
+from .search import SearchDocument
 
 __all__ = [
     'CustomUser',
@@ -32,5 +34,8 @@ __all__ = [
     'Expense',
     'Notification',
     'NotificationPreference',
+    'NotificationOutbox',
     'Balance',
+    'DailyFinancialRollup',
+    'SearchDocument',
 ]
\ No newline at end of file
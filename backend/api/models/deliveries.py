@@ -13,6 +13,10 @@ class DeliverReceip(models.Model):
         limit_choices_to={'role': 'client'},
         help_text='Cliente al que pertenece el delivery'
     )
+    agent = models.ForeignKey(
+        'api.CustomUser', on_delete=models.SET_NULL, null=True, blank=True, editable=False,
+        related_name='+', help_text="Agente del cliente (client.assigned_agent). Desnormalizado para filtrar por rol sin joins"
+    )
     category = models.ForeignKey(
         'api.Category',
         on_delete=models.SET_NULL,
@@ -148,6 +152,12 @@ class DeliverReceip(models.Model):
         ordering = ['-deliver_date']
         verbose_name = "Recibo de Entrega"
         verbose_name_plural = "Recibos de Entrega"
+        indexes = [
+            # Listado por fecha, entregas de un cliente y reportes por estado de pago
+            models.Index(fields=['-deliver_date'], name='deliver_date_idx'),
+            models.Index(fields=['client', '-deliver_date'], name='deliver_client_date_idx'),
+            models.Index(fields=['payment_status', '-deliver_date'], name='deliver_paystatus_date_idx'),
+        ]
 
 
 class Package(models.Model):
@@ -45,6 +45,10 @@ class Expense(models.Model):
         ordering = ["-date"]
         verbose_name = "Gasto"
         verbose_name_plural = "Gastos"
+        indexes = [
+            # Análisis de gastos por rango de fechas
+            models.Index(fields=["-date"], name="expense_date_idx"),
+        ]
 
     def __str__(self):
         return f"Gasto #{self.pk} - {self.category} - {self.amount}"
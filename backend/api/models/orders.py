@@ -11,6 +11,10 @@ class Order(models.Model):
     client = models.ForeignKey(
         'api.CustomUser', on_delete=models.CASCADE, related_name="orders"
     )
+    agent = models.ForeignKey(
+        'api.CustomUser', on_delete=models.SET_NULL, null=True, blank=True, editable=False,
+        related_name='+', help_text="Agente del cliente (client.assigned_agent). Desnormalizado para filtrar por rol sin joins"
+    )
     sales_manager = models.ForeignKey(
         'api.CustomUser', on_delete=models.CASCADE, related_name="managed_orders",
         null=True,
@@ -238,6 +242,33 @@ class Order(models.Model):
             return False
         return not self.has_pending_delivery
 
+    def _sum_product_financial(self, field):
+        """
+        Suma `field × amount_purchased` de los productos de la orden.
+
+        Usa la anotación del queryset si existe (ver annotate_product_financials),
+        los productos precargados si hay prefetch, o un único SUM en SQL.
+        """
+        annotated = getattr(self, f'products_{field}_total', None)
+        if annotated is not None:
+            return round(float(annotated), 2)
+
+        prefetched = getattr(self, '_prefetched_objects_cache', {}).get('products')
+        if prefetched is not None:
+            total = sum(
+                float(getattr(product, field) or 0.0) * int(product.amount_purchased or 0)
+                for product in prefetched
+            )
+            return round(float(total), 2)
+
+        total = self.products.aggregate(
+            total=models.Sum(
+                models.F(field) * models.F('amount_purchased'),
+                output_field=models.FloatField()
+            )
+        )['total']
+        return round(float(total or 0.0), 2)
+
     @property
     def total_expenses(self):
         """
@@ -245,15 +276,7 @@ class Order(models.Model):
         Suma de los gastos del sistema (system_expenses) de todos los productos,
         multiplicados por la cantidad comprada de cada producto.
         """
-        total = 0.0
-        for product in self.products.all():
-            try:
-                # Gastos del sistema por unidad × cantidad comprada
-                product_expenses = float(product.system_expenses or 0.0) * int(product.amount_purchased or 0)
-                total += product_expenses
-            except (AttributeError, TypeError, ValueError):
-                continue
-        return round(float(total), 2)
+        return self._sum_product_financial('system_expenses')
 
     @property
     def total_profit(self):
@@ -265,15 +288,7 @@ class Order(models.Model):
         La ganancia se calcula como:
         (costo total cobrado al cliente - gastos del sistema) × cantidad comprada
         """
-        total = 0.0
-        for product in self.products.all():
-            try:
-                # Ganancia del sistema por unidad × cantidad comprada
-                product_profit = float(product.system_profit or 0.0) * int(product.amount_purchased or 0)
-                total += product_profit
-            except (AttributeError, TypeError, ValueError):
-                continue
-        return round(float(total), 2)
+        return self._sum_product_financial('system_profit')
 
     @property
     def available_for_delivery(self):
@@ -296,6 +311,14 @@ class Order(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Paginación por cursor (keyset) sobre (created_at, id)
+            models.Index(fields=['-created_at', '-id'], name='order_created_id_idx'),
+            # Pedidos de un cliente por fecha y pedidos de un agente por estado
+            models.Index(fields=['client', '-created_at'], name='order_client_created_idx'),
+            models.Index(fields=['sales_manager', 'status'], name='order_manager_status_idx'),
+            models.Index(fields=['status'], name='order_status_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         """
@@ -26,6 +26,12 @@ class Category(models.Model):
         verbose_name_plural = "Categorías"
 
 
+# Campos de los que dependen system_expenses y system_profit
+FINANCIAL_SOURCE_FIELDS = frozenset({
+    'shop_cost', 'shop_delivery_cost', 'charge_iva', 'added_taxes', 'own_taxes', 'total_cost',
+})
+
+
 class Product(models.Model):
     """Products in shop"""
 
@@ -49,6 +55,10 @@ class Product(models.Model):
     amount_delivered = models.IntegerField(default=0, help_text="Cantidad total de productos entregados")
     
     order = models.ForeignKey('api.Order', on_delete=models.CASCADE, related_name="products")
+    agent = models.ForeignKey(
+        'api.CustomUser', on_delete=models.SET_NULL, null=True, blank=True, editable=False,
+        related_name='+', help_text="Agente del cliente (order.agent). Desnormalizado para filtrar por rol sin joins"
+    )
     status = models.CharField(
         max_length=100,
         choices=[(tag.value, tag.value) for tag in ProductStatusEnum],
@@ -68,6 +78,14 @@ class Product(models.Model):
     own_taxes = models.FloatField(default=0)
     added_taxes = models.FloatField(default=0)
     total_cost = models.FloatField(default=0)
+    system_expenses = models.FloatField(
+        default=0,
+        help_text="Gastos del sistema por unidad (se recalcula al guardar)"
+    )
+    system_profit = models.FloatField(
+        default=0,
+        help_text="Ganancia del sistema por unidad (se recalcula al guardar)"
+    )
 
     # Timestamps
     created_at = models.DateTimeField(default=timezone.now)
@@ -75,7 +93,12 @@ class Product(models.Model):
 
     objects = models.Manager()
 
-    def save(self, *args, **kwargs):
+    def prepare_financials(self):
+        """
+        Redondea los campos financieros y recalcula las columnas derivadas.
+        Lo llama save() y también la escritura masiva, ya que bulk_create /
+        bulk_update no pasan por save().
+        """
         # Round financial fields
         self.shop_cost = round(self.shop_cost or 0.0, 2)
         self.shop_delivery_cost = round(self.shop_delivery_cost or 0.0, 2)
@@ -85,6 +108,19 @@ class Product(models.Model):
         self.own_taxes = round(self.own_taxes or 0.0, 2)
         self.added_taxes = round(self.added_taxes or 0.0, 2)
         self.total_cost = round(self.total_cost or 0.0, 2)
+
+        # Columnas financieras derivadas: se guardan para poder filtrar,
+        # ordenar y agregar en SQL (SUM(system_profit * amount_purchased))
+        self.system_expenses = self.calculate_system_expenses()
+        self.system_profit = self.calculate_system_profit()
+
+    def save(self, *args, **kwargs):
+        self.prepare_financials()
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and FINANCIAL_SOURCE_FIELDS.intersection(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'system_expenses', 'system_profit'}
+
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -130,33 +166,38 @@ class Product(models.Model):
         """Total de productos entregados (redundante, usa amount_delivered)"""
         return self.amount_delivered
 
-    @property
-    def system_expenses(self):
+    def calculate_system_expenses(self):
         """
         Gastos del sistema para este producto.
         Fórmula: precio + envío + (7% del precio si charge_iva=True) + impuesto adicional (added_taxes)
         """
-        base_price = self.shop_cost
-        shipping = self.shop_delivery_cost
+        base_price = self.shop_cost or 0.0
+        shipping = self.shop_delivery_cost or 0.0
         # Solo aplicar IVA si charge_iva es True
         base_tax = (base_price * 0.07) if self.charge_iva else 0
-        additional_tax = self.added_taxes
+        additional_tax = self.added_taxes or 0.0
 
         return round(base_price + shipping + base_tax + additional_tax, 2)
 
-    @property
-    def system_profit(self):
+    def calculate_system_profit(self):
         """
         Ganancia del sistema para este producto.
         Fórmula: (costo total cobrado al cliente - gastos del sistema) + impuestos propios (own_taxes)
 
         El campo own_taxes representa impuestos adicionales que se suman a las ganancias del sistema.
         """
-        base_profit = float(self.total_cost) - self.system_expenses
-        return round(base_profit + self.own_taxes, 2)
+        base_profit = float(self.total_cost or 0.0) - self.calculate_system_expenses()
+        return round(base_profit + (self.own_taxes or 0.0), 2)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Paginación por cursor (keyset) sobre (created_at, id)
+            models.Index(fields=['-created_at', '-id'], name='product_created_id_idx'),
+            # Conteos por estado del dashboard y productos de un pedido por estado
+            models.Index(fields=['status'], name='product_status_idx'),
+            models.Index(fields=['order', 'status'], name='product_order_status_idx'),
+        ]
 
 
 class ProductBuyed(models.Model):
@@ -165,6 +206,10 @@ class ProductBuyed(models.Model):
     original_product = models.ForeignKey(
         Product, on_delete=models.CASCADE, related_name="buys"
     )
+    agent = models.ForeignKey(
+        'api.CustomUser', on_delete=models.SET_NULL, null=True, blank=True, editable=False,
+        related_name='+', help_text="Agente del cliente (original_product.agent). Desnormalizado para filtrar por rol sin joins"
+    )
     shop_discount = models.FloatField(default=0)
     offer_discount = models.FloatField(default=0)
     buy_date = models.DateTimeField(default=timezone.now)
@@ -224,6 +269,10 @@ class ProductBuyed(models.Model):
         ordering = ['-buy_date']
         verbose_name = "Producto Comprado"
         verbose_name_plural = "Productos Comprados"
+        indexes = [
+            # Paginación por cursor (keyset) sobre (created_at, id)
+            models.Index(fields=['-created_at', '-id'], name='buyed_created_id_idx'),
+        ]
 
 
 class ProductReceived(models.Model):
@@ -232,6 +281,10 @@ class ProductReceived(models.Model):
     original_product = models.ForeignKey(
         Product, on_delete=models.CASCADE, related_name="receiveds"
     )
+    agent = models.ForeignKey(
+        'api.CustomUser', on_delete=models.SET_NULL, null=True, blank=True, editable=False,
+        related_name='+', help_text="Agente del cliente (original_product.agent). Desnormalizado para filtrar por rol sin joins"
+    )
     package = models.ForeignKey(
         'api.Package',
         on_delete=models.CASCADE,
@@ -282,6 +335,10 @@ class ProductDelivery(models.Model):
     original_product = models.ForeignKey(
         Product, on_delete=models.CASCADE, related_name="delivers"
     )
+    agent = models.ForeignKey(
+        'api.CustomUser', on_delete=models.SET_NULL, null=True, blank=True, editable=False,
+        related_name='+', help_text="Agente del cliente (original_product.agent). Desnormalizado para filtrar por rol sin joins"
+    )
 
     deliver_receip = models.ForeignKey(
         'api.DeliverReceip',
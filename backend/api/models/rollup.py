@@ -0,0 +1,63 @@
+"""Daily financial rollup model"""
+
+from decimal import Decimal
+from django.db import models
+
+
+def _money_field(help_text):
+    return models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        help_text=help_text,
+    )
+
+
+class DailyFinancialRollup(models.Model):
+    """
+    Totales financieros precalculados por día.
+
+    Cada fila resume las entregas, pedidos, compras y facturas de un día, de modo
+    que cualquier cálculo sobre un rango de fechas se reduce a sumar como mucho
+    unos cientos de filas en lugar de recorrer todas las operaciones del rango.
+    Las filas se mantienen desde signals al escribir y se pueden reconstruir con
+    el comando `backfill_financial_rollups`.
+    """
+
+    day = models.DateField(unique=True, help_text="Día (zona horaria del sistema) que resume esta fila")
+
+    # Entregas (DeliverReceip.deliver_date)
+    deliveries_count = models.IntegerField(default=0)
+    total_weight = _money_field("Peso total entregado en el día")
+    total_delivery_cost = _money_field("Suma de weight_cost de las entregas del día")
+
+    # Pedidos (Order.created_at)
+    orders_count = models.IntegerField(default=0)
+    total_revenue = _money_field("Suma de received_value_of_client de los pedidos del día")
+    total_order_balance = _money_field("Suma del balance (recibido + saldo aplicado - costo) de los pedidos del día")
+
+    # Compras (ShoppingReceip.buy_date)
+    shopping_receipts_count = models.IntegerField(default=0)
+    products_bought_count = models.IntegerField(default=0)
+    total_purchase_cost = _money_field("Suma de total_cost_of_purchase de los recibos de compra del día")
+
+    # Facturas y tags (Invoice.date)
+    invoices_count = models.IntegerField(default=0)
+    total_invoices_amount = _money_field("Suma del total de las facturas del día")
+    tags_count = models.IntegerField(default=0)
+    total_tag_weight = _money_field("Peso total de los tags de las facturas del día")
+    total_fixed_cost = _money_field("Costo fijo total de los tags del día")
+    total_tag_subtotal = _money_field("Subtotal de los tags del día")
+    total_shipping_cost = _money_field("Suma de peso × costo por libra de los tags del día")
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = models.Manager()
+
+    class Meta:
+        ordering = ['-day']
+        verbose_name = "Resumen Financiero Diario"
+        verbose_name_plural = "Resúmenes Financieros Diarios"
+
+    def __str__(self):
+        return f"Resumen {self.day}"
@@ -0,0 +1,49 @@
+"""Search index model"""
+
+from django.db import models
+
+
+class SearchDocument(models.Model):
+    """
+    Documento de búsqueda desnormalizado de un usuario, pedido o producto.
+
+    `content` guarda el texto buscable ya normalizado (minúsculas y sin tildes)
+    para que la búsqueda no tenga que unir tablas ni aplicar LOWER/LIKE sobre
+    cada columna. Los índices dependen del motor y se crean en la migración:
+
+    - PostgreSQL: GIN con `gin_trgm_ops` sobre `content` (LIKE y similitud) y
+      GIN sobre `to_tsvector('simple', content)` (búsqueda por palabras).
+    - SQLite: tabla virtual FTS5 `api_searchdocument_fts` mantenida con triggers.
+
+    Las filas se mantienen desde signals al guardar CustomUser, Order y Product y
+    se pueden reconstruir con el comando `rebuild_search_index`.
+    """
+
+    ENTITY_USER = 'user'
+    ENTITY_ORDER = 'order'
+    ENTITY_PRODUCT = 'product'
+    ENTITY_CHOICES = [
+        (ENTITY_USER, 'Usuario'),
+        (ENTITY_ORDER, 'Pedido'),
+        (ENTITY_PRODUCT, 'Producto'),
+    ]
+
+    entity_type = models.CharField(max_length=20, choices=ENTITY_CHOICES)
+    object_id = models.CharField(max_length=64, help_text="Clave primaria del objeto indexado")
+    title = models.CharField(max_length=255, blank=True, default='')
+    subtitle = models.CharField(max_length=255, blank=True, default='')
+    content = models.TextField(blank=True, default='', help_text="Texto buscable normalizado")
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = models.Manager()
+
+    def __str__(self):
+        return f"{self.entity_type}:{self.object_id}"
+
+    class Meta:
+        verbose_name = "Documento de Búsqueda"
+        verbose_name_plural = "Documentos de Búsqueda"
+        constraints = [
+            models.UniqueConstraint(fields=['entity_type', 'object_id'], name='search_doc_entity_unique'),
+        ]
@@ -111,16 +111,30 @@ class ShoppingReceip(models.Model):
         
         return round(total, 2)
 
+    def _buyed_products_list(self):
+        """
+        Productos comprados del recibo: los precargados si hay prefetch,
+        o una única consulta con su producto original.
+        """
+        prefetched = getattr(self, '_prefetched_objects_cache', {}).get('buyed_products')
+        if prefetched is not None:
+            return list(prefetched)
+        return list(self.buyed_products.select_related('original_product'))
+
     @property
     def total_cost_of_shopping(self):
         """
         Suma del costo de todos los productos en esta compra.
         Si amount_buyed == amount_requested: usa total_cost del producto.
         Si son diferentes: recalcula el costo proporcionalmente.
+
+        Usa la anotación `buyed_cost_total` si existe (ver annotate_receipt_costs).
         """
-        total = 0.0
-        for product_buyed in self.buyed_products.select_related('original_product').all():
-            total += self._calculate_product_cost(product_buyed)
+        annotated = getattr(self, 'buyed_cost_total', None)
+        if annotated is not None:
+            return round(float(annotated), 2)
+
+        total = sum(self._calculate_product_cost(pb) for pb in self._buyed_products_list())
         return round(total, 2)
 
     @property
@@ -128,20 +142,35 @@ class ShoppingReceip(models.Model):
         """
         Suma del costo excluyendo productos reembolsados.
         Sigue la misma lógica de cálculo proporcional.
+
+        Usa la anotación `buyed_cost_excluding_refunds` si existe.
         """
-        total = 0.0
-        for product_buyed in self.buyed_products.select_related('original_product').filter(is_refunded=False):
-            total += self._calculate_product_cost(product_buyed)
-        # También incluir los que tienen is_refunded=None
-        for product_buyed in self.buyed_products.select_related('original_product').filter(is_refunded__isnull=True):
-            total += self._calculate_product_cost(product_buyed)
+        annotated = getattr(self, 'buyed_cost_excluding_refunds', None)
+        if annotated is not None:
+            return round(float(annotated), 2)
+
+        total = sum(
+            self._calculate_product_cost(pb)
+            for pb in self._buyed_products_list()
+            if not pb.is_refunded
+        )
         return round(total, 2)
 
     @property
     def total_refunded(self):
         """
         Suma total de los montos reembolsados en esta compra.
+
+        Usa la anotación `buyed_refunded_total` si existe.
         """
+        annotated = getattr(self, 'buyed_refunded_total', None)
+        if annotated is not None:
+            return float(annotated)
+
+        prefetched = getattr(self, '_prefetched_objects_cache', {}).get('buyed_products')
+        if prefetched is not None:
+            return float(sum(pb.refund_amount or 0 for pb in prefetched if pb.is_refunded))
+
         from django.db.models import Sum
         total = self.buyed_products.filter(is_refunded=True).aggregate(
             total=Sum('refund_amount')
@@ -186,4 +215,9 @@ class ShoppingReceip(models.Model):
     class Meta:
         ordering = ['-buy_date']
         verbose_name = "Recibo de Compra"
-        verbose_name_plural = "Recibos de Compra"
\ No newline at end of file
+        verbose_name_plural = "Recibos de Compra"
+        indexes = [
+            # Reportes de compras por rango de fechas y operaciones por tarjeta
+            models.Index(fields=['-buy_date'], name='shopping_buy_date_idx'),
+            models.Index(fields=['card_id', '-buy_date'], name='shopping_card_date_idx'),
+        ]
\ No newline at end of file
@@ -0,0 +1,271 @@
+"""
+Contadores de notificaciones por usuario (badge de no leídas y estadísticas).
+
+NotificationCounter guarda, por usuario, tipo y prioridad, el total de
+notificaciones y cuántas siguen sin leer. Las escrituras (creación, marcar
+como leída/no leída, borrados) aplican deltas en la misma transacción desde
+NotificationQuerySet y Notification; las lecturas suman las filas del usuario
+y las guardan en cache hasta la siguiente escritura, de modo que el polling
+del badge cuesta una lectura de cache.
+
+La invalidación solo llega a todos los procesos si la cache de Django es
+compartida (Redis, Memcached, base de datos). Con la LocMemCache por defecto,
+que es de cada proceso, el resumen se guarda LOCAL_CACHE_TTL segundos: es lo
+que puede tardar otro proceso en servir el badge actualizado.
+
+Si los contadores se desvían (escrituras con SQL directo, restauraciones),
+`python manage.py reconcile_notification_counters` los recalcula.
+"""
+
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from api.notifications.lookups_notifications import cache_is_process_local
+from api.notifications.models_notifications import Notification, NotificationCounter
+
+logger = logging.getLogger(__name__)
+
+# (user_id, notification_type, priority) → [delta_total, delta_unread]
+Deltas = Dict[Tuple[int, str, str], List[int]]
+
+
+class NotificationCounterService:
+    """Mantenimiento y lectura de NotificationCounter."""
+
+    CACHE_PREFIX = 'notif_counters'
+    # Las escrituras invalidan la cache; el TTL acota el caso de una lectura
+    # que rellena la cache justo después de una invalidación concurrente
+    CACHE_TTL = 300
+    # TTL con una cache de proceso, donde la invalidación no llega a los demás
+    LOCAL_CACHE_TTL = 5
+
+    # ------------------------------------------------------------------
+    # Deltas
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def deltas_for(notifications: Iterable[Notification], sign: int = 1, read_change: int = 0) -> Deltas:
+        """
+        Deltas de una lista de notificaciones.
+
+        Args:
+            sign: 1 al crearlas, -1 al borrarlas, 0 si solo cambia su estado de lectura
+            read_change: 1 si pasan a leídas, -1 si pasan a no leídas
+        """
+        deltas: Deltas = defaultdict(lambda: [0, 0])
+        for notification in notifications:
+            key = (notification.recipient_id, notification.notification_type, notification.priority)
+            deltas[key][0] += sign
+            if read_change:
+                deltas[key][1] -= read_change
+            elif not notification.is_read:
+                deltas[key][1] += sign
+        return deltas
+
+    @staticmethod
+    def deltas_for_queryset(queryset, sign: int = 1, read_change: int = 0) -> Deltas:
+        """Igual que deltas_for, con un único GROUP BY sobre el queryset."""
+        rows = (
+            queryset.order_by()
+            .values('recipient_id', 'notification_type', 'priority')
+            .annotate(total=Count('id'), unread=Count('id', filter=Q(is_read=False)))
+        )
+        deltas: Deltas = defaultdict(lambda: [0, 0])
+        for row in rows:
+            key = (row['recipient_id'], row['notification_type'], row['priority'])
+            deltas[key][0] += sign * row['total']
+            if read_change:
+                deltas[key][1] -= read_change * row['total']
+            else:
+                deltas[key][1] += sign * row['unread']
+        return deltas
+
+    @classmethod
+    def apply(cls, deltas: Deltas):
+        """
+        Aplica los deltas con un único INSERT ... ON CONFLICT DO UPDATE (o un
+        UPDATE por fila en motores sin upsert) e invalida la cache de los
+        usuarios afectados; otra vez al confirmar la transacción, por si una
+        lectura concurrente la rellenó con los valores anteriores.
+        """
+        changes = sorted((key, value) for key, value in deltas.items() if key[0] and any(value))
+        if not changes:
+            return
+
+        if connection.features.supports_update_conflicts_with_target:
+            cls._upsert(changes)
+        else:
+            for key, (total, unread) in changes:
+                cls._update_row(key, total, unread)
+
+        user_ids = {key[0] for key, _ in changes}
+        cls.invalidate(user_ids)
+        transaction.on_commit(lambda: cls.invalidate(user_ids))
+
+    @staticmethod
+    def _upsert(changes):
+        table = connection.ops.quote_name(NotificationCounter._meta.db_table)
+        now = timezone.now()
+        rows = ', '.join(['(%s, %s, %s, %s, %s, %s)'] * len(changes))
+        params = []
+        for (user_id, notification_type, priority), (total, unread) in changes:
+            params.extend([user_id, notification_type, priority, total, unread, now])
+        # Las filas van ordenadas por clave para que dos transacciones no se bloqueen mutuamente
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table} (user_id, notification_type, priority, total, unread, updated_at) "
+                f"VALUES {rows} "
+                f"ON CONFLICT (user_id, notification_type, priority) DO UPDATE SET "
+                f"total = {table}.total + excluded.total, "
+                f"unread = {table}.unread + excluded.unread, "
+                f"updated_at = excluded.updated_at",
+                params
+            )
+
+    @staticmethod
+    def _update_row(key, total: int, unread: int):
+        user_id, notification_type, priority = key
+        lookup = dict(user_id=user_id, notification_type=notification_type, priority=priority)
+        if NotificationCounter.objects.filter(**lookup).update(total=F('total') + total, unread=F('unread') + unread):
+            return
+        try:
+            with transaction.atomic():
+                NotificationCounter.objects.create(total=total, unread=unread, **lookup)
+        except IntegrityError:
+            # Otra transacción creó la fila entre el UPDATE y el INSERT
+            NotificationCounter.objects.filter(**lookup).update(
+                total=F('total') + total, unread=F('unread') + unread
+            )
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def _cache_key(cls, user_id: int) -> str:
+        return f"{cls.CACHE_PREFIX}:{user_id}"
+
+    @classmethod
+    def invalidate(cls, user_ids: Iterable[int]):
+        cache.delete_many([cls._cache_key(user_id) for user_id in user_ids])
+
+    @staticmethod
+    def _summarize(rows) -> dict:
+        summary = {
+            'total': 0,
+            'unread': 0,
+            'by_type': defaultdict(int),
+            'by_priority': defaultdict(int),
+            'unread_by_type': defaultdict(int),
+            'unread_by_priority': defaultdict(int),
+        }
+        for notification_type, priority, total, unread in rows:
+            summary['total'] += total
+            summary['unread'] += unread
+            if total:
+                summary['by_type'][notification_type] += total
+                summary['by_priority'][priority] += total
+            if unread:
+                summary['unread_by_type'][notification_type] += unread
+                summary['unread_by_priority'][priority] += unread
+        return {key: dict(value) if isinstance(value, defaultdict) else value for key, value in summary.items()}
+
+    @classmethod
+    def summary(cls, user_id: int) -> dict:
+        """
+        Totales y no leídas del usuario, globales y por tipo y prioridad.
+        Desde cache; si no está, se suman sus filas de NotificationCounter.
+        """
+        key = cls._cache_key(user_id)
+        summary = cache.get(key)
+        if summary is None:
+            summary = cls._summarize(
+                NotificationCounter.objects.filter(user_id=user_id)
+                .values_list('notification_type', 'priority', 'total', 'unread')
+            )
+            cache.set(key, summary, cls.LOCAL_CACHE_TTL if cache_is_process_local() else cls.CACHE_TTL)
+        return summary
+
+    @classmethod
+    def unread_count(cls, user_id: int) -> int:
+        """Número de notificaciones no leídas del usuario."""
+        return cls.summary(user_id)['unread']
+
+    # ------------------------------------------------------------------
+    # Reconciliación
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def reconcile(cls, user_ids: Optional[Iterable[int]] = None, batch_size: int = 500) -> dict:
+        """
+        Recalcula los contadores a partir de las notificaciones y corrige las
+        filas que no coinciden.
+
+        Args:
+            user_ids: Usuarios a reconciliar (por defecto, todos los que tienen
+                notificaciones o contadores)
+            batch_size: Usuarios por bloque (un GROUP BY por bloque)
+
+        Returns:
+            dict: {'users': revisados, 'fixed': filas corregidas, 'users_fixed': usuarios con desvío}
+        """
+        if user_ids is None:
+            user_ids = set(Notification.objects.order_by().values_list('recipient_id', flat=True).distinct())
+            user_ids |= set(NotificationCounter.objects.order_by().values_list('user_id', flat=True).distinct())
+        user_ids = sorted(set(user_ids))
+
+        totals = {'users': len(user_ids), 'fixed': 0, 'users_fixed': 0}
+        for start in range(0, len(user_ids), batch_size):
+            batch = user_ids[start:start + batch_size]
+            fixed, users_fixed = cls._reconcile_batch(batch)
+            totals['fixed'] += fixed
+            totals['users_fixed'] += users_fixed
+        return totals
+
+    @classmethod
+    def _reconcile_batch(cls, user_ids: List[int]) -> Tuple[int, int]:
+        with transaction.atomic():
+            # Bloquea los contadores del bloque mientras se comparan
+            existing = {
+                (row.user_id, row.notification_type, row.priority): row
+                for row in NotificationCounter.objects.select_for_update().filter(user_id__in=user_ids)
+            }
+            expected = {
+                key: (total, unread)
+                for key, (total, unread) in cls.deltas_for_queryset(
+                    Notification.objects.filter(recipient_id__in=user_ids)
+                ).items()
+            }
+
+            now = timezone.now()
+            to_create, to_update = [], []
+            for key, (total, unread) in expected.items():
+                row = existing.get(key)
+                if row is None:
+                    to_create.append(NotificationCounter(
+                        user_id=key[0], notification_type=key[1], priority=key[2], total=total, unread=unread
+                    ))
+                elif (row.total, row.unread) != (total, unread):
+                    row.total, row.unread, row.updated_at = total, unread, now
+                    to_update.append(row)
+            # Sin notificaciones: se borra la fila (las que quedaron a cero no son desvío)
+            stale = [row for key, row in existing.items() if key not in expected]
+            wrong = [row for row in stale if row.total or row.unread]
+
+            NotificationCounter.objects.bulk_create(to_create)
+            NotificationCounter.objects.bulk_update(to_update, ['total', 'unread', 'updated_at'])
+            NotificationCounter.objects.filter(pk__in=[row.pk for row in stale]).delete()
+
+            fixed = to_create + to_update + wrong
+            drifted = {row.user_id for row in fixed}
+            if drifted:
+                logger.warning(f"Contadores de notificaciones corregidos para {len(drifted)} usuarios")
+            cls.invalidate(user_ids)
+            transaction.on_commit(lambda: cls.invalidate(user_ids))
+        return len(fixed), len(drifted)
@@ -2,15 +2,30 @@
 Servicio de email para notificaciones.
 
 Gestiona el envío de notificaciones por correo electrónico con templates HTML.
+
+Los envíos se hacen por lotes:
+- Las preferencias de todos los destinatarios se cargan en una consulta.
+- Cada notificación (mismo tipo y contenido) se renderiza una sola vez; el
+  nombre del destinatario se sustituye después en el texto renderizado.
+- Los mensajes salen por una única conexión del backend de email, en bloques
+  de BATCH_SIZE con send_messages, en lugar de abrir una conexión SMTP por
+  mensaje.
+
+Los resúmenes (digest) para usuarios con frecuencia diaria o semanal los
+envía el comando programado `send_notification_digests`.
 """
 
-from django.core.mail import EmailMultiAlternatives
+from django.core.mail import EmailMultiAlternatives, get_connection
 from django.template.loader import render_to_string
 from django.conf import settings
 from django.utils import timezone
-from typing import Optional, List, Dict, Any
+from django.utils.html import escape
+from datetime import timedelta
+from typing import Optional, List, Dict, Any, Iterable, Tuple
+import json
 import logging
 
+from api.notifications.lookups_notifications import NotificationLookupCache
 from api.notifications.models_notifications import Notification, NotificationPreference
 from api.models import CustomUser
 
@@ -21,45 +36,215 @@ class NotificationEmailService:
     """
     Servicio para enviar notificaciones por email.
     """
-    
+
     # Configuración por defecto
     DEFAULT_FROM_EMAIL = getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@ar-e-system.com')
     BASE_URL = getattr(settings, 'FRONTEND_URL', 'http://localhost:5173')
     APP_NAME = getattr(settings, 'APP_NAME', 'AR-E System')
-    
+
+    # Mensajes por llamada a send_messages sobre la misma conexión
+    BATCH_SIZE = getattr(settings, 'NOTIFICATION_EMAIL_BATCH_SIZE', 50)
+
+    # Notificaciones que se listan en un resumen (el total se indica aparte)
+    DIGEST_MAX_ITEMS = 20
+    DIGEST_PERIODS = {
+        'daily': timedelta(days=1),
+        'weekly': timedelta(days=7),
+    }
+
+    SUBJECT_PREFIX = {
+        'urgent': '[URGENTE] ',
+        'high': '[IMPORTANTE] ',
+    }
+
+    # Marcador del nombre del destinatario en las plantillas renderizadas una sola vez
+    RECIPIENT_PLACEHOLDER = '__recipient_name__'
+
+    # ------------------------------------------------------------------
+    # Preferencias
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _email_allowed(prefs: NotificationPreference, notification_type: str, immediate: bool = True) -> bool:
+        """Email habilitado, tipo habilitado y (para envíos inmediatos) sin resumen programado."""
+        if not prefs.email_notifications:
+            return False
+        if not prefs.is_notification_enabled(notification_type):
+            return False
+        # Verificar frecuencia (immediate envía siempre, otros acumulan para el resumen)
+        return not immediate or prefs.digest_frequency == 'immediate'
+
+    @staticmethod
+    def preferences_for(user_ids: Iterable[int]) -> Dict[int, NotificationPreference]:
+        """
+        Preferencias (solo lectura) de varios usuarios, desde la cache de
+        NotificationLookupCache. Los usuarios sin registro reciben las
+        preferencias por defecto (sin crearlas).
+        """
+        return NotificationLookupCache.preferences_for(user_ids)
+
     @classmethod
     def should_send_email(cls, recipient: CustomUser, notification_type: str) -> bool:
         """
         Verificar si se debe enviar email según las preferencias del usuario.
-        
+
         Args:
             recipient: Usuario destinatario
             notification_type: Tipo de notificación
-        
+
         Returns:
             bool: True si debe enviar email
         """
         try:
-            prefs = NotificationPreference.get_or_create_preferences(recipient)
-            
-            # Verificar si email está habilitado
-            if not prefs.email_notifications:
-                return False
-            
-            # Verificar si el tipo específico está habilitado
-            if not prefs.is_notification_enabled(notification_type):
-                return False
-            
-            # Verificar frecuencia (immediate envía siempre, otros acumulan)
-            if prefs.digest_frequency != 'immediate':
-                return False
-            
-            return True
-            
+            prefs = cls.preferences_for([recipient.id])[recipient.id]
+            return cls._email_allowed(prefs, notification_type)
         except Exception as e:
             logger.error(f"Error verificando preferencias de email: {e}")
             return True  # En caso de error, enviar por defecto
-    
+
+    # ------------------------------------------------------------------
+    # Renderizado y envío
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def _base_context(cls) -> Dict[str, Any]:
+        return {
+            'recipient_name': cls.RECIPIENT_PLACEHOLDER,
+            'base_url': cls.BASE_URL,
+            'app_name': cls.APP_NAME,
+            'current_year': timezone.now().year,
+        }
+
+    @classmethod
+    def _render(cls, template: str, context: Dict[str, Any]) -> Tuple[str, str]:
+        """Renderiza las versiones texto y HTML de una plantilla de emails/."""
+        context = {**cls._base_context(), **context}
+        return (
+            render_to_string(f'emails/{template}.txt', context),
+            render_to_string(f'emails/{template}.html', context),
+        )
+
+    @classmethod
+    def _build_message(cls, recipient: CustomUser, subject: str, rendered: Tuple[str, str]) -> EmailMultiAlternatives:
+        """Mensaje para un destinatario a partir de una plantilla ya renderizada."""
+        text_content, html_content = rendered
+        name = recipient.full_name or 'Usuario'
+        email = EmailMultiAlternatives(
+            subject=subject,
+            body=text_content.replace(cls.RECIPIENT_PLACEHOLDER, name),
+            from_email=cls.DEFAULT_FROM_EMAIL,
+            to=[recipient.email]
+        )
+        email.attach_alternative(html_content.replace(cls.RECIPIENT_PLACEHOLDER, escape(name)), "text/html")
+        return email
+
+    @classmethod
+    def send_messages(cls, messages: List[EmailMultiAlternatives]) -> Tuple[List[str], List[str]]:
+        """
+        Envía los mensajes por una sola conexión del backend, en bloques de
+        BATCH_SIZE. Un bloque que falla se cuenta como fallido y se continúa con
+        el siguiente.
+
+        Returns:
+            tuple: (emails enviados, emails fallidos)
+        """
+        sent, failed = [], []
+        if not messages:
+            return sent, failed
+
+        connection = get_connection(fail_silently=False)
+        try:
+            connection.open()
+            for start in range(0, len(messages), cls.BATCH_SIZE):
+                chunk = messages[start:start + cls.BATCH_SIZE]
+                addresses = [message.to[0] for message in chunk]
+                try:
+                    connection.send_messages(chunk)
+                    sent.extend(addresses)
+                except Exception as e:
+                    logger.error(f"Error enviando {len(chunk)} emails: {e}")
+                    failed.extend(addresses)
+                    # La conexión puede haber quedado inservible: se reabre para el siguiente bloque
+                    connection.close()
+                    connection.open()
+        except Exception as e:
+            logger.error(f"Error abriendo la conexión de email: {e}")
+            failed.extend(message.to[0] for message in messages[len(sent) + len(failed):])
+        finally:
+            connection.close()
+
+        logger.info(f"Emails de notificación: {len(sent)} enviados, {len(failed)} fallidos")
+        return sent, failed
+
+    @classmethod
+    def _notification_subject(cls, title: str, priority: str) -> str:
+        # Definir asunto según prioridad
+        return f"{cls.SUBJECT_PREFIX.get((priority or '').lower(), '')}{title}"
+
+    @classmethod
+    def _render_notification(cls, title, message, priority, action_url, metadata, sender) -> Tuple[str, str]:
+        return cls._render('notification_email', {
+            'title': title,
+            'message': message,
+            'priority': priority,
+            'action_url': action_url,
+            'metadata': metadata or {},
+            'sender_name': sender.full_name if sender else None,
+        })
+
+    @classmethod
+    def send_notifications(cls, notifications: Iterable[Notification]) -> Dict[str, Any]:
+        """
+        Envía por email un lote de notificaciones ya creadas (p. ej. las de un
+        lote del outbox), respetando las preferencias de cada destinatario.
+
+        Returns:
+            dict: Igual que send_bulk_notification_emails
+        """
+        notifications = [notification for notification in notifications if notification.recipient_id]
+        preferences = cls.preferences_for(notification.recipient_id for notification in notifications)
+
+        rendered_by_content = {}
+        messages, skipped = [], []
+        for notification in notifications:
+            recipient = notification.recipient
+            if not recipient.email or not cls._email_allowed(
+                preferences[recipient.id], notification.notification_type
+            ):
+                skipped.append(recipient.email)
+                continue
+
+            # Las notificaciones masivas comparten contenido: se renderizan una vez
+            key = (
+                notification.notification_type, notification.title, notification.message,
+                notification.priority, notification.action_url, notification.sender_id,
+                json.dumps(notification.metadata, sort_keys=True, default=str),
+            )
+            if key not in rendered_by_content:
+                rendered_by_content[key] = cls._render_notification(
+                    notification.title, notification.message, notification.priority,
+                    notification.action_url, notification.metadata, notification.sender
+                )
+            messages.append(cls._build_message(
+                recipient,
+                cls._notification_subject(notification.title, notification.priority),
+                rendered_by_content[key]
+            ))
+
+        sent, failed = cls.send_messages(messages)
+        return cls._result(sent, failed, skipped)
+
+    @staticmethod
+    def _result(sent: List[str], failed: List[str], skipped: List[str]) -> Dict[str, Any]:
+        return {
+            'sent': sent,
+            'failed': failed,
+            'skipped': skipped,
+            'total_sent': len(sent),
+            'total_failed': len(failed),
+            'total_skipped': len(skipped)
+        }
+
     @classmethod
     def send_notification_email(
         cls,
@@ -74,7 +259,7 @@ class NotificationEmailService:
     ) -> bool:
         """
         Enviar email de notificación.
-        
+
         Args:
             recipient: Usuario destinatario
             title: Título de la notificación
@@ -84,7 +269,7 @@ class NotificationEmailService:
             action_url: URL de acción
             metadata: Datos adicionales
             sender: Usuario que genera la notificación
-        
+
         Returns:
             bool: True si se envió exitosamente
         """
@@ -92,70 +277,31 @@ class NotificationEmailService:
         if not cls.should_send_email(recipient, notification_type):
             logger.info(f"Email no enviado a {recipient.email} por preferencias de usuario")
             return False
-        
+
+        # Verificar que el usuario tenga email
+        if not recipient.email:
+            logger.warning(f"Usuario {recipient.id} no tiene email configurado")
+            return False
+
         try:
-            # Verificar que el usuario tenga email
-            if not recipient.email:
-                logger.warning(f"Usuario {recipient.id} no tiene email configurado")
-                return False
-            
-            # Preparar contexto para templates
-            context = {
-                'recipient_name': recipient.full_name,
-                'title': title,
-                'message': message,
-                'priority': priority,
-                'action_url': action_url,
-                'metadata': metadata or {},
-                'sender_name': sender.full_name if sender else None,
-                'base_url': cls.BASE_URL,
-                'app_name': cls.APP_NAME,
-                'current_year': timezone.now().year,
-            }
-            
-            # Renderizar templates
-            html_content = render_to_string('emails/notification_email.html', context)
-            text_content = render_to_string('emails/notification_email.txt', context)
-            
-            # Definir asunto según prioridad
-            subject_prefix = {
-                'urgent': '[URGENTE] ',
-                'high': '[IMPORTANTE] ',
-                'normal': '',
-                'low': ''
-            }.get(priority.lower(), '')
-            
-            subject = f"{subject_prefix}{title}"
-            
-            # Crear email
-            email = EmailMultiAlternatives(
-                subject=subject,
-                body=text_content,
-                from_email=cls.DEFAULT_FROM_EMAIL,
-                to=[recipient.email]
-            )
-            
-            # Agregar versión HTML
-            email.attach_alternative(html_content, "text/html")
-            
-            # Enviar
-            email.send(fail_silently=False)
-            
-            logger.info(f"Email enviado exitosamente a {recipient.email}")
-            return True
-            
+            rendered = cls._render_notification(title, message, priority, action_url, metadata, sender)
         except Exception as e:
             logger.error(f"Error enviando email a {recipient.email}: {e}")
             return False
-    
+
+        sent, _ = cls.send_messages([
+            cls._build_message(recipient, cls._notification_subject(title, priority), rendered)
+        ])
+        return bool(sent)
+
     @classmethod
     def send_notification_email_from_object(cls, notification: Notification) -> bool:
         """
         Enviar email desde un objeto Notification.
-        
+
         Args:
             notification: Instancia de Notification
-        
+
         Returns:
             bool: True si se envió exitosamente
         """
@@ -169,7 +315,7 @@ class NotificationEmailService:
             metadata=notification.metadata,
             sender=notification.sender
         )
-    
+
     @classmethod
     def send_bulk_notification_emails(
         cls,
@@ -183,7 +329,9 @@ class NotificationEmailService:
     ) -> Dict[str, Any]:
         """
         Enviar emails a múltiples usuarios.
-        
+
+        Una consulta de preferencias, un renderizado y una conexión para todos.
+
         Returns:
             dict: {
                 'sent': [lista de emails enviados],
@@ -191,41 +339,54 @@ class NotificationEmailService:
                 'skipped': [lista de emails omitidos por preferencias]
             }
         """
-        sent = []
-        failed = []
-        skipped = []
-        
+        recipients = list(recipients)
+        preferences = cls.preferences_for(recipient.id for recipient in recipients)
+
+        allowed, skipped = [], []
         for recipient in recipients:
             # Verificar preferencias primero
-            if not cls.should_send_email(recipient, notification_type):
-                skipped.append(recipient.email)
-                continue
-            
-            # Intentar enviar
-            success = cls.send_notification_email(
-                recipient=recipient,
-                title=title,
-                message=message,
-                notification_type=notification_type,
-                priority=priority,
-                action_url=action_url,
-                metadata=metadata
-            )
-            
-            if success:
-                sent.append(recipient.email)
+            if recipient.email and cls._email_allowed(preferences[recipient.id], notification_type):
+                allowed.append(recipient)
             else:
-                failed.append(recipient.email)
-        
-        return {
-            'sent': sent,
-            'failed': failed,
-            'skipped': skipped,
-            'total_sent': len(sent),
-            'total_failed': len(failed),
-            'total_skipped': len(skipped)
-        }
-    
+                skipped.append(recipient.email)
+
+        if not allowed:
+            return cls._result([], [], skipped)
+
+        try:
+            rendered = cls._render_notification(title, message, priority, action_url, metadata, None)
+        except Exception as e:
+            logger.error(f"Error renderizando email de notificación: {e}")
+            return cls._result([], [recipient.email for recipient in allowed], skipped)
+
+        subject = cls._notification_subject(title, priority)
+        sent, failed = cls.send_messages([
+            cls._build_message(recipient, subject, rendered) for recipient in allowed
+        ])
+        return cls._result(sent, failed, skipped)
+
+    # ------------------------------------------------------------------
+    # Resúmenes (digest)
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def _build_digest_message(cls, recipient: CustomUser, notifications: List[Notification]) -> EmailMultiAlternatives:
+        # Agrupar notificaciones por tipo
+        by_type = {}
+        for notif in notifications[:cls.DIGEST_MAX_ITEMS]:
+            by_type.setdefault(notif.get_notification_type_display(), []).append(notif)
+
+        # Context para el digest
+        rendered = cls._render('notification_digest', {
+            'notifications': notifications[:cls.DIGEST_MAX_ITEMS],
+            'notifications_by_type': by_type,
+            'total_count': len(notifications),
+            'hidden_count': max(len(notifications) - cls.DIGEST_MAX_ITEMS, 0),
+            'unread_count': sum(1 for n in notifications if not n.is_read),
+        })
+        subject = f"Resumen de notificaciones - {len(notifications)} nuevas"
+        return cls._build_message(recipient, subject, rendered)
+
     @classmethod
     def send_digest_email(
         cls,
@@ -234,62 +395,110 @@ class NotificationEmailService:
     ) -> bool:
         """
         Enviar email resumen con múltiples notificaciones.
-        
+
         Args:
             recipient: Usuario destinatario
             notifications: Lista de notificaciones a incluir
-        
+
         Returns:
             bool: True si se envió exitosamente
         """
-        if not notifications:
+        if not notifications or not recipient.email:
             return False
-        
+
         try:
-            # Agrupar notificaciones por tipo
-            by_type = {}
-            for notif in notifications:
-                notif_type = notif.get_notification_type_display()
-                if notif_type not in by_type:
-                    by_type[notif_type] = []
-                by_type[notif_type].append(notif)
-            
-            # Context para el digest
-            context = {
-                'recipient_name': recipient.full_name,
-                'notifications': notifications,
-                'notifications_by_type': by_type,
-                'total_count': len(notifications),
-                'unread_count': sum(1 for n in notifications if not n.is_read),
-                'base_url': cls.BASE_URL,
-                'app_name': cls.APP_NAME,
-                'current_year': timezone.now().year,
-            }
-            
-            # Renderizar template de digest (crear uno específico o usar el normal)
-            html_content = render_to_string('emails/notification_digest.html', context)
-            text_content = render_to_string('emails/notification_digest.txt', context)
-            
-            subject = f"Resumen de notificaciones - {len(notifications)} nuevas"
-            
-            # Crear y enviar email
-            email = EmailMultiAlternatives(
-                subject=subject,
-                body=text_content,
-                from_email=cls.DEFAULT_FROM_EMAIL,
-                to=[recipient.email]
-            )
-            
-            email.attach_alternative(html_content, "text/html")
-            email.send(fail_silently=False)
-            
-            logger.info(f"Email digest enviado a {recipient.email} con {len(notifications)} notificaciones")
-            return True
-            
+            message = cls._build_digest_message(recipient, list(notifications))
         except Exception as e:
             logger.error(f"Error enviando digest a {recipient.email}: {e}")
             return False
 
+        sent, _ = cls.send_messages([message])
+        if sent:
+            logger.info(f"Email digest enviado a {recipient.email} con {len(notifications)} notificaciones")
+        return bool(sent)
+
+    @classmethod
+    def send_digests(cls, frequency: str, now=None, users_per_batch: int = 200) -> Dict[str, int]:
+        """
+        Envía el resumen de notificaciones no leídas a los usuarios con la
+        frecuencia indicada. Pensado para ejecutarse de forma programada
+        (comando `send_notification_digests`).
+
+        Cada usuario recibe las no leídas de los tipos que tiene habilitados
+        desde su último resumen (como máximo, el periodo de la frecuencia).
+        Las notificaciones de cada bloque de usuarios se leen en una consulta y
+        los emails salen por una única conexión.
+
+        Args:
+            frequency: 'daily' o 'weekly'
+            now: Momento de referencia (por defecto, ahora)
+            users_per_batch: Usuarios por bloque de consulta y envío
+
+        Returns:
+            dict: {'users': con resumen enviado, 'failed': fallidos, 'notifications': incluidas}
+        """
+        if frequency not in cls.DIGEST_PERIODS:
+            raise ValueError(f"Frecuencia de resumen no válida: {frequency}")
+        now = now or timezone.now()
+        earliest = now - cls.DIGEST_PERIODS[frequency]
+
+        preferences = (
+            NotificationPreference.objects
+            .filter(digest_frequency=frequency, email_notifications=True, user__is_active=True)
+            .select_related('user')
+            .order_by('user_id')
+        )
+        totals = {'users': 0, 'failed': 0, 'notifications': 0}
+
+        batch = []
+        for prefs in preferences.iterator(chunk_size=users_per_batch):
+            batch.append(prefs)
+            if len(batch) == users_per_batch:
+                cls._send_digest_batch(batch, earliest, now, totals)
+                batch = []
+        if batch:
+            cls._send_digest_batch(batch, earliest, now, totals)
+
+        logger.info(
+            f"Resúmenes {frequency}: {totals['users']} enviados, {totals['failed']} fallidos, "
+            f"{totals['notifications']} notificaciones"
+        )
+        return totals
+
+    @classmethod
+    def _send_digest_batch(cls, batch: List[NotificationPreference], earliest, now, totals: Dict[str, int]):
+        since = {
+            prefs.user_id: max(prefs.last_digest_sent_at or earliest, earliest)
+            for prefs in batch
+        }
+        pending: Dict[int, List[Notification]] = {user_id: [] for user_id in since}
+        unread = Notification.objects.filter(
+            recipient_id__in=since, is_read=False,
+            created_at__gte=min(since.values()), created_at__lt=now
+        ).order_by('recipient_id', '-created_at')
+        for notification in unread:
+            if notification.created_at >= since[notification.recipient_id]:
+                pending[notification.recipient_id].append(notification)
+
+        messages, included = [], {}
+        for prefs in batch:
+            notifications = [
+                notification for notification in pending[prefs.user_id]
+                if prefs.is_notification_enabled(notification.notification_type)
+            ]
+            if not notifications or not prefs.user.email:
+                continue
+            messages.append(cls._build_digest_message(prefs.user, notifications))
+            included[prefs.user.email] = (prefs.user_id, len(notifications))
+
+        sent, failed = cls.send_messages(messages)
+        sent_user_ids = [included[email][0] for email in sent]
+        NotificationPreference.objects.filter(user_id__in=sent_user_ids).update(last_digest_sent_at=now)
+
+        totals['users'] += len(sent)
+        totals['failed'] += len(failed)
+        totals['notifications'] += sum(included[email][1] for email in sent)
+
 
 def send_notification_with_email(
     recipient,
@@ -306,16 +515,14 @@ def send_notification_with_email(
 ):
     """
     Wrapper para crear notificación y enviar email automáticamente.
-    
+
     Args:
         (mismos que Notification.create_notification)
         send_email: Si es True, intenta enviar email
-    
+
     Returns:
         tuple: (notification, email_sent)
     """
-    from api.models_notifications import Notification
-    
     # Crear notificación
     notification = Notification.create_notification(
         recipient=recipient,
@@ -329,10 +536,10 @@ def send_notification_with_email(
         metadata=metadata,
         expires_at=expires_at
     )
-    
+
     # Enviar email si está habilitado
     email_sent = False
     if send_email:
         email_sent = NotificationEmailService.send_notification_email_from_object(notification)
-    
+
     return notification, email_sent
@@ -9,13 +9,21 @@ Por ejemplo, en lugar de mostrar:
 
 Se muestra:
 - "3 productos fueron comprados" (con lista de productos en metadata)
+
+Las notificaciones se agrupan por lotes (NotificationGrouper.group_notifications):
+las del mismo destinatario y tipo se combinan en memoria y cada grupo se
+escribe una sola vez. El dispatcher del outbox agrupa así cada lote de
+eventos, y NotificationGrouper.coalesce() abre la misma ventana dentro de una
+petición o transacción. Cada grupo guarda además un resumen precalculado
+(`summary`) para los listados, que no necesitan leer aggregated_data.
 """
 
+import threading
+from contextlib import contextmanager
 from django.db import models, transaction
 from django.utils import timezone
 from datetime import timedelta
-from typing import List, Optional, Dict, Any
-import json
+from typing import Iterable, List, Optional, Dict, Any
 
 from api.notifications.models_notifications import Notification, NotificationType, NotificationPriority
 
@@ -68,6 +76,12 @@ class NotificationGroup(models.Model):
         verbose_name='Datos agregados'
     )
     
+    # Resumen precalculado para los listados (últimas entradas y acción)
+    summary = models.JSONField(
+        default=dict,
+        verbose_name='Resumen'
+    )
+    
     # Estado
     is_read = models.BooleanField(default=False, verbose_name='Leído')
     
@@ -87,32 +101,55 @@ class NotificationGroup(models.Model):
     def __str__(self):
         return f"{self.title} ({self.count} notificaciones)"
     
+    # Entradas recientes incluidas en el resumen
+    SUMMARY_PREVIEW = 3
+    
+    @staticmethod
+    def entry_for(notification: Notification) -> Dict[str, Any]:
+        """Datos de una notificación tal como se guardan en aggregated_data"""
+        return {
+            'id': notification.id,
+            'title': notification.title,
+            'message': notification.message,
+            'metadata': notification.metadata,
+            'created_at': notification.created_at.isoformat(),
+            'action_url': notification.action_url,
+        }
+    
+    def merge(self, notifications: List[Notification]):
+        """
+        Agregar notificaciones al grupo en memoria (sin guardar): contador,
+        última notificación, aggregated_data, título y resumen.
+        """
+        if not isinstance(self.aggregated_data, list):
+            self.aggregated_data = []
+        self.aggregated_data.extend(self.entry_for(notification) for notification in notifications)
+        self.count += len(notifications)
+        self.last_notification = notifications[-1]
+        self.updated_at = timezone.now()
+        self.title = self._generate_group_title()
+        self.summary = self.build_summary(self.aggregated_data)
+    
+    @classmethod
+    def build_summary(cls, entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Resumen de las últimas entradas para los listados"""
+        if not entries:
+            return {}
+        last = entries[-1]
+        return {
+            'preview': [
+                {'id': entry.get('id'), 'title': entry.get('title')}
+                for entry in reversed(entries[-cls.SUMMARY_PREVIEW:])
+            ],
+            'last_message': last.get('message'),
+            'last_action_url': last.get('action_url'),
+            'last_created_at': last.get('created_at'),
+        }
+    
     def add_notification(self, notification: Notification):
         """Agregar una notificación al grupo"""
-        with transaction.atomic():
-            self.count += 1
-            self.last_notification = notification
-            self.updated_at = timezone.now()
-            
-            # Agregar metadata de la notificación
-            notif_data = {
-                'id': notification.id,
-                'title': notification.title,
-                'message': notification.message,
-                'metadata': notification.metadata,
-                'created_at': notification.created_at.isoformat(),
-                'action_url': notification.action_url,
-            }
-            
-            if not isinstance(self.aggregated_data, list):
-                self.aggregated_data = []
-            
-            self.aggregated_data.append(notif_data)
-            
-            # Actualizar título con contador
-            self.title = self._generate_group_title()
-            
-            self.save()
+        self.merge([notification])
+        self.save()
     
     def _generate_group_title(self) -> str:
         """Generar título descriptivo según el tipo y cantidad"""
@@ -154,6 +191,9 @@ class NotificationGrouper:
     # Tiempo máximo para considerar notificaciones como agrupables (minutos)
     GROUPING_WINDOW = 30
     
+    # Notificaciones pendientes de la ventana coalesce() activa en el hilo
+    _local = threading.local()
+    
     # Tipos de notificación que se pueden agrupar
     GROUPABLE_TYPES = [
         NotificationType.PRODUCT_PURCHASED,
@@ -201,6 +241,9 @@ class NotificationGrouper:
         """
         Crear un nuevo grupo o agregar a uno existente.
         
+        Dentro de coalesce() la notificación se acumula y se agrupa al cerrar
+        la ventana; en ese caso devuelve None.
+        
         Args:
             notification: La notificación a agrupar
         
@@ -211,35 +254,101 @@ class NotificationGrouper:
         if not cls.should_group(notification.notification_type):
             return None
         
-        # Buscar grupo activo
-        group = cls.find_active_group(
-            recipient_id=notification.recipient.id,
-            notification_type=notification.notification_type
-        )
+        pending = getattr(cls._local, 'pending', None)
+        if pending is not None:
+            pending.append(notification)
+            return None
+        
+        groups = cls.group_notifications([notification])
+        return groups[0] if groups else None
+    
+    @classmethod
+    def group_notifications(cls, notifications: Iterable[Notification]) -> List[NotificationGroup]:
+        """
+        Agrupar un lote de notificaciones ya guardadas.
+        
+        Las notificaciones agrupables se reparten por (destinatario, tipo); los
+        grupos activos de todos ellos se buscan con una consulta y cada grupo,
+        nuevo o existente, se escribe una vez con el lote combinado en memoria.
         
-        if group:
-            # Agregar a grupo existente
-            group.add_notification(notification)
-            return group
-        else:
-            # Crear nuevo grupo
-            group = NotificationGroup.objects.create(
-                recipient=notification.recipient,
-                notification_type=notification.notification_type,
-                title=notification.title,
-                count=1,
-                first_notification=notification,
-                last_notification=notification,
-                aggregated_data=[{
-                    'id': notification.id,
-                    'title': notification.title,
-                    'message': notification.message,
-                    'metadata': notification.metadata,
-                    'created_at': notification.created_at.isoformat(),
-                    'action_url': notification.action_url,
-                }]
+        Returns:
+            list: Grupos creados o actualizados
+        """
+        buckets: Dict[tuple, List[Notification]] = {}
+        for notification in notifications:
+            if notification.pk and cls.should_group(notification.notification_type):
+                buckets.setdefault((notification.recipient_id, notification.notification_type), []).append(notification)
+        if not buckets:
+            return []
+        
+        cutoff_time = timezone.now() - timedelta(minutes=cls.GROUPING_WINDOW)
+        with transaction.atomic():
+            active: Dict[tuple, NotificationGroup] = {}
+            candidates = NotificationGroup.objects.select_for_update().filter(
+                recipient_id__in={key[0] for key in buckets},
+                notification_type__in={key[1] for key in buckets},
+                is_read=False,
+                updated_at__gte=cutoff_time
+            ).order_by('-updated_at')
+            for group in candidates:
+                # El más reciente de cada (destinatario, tipo), como find_active_group
+                active.setdefault((group.recipient_id, group.notification_type), group)
+            
+            created, updated = [], []
+            for key, items in buckets.items():
+                group = active.get(key)
+                if group is None:
+                    first = items[0]
+                    group = NotificationGroup(
+                        recipient_id=first.recipient_id,
+                        notification_type=first.notification_type,
+                        title=first.title,
+                        count=1,
+                        first_notification=first,
+                        last_notification=first,
+                        aggregated_data=[NotificationGroup.entry_for(first)],
+                        summary=NotificationGroup.build_summary([NotificationGroup.entry_for(first)])
+                    )
+                    if len(items) > 1:
+                        group.merge(items[1:])
+                    created.append(group)
+                else:
+                    group.merge(items)
+                    updated.append(group)
+            
+            NotificationGroup.objects.bulk_create(created)
+            NotificationGroup.objects.bulk_update(
+                updated,
+                ['count', 'last_notification', 'aggregated_data', 'title', 'summary', 'updated_at']
             )
-            return group
+        return created + updated
+    
+    @classmethod
+    @contextmanager
+    def coalesce(cls):
+        """
+        Ventana de agrupación: las notificaciones agrupables que pasen por
+        create_or_update_group (o create_notification_with_grouping) dentro
+        del bloque se agrupan juntas al salir, con una escritura por grupo.
+        Los bloques anidados se integran en el exterior; si el bloque falla
+        no se agrupa nada.
+        
+        Uso:
+            with NotificationGrouper.coalesce():
+                for product in products:
+                    create_notification_with_grouping(...)
+        """
+        if getattr(cls._local, 'pending', None) is not None:
+            yield
+            return
+        
+        cls._local.pending = []
+        try:
+            yield
+            pending = cls._local.pending
+        finally:
+            cls._local.pending = None
+        cls.group_notifications(pending)
     
     @classmethod
     def get_grouped_notifications(
@@ -254,7 +363,10 @@ class NotificationGrouper:
             dict con 'groups' (agrupadas) y 'individual' (sin agrupar)
         """
         # Obtener grupos activos
-        groups_query = NotificationGroup.objects.filter(recipient_id=recipient_id)
+        # Los listados usan el resumen precalculado: aggregated_data no se lee
+        groups_query = NotificationGroup.objects.filter(
+            recipient_id=recipient_id
+        ).select_related('recipient').defer('aggregated_data')
         
         if not include_read:
             groups_query = groups_query.filter(is_read=False)
@@ -313,14 +425,10 @@ class NotificationGrouper:
             pass
     
     @classmethod
-    def cleanup_old_groups(cls, days: int = 30):
-        """Eliminar grupos antiguos ya leídos"""
-        cutoff_date = timezone.now() - timedelta(days=days)
-        count = NotificationGroup.objects.filter(
-            is_read=True,
-            updated_at__lt=cutoff_date
-        ).delete()[0]
-        return count
+    def cleanup_old_groups(cls, days: int = 30, **options):
+        """Eliminar grupos antiguos ya leídos (por lotes, ver NotificationRetentionService)"""
+        from api.notifications.retention_notifications import NotificationRetentionService
+        return NotificationRetentionService.cleanup_old_groups(days=days, **options)
 
 
 def create_notification_with_grouping(
@@ -346,8 +454,6 @@ def create_notification_with_grouping(
     Returns:
         tuple: (notification, group) donde group puede ser None
     """
-    from api.models_notifications import Notification
-    
     # Crear notificación
     notification = Notification.create_notification(
         recipient=recipient,
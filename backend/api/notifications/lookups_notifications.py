@@ -0,0 +1,228 @@
+"""
+Cache de consultas auxiliares de las notificaciones.
+
+Cada notificación consultaba las preferencias del destinatario y, según el
+evento, los usuarios de un rol (admins, contadores, compradores, logísticos).
+Esos datos cambian muy poco, así que se sirven desde dos niveles:
+
+1. Un LRU local del proceso, con un TTL corto (LOCAL_TTL), sin red ni
+   serialización.
+2. La cache de Django (CACHES['default'], SHARED_TTL).
+
+Los receivers de post_save/post_delete de NotificationPreference y CustomUser
+(signals_notifications.py) invalidan ambos niveles en el proceso que escribe.
+Los demás procesos solo ven la invalidación si la cache de Django es
+compartida (Redis, Memcached, base de datos): entonces un cambio tarda como
+mucho LOCAL_TTL segundos en verse. Sin CACHES configurado Django usa
+LocMemCache, que es de cada proceso; en ese caso el segundo nivel se guarda
+solo LOCAL_TTL segundos (cache_is_process_local) y el retraso máximo en otro
+proceso es de 2 × LOCAL_TTL.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Tuple
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+from api.notifications.models_notifications import NotificationPreference
+
+# Campos de las preferencias que deciden el envío (se guardan en cache)
+PREFERENCE_FIELDS = ('enabled_notification_types', 'email_notifications', 'push_notifications', 'digest_frequency')
+
+_MISSING = object()
+
+
+def cache_is_process_local() -> bool:
+    """
+    True si la cache por defecto de Django es de cada proceso (LocMemCache,
+    DummyCache): las invalidaciones no llegan a los demás procesos.
+    """
+    return isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+class _LocalLRU:
+    """LRU en memoria del proceso con caducidad por entrada, seguro entre hilos."""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: 'OrderedDict[Hashable, Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = _MISSING) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, keys: Iterable[Hashable]):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class NotificationLookupCache:
+    """Preferencias de notificación y usuarios por rol, con cache local y compartida."""
+
+    PREFIX = 'notif_lookup'
+    # Retraso máximo con el que otro proceso ve un cambio (con cache compartida)
+    LOCAL_TTL = 5
+    LOCAL_MAX_SIZE = 2048
+    # TTL del segundo nivel; con una cache de proceso se usa LOCAL_TTL
+    SHARED_TTL = 300
+
+    _local = _LocalLRU(LOCAL_MAX_SIZE, LOCAL_TTL)
+
+    # ------------------------------------------------------------------
+    # Lectura en dos niveles
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def _key(cls, kind: str, value) -> str:
+        return f"{cls.PREFIX}:{kind}:{value}"
+
+    @classmethod
+    def _shared_ttl(cls) -> int:
+        return cls.LOCAL_TTL if cache_is_process_local() else cls.SHARED_TTL
+
+    @classmethod
+    def _get_many(cls, keys: List[str], load) -> Dict[str, Any]:
+        """
+        Valores de las claves: LRU local, luego cache compartida (un get_many)
+        y, para las que falten, `load(claves)` (que debe devolver todas).
+        """
+        values = {}
+        for key in keys:
+            value = cls._local.get(key)
+            if value is not _MISSING:
+                values[key] = value
+
+        missing = [key for key in keys if key not in values]
+        if missing:
+            shared = cache.get_many(missing)
+            values.update(shared)
+            missing = [key for key in missing if key not in shared]
+            for key, value in shared.items():
+                cls._local.set(key, value)
+
+        if missing:
+            loaded = load(missing)
+            cache.set_many(loaded, cls._shared_ttl())
+            for key, value in loaded.items():
+                cls._local.set(key, value)
+            values.update(loaded)
+        return values
+
+    @classmethod
+    def _invalidate(cls, keys: List[str]):
+        if keys:
+            cls._local.delete(keys)
+            cache.delete_many(keys)
+
+    @classmethod
+    def clear_local(cls):
+        """Vacía el LRU del proceso (la cache compartida no se toca)."""
+        cls._local.clear()
+
+    # ------------------------------------------------------------------
+    # Preferencias
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def preferences_for(cls, user_ids: Iterable[int]) -> Dict[int, NotificationPreference]:
+        """
+        Preferencias de varios usuarios, como instancias sin guardar (solo
+        lectura). Los usuarios sin registro reciben las preferencias por
+        defecto, y esa ausencia también se guarda en cache.
+        """
+        user_ids = {user_id for user_id in user_ids if user_id}
+        keys = {cls._key('prefs', user_id): user_id for user_id in user_ids}
+
+        def load(missing):
+            ids = [keys[key] for key in missing]
+            rows = {
+                row['user_id']: {field: row[field] for field in PREFERENCE_FIELDS}
+                for row in NotificationPreference.objects.filter(user_id__in=ids).values('user_id', *PREFERENCE_FIELDS)
+            }
+            # {} = sin registro: preferencias por defecto
+            return {cls._key('prefs', user_id): rows.get(user_id, {}) for user_id in ids}
+
+        values = cls._get_many(list(keys), load)
+        return {
+            user_id: NotificationPreference(
+                user_id=user_id,
+                **{field: list(value) if isinstance(value, list) else value for field, value in values[key].items()}
+            )
+            for key, user_id in keys.items()
+        }
+
+    @classmethod
+    def preferences(cls, user_id: int) -> NotificationPreference:
+        """Preferencias (solo lectura) de un usuario."""
+        return cls.preferences_for([user_id])[user_id]
+
+    @classmethod
+    def invalidate_preferences(cls, user_ids: Iterable[int]):
+        cls._invalidate([cls._key('prefs', user_id) for user_id in set(user_ids)])
+
+    # ------------------------------------------------------------------
+    # Usuarios por rol
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def _roles_version(cls) -> int:
+        """
+        Versión de las claves de roles. Invalidar cambia la versión, de modo que
+        se descartan todos los roles a la vez (incluidos los que no están en
+        ROLE_CHOICES, como 'buyer').
+        """
+        key = cls._key('roles', 'version')
+        version = cls._local.get(key)
+        if version is _MISSING:
+            version = cache.get(key)
+            if version is None:
+                cache.add(key, time.time_ns(), None)
+                version = cache.get(key)
+            cls._local.set(key, version)
+        return version
+
+    @classmethod
+    def role_user_ids(cls, role: str) -> List[int]:
+        """IDs de los usuarios con el rol indicado, ordenados."""
+        from api.models import CustomUser
+
+        key = cls._key('role', f'{cls._roles_version()}:{role}')
+
+        def load(missing):
+            ids = CustomUser.objects.filter(role=role).order_by('pk').values_list('pk', flat=True)
+            return {key: tuple(ids)}
+
+        return list(cls._get_many([key], load)[key])
+
+    @classmethod
+    def invalidate_roles(cls):
+        """Invalida los usuarios de todos los roles."""
+        key = cls._key('roles', 'version')
+        cache.set(key, time.time_ns(), None)
+        cls._local.delete([key])
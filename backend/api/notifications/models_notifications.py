@@ -2,14 +2,86 @@
 Modelos para el sistema de notificaciones
 """
 
-from django.db import models
+from django.db import connections, models, transaction
 from django.utils import timezone
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 # from api.models import CustomUser  # Eliminado para evitar importación circular
 
 
-class NotificationManager(models.Manager):
+class NotificationQuerySet(models.QuerySet):
+    """
+    QuerySet de notificaciones que mantiene los contadores por usuario
+    (NotificationCounter) en las escrituras masivas: bulk_create, update de
+    is_read y delete. Los contadores se actualizan en la misma transacción.
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        from api.notifications.counters_notifications import NotificationCounterService
+
+        with transaction.atomic(using=self.db, savepoint=False):
+            created = super().bulk_create(objs, *args, **kwargs)
+            NotificationCounterService.apply(NotificationCounterService.deltas_for(created))
+        for notification in created:
+            notification._counted_is_read = notification.is_read
+        return created
+
+    def update(self, **kwargs):
+        from api.notifications.counters_notifications import NotificationCounterService
+
+        is_read = kwargs.get('is_read')
+        if not isinstance(is_read, bool):
+            return super().update(**kwargs)
+
+        with transaction.atomic(using=self.db, savepoint=False):
+            # Se bloquean (en orden de pk) las filas cuyo estado cambia y solo
+            # esas se actualizan, con el estado anterior como condición: dos
+            # "marcar todas" concurrentes no descuentan dos veces la misma fila
+            changing = self.exclude(is_read=is_read).select_related(None).order_by('pk').only(
+                'pk', 'recipient_id', 'notification_type', 'priority', 'is_read'
+            )
+            if connections[self.db].features.has_select_for_update_of:
+                changing = changing.select_for_update(of=('self',))
+            else:
+                changing = changing.select_for_update()
+            changing = list(changing)
+
+            count = 0
+            if len(kwargs) > 1:
+                # Las filas que ya tenían ese estado reciben el resto de campos
+                count += super(NotificationQuerySet, self.filter(is_read=is_read)).update(**kwargs)
+            changed = 0
+            if changing:
+                changed = self.model._base_manager.using(self.db).filter(
+                    pk__in=[notification.pk for notification in changing], is_read=not is_read
+                ).update(**kwargs)
+            count += changed
+
+            NotificationCounterService.apply(NotificationCounterService.deltas_for(
+                changing, sign=0, read_change=1 if is_read else -1
+            ))
+            if changed != len(changing):
+                # Alguna fila cambió entre la lectura y el UPDATE (motores sin
+                # bloqueo de filas): se recalculan los contadores afectados
+                NotificationCounterService.reconcile({notification.recipient_id for notification in changing})
+        return count
+
+    update.alters_data = True
+
+    def delete(self):
+        from api.notifications.counters_notifications import NotificationCounterService
+
+        with transaction.atomic(using=self.db, savepoint=False):
+            deltas = NotificationCounterService.deltas_for_queryset(self, sign=-1)
+            result = super().delete()
+            NotificationCounterService.apply(deltas)
+        return result
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+
+class NotificationManager(models.Manager.from_queryset(NotificationQuerySet)):
     """Manager personalizado para Notificaciones"""
     
     def unread(self):
@@ -33,20 +105,18 @@ class NotificationManager(models.Manager):
         from django.utils import timezone
         return self.filter(expires_at__lt=timezone.now())
     
-    def delete_expired(self):
-        """Eliminar notificaciones expiradas"""
-        count = self.expired().count()
-        self.expired().delete()
-        return count
+    def delete_expired(self, **options):
+        """
+        Eliminar notificaciones expiradas, por lotes (opciones de
+        NotificationRetentionService.delete_in_batches: batch_size, pause, archive).
+        """
+        from api.notifications.retention_notifications import NotificationRetentionService
+        return NotificationRetentionService.delete_expired(**options)
     
-    def delete_old_read(self, days=30):
-        """Eliminar notificaciones leídas más antiguas que X días"""
-        from django.utils import timezone
-        from datetime import timedelta
-        cutoff_date = timezone.now() - timedelta(days=days)
-        count = self.filter(is_read=True, created_at__lt=cutoff_date).count()
-        self.filter(is_read=True, created_at__lt=cutoff_date).delete()
-        return count
+    def delete_old_read(self, days=30, **options):
+        """Eliminar notificaciones leídas más antiguas que X días, por lotes"""
+        from api.notifications.retention_notifications import NotificationRetentionService
+        return NotificationRetentionService.delete_old_read(days=days, **options)
 
 
 class NotificationType(models.TextChoices):
@@ -198,6 +268,8 @@ class Notification(models.Model):
         indexes = [
             # Índices para consultas comunes
             models.Index(fields=['recipient', '-created_at'], name='notif_recip_created_idx'),
+            # Paginación por cursor (keyset) sobre (created_at, id) por destinatario
+            models.Index(fields=['recipient', '-created_at', '-id'], name='notif_recip_created_id_idx'),
             models.Index(fields=['recipient', 'is_read'], name='notif_recip_read_idx'),
             models.Index(fields=['recipient', 'is_read', '-created_at'], name='notif_recip_read_created_idx'),
             models.Index(fields=['notification_type'], name='notif_type_idx'),
@@ -213,6 +285,51 @@ class Notification(models.Model):
     def __str__(self):
         return f"{self.title} - {self.recipient.full_name}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Estado de lectura ya contado en NotificationCounter
+        instance._counted_is_read = instance.__dict__.get('is_read')
+        return instance
+
+    def save(self, *args, **kwargs):
+        from api.notifications.counters_notifications import NotificationCounterService
+
+        adding = self._state.adding
+        counted_is_read = getattr(self, '_counted_is_read', None)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'is_read' not in update_fields:
+            counted_is_read = None
+        read_changed = not adding and counted_is_read is not None and counted_is_read != self.is_read
+        with transaction.atomic(savepoint=False):
+            changed = 0
+            if read_changed:
+                # Cambio condicional: solo se cuenta si la fila seguía con el
+                # estado leído al cargarla (otra instancia pudo cambiarlo ya)
+                changed = type(self)._base_manager.using(kwargs.get('using') or self._state.db).filter(
+                    pk=self.pk, is_read=counted_is_read
+                ).update(is_read=self.is_read)
+            super().save(*args, **kwargs)
+            if adding:
+                NotificationCounterService.apply(NotificationCounterService.deltas_for([self]))
+            elif changed == 1:
+                NotificationCounterService.apply(NotificationCounterService.deltas_for(
+                    [self], sign=0, read_change=1 if self.is_read else -1
+                ))
+        if adding or counted_is_read is not None:
+            self._counted_is_read = self.is_read
+
+    def delete(self, *args, **kwargs):
+        from api.notifications.counters_notifications import NotificationCounterService
+
+        is_read = getattr(self, '_counted_is_read', None)
+        with transaction.atomic(savepoint=False):
+            result = super().delete(*args, **kwargs)
+            if is_read is not None:
+                self.is_read = is_read
+            NotificationCounterService.apply(NotificationCounterService.deltas_for([self], sign=-1))
+        return result
+
     def mark_as_read(self):
         """Marcar la notificación como leída"""
         if not self.is_read:
@@ -256,6 +373,29 @@ class Notification(models.Model):
         Returns:
             Notification: Instancia de la notificación creada
         """
+        notification = cls.build_notification(
+            recipient=recipient,
+            notification_type=notification_type,
+            title=title,
+            message=message,
+            sender=sender,
+            priority=priority,
+            related_object=related_object,
+            action_url=action_url,
+            metadata=metadata,
+            expires_at=expires_at
+        )
+        notification.save()
+        return notification
+
+    @classmethod
+    def build_notification(cls, recipient, notification_type, title, message,
+                           sender=None, priority=NotificationPriority.NORMAL,
+                           related_object=None, action_url=None, metadata=None, expires_at=None):
+        """
+        Igual que create_notification pero sin guardar: el dispatcher del outbox
+        inserta las de todo un lote con un único bulk_create.
+        """
         notification = cls(
             recipient=recipient,
             sender=sender,
@@ -270,8 +410,7 @@ class Notification(models.Model):
         
         if related_object:
             notification.related_object = related_object
-        
-        notification.save()
+
         return notification
     
     @classmethod
@@ -294,9 +433,28 @@ class Notification(models.Model):
         Returns:
             list: Lista de notificaciones creadas
         """
-        notifications = [
+        return cls.objects.bulk_create(cls.build_bulk_notifications(
+            recipients=recipients,
+            notification_type=notification_type,
+            title=title,
+            message=message,
+            sender=sender,
+            priority=priority,
+            action_url=action_url,
+            metadata=metadata
+        ))
+
+    @classmethod
+    def build_bulk_notifications(cls, recipients, notification_type, title, message,
+                                 sender=None, priority=NotificationPriority.NORMAL,
+                                 action_url=None, metadata=None):
+        """
+        Igual que create_bulk_notifications pero sin guardar. `recipients`
+        puede contener usuarios o IDs de usuario.
+        """
+        return [
             cls(
-                recipient=recipient,
+                **({'recipient': recipient} if isinstance(recipient, models.Model) else {'recipient_id': recipient}),
                 sender=sender,
                 notification_type=notification_type,
                 priority=priority,
@@ -307,8 +465,6 @@ class Notification(models.Model):
             )
             for recipient in recipients
         ]
-        
-        return cls.objects.bulk_create(notifications)
 
 
 class NotificationPreference(models.Model):
@@ -355,6 +511,13 @@ class NotificationPreference(models.Model):
         default='immediate',
         verbose_name='Frecuencia de resumen'
     )
+
+    # Último resumen enviado (el siguiente incluye lo posterior)
+    last_digest_sent_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Último resumen enviado'
+    )
     
     # Timestamps
     created_at = models.DateTimeField(default=timezone.now)
@@ -387,3 +550,118 @@ class NotificationPreference(models.Model):
             }
         )
         return preferences
+
+
+class NotificationOutbox(models.Model):
+    """
+    Outbox transaccional de eventos de dominio que generan notificaciones.
+
+    Las señales solo insertan aquí el evento (con los ids y cambios necesarios)
+    dentro de la transacción de la escritura: si se revierte, el evento
+    desaparece con ella. El dispatcher (api/notifications/outbox_notifications.py)
+    los procesa después por lotes.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pendiente'
+        DONE = 'done', 'Procesado'
+        FAILED = 'failed', 'Fallido'
+
+    event_type = models.CharField(max_length=50, verbose_name='Evento')
+    payload = models.JSONField(default=dict, blank=True, verbose_name='Datos')
+    status = models.CharField(
+        max_length=10,
+        choices=Status.choices,
+        default=Status.PENDING,
+        verbose_name='Estado'
+    )
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name='Intentos')
+    last_error = models.TextField(blank=True, default='', verbose_name='Último error')
+
+    created_at = models.DateTimeField(default=timezone.now, verbose_name='Creado en')
+    # Los reintentos se programan moviendo available_at hacia adelante
+    available_at = models.DateTimeField(default=timezone.now, verbose_name='Disponible desde')
+    processed_at = models.DateTimeField(null=True, blank=True, verbose_name='Procesado en')
+
+    class Meta:
+        ordering = ['id']
+        verbose_name = 'Evento de notificación'
+        verbose_name_plural = 'Outbox de notificaciones'
+        indexes = [
+            # Cola del dispatcher: pendientes disponibles por orden de llegada
+            models.Index(fields=['status', 'available_at', 'id'], name='notif_outbox_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} #{self.pk} ({self.status})"
+
+
+class NotificationCounter(models.Model):
+    """
+    Contadores precalculados de notificaciones por usuario, tipo y prioridad.
+
+    El badge de no leídas y las estadísticas se obtienen sumando unas pocas
+    filas por usuario (y, normalmente, desde cache) en lugar de contar sus
+    notificaciones. Se mantienen desde NotificationQuerySet y Notification en
+    la misma transacción que la escritura, y se pueden reconciliar con el
+    comando `reconcile_notification_counters`.
+    """
+
+    user = models.ForeignKey(
+        'api.CustomUser',
+        on_delete=models.CASCADE,
+        related_name='notification_counters',
+        verbose_name='Usuario'
+    )
+    notification_type = models.CharField(max_length=50, choices=NotificationType.choices, verbose_name='Tipo')
+    priority = models.CharField(max_length=20, choices=NotificationPriority.choices, verbose_name='Prioridad')
+    total = models.IntegerField(default=0, verbose_name='Total')
+    unread = models.IntegerField(default=0, verbose_name='No leídas')
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Contador de notificaciones'
+        verbose_name_plural = 'Contadores de notificaciones'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'notification_type', 'priority'], name='notif_counter_user_type_priority_uniq'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.notification_type}/{self.priority}: {self.unread}/{self.total}"
+
+
+class NotificationArchive(models.Model):
+    """
+    Copia compacta de las notificaciones eliminadas por la retención
+    (NotificationRetentionService con archive=True).
+
+    Sin claves foráneas ni relación genérica: las filas no bloquean el borrado
+    de usuarios y la tabla se puede particionar. En PostgreSQL está
+    particionada por mes de `created_at` y los meses antiguos se eliminan con
+    DROP TABLE de la partición.
+    """
+
+    original_id = models.BigIntegerField(verbose_name='ID original')
+    recipient_id = models.BigIntegerField(verbose_name='Destinatario')
+    sender_id = models.BigIntegerField(null=True, blank=True, verbose_name='Remitente')
+    notification_type = models.CharField(max_length=50, choices=NotificationType.choices, verbose_name='Tipo')
+    priority = models.CharField(max_length=20, choices=NotificationPriority.choices, verbose_name='Prioridad')
+    title = models.CharField(max_length=200, verbose_name='Título')
+    message = models.TextField(verbose_name='Mensaje')
+    is_read = models.BooleanField(default=False, verbose_name='Leída')
+    read_at = models.DateTimeField(null=True, blank=True, verbose_name='Leída en')
+    created_at = models.DateTimeField(verbose_name='Creada en')
+    archived_at = models.DateTimeField(default=timezone.now, verbose_name='Archivada en')
+
+    class Meta:
+        verbose_name = 'Notificación archivada'
+        verbose_name_plural = 'Notificaciones archivadas'
+        indexes = [
+            models.Index(fields=['created_at'], name='notif_archive_created_idx'),
+            models.Index(fields=['recipient_id', '-created_at'], name='notif_archive_recip_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.title} ({self.original_id})"
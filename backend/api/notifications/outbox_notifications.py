@@ -0,0 +1,316 @@
+"""
+Outbox transaccional de notificaciones.
+
+Las señales de dominio (pedidos, productos, paquetes, entregas, usuarios) no
+crean notificaciones dentro de la petición: registran un evento en
+NotificationOutbox dentro de la misma transacción y, con
+transaction.on_commit, avisan al dispatcher. Un evento de una transacción
+revertida nunca se procesa.
+
+El dispatcher toma los eventos pendientes por lotes y, para cada lote:
+
+1. Ejecuta el handler de cada evento (consultas de destinatarios y
+   construcción de las notificaciones sin guardar).
+2. Inserta todas las notificaciones del lote con un único bulk_create, las
+   agrupa (una escritura por grupo, ver NotificationGrouper.group_notifications)
+   y marca los eventos como procesados.
+3. Tras el commit, publica las notificaciones en el stream SSE (solo en los
+   procesos web, ver abajo) y, con ENABLE_NOTIFICATION_EMAILS, las envía por
+   email en un único envío por lotes (NotificationEmailService.send_notifications).
+
+Un evento cuyo handler falla se reintenta con espera exponencial hasta
+MAX_ATTEMPTS; después queda como `failed` con el último error.
+
+Modos de ejecución (setting NOTIFICATION_OUTBOX_WORKER):
+- False (por defecto): un hilo en segundo plano de cada proceso web procesa
+  los eventos cuando se confirma la transacción que los generó. Con SQLite
+  (desarrollo) se procesan en el mismo hilo justo después del commit.
+- True: los procesos web solo escriben el outbox y un worker aparte los
+  procesa (`python manage.py dispatch_notifications`). El worker inserta las
+  notificaciones y envía los emails, pero no publica en SSE: el broker es por
+  proceso y el worker no atiende conexiones. Cada proceso web lee las
+  notificaciones nuevas de sus usuarios conectados de la tabla y las publica
+  (NotificationRelay en realtime_notifications.py), con hasta
+  NotificationRelay.POLL_INTERVAL segundos de retraso.
+"""
+
+import logging
+import os
+import threading
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Avg, F, Max, Min, prefetch_related_objects
+from django.utils import timezone
+
+from api.notifications.models_notifications import Notification, NotificationOutbox
+
+logger = logging.getLogger(__name__)
+
+# Tipo de evento → handler que devuelve las notificaciones (sin guardar) del evento
+_HANDLERS: Dict[str, Callable[[dict], List[Notification]]] = {}
+
+
+def outbox_handler(event_type: str):
+    """Registra el handler de un tipo de evento del outbox."""
+    def decorator(func):
+        _HANDLERS[event_type] = func
+        return func
+    return decorator
+
+
+class NotificationOutboxService:
+    """Escritura de eventos en el outbox."""
+
+    @staticmethod
+    def enqueue(event_type: str, payload: dict) -> NotificationOutbox:
+        """
+        Registra un evento en la transacción actual y avisa al dispatcher al
+        confirmarla.
+
+        Args:
+            event_type: Tipo de evento (debe tener un handler registrado)
+            payload: Datos serializables en JSON (ids y valores de los cambios)
+        """
+        event = NotificationOutbox.objects.create(event_type=event_type, payload=payload)
+        transaction.on_commit(OutboxDispatcher.wake)
+        return event
+
+
+class OutboxDispatcher:
+    """Procesamiento por lotes de los eventos pendientes del outbox."""
+
+    BATCH_SIZE = 100
+    MAX_ATTEMPTS = 5
+    # Espera antes del reintento n: RETRY_BASE_SECONDS * 2**(n-1)
+    RETRY_BASE_SECONDS = 5
+    # Cada cuánto revisa el hilo en segundo plano los reintentos programados
+    POLL_INTERVAL = 30
+
+    _thread: Optional[threading.Thread] = None
+    _thread_pid: Optional[int] = None
+    _wakeup = threading.Event()
+    _thread_lock = threading.Lock()
+
+    @classmethod
+    def dispatch_batch(cls, limit: Optional[int] = None) -> int:
+        """
+        Procesa un lote de eventos pendientes.
+
+        Returns:
+            int: Eventos tomados del outbox (procesados o reprogramados)
+        """
+        limit = limit or cls.BATCH_SIZE
+        now = timezone.now()
+        delivered: List[Notification] = []
+
+        with transaction.atomic():
+            queryset = NotificationOutbox.objects.filter(
+                status=NotificationOutbox.Status.PENDING, available_at__lte=now
+            ).order_by('id')
+            if connection.features.has_select_for_update_skip_locked:
+                # Varios workers pueden procesar el outbox sin tomar el mismo evento
+                queryset = queryset.select_for_update(skip_locked=True)
+            events = list(queryset[:limit])
+            if not events:
+                return 0
+
+            built: Dict[int, List[Notification]] = {}
+            failed: Dict[int, str] = {}
+            for event in events:
+                handler = _HANDLERS.get(event.event_type)
+                try:
+                    if handler is None:
+                        raise LookupError(f'Sin handler para el evento {event.event_type}')
+                    with transaction.atomic():
+                        built[event.pk] = cls._valid(handler(event.payload))
+                except Exception as e:
+                    failed[event.pk] = f'{type(e).__name__}: {e}'
+
+            delivered = cls._insert(built, failed)
+            cls._group(delivered)
+            cls._mark_done([event.pk for event in events if event.pk in built])
+            cls._mark_failed([event for event in events if event.pk in failed], failed)
+
+            transaction.on_commit(lambda: cls._publish(delivered))
+
+        lags = [(now - event.created_at).total_seconds() for event in events]
+        logger.info(
+            f"Outbox: {len(events) - len(failed)} eventos procesados, {len(failed)} con error, "
+            f"{len(delivered)} notificaciones; retraso máx. {max(lags):.2f} s"
+        )
+        return len(events)
+
+    @classmethod
+    def dispatch_pending(cls, max_batches: Optional[int] = None) -> int:
+        """Procesa lotes hasta vaciar los eventos disponibles. Devuelve los eventos tomados."""
+        total = 0
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            count = cls.dispatch_batch()
+            total += count
+            batches += 1
+            if count < cls.BATCH_SIZE:
+                break
+        return total
+
+    @staticmethod
+    def _valid(notifications: List[Notification]) -> List[Notification]:
+        """Descarta las notificaciones sin destinatario (p. ej. pedidos sin agente)."""
+        return [notification for notification in notifications if notification.recipient_id]
+
+    @classmethod
+    def _insert(cls, built: Dict[int, List[Notification]], failed: Dict[int, str]) -> List[Notification]:
+        """
+        Inserta las notificaciones de todo el lote con un bulk_create. Si falla,
+        se insertan evento a evento para aislar el que provoca el error.
+        """
+        notifications = [notification for items in built.values() for notification in items]
+        try:
+            with transaction.atomic():
+                return Notification.objects.bulk_create(notifications)
+        except Exception:
+            logger.warning("Outbox: falló la inserción del lote; se reintenta evento a evento", exc_info=True)
+
+        inserted = []
+        for event_id, items in list(built.items()):
+            try:
+                with transaction.atomic():
+                    inserted.extend(Notification.objects.bulk_create(items))
+            except Exception as e:
+                del built[event_id]
+                failed[event_id] = f'{type(e).__name__}: {e}'
+        return inserted
+
+    @staticmethod
+    def _group(notifications: List[Notification]):
+        """Agrupa las notificaciones del lote; un error no impide entregarlas."""
+        from api.notifications.grouping_notifications import NotificationGrouper
+
+        try:
+            with transaction.atomic():
+                NotificationGrouper.group_notifications(notifications)
+        except Exception:
+            logger.exception("Outbox: error agrupando las notificaciones del lote")
+
+    @staticmethod
+    def _mark_done(event_ids: List[int]):
+        if event_ids:
+            NotificationOutbox.objects.filter(pk__in=event_ids).update(
+                status=NotificationOutbox.Status.DONE,
+                attempts=F('attempts') + 1,
+                processed_at=timezone.now(),
+                last_error=''
+            )
+
+    @classmethod
+    def _mark_failed(cls, events: List[NotificationOutbox], errors: Dict[int, str]):
+        now = timezone.now()
+        for event in events:
+            event.attempts += 1
+            event.last_error = errors[event.pk][:2000]
+            if event.attempts >= cls.MAX_ATTEMPTS:
+                event.status = NotificationOutbox.Status.FAILED
+                logger.error(f"Outbox: evento {event.pk} ({event.event_type}) descartado: {event.last_error}")
+            else:
+                event.available_at = now + timedelta(seconds=cls.RETRY_BASE_SECONDS * 2 ** (event.attempts - 1))
+                logger.warning(f"Outbox: evento {event.pk} ({event.event_type}) se reintentará: {event.last_error}")
+        if events:
+            NotificationOutbox.objects.bulk_update(events, ['attempts', 'last_error', 'status', 'available_at'])
+
+    @staticmethod
+    def _publish(notifications: List[Notification]):
+        """
+        Publica en el stream SSE (y por email, si está activo) las
+        notificaciones insertadas. En modo worker no se publica en SSE: lo hace
+        NotificationRelay en los procesos web.
+        """
+        from api.notifications.email_notifications import NotificationEmailService
+        from api.notifications.realtime_notifications import NotificationRelay, NotificationSSE
+        from api.notifications.serializers_notifications import NotificationSerializer
+
+        # Los handlers pueden construir notificaciones solo con recipient_id
+        # (usuarios por rol desde cache): se cargan todos en una consulta
+        prefetch_related_objects(notifications, 'recipient', 'sender')
+        for notification in ([] if NotificationRelay.enabled() else notifications):
+            try:
+                NotificationSSE.publish_notification(
+                    user_id=notification.recipient_id,
+                    notification_data=NotificationSerializer(notification).data
+                )
+            except Exception as e:
+                logger.warning(f"Failed to push realtime notification {notification.pk}: {e}")
+
+        if notifications and getattr(settings, 'ENABLE_NOTIFICATION_EMAILS', False):
+            try:
+                NotificationEmailService.send_notifications(notifications)
+            except Exception:
+                logger.exception("Outbox: error enviando los emails del lote")
+
+    @staticmethod
+    def stats(window: timedelta = timedelta(hours=1)) -> dict:
+        """
+        Métricas del outbox: pendientes, fallidos, antigüedad del pendiente más
+        antiguo y retraso de despacho (creación → procesado) en la ventana.
+        """
+        now = timezone.now()
+        pending = NotificationOutbox.objects.filter(status=NotificationOutbox.Status.PENDING)
+        oldest = pending.aggregate(oldest=Min('created_at'))['oldest']
+        lag = NotificationOutbox.objects.filter(
+            status=NotificationOutbox.Status.DONE, processed_at__gte=now - window
+        ).aggregate(avg=Avg(F('processed_at') - F('created_at')), max=Max(F('processed_at') - F('created_at')))
+
+        def seconds(value):
+            # SQLite devuelve la diferencia en microsegundos, PostgreSQL como timedelta
+            if value is None:
+                return None
+            return value.total_seconds() if isinstance(value, timedelta) else value / 1_000_000
+
+        return {
+            'pending': pending.count(),
+            'failed': NotificationOutbox.objects.filter(status=NotificationOutbox.Status.FAILED).count(),
+            'oldest_pending_seconds': (now - oldest).total_seconds() if oldest else None,
+            'avg_lag_seconds': seconds(lag['avg']),
+            'max_lag_seconds': seconds(lag['max']),
+        }
+
+    # ------------------------------------------------------------------
+    # Hilo en segundo plano (NOTIFICATION_OUTBOX_WORKER = False)
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def wake(cls):
+        """Avisa al hilo dispatcher del proceso; lo arranca si hace falta."""
+        if getattr(settings, 'NOTIFICATION_OUTBOX_WORKER', False):
+            return
+        if connection.vendor == 'sqlite':
+            # SQLite (desarrollo) no admite escrituras concurrentes desde otro
+            # hilo: se despacha en el mismo hilo, ya fuera de la transacción
+            try:
+                cls.dispatch_pending()
+            except Exception:
+                logger.exception("Outbox: error al despachar tras el commit")
+            return
+        with cls._thread_lock:
+            # Tras un fork (workers de gunicorn) el hilo del padre no existe en el hijo
+            if cls._thread is None or not cls._thread.is_alive() or cls._thread_pid != os.getpid():
+                cls._wakeup = threading.Event()
+                cls._thread = threading.Thread(target=cls._run, name='notification-outbox', daemon=True)
+                cls._thread_pid = os.getpid()
+                cls._thread.start()
+        cls._wakeup.set()
+
+    @classmethod
+    def _run(cls):
+        wakeup = cls._wakeup
+        while True:
+            wakeup.wait(timeout=cls.POLL_INTERVAL)
+            wakeup.clear()
+            try:
+                cls.dispatch_pending()
+            except Exception:
+                logger.exception("Outbox: error en el dispatcher en segundo plano")
+            finally:
+                close_old_connections()
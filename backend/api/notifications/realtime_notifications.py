@@ -3,182 +3,522 @@ Sistema de notificaciones en tiempo real usando Server-Sent Events (SSE).
 
 SSE es más simple que WebSockets y suficiente para notificaciones unidireccionales.
 No requiere Django Channels ni configuración compleja.
+
+El stream es una vista asíncrona servida por config/asgi.py: cada conexión
+abierta es una corrutina que espera en su cola del broker en proceso
+(NotificationBroker) sin ocupar un worker ni un hilo. Los heartbeats salen
+cuando la espera supera HEARTBEAT_INTERVAL. Las notificaciones se publican
+desde cualquier hilo (señales de las vistas síncronas) y se entregan en el
+event loop de cada conexión.
+
+Cada usuario tiene además un buffer circular de los últimos mensajes con ids
+de secuencia crecientes. Los eventos SSE llevan `id:` y, al reconectar, el
+cliente envía `Last-Event-ID`: se reenvían los mensajes posteriores desde el
+buffer, sin consultar la base de datos. La lectura es por cursor (no borra
+nada), así que varias pestañas o reconexiones ven los mismos mensajes. Los
+buffers de usuarios sin conexión se descartan pasado REPLAY_WINDOW, de modo
+que la memoria crece con los usuarios conectados y no con todos los usuarios.
+
+El broker es por proceso: con varios workers, cada uno entrega solo a las
+conexiones que atiende. Con NOTIFICATION_OUTBOX_WORKER=True las notificaciones
+las inserta el worker del outbox, que no tiene conexiones: en ese modo cada
+proceso web las lee de la tabla de notificaciones (NotificationRelay) y las
+publica en su propio broker.
 """
 
-from django.http import StreamingHttpResponse
-from django.views.decorators.csrf import csrf_exempt
-from django.utils import timezone
-from django.core.cache import cache
+import asyncio
 import json
-import time
 import logging
-from typing import Generator, Optional
+import threading
+import time
+import os
+from collections import defaultdict, deque
+from datetime import timedelta
+from typing import AsyncGenerator, Dict, List, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.core.handlers.wsgi import WSGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils import timezone
 
 from api.notifications.models_notifications import Notification
 
 logger = logging.getLogger(__name__)
 
 
+class _Subscription:
+    """Cola de una conexión SSE y el event loop en el que se consume."""
+
+    __slots__ = ('loop', 'queue')
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, maxsize: int):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def deliver(self, message: dict):
+        """Se ejecuta en el loop de la conexión. Si la cola está llena se descarta el más antiguo."""
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+
+class _MessageBuffer:
+    """
+    Últimos mensajes de un usuario con su id de secuencia.
+
+    La secuencia arranca en el instante de creación (ms) para que los ids sigan
+    creciendo tras reiniciar el proceso y un Last-Event-ID antiguo no oculte
+    mensajes nuevos.
+    """
+
+    __slots__ = ('messages', 'last_id', 'idle_since')
+
+    def __init__(self, size: int):
+        self.messages = deque(maxlen=size)
+        self.last_id = int(time.time() * 1000)
+        # Instante (monotonic) en que se cerró la última conexión del usuario
+        self.idle_since: Optional[float] = None
+
+    def append(self, message: dict) -> dict:
+        self.last_id += 1
+        message = {**message, 'id': self.last_id}
+        self.messages.append(message)
+        return message
+
+    def after(self, last_event_id: int) -> Tuple[List[dict], bool]:
+        """
+        Mensajes posteriores al cursor y si hubo un hueco (el cursor es anterior
+        al mensaje más antiguo que se conserva).
+        """
+        pending = [message for message in self.messages if message['id'] > last_event_id]
+        oldest = self.messages[0]['id'] if self.messages else self.last_id + 1
+        return pending, last_event_id < oldest - 1
+
+
+class NotificationBroker:
+    """
+    Canal pub/sub en proceso: una cola por conexión SSE abierta, agrupadas por
+    usuario, y un buffer circular de mensajes por usuario para reanudar.
+
+    Solo se guardan buffers de usuarios conectados o que se desconectaron hace
+    menos de REPLAY_WINDOW segundos; los demás se descartan (como mucho cada
+    EVICT_INTERVAL segundos se revisan todos). Un cliente que reconecta con
+    Last-Event-ID sin buffer recibe `resync`.
+    """
+
+    # Mensajes pendientes por conexión (un cliente lento pierde los más antiguos)
+    QUEUE_SIZE = 100
+    # Mensajes que se conservan por usuario para reanudar con Last-Event-ID
+    BUFFER_SIZE = 50
+    # Segundos que se conserva el buffer de un usuario sin conexiones
+    REPLAY_WINDOW = 300
+    # Intervalo mínimo entre revisiones de buffers inactivos
+    EVICT_INTERVAL = 60
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._buffers = {}
+        self._lock = threading.Lock()
+        self._next_eviction = time.monotonic() + self.EVICT_INTERVAL
+
+    def subscribe(self, user_id: int, last_event_id: Optional[int] = None) -> Tuple[_Subscription, List[dict], bool]:
+        """
+        Registra una conexión del usuario. Debe llamarse desde su event loop.
+
+        El registro y la lectura del buffer se hacen bajo el mismo lock que
+        publish(), así que cada mensaje llega una sola vez: o está en el
+        backlog o se entrega en la cola.
+
+        Args:
+            user_id: ID del usuario
+            last_event_id: Último id recibido por el cliente (Last-Event-ID)
+
+        Returns:
+            tuple: (suscripción, mensajes posteriores a last_event_id, hubo_hueco)
+        """
+        subscription = _Subscription(asyncio.get_running_loop(), self.QUEUE_SIZE)
+        with self._lock:
+            self._subscribers[user_id].add(subscription)
+            buffer = self._buffers.get(user_id)
+            if buffer is not None:
+                buffer.idle_since = None
+            if last_event_id is None:
+                return subscription, [], False
+            if buffer is None:
+                # Buffer descartado por inactividad (o proceso reiniciado): no se sabe qué se perdió
+                return subscription, [], True
+            backlog, gap = buffer.after(last_event_id)
+        return subscription, backlog, gap
+
+    def unsubscribe(self, user_id: int, subscription: _Subscription):
+        with self._lock:
+            subscriptions = self._subscribers.get(user_id)
+            if subscriptions is None:
+                return
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self._subscribers[user_id]
+                buffer = self._buffers.get(user_id)
+                if buffer is not None:
+                    buffer.idle_since = time.monotonic()
+            self._maybe_evict()
+
+    def publish(self, user_id: int, message: dict) -> int:
+        """
+        Añade el mensaje al buffer del usuario (asignándole el siguiente id) y
+        lo entrega a todas sus conexiones. Puede llamarse desde cualquier hilo.
+
+        Returns:
+            int: Conexiones a las que se entregó
+        """
+        closed = []
+        with self._lock:
+            self._maybe_evict()
+            buffer = self._buffers.get(user_id)
+            if buffer is None:
+                if user_id not in self._subscribers:
+                    # Ni conectado ni desconectado hace poco: no hay a quién reenviarlo
+                    return 0
+                buffer = self._buffers[user_id] = _MessageBuffer(self.BUFFER_SIZE)
+            message = buffer.append(message)
+
+            # Se encola dentro del lock para que cada conexión reciba los ids en orden
+            delivered = 0
+            for subscription in self._subscribers.get(user_id, ()):
+                try:
+                    subscription.loop.call_soon_threadsafe(subscription.deliver, message)
+                    delivered += 1
+                except RuntimeError:
+                    # El loop de la conexión ya se cerró
+                    closed.append(subscription)
+
+        for subscription in closed:
+            self.unsubscribe(user_id, subscription)
+        return delivered
+
+    def _maybe_evict(self):
+        """Revisa los buffers inactivos si pasó EVICT_INTERVAL. Requiere el lock."""
+        now = time.monotonic()
+        if now >= self._next_eviction:
+            self._next_eviction = now + self.EVICT_INTERVAL
+            self._evict_idle(now)
+
+    def _evict_idle(self, now: float) -> int:
+        expired = [
+            user_id for user_id, buffer in self._buffers.items()
+            if buffer.idle_since is not None and now - buffer.idle_since >= self.REPLAY_WINDOW
+        ]
+        for user_id in expired:
+            del self._buffers[user_id]
+        return len(expired)
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """
+        Descarta los buffers de usuarios sin conexiones desde hace más de
+        REPLAY_WINDOW segundos.
+
+        Returns:
+            int: Buffers descartados
+        """
+        with self._lock:
+            return self._evict_idle(time.monotonic() if now is None else now)
+
+    def buffer_count(self) -> int:
+        with self._lock:
+            return len(self._buffers)
+
+    def user_ids(self) -> List[int]:
+        """Usuarios con alguna conexión abierta en este proceso."""
+        with self._lock:
+            return list(self._subscribers)
+
+    def connection_count(self, user_id: Optional[int] = None) -> int:
+        with self._lock:
+            if user_id is not None:
+                return len(self._subscribers.get(user_id, ()))
+            return sum(len(subscriptions) for subscriptions in self._subscribers.values())
+
+
+broker = NotificationBroker()
+
+
 class NotificationSSE:
     """
     Clase para gestionar Server-Sent Events de notificaciones.
     """
-    
+
     # Tiempo entre heartbeats (segundos)
     HEARTBEAT_INTERVAL = 30
-    
-    # TTL del cache (segundos)
-    CACHE_TTL = 60
-    
-    @classmethod
-    def _get_channel_key(cls, user_id: int) -> str:
-        """Generar clave de canal para un usuario"""
-        return f"notif_sse_channel:{user_id}"
-    
+
     @classmethod
     def publish_notification(cls, user_id: int, notification_data: dict):
         """
         Publicar una notificación en el canal SSE del usuario.
-        
+
         Args:
             user_id: ID del usuario destinatario
             notification_data: Datos de la notificación en formato dict
         """
-        channel_key = cls._get_channel_key(user_id)
-        
-        # Guardar en cache con timestamp
         message = {
             'event': 'notification',
             'data': notification_data,
             'timestamp': timezone.now().isoformat()
         }
-        
-        # Usar una lista en cache para acumular mensajes
-        messages = cache.get(channel_key, [])
-        messages.append(message)
-        
-        # Mantener solo los últimos 50 mensajes
-        if len(messages) > 50:
-            messages = messages[-50:]
-        
-        cache.set(channel_key, messages, cls.CACHE_TTL)
-        
-        logger.info(f"Notificación publicada en canal SSE del usuario {user_id}")
-    
-    @classmethod
-    def get_pending_messages(cls, user_id: int) -> list:
-        """Obtener mensajes pendientes del usuario"""
-        channel_key = cls._get_channel_key(user_id)
-        messages = cache.get(channel_key, [])
-        
-        # Limpiar mensajes después de leer
-        cache.delete(channel_key)
-        
-        return messages
-    
+        delivered = broker.publish(user_id, message)
+
+        logger.info(f"Notificación publicada en canal SSE del usuario {user_id} ({delivered} conexiones)")
+
     @classmethod
-    def format_sse_message(cls, event: str, data: dict) -> str:
+    def format_sse_message(cls, event: str, data: dict, event_id: Optional[int] = None) -> str:
         """
         Formatear mensaje en formato SSE.
-        
+
         SSE Format:
+        id: 1718000000001
         event: event_name
         data: {"key": "value"}
-        
+
+        Solo los mensajes del buffer llevan id; los de control (connected,
+        heartbeat) no mueven el cursor del cliente.
         """
         lines = []
-        
+
+        if event_id is not None:
+            lines.append(f"id: {event_id}")
+
         if event:
             lines.append(f"event: {event}")
-        
+
         if data:
             # JSON debe estar en una sola línea
-            json_data = json.dumps(data, ensure_ascii=False)
+            json_data = json.dumps(data, ensure_ascii=False, default=str)
             lines.append(f"data: {json_data}")
-        
+
         # SSE requiere línea en blanco al final
         lines.append("")
         lines.append("")
-        
+
         return "\n".join(lines)
-    
+
+    @classmethod
+    def _format_message(cls, message: dict) -> str:
+        return cls.format_sse_message(
+            message.get('event', 'notification'),
+            message.get('data', {}),
+            message.get('id')
+        )
+
     @classmethod
-    def event_stream(cls, user_id: int) -> Generator[str, None, None]:
+    async def event_stream(cls, user_id: int, last_event_id: Optional[int] = None) -> AsyncGenerator[str, None]:
         """
-        Generador de eventos SSE para un usuario.
-        
+        Generador asíncrono de eventos SSE para un usuario.
+
         Args:
             user_id: ID del usuario
-        
+            last_event_id: Último id recibido por el cliente; se reenvían los
+                mensajes posteriores que sigan en el buffer
+
         Yields:
             str: Mensajes en formato SSE
         """
+        subscription, backlog, gap = broker.subscribe(user_id, last_event_id)
         logger.info(f"Iniciando stream SSE para usuario {user_id}")
-        
-        # Enviar mensaje de conexión
-        yield cls.format_sse_message("connected", {
-            "message": "Conectado al servidor de notificaciones",
-            "user_id": user_id,
-            "timestamp": timezone.now().isoformat()
-        })
-        
-        last_heartbeat = time.time()
-        
+        if NotificationRelay.enabled():
+            NotificationRelay.ensure_started()
+
         try:
+            # Enviar mensaje de conexión
+            yield cls.format_sse_message("connected", {
+                "message": "Conectado al servidor de notificaciones",
+                "user_id": user_id,
+                "timestamp": timezone.now().isoformat()
+            })
+
+            if gap:
+                # Parte de lo perdido ya salió del buffer: el cliente debe recargar por la API
+                yield cls.format_sse_message("resync", {
+                    "last_event_id": last_event_id,
+                    "timestamp": timezone.now().isoformat()
+                })
+
+            for message in backlog:
+                yield cls._format_message(message)
+
             while True:
-                current_time = time.time()
-                
-                # Verificar mensajes pendientes
-                messages = cls.get_pending_messages(user_id)
-                
-                for message in messages:
-                    yield cls.format_sse_message(
-                        message.get('event', 'notification'),
-                        message.get('data', {})
-                    )
-                
-                # Enviar heartbeat cada X segundos
-                if current_time - last_heartbeat >= cls.HEARTBEAT_INTERVAL:
+                try:
+                    message = await asyncio.wait_for(subscription.queue.get(), timeout=cls.HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
                     yield cls.format_sse_message("heartbeat", {
                         "timestamp": timezone.now().isoformat()
                     })
-                    last_heartbeat = current_time
-                
-                # Esperar un poco antes de la próxima iteración
-                time.sleep(1)
-                
-        except GeneratorExit:
+                    continue
+
+                yield cls._format_message(message)
+        finally:
+            # Desconexión del cliente (el servidor ASGI cancela la corrutina) o cierre del stream
+            broker.unsubscribe(user_id, subscription)
             logger.info(f"Stream SSE cerrado para usuario {user_id}")
-        except Exception as e:
-            logger.error(f"Error en stream SSE para usuario {user_id}: {e}")
-            yield cls.format_sse_message("error", {
-                "message": "Error en la conexión",
-                "error": str(e)
-            })
 
 
-def notification_sse_view(request):
+class NotificationRelay:
     """
-    Vista para manejar conexión SSE de notificaciones.
-    
+    Publicación SSE de las notificaciones que inserta otro proceso
+    (NOTIFICATION_OUTBOX_WORKER=True).
+
+    El worker del outbox no atiende conexiones y el broker es por proceso, así
+    que el worker no publica nada: la tabla de notificaciones hace de canal
+    compartido. Cada proceso web con conexiones abiertas arranca un hilo que,
+    cada POLL_INTERVAL segundos, consulta las notificaciones recientes de sus
+    usuarios conectados (índice recipient, -created_at) y publica en su broker
+    las que todavía no ha publicado. La ventana LOOKBACK_SECONDS cubre las
+    transacciones que confirman fuera de orden respecto a sus ids.
     """
-    # Verificar autenticación
-    if not request.user.is_authenticated:
-        return StreamingHttpResponse(
+
+    POLL_INTERVAL = 1.0
+    LOOKBACK_SECONDS = 30
+
+    _thread: Optional[threading.Thread] = None
+    _thread_pid: Optional[int] = None
+    _lock = threading.Lock()
+    # id de notificación publicada → created_at (se olvida al salir de la ventana)
+    _published: Dict[int, object] = {}
+    _started_at = None
+
+    @staticmethod
+    def enabled() -> bool:
+        return getattr(settings, 'NOTIFICATION_OUTBOX_WORKER', False)
+
+    @classmethod
+    def ensure_started(cls):
+        """Arranca el hilo del proceso si no está en marcha (también tras un fork)."""
+        with cls._lock:
+            if cls._thread is not None and cls._thread.is_alive() and cls._thread_pid == os.getpid():
+                return
+            cls._published = {}
+            cls._started_at = timezone.now()
+            cls._thread = threading.Thread(target=cls._run, name='notification-relay', daemon=True)
+            cls._thread_pid = os.getpid()
+            cls._thread.start()
+
+    @classmethod
+    def poll_once(cls) -> int:
+        """
+        Publica las notificaciones nuevas de los usuarios conectados a este
+        proceso. Devuelve cuántas se publicaron.
+        """
+        from api.notifications.serializers_notifications import NotificationSerializer
+
+        user_ids = broker.user_ids()
+        if not user_ids:
+            return 0
+
+        since = timezone.now() - timedelta(seconds=cls.LOOKBACK_SECONDS)
+        if cls._started_at is not None:
+            since = max(since, cls._started_at)
+        recent = (
+            Notification.objects
+            .filter(recipient_id__in=user_ids, created_at__gte=since)
+            .select_related('recipient', 'sender')
+            .order_by('id')
+        )
+
+        published = 0
+        for notification in recent:
+            if notification.pk in cls._published:
+                continue
+            cls._published[notification.pk] = notification.created_at
+            NotificationSSE.publish_notification(
+                user_id=notification.recipient_id,
+                notification_data=NotificationSerializer(notification).data
+            )
+            published += 1
+
+        cls._published = {pk: created for pk, created in cls._published.items() if created >= since}
+        return published
+
+    @classmethod
+    def _run(cls):
+        while True:
+            time.sleep(cls.POLL_INTERVAL)
+            try:
+                cls.poll_once()
+            except Exception:
+                logger.exception("Relay SSE: error leyendo las notificaciones nuevas")
+            finally:
+                close_old_connections()
+
+
+async def _authenticate(request):
+    """
+    Usuario de la sesión o del header `Authorization: Bearer <jwt>` (el cliente
+    SSE del frontend usa fetch con el token de acceso).
+    """
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed
+
+    user = await request.auser()
+    if user.is_authenticated:
+        return user
+
+    authenticator = JWTAuthentication()
+    header = authenticator.get_header(request)
+    raw_token = authenticator.get_raw_token(header) if header else None
+    if raw_token is None:
+        return None
+    try:
+        validated_token = authenticator.get_validated_token(raw_token)
+        return await sync_to_async(authenticator.get_user)(validated_token)
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+def _last_event_id(request) -> Optional[int]:
+    """
+    Cursor de reanudación: header `Last-Event-ID` (EventSource lo envía al
+    reconectar) o parámetro `last_event_id` para clientes que no pueden fijarlo.
+    """
+    value = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+async def notification_sse_view(request):
+    """
+    Vista asíncrona para manejar conexión SSE de notificaciones.
+
+    Solo funciona servida por ASGI (config.asgi, p. ej. uvicorn): bajo WSGI
+    (runserver, gunicorn síncrono) el generador asíncrono se consume entero
+    antes de enviar nada y la conexión queda colgada, así que se rechaza.
+    """
+    if isinstance(request, WSGIRequest):
+        logger.error("SSE: el stream de notificaciones requiere un servidor ASGI (config.asgi)")
+        return HttpResponse(
+            "event: error\ndata: {\"error\": \"El stream requiere un servidor ASGI\"}\n\n",
+            content_type="text/event-stream",
+            status=503
+        )
+
+    user = await _authenticate(request)
+    if user is None or not user.is_active:
+        return HttpResponse(
             "event: error\ndata: {\"error\": \"No autenticado\"}\n\n",
             content_type="text/event-stream",
             status=401
         )
-    
+
     response = StreamingHttpResponse(
-        NotificationSSE.event_stream(request.user.id),
+        NotificationSSE.event_stream(user.id, _last_event_id(request)),
         content_type="text/event-stream"
     )
-    
+
     # Headers necesarios para SSE
     response['Cache-Control'] = 'no-cache'
     response['X-Accel-Buffering'] = 'no'  # Deshabilitar buffering de Nginx
-    
+
     return response
 
 
@@ -191,6 +531,10 @@ def send_realtime_notification(notification: Notification):
     """
     from api.notifications.serializers_notifications import NotificationSerializer
     
+    if NotificationRelay.enabled():
+        # La publica NotificationRelay al leerla de la tabla
+        return
+    
     # Serializar notificación
     serializer = NotificationSerializer(notification)
     
@@ -0,0 +1,229 @@
+"""
+Retención de notificaciones por lotes.
+
+Los borrados de limpieza (expiradas, leídas antiguas, grupos antiguos) se
+hacen en lotes acotados por rango de id, cada uno en su propia transacción y
+con una pausa entre lotes, en lugar de un único DELETE sobre toda la tabla que
+bloquea filas y genera bloat durante mucho tiempo.
+
+Con archive=True las notificaciones se copian antes a NotificationArchive. En
+PostgreSQL esa tabla está particionada por mes (created_at): las particiones
+se crean al archivar y los meses antiguos se eliminan al instante con DROP
+TABLE (drop_archive_before). En otros motores el archivo se purga por lotes.
+"""
+
+import logging
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from api.notifications.models_notifications import Notification, NotificationArchive
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FIELDS = (
+    'id', 'recipient_id', 'sender_id', 'notification_type', 'priority',
+    'title', 'message', 'is_read', 'read_at', 'created_at',
+)
+
+
+def _month_start(value: datetime) -> datetime:
+    value = value.astimezone(dt_timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=dt_timezone.utc)
+
+
+def _next_month(month: datetime) -> datetime:
+    if month.month == 12:
+        return month.replace(year=month.year + 1, month=1)
+    return month.replace(month=month.month + 1)
+
+
+class NotificationRetentionService:
+    """Borrado y archivo por lotes de notificaciones y grupos."""
+
+    BATCH_SIZE = 1000
+    # Pausa entre lotes para dejar pasar al resto de escrituras (y a autovacuum)
+    PAUSE_SECONDS = 0.1
+
+    # ------------------------------------------------------------------
+    # Borrado por lotes
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def delete_in_batches(
+        cls,
+        queryset,
+        batch_size: Optional[int] = None,
+        pause: Optional[float] = None,
+        archive: bool = False,
+        progress: Optional[Callable[[int], None]] = None
+    ) -> int:
+        """
+        Elimina las filas del queryset en lotes de como mucho `batch_size`
+        filas consecutivas por id.
+
+        Args:
+            queryset: Filas a eliminar (se recorre por id ascendente)
+            batch_size: Filas por lote (por defecto BATCH_SIZE)
+            pause: Segundos de espera entre lotes (por defecto PAUSE_SECONDS)
+            archive: Copiar antes a NotificationArchive (solo notificaciones)
+            progress: Función llamada tras cada lote con el total eliminado
+
+        Returns:
+            int: Filas del modelo del queryset eliminadas
+        """
+        batch_size = batch_size or cls.BATCH_SIZE
+        pause = cls.PAUSE_SECONDS if pause is None else pause
+        label = queryset.model._meta.label
+        queryset = queryset.order_by()
+
+        deleted = 0
+        last_id = None
+        while True:
+            pending = queryset if last_id is None else queryset.filter(pk__gt=last_id)
+            ids = list(pending.order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+
+            # Rango de ids del lote: un recorrido acotado del índice de la clave primaria
+            batch = queryset.filter(pk__gte=ids[0], pk__lte=ids[-1])
+            with transaction.atomic():
+                if archive:
+                    cls.archive(batch)
+                deleted += batch.delete()[1].get(label, 0)
+
+            last_id = ids[-1]
+            if progress:
+                progress(deleted)
+            if len(ids) < batch_size:
+                break
+            if pause:
+                time.sleep(pause)
+        return deleted
+
+    @classmethod
+    def delete_expired(cls, **options) -> int:
+        """Eliminar notificaciones expiradas. Opciones: las de delete_in_batches."""
+        return cls.delete_in_batches(Notification.objects.expired(), **options)
+
+    @classmethod
+    def delete_old_read(cls, days: int = 30, **options) -> int:
+        """Eliminar notificaciones leídas creadas hace más de `days` días."""
+        cutoff = timezone.now() - timedelta(days=days)
+        return cls.delete_in_batches(
+            Notification.objects.filter(is_read=True, created_at__lt=cutoff), **options
+        )
+
+    @classmethod
+    def cleanup_old_groups(cls, days: int = 30, **options) -> int:
+        """Eliminar grupos de notificaciones leídos sin actividad en `days` días."""
+        from api.notifications.grouping_notifications import NotificationGroup
+
+        cutoff = timezone.now() - timedelta(days=days)
+        options.pop('archive', None)
+        return cls.delete_in_batches(
+            NotificationGroup.objects.filter(is_read=True, updated_at__lt=cutoff), **options
+        )
+
+    # ------------------------------------------------------------------
+    # Archivo
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def archive(cls, queryset) -> int:
+        """Copia las notificaciones del queryset a NotificationArchive."""
+        now = timezone.now()
+        rows = list(queryset.values_list(*ARCHIVE_FIELDS))
+        if not rows:
+            return 0
+        if cls.archive_is_partitioned():
+            cls.ensure_archive_partitions({_month_start(row[-1]) for row in rows})
+        NotificationArchive.objects.bulk_create([
+            NotificationArchive(
+                original_id=original_id, recipient_id=recipient_id, sender_id=sender_id,
+                notification_type=notification_type, priority=priority, title=title, message=message,
+                is_read=is_read, read_at=read_at, created_at=created_at, archived_at=now
+            )
+            for (original_id, recipient_id, sender_id, notification_type, priority,
+                 title, message, is_read, read_at, created_at) in rows
+        ])
+        return len(rows)
+
+    @staticmethod
+    def archive_is_partitioned() -> bool:
+        """Si la tabla de archivo es una tabla particionada de PostgreSQL."""
+        if connection.vendor != 'postgresql':
+            return False
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass",
+                [NotificationArchive._meta.db_table]
+            )
+            return cursor.fetchone() is not None
+
+    @staticmethod
+    def _partition_name(month: datetime) -> str:
+        return f"{NotificationArchive._meta.db_table}_p{month:%Y%m}"
+
+    @classmethod
+    def ensure_archive_partitions(cls, months: Iterable[datetime]) -> List[str]:
+        """Crea (si no existen) las particiones mensuales de los meses indicados."""
+        table = connection.ops.quote_name(NotificationArchive._meta.db_table)
+        created = []
+        with connection.cursor() as cursor:
+            for month in sorted(set(months)):
+                name = cls._partition_name(month)
+                cursor.execute(
+                    f"CREATE TABLE IF NOT EXISTS {connection.ops.quote_name(name)} PARTITION OF {table} "
+                    f"FOR VALUES FROM (%s) TO (%s)",
+                    [month, _next_month(month)]
+                )
+                created.append(name)
+        return created
+
+    @classmethod
+    def archive_partitions(cls) -> List[Tuple[str, datetime]]:
+        """Particiones mensuales existentes del archivo: [(nombre, inicio del mes)]."""
+        prefix = f"{NotificationArchive._meta.db_table}_p"
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT child.relname FROM pg_inherits "
+                "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                "WHERE pg_inherits.inhparent = %s::regclass",
+                [NotificationArchive._meta.db_table]
+            )
+            names = [row[0] for row in cursor.fetchall()]
+        partitions = []
+        for name in names:
+            suffix = name[len(prefix):]
+            if name.startswith(prefix) and len(suffix) == 6 and suffix.isdigit():
+                partitions.append((name, datetime(int(suffix[:4]), int(suffix[4:]), 1, tzinfo=dt_timezone.utc)))
+        return sorted(partitions, key=lambda item: item[1])
+
+    @classmethod
+    def drop_archive_before(cls, cutoff: datetime, **options) -> dict:
+        """
+        Elimina del archivo las notificaciones creadas antes de `cutoff`.
+
+        En PostgreSQL se eliminan las particiones de los meses completos
+        anteriores a `cutoff` (DROP TABLE, instantáneo); el mes en curso del
+        corte se conserva entero. En otros motores se borra por lotes.
+
+        Returns:
+            dict: {'partitions': particiones eliminadas, 'rows': filas borradas por lotes}
+        """
+        if not cls.archive_is_partitioned():
+            rows = cls.delete_in_batches(NotificationArchive.objects.filter(created_at__lt=cutoff), **options)
+            return {'partitions': 0, 'rows': rows}
+
+        dropped = 0
+        with connection.cursor() as cursor:
+            for name, month in cls.archive_partitions():
+                if _next_month(month) <= cutoff:
+                    cursor.execute(f"DROP TABLE {connection.ops.quote_name(name)}")
+                    logger.info(f"Retención: partición {name} eliminada")
+                    dropped += 1
+        return {'partitions': dropped, 'rows': 0}
@@ -124,6 +124,8 @@ class NotificationStatsSerializer(serializers.Serializer):
     unread = serializers.IntegerField()
     by_type = serializers.DictField()
     by_priority = serializers.DictField()
+    unread_by_type = serializers.DictField()
+    unread_by_priority = serializers.DictField()
 
 
 class NotificationGroupSerializer(serializers.Serializer):
@@ -138,14 +140,15 @@ class NotificationGroupSerializer(serializers.Serializer):
     title = serializers.CharField()
     count = serializers.IntegerField()
     is_read = serializers.BooleanField()
-    aggregated_data = serializers.JSONField()
+    # Resumen precalculado (últimas entradas); el detalle completo está en expand
+    summary = serializers.JSONField()
     created_at = serializers.DateTimeField()
     updated_at = serializers.DateTimeField()
     
     # Datos de primera y última notificación
-    first_notification_id = serializers.IntegerField(source='first_notification.id')
-    last_notification_id = serializers.IntegerField(source='last_notification.id')
-    last_action_url = serializers.CharField(source='last_notification.action_url', allow_null=True)
+    first_notification_id = serializers.IntegerField()
+    last_notification_id = serializers.IntegerField()
+    last_action_url = serializers.CharField(source='summary.last_action_url', allow_null=True)
 
 
 class GroupedNotificationsSerializer(serializers.Serializer):
@@ -1,17 +1,41 @@
 """
 Señales de Django para generar notificaciones automáticamente.
 Este archivo detecta eventos en el sistema y crea notificaciones para los usuarios relevantes.
+
+Los receivers no crean notificaciones dentro de la petición: registran un
+evento en el outbox (ids y cambios detectados) en la misma transacción que la
+escritura. Los handlers `build_*` se ejecutan después en el dispatcher
+(api/notifications/outbox_notifications.py), consultan los destinatarios y
+devuelven las notificaciones sin guardar para insertarlas por lotes.
+
+Los cambios de estado se detectan en pre_save y el evento se registra en
+post_save, así que solo se encola si el guardado se completó.
 """
 
 import logging
-from django.db.models.signals import post_save, pre_save
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from api.models import Order, Product, ProductBuyed, ProductReceived, Package, DeliverReceip, CustomUser
-from api.notifications.models_notifications import Notification, NotificationType, NotificationPriority
+from api.notifications.lookups_notifications import NotificationLookupCache
+from api.notifications.models_notifications import (
+    Notification, NotificationPreference, NotificationType, NotificationPriority,
+)
+from api.notifications.outbox_notifications import NotificationOutboxService, outbox_handler
 
 logger = logging.getLogger(__name__)
 
 
+def _enqueue_changes(event_type, instance, **payload):
+    """Registra el evento con los cambios detectados en pre_save, si los hubo."""
+    changes = getattr(instance, '_notification_changes', None)
+    if changes:
+        instance._notification_changes = None
+        NotificationOutboxService.enqueue(event_type, {**payload, **changes})
+
+
 # ============================================================================
 # SEÑALES DE ÓRDENES
 # ============================================================================
@@ -25,43 +49,55 @@ def notify_order_created(sender, instance, created, **kwargs):
     - Notifica a los admins
     """
     if created:
-        # Notificar al cliente
-        Notification.create_notification(
-            recipient=instance.client,
-            notification_type=NotificationType.ORDER_CREATED,
-            title='¡Orden creada con éxito!',
-            message=f'Tu orden #{instance.id} ha sido creada y está siendo procesada.',
-            sender=instance.sales_manager,
-            priority=NotificationPriority.NORMAL,
-            related_object=instance,
-            action_url=f'/orders/{instance.id}',
-            metadata={'order_id': instance.id}
-        )
-        
-        # Notificar al agente asignado
-        Notification.create_notification(
-            recipient=instance.sales_manager,
-            notification_type=NotificationType.ORDER_ASSIGNED,
-            title='Nueva orden asignada',
-            message=f'Se te ha asignado la orden #{instance.id} del cliente {instance.client.full_name}.',
-            priority=NotificationPriority.HIGH,
-            related_object=instance,
-            action_url=f'/orders/{instance.id}',
-            metadata={'order_id': instance.id, 'client_id': instance.client.id}
-        )
-        
-        # Notificar a todos los admins
-        admins = CustomUser.objects.filter(role='admin')
-        Notification.create_bulk_notifications(
-            recipients=admins,
-            notification_type=NotificationType.ORDER_CREATED,
-            title='Nueva orden en el sistema',
-            message=f'Nueva orden #{instance.id} creada por {instance.sales_manager.full_name}.',
-            sender=instance.sales_manager,
-            priority=NotificationPriority.NORMAL,
-            action_url=f'/orders/{instance.id}',
-            metadata={'order_id': instance.id}
-        )
+        NotificationOutboxService.enqueue('order.created', {'order_id': instance.id})
+
+
+@outbox_handler('order.created')
+def build_order_created(payload):
+    order = Order.objects.select_related('client', 'sales_manager').filter(pk=payload['order_id']).first()
+    if order is None:
+        return []
+
+    notifications = []
+    # Notificar al cliente
+    notifications.append(Notification.build_notification(
+        recipient=order.client,
+        notification_type=NotificationType.ORDER_CREATED,
+        title='¡Orden creada con éxito!',
+        message=f'Tu orden #{order.id} ha sido creada y está siendo procesada.',
+        sender=order.sales_manager,
+        priority=NotificationPriority.NORMAL,
+        related_object=order,
+        action_url=f'/orders/{order.id}',
+        metadata={'order_id': order.id}
+    ))
+
+    # Notificar al agente asignado (las órdenes sin agente se descartan en el dispatcher)
+    notifications.append(Notification.build_notification(
+        recipient=order.sales_manager,
+        notification_type=NotificationType.ORDER_ASSIGNED,
+        title='Nueva orden asignada',
+        message=f'Se te ha asignado la orden #{order.id} del cliente {order.client.full_name}.',
+        priority=NotificationPriority.HIGH,
+        related_object=order,
+        action_url=f'/orders/{order.id}',
+        metadata={'order_id': order.id, 'client_id': order.client.id}
+    ))
+
+    # Notificar a todos los admins
+    admins = NotificationLookupCache.role_user_ids('admin')
+    created_by = f' por {order.sales_manager.full_name}' if order.sales_manager else ''
+    notifications += Notification.build_bulk_notifications(
+        recipients=admins,
+        notification_type=NotificationType.ORDER_CREATED,
+        title='Nueva orden en el sistema',
+        message=f'Nueva orden #{order.id} creada{created_by}.',
+        sender=order.sales_manager,
+        priority=NotificationPriority.NORMAL,
+        action_url=f'/orders/{order.id}',
+        metadata={'order_id': order.id}
+    )
+    return notifications
 
 
 @receiver(pre_save, sender=Order)
@@ -70,74 +106,97 @@ def notify_order_status_changed(sender, instance, **kwargs):
     Notificar cuando cambia el estado de una orden.
     Solo notifica si la orden ya existía y el estado cambió.
     """
+    instance._notification_changes = None
     if instance.pk:  # Si la orden ya existe
-        try:
-            old_instance = Order.objects.get(pk=instance.pk)
-            
-            # Verificar si cambió el estado
-            if old_instance.status != instance.status:
-                # Notificar al cliente
-                Notification.create_notification(
-                    recipient=instance.client,
-                    notification_type=NotificationType.ORDER_STATUS_CHANGED,
-                    title='Estado de tu orden actualizado',
-                    message=f'Tu orden #{instance.id} cambió de estado: {old_instance.status} → {instance.status}',
-                    sender=instance.sales_manager,
-                    priority=NotificationPriority.HIGH,
-                    related_object=instance,
-                    action_url=f'/orders/{instance.id}',
-                    metadata={
-                        'order_id': instance.id,
-                        'old_status': old_instance.status,
-                        'new_status': instance.status
-                    }
-                )
-                
-                # Si la orden se completó, notificar también al agente
-                if instance.status == 'Completado':
-                    Notification.create_notification(
-                        recipient=instance.sales_manager,
-                        notification_type=NotificationType.ORDER_COMPLETED,
-                        title='Orden completada',
-                        message=f'La orden #{instance.id} ha sido completada exitosamente.',
-                        priority=NotificationPriority.NORMAL,
-                        related_object=instance,
-                        action_url=f'/orders/{instance.id}',
-                        metadata={'order_id': instance.id}
-                    )
-            
-            # Verificar si cambió el estado de pago
-            if old_instance.pay_status != instance.pay_status:
-                # Notificar al cliente
-                Notification.create_notification(
-                    recipient=instance.client,
-                    notification_type=NotificationType.PAYMENT_RECEIVED if instance.pay_status == 'Pagado' else NotificationType.PAYMENT_PENDING,
-                    title='Estado de pago actualizado',
-                    message=f'El estado de pago de tu orden #{instance.id} cambió a: {instance.pay_status}',
-                    priority=NotificationPriority.HIGH if instance.pay_status == 'Pagado' else NotificationPriority.NORMAL,
-                    related_object=instance,
-                    action_url=f'/orders/{instance.id}',
-                    metadata={
-                        'order_id': instance.id,
-                        'old_pay_status': old_instance.pay_status,
-                        'new_pay_status': instance.pay_status
-                    }
-                )
-                
-                # Notificar a los contadores si el pago fue recibido
-                if instance.pay_status == 'Pagado':
-                    accountants = CustomUser.objects.filter(role='accountant')
-                    Notification.create_bulk_notifications(
-                        recipients=accountants,
-                        notification_type=NotificationType.PAYMENT_RECEIVED,
-                        title='Pago recibido',
-                        message=f'La orden #{instance.id} ha sido pagada por {instance.client.full_name}.',
-                        priority=NotificationPriority.NORMAL,
-                        action_url=f'/orders/{instance.id}',
-                        metadata={'order_id': instance.id, 'client_id': instance.client.id}
-                    )
-        except Order.DoesNotExist:
-            pass
+        old = Order.objects.filter(pk=instance.pk).values('status', 'pay_status').first()
+        if old is None:
+            return
+
+        changes = {}
+        if old['status'] != instance.status:
+            changes.update(old_status=old['status'], new_status=instance.status)
+        if old['pay_status'] != instance.pay_status:
+            changes.update(old_pay_status=old['pay_status'], new_pay_status=instance.pay_status)
+        instance._notification_changes = changes
+
+
+@receiver(post_save, sender=Order)
+def enqueue_order_changes(sender, instance, created, **kwargs):
+    _enqueue_changes('order.changed', instance, order_id=instance.id)
+
+
+@outbox_handler('order.changed')
+def build_order_changed(payload):
+    order = Order.objects.select_related('client', 'sales_manager').filter(pk=payload['order_id']).first()
+    if order is None:
+        return []
+
+    notifications = []
+    # Verificar si cambió el estado
+    if 'new_status' in payload:
+        old_status, new_status = payload['old_status'], payload['new_status']
+        # Notificar al cliente
+        notifications.append(Notification.build_notification(
+            recipient=order.client,
+            notification_type=NotificationType.ORDER_STATUS_CHANGED,
+            title='Estado de tu orden actualizado',
+            message=f'Tu orden #{order.id} cambió de estado: {old_status} → {new_status}',
+            sender=order.sales_manager,
+            priority=NotificationPriority.HIGH,
+            related_object=order,
+            action_url=f'/orders/{order.id}',
+            metadata={
+                'order_id': order.id,
+                'old_status': old_status,
+                'new_status': new_status
+            }
+        ))
+
+        # Si la orden se completó, notificar también al agente
+        if new_status == 'Completado':
+            notifications.append(Notification.build_notification(
+                recipient=order.sales_manager,
+                notification_type=NotificationType.ORDER_COMPLETED,
+                title='Orden completada',
+                message=f'La orden #{order.id} ha sido completada exitosamente.',
+                priority=NotificationPriority.NORMAL,
+                related_object=order,
+                action_url=f'/orders/{order.id}',
+                metadata={'order_id': order.id}
+            ))
+
+    # Verificar si cambió el estado de pago
+    if 'new_pay_status' in payload:
+        old_pay_status, new_pay_status = payload['old_pay_status'], payload['new_pay_status']
+        # Notificar al cliente
+        notifications.append(Notification.build_notification(
+            recipient=order.client,
+            notification_type=NotificationType.PAYMENT_RECEIVED if new_pay_status == 'Pagado' else NotificationType.PAYMENT_PENDING,
+            title='Estado de pago actualizado',
+            message=f'El estado de pago de tu orden #{order.id} cambió a: {new_pay_status}',
+            priority=NotificationPriority.HIGH if new_pay_status == 'Pagado' else NotificationPriority.NORMAL,
+            related_object=order,
+            action_url=f'/orders/{order.id}',
+            metadata={
+                'order_id': order.id,
+                'old_pay_status': old_pay_status,
+                'new_pay_status': new_pay_status
+            }
+        ))
+
+        # Notificar a los contadores si el pago fue recibido
+        if new_pay_status == 'Pagado':
+            accountants = NotificationLookupCache.role_user_ids('accountant')
+            notifications += Notification.build_bulk_notifications(
+                recipients=accountants,
+                notification_type=NotificationType.PAYMENT_RECEIVED,
+                title='Pago recibido',
+                message=f'La orden #{order.id} ha sido pagada por {order.client.full_name}.',
+                priority=NotificationPriority.NORMAL,
+                action_url=f'/orders/{order.id}',
+                metadata={'order_id': order.id, 'client_id': order.client.id}
+            )
+    return notifications
 
 
 # ============================================================================
@@ -151,21 +210,30 @@ def notify_product_added(sender, instance, created, **kwargs):
     - Notifica al comprador que hay un nuevo producto para comprar
     """
     if created:
-        # Notificar a los compradores
-        buyers = CustomUser.objects.filter(role='buyer')
-        Notification.create_bulk_notifications(
-            recipients=buyers,
-            notification_type=NotificationType.PRODUCT_ADDED,
-            title='Nuevo producto pendiente de compra',
-            message=f'Producto "{instance.name}" agregado a la orden #{instance.order.id}.',
-            priority=NotificationPriority.NORMAL,
-            action_url=f'/products/{instance.id}',
-            metadata={
-                'product_id': str(instance.id),
-                'order_id': instance.order.id,
-                'product_name': instance.name
-            }
-        )
+        NotificationOutboxService.enqueue('product.created', {'product_id': str(instance.id)})
+
+
+@outbox_handler('product.created')
+def build_product_added(payload):
+    product = Product.objects.filter(pk=payload['product_id']).first()
+    if product is None:
+        return []
+
+    # Notificar a los compradores
+    buyers = NotificationLookupCache.role_user_ids('buyer')
+    return Notification.build_bulk_notifications(
+        recipients=buyers,
+        notification_type=NotificationType.PRODUCT_ADDED,
+        title='Nuevo producto pendiente de compra',
+        message=f'Producto "{product.name}" agregado a la orden #{product.order_id}.',
+        priority=NotificationPriority.NORMAL,
+        action_url=f'/products/{product.id}',
+        metadata={
+            'product_id': str(product.id),
+            'order_id': product.order_id,
+            'product_name': product.name
+        }
+    )
 
 
 @receiver(post_save, sender=ProductBuyed)
@@ -177,50 +245,68 @@ def notify_product_purchased(sender, instance, created, **kwargs):
     - Notifica al logístico
     """
     if created:
+        NotificationOutboxService.enqueue('product.purchased', {'product_buyed_id': instance.id})
+
+
+@outbox_handler('product.purchased')
+def build_product_purchased(payload):
+    purchase = (
+        ProductBuyed.objects
+        .select_related('original_product__order__client', 'original_product__order__sales_manager')
+        .filter(pk=payload['product_buyed_id'])
+        .first()
+    )
+    if purchase is None or purchase.original_product is None:
+        return []
+    product = purchase.original_product
+    order = product.order
+
+    notifications = [
         # Notificar al agente
-        Notification.create_notification(
-            recipient=instance.original_product.order.sales_manager,
+        Notification.build_notification(
+            recipient=order.sales_manager,
             notification_type=NotificationType.PRODUCT_PURCHASED,
             title='Producto comprado',
-            message=f'Se compró el producto "{instance.original_product.name}" ({instance.amount_buyed} unidades).',
+            message=f'Se compró el producto "{product.name}" ({purchase.amount_buyed} unidades).',
             priority=NotificationPriority.NORMAL,
-            related_object=instance,
-            action_url=f'/products/{instance.original_product.id}',
+            related_object=purchase,
+            action_url=f'/products/{product.id}',
             metadata={
-                'product_id': str(instance.original_product.id),
-                'order_id': instance.original_product.order.id,
-                'amount_buyed': instance.amount_buyed
+                'product_id': str(product.id),
+                'order_id': order.id,
+                'amount_buyed': purchase.amount_buyed
             }
-        )
-        
+        ),
         # Notificar al cliente
-        Notification.create_notification(
-            recipient=instance.original_product.order.client,
+        Notification.build_notification(
+            recipient=order.client,
             notification_type=NotificationType.PRODUCT_PURCHASED,
             title='Tu producto fue comprado',
-            message=f'El producto "{instance.original_product.name}" de tu orden #{instance.original_product.order.id} ha sido comprado.',
-            priority=NotificationPriority.NORMAL,
-            action_url=f'/orders/{instance.original_product.order.id}',
-            metadata={
-                'product_id': str(instance.original_product.id),
-                'order_id': instance.original_product.order.id
-            }
-        )
-        
-        # Notificar a los logísticos
-        logisticals = CustomUser.objects.filter(role='logistical')
-        Notification.create_bulk_notifications(
-            recipients=logisticals,
-            notification_type=NotificationType.PRODUCT_PURCHASED,
-            title='Producto comprado - Preparar recepción',
-            message=f'Producto "{instance.original_product.name}" comprado y en camino.',
+            message=f'El producto "{product.name}" de tu orden #{order.id} ha sido comprado.',
             priority=NotificationPriority.NORMAL,
-            action_url=f'/products/{instance.original_product.id}',
+            action_url=f'/orders/{order.id}',
             metadata={
-                'product_id': str(instance.original_product.id),
-                'order_id': instance.original_product.order.id
+                'product_id': str(product.id),
+                'order_id': order.id
             }
-        )
+        ),
+    ]
+
+    # Notificar a los logísticos
+    logisticals = NotificationLookupCache.role_user_ids('logistical')
+    notifications += Notification.build_bulk_notifications(
+        recipients=logisticals,
+        notification_type=NotificationType.PRODUCT_PURCHASED,
+        title='Producto comprado - Preparar recepción',
+        message=f'Producto "{product.name}" comprado y en camino.',
+        priority=NotificationPriority.NORMAL,
+        action_url=f'/products/{product.id}',
+        metadata={
+            'product_id': str(product.id),
+            'order_id': order.id
+        }
+    )
+    return notifications
 
 
 @receiver(post_save, sender=ProductReceived)
@@ -231,40 +317,118 @@ def notify_product_received(sender, instance, created, **kwargs):
     - Notifica al cliente
     - Notifica a los logísticos para preparar entrega
     """
-    if created and instance.original_product:
-        order = instance.original_product.order
-        
-        # Notificar al agente (sales_manager de la orden)
-        if order and order.sales_manager:
-            Notification.create_notification(
+    if created and instance.original_product_id:
+        NotificationOutboxService.enqueue('product.received', {'product_received_id': instance.id})
+
+
+@outbox_handler('product.received')
+def build_product_received(payload):
+    received = (
+        ProductReceived.objects
+        .select_related('original_product__order__client', 'original_product__order__sales_manager')
+        .filter(pk=payload['product_received_id'])
+        .first()
+    )
+    if received is None or received.original_product is None:
+        return []
+    product = received.original_product
+    order = product.order
+
+    notifications = []
+    # Notificar al agente (sales_manager de la orden)
+    if order and order.sales_manager:
+        notifications.append(Notification.build_notification(
+            recipient=order.sales_manager,
+            notification_type=NotificationType.PRODUCT_RECEIVED,
+            title='Producto recibido en almacén',
+            message=f'Se recibió el producto "{product.name}" ({received.amount_received} unidades).',
+            priority=NotificationPriority.HIGH,
+            related_object=received,
+            action_url=f'/products/{product.id}',
+            metadata={
+                'product_id': str(product.id),
+                'order_id': order.id,
+                'package_id': received.package_id
+            }
+        ))
+
+    # Notificar al cliente
+    if order and order.client:
+        notifications.append(Notification.build_notification(
+            recipient=order.client,
+            notification_type=NotificationType.PRODUCT_RECEIVED,
+            title='¡Tu producto llegó!',
+            message=f'El producto "{product.name}" de tu orden #{order.id} fue recibido y está listo para entrega.',
+            priority=NotificationPriority.HIGH,
+            action_url=f'/orders/{order.id}',
+            metadata={
+                'product_id': str(product.id),
+                'order_id': order.id
+            }
+        ))
+    return notifications
+
+
+@outbox_handler('products.added')
+def build_products_added(payload):
+    """Alta masiva (BulkWriteService): una notificación a cada comprador por lote."""
+    product_ids = payload['product_ids']
+    buyers = NotificationLookupCache.role_user_ids('buyer')
+    return Notification.build_bulk_notifications(
+        recipients=buyers,
+        notification_type=NotificationType.PRODUCT_ADDED,
+        title='Nuevos productos pendientes de compra',
+        message=f'{len(product_ids)} productos agregados a la orden #{payload["order_id"]}.',
+        priority=NotificationPriority.NORMAL,
+        action_url=f'/orders/{payload["order_id"]}',
+        metadata={
+            'order_id': payload['order_id'],
+            'product_ids': product_ids,
+            'count': len(product_ids),
+        }
+    )
+
+
+@outbox_handler('products.received')
+def build_products_received(payload):
+    """Recepción masiva (BulkWriteService): una notificación por orden al agente y al cliente."""
+    by_order = defaultdict(list)
+    for item in ProductReceived.objects.filter(pk__in=payload['received_ids']).select_related('original_product'):
+        by_order[item.original_product.order_id].append(item)
+
+    notifications = []
+    for order in Order.objects.filter(pk__in=by_order).select_related('client', 'sales_manager'):
+        items = by_order[order.id]
+        units = sum(item.amount_received for item in items)
+        metadata = {
+            'order_id': order.id,
+            'product_ids': [str(item.original_product_id) for item in items],
+            'package_id': items[0].package_id,
+            'count': len(items),
+        }
+
+        if order.sales_manager:
+            notifications.append(Notification.build_notification(
                 recipient=order.sales_manager,
                 notification_type=NotificationType.PRODUCT_RECEIVED,
-                title='Producto recibido en almacén',
-                message=f'Se recibió el producto "{instance.original_product.name}" ({instance.amount_received} unidades).',
+                title='Productos recibidos en almacén',
+                message=f'Se recibieron {len(items)} productos de la orden #{order.id} ({units} unidades).',
                 priority=NotificationPriority.HIGH,
-                related_object=instance,
-                action_url=f'/products/{instance.original_product.id}',
-                metadata={
-                    'product_id': str(instance.original_product.id),
-                    'order_id': order.id,
-                    'package_id': instance.package.id if instance.package else None
-                }
-            )
-        
-        # Notificar al cliente
-        if order and order.client:
-            Notification.create_notification(
+                action_url=f'/orders/{order.id}',
+                metadata=metadata
+            ))
+
+        if order.client:
+            notifications.append(Notification.build_notification(
                 recipient=order.client,
                 notification_type=NotificationType.PRODUCT_RECEIVED,
-                title='¡Tu producto llegó!',
-                message=f'El producto "{instance.original_product.name}" de tu orden #{order.id} fue recibido y está listo para entrega.',
+                title='¡Tus productos llegaron!',
+                message=f'Se recibieron {len(items)} productos de tu orden #{order.id} y están listos para entrega.',
                 priority=NotificationPriority.HIGH,
                 action_url=f'/orders/{order.id}',
-                metadata={
-                    'product_id': str(instance.original_product.id),
-                    'order_id': order.id
-                }
-            )
+                metadata=metadata
+            ))
+    return notifications
 
 
 # ============================================================================
@@ -277,20 +441,31 @@ def notify_package_status(sender, instance, created, **kwargs):
     Notificar sobre el estado de los paquetes.
     """
     if created:
-        # Notificar a los logísticos que hay un nuevo paquete
-        logisticals = CustomUser.objects.filter(role='logistical')
-        Notification.create_bulk_notifications(
-            recipients=logisticals,
-            notification_type=NotificationType.PACKAGE_SHIPPED,
-            title='Nuevo paquete registrado',
-            message=f'Paquete {instance.number_of_tracking} de {instance.agency_name} registrado en el sistema.',
-            priority=NotificationPriority.NORMAL,
-            action_url=f'/packages/{instance.id}',
-            metadata={
-                'package_id': instance.id,
-                'tracking_number': instance.number_of_tracking
-            }
-        )
+        NotificationOutboxService.enqueue('package.created', {'package_id': instance.id})
+    else:
+        _enqueue_changes('package.status_changed', instance, package_id=instance.id)
+
+
+@outbox_handler('package.created')
+def build_package_created(payload):
+    package = Package.objects.filter(pk=payload['package_id']).first()
+    if package is None:
+        return []
+
+    # Notificar a los logísticos que hay un nuevo paquete
+    logisticals = NotificationLookupCache.role_user_ids('logistical')
+    return Notification.build_bulk_notifications(
+        recipients=logisticals,
+        notification_type=NotificationType.PACKAGE_SHIPPED,
+        title='Nuevo paquete registrado',
+        message=f'Paquete {package.number_of_tracking} de {package.agency_name} registrado en el sistema.',
+        priority=NotificationPriority.NORMAL,
+        action_url=f'/packages/{package.id}',
+        metadata={
+            'package_id': package.id,
+            'tracking_number': package.number_of_tracking
+        }
+    )
 
 
 @receiver(pre_save, sender=Package)
@@ -298,45 +473,50 @@ def notify_package_status_changed(sender, instance, **kwargs):
     """
     Notificar cuando cambia el estado de un paquete.
     """
+    instance._notification_changes = None
     if instance.pk:
-        try:
-            old_instance = Package.objects.get(pk=instance.pk)
-            
-            if old_instance.status_of_processing != instance.status_of_processing:
-                # Obtener todos los productos en este paquete
-                products_in_package = instance.package_products.all()
-                
-                # Notificar a los clientes de los productos en el paquete
-                for product_received in products_in_package:
-                    client = product_received.original_product.order.client
-                    
-                    if instance.status_of_processing == 'Completado':
-                        notification_type = NotificationType.PACKAGE_DELIVERED
-                        title = '¡Tu paquete ha llegado!'
-                        message = f'El paquete con tracking {instance.number_of_tracking} ha sido entregado.'
-                        priority = NotificationPriority.HIGH
-                    else:
-                        notification_type = NotificationType.PACKAGE_IN_TRANSIT
-                        title = 'Actualización de tu paquete'
-                        message = f'Tu paquete {instance.number_of_tracking} cambió a: {instance.status_of_processing}'
-                        priority = NotificationPriority.NORMAL
-                    
-                    Notification.create_notification(
-                        recipient=client,
-                        notification_type=notification_type,
-                        title=title,
-                        message=message,
-                        priority=priority,
-                        related_object=instance,
-                        action_url=f'/packages/{instance.id}',
-                        metadata={
-                            'package_id': instance.id,
-                            'tracking_number': instance.number_of_tracking,
-                            'status': instance.status_of_processing
-                        }
-                    )
-        except Package.DoesNotExist:
-            pass
+        old_status = Package.objects.filter(pk=instance.pk).values_list('status_of_processing', flat=True).first()
+        if old_status is not None and old_status != instance.status_of_processing:
+            instance._notification_changes = {'status': instance.status_of_processing}
+
+
+@outbox_handler('package.status_changed')
+def build_package_status_changed(payload):
+    package = Package.objects.filter(pk=payload['package_id']).first()
+    if package is None:
+        return []
+    status = payload['status']
+
+    if status == 'Completado':
+        notification_type = NotificationType.PACKAGE_DELIVERED
+        title = '¡Tu paquete ha llegado!'
+        message = f'El paquete con tracking {package.number_of_tracking} ha sido entregado.'
+        priority = NotificationPriority.HIGH
+    else:
+        notification_type = NotificationType.PACKAGE_IN_TRANSIT
+        title = 'Actualización de tu paquete'
+        message = f'Tu paquete {package.number_of_tracking} cambió a: {status}'
+        priority = NotificationPriority.NORMAL
+
+    # Notificar a los clientes de los productos en el paquete
+    products_in_package = package.package_products.select_related('original_product__order__client')
+    return [
+        Notification.build_notification(
+            recipient=product_received.original_product.order.client,
+            notification_type=notification_type,
+            title=title,
+            message=message,
+            priority=priority,
+            related_object=package,
+            action_url=f'/packages/{package.id}',
+            metadata={
+                'package_id': package.id,
+                'tracking_number': package.number_of_tracking,
+                'status': status
+            }
+        )
+        for product_received in products_in_package
+    ]
 
 
 # ============================================================================
@@ -348,40 +528,57 @@ def notify_delivery_created(sender, instance, created, **kwargs):
     """
     Notificar cuando se crea un recibo de entrega.
     """
-    if created and instance.client:  # Solo notificar si hay un cliente asociado
+    if created and instance.client_id:  # Solo notificar si hay un cliente asociado
+        NotificationOutboxService.enqueue('delivery.created', {'delivery_id': instance.id})
+
+
+@outbox_handler('delivery.created')
+def build_delivery_created(payload):
+    delivery = (
+        DeliverReceip.objects
+        .select_related('client__assigned_agent')
+        .filter(pk=payload['delivery_id'])
+        .first()
+    )
+    if delivery is None or delivery.client is None:
+        return []
+
+    notifications = [
         # Notificar al cliente
-        Notification.create_notification(
-            recipient=instance.client,
+        Notification.build_notification(
+            recipient=delivery.client,
             notification_type=NotificationType.PRODUCT_DELIVERED,
             title='¡Entrega registrada!',
-            message=f'Se ha registrado una entrega de {instance.weight:.2f} lb. Costo: ${instance.weight_cost:.2f}',
+            message=f'Se ha registrado una entrega de {delivery.weight:.2f} lb. Costo: ${delivery.weight_cost:.2f}',
             priority=NotificationPriority.HIGH,
-            related_object=instance,
-            action_url=f'/deliveries/{instance.id}',
+            related_object=delivery,
+            action_url=f'/deliveries/{delivery.id}',
             metadata={
-                'delivery_id': instance.id,
-                'weight': instance.weight,
-                'weight_cost': float(instance.weight_cost),
-                'manager_profit': float(instance.manager_profit)
+                'delivery_id': delivery.id,
+                'weight': delivery.weight,
+                'weight_cost': float(delivery.weight_cost),
+                'manager_profit': float(delivery.manager_profit)
             }
         )
-        
-        # Notificar al agente asignado del cliente (si tiene)
-        if instance.client.assigned_agent:
-            Notification.create_notification(
-                recipient=instance.client.assigned_agent,
-                notification_type=NotificationType.PRODUCT_DELIVERED,
-                title='Entrega completada',
-                message=f'Se completó la entrega para tu cliente {instance.client.full_name}. Ganancia: ${instance.manager_profit:.2f}',
-                priority=NotificationPriority.NORMAL,
-                related_object=instance,
-                action_url=f'/deliveries/{instance.id}',
-                metadata={
-                    'client_id': instance.client.id,
-                    'delivery_id': instance.id,
-                    'manager_profit': float(instance.manager_profit)
-                }
-            )
+    ]
+
+    # Notificar al agente asignado del cliente (si tiene)
+    if delivery.client.assigned_agent:
+        notifications.append(Notification.build_notification(
+            recipient=delivery.client.assigned_agent,
+            notification_type=NotificationType.PRODUCT_DELIVERED,
+            title='Entrega completada',
+            message=f'Se completó la entrega para tu cliente {delivery.client.full_name}. Ganancia: ${delivery.manager_profit:.2f}',
+            priority=NotificationPriority.NORMAL,
+            related_object=delivery,
+            action_url=f'/deliveries/{delivery.id}',
+            metadata={
+                'client_id': delivery.client.id,
+                'delivery_id': delivery.id,
+                'manager_profit': float(delivery.manager_profit)
+            }
+        ))
+    return notifications
 
 
 # ============================================================================
@@ -394,31 +591,43 @@ def notify_user_events(sender, instance, created, **kwargs):
     Notificar eventos relacionados con usuarios.
     """
     if created:
-        # Notificar a los admins sobre el nuevo usuario
-        admins = CustomUser.objects.filter(role='admin')
-        Notification.create_bulk_notifications(
-            recipients=admins,
-            notification_type=NotificationType.USER_REGISTERED,
-            title='Nuevo usuario registrado',
-            message=f'{instance.full_name} se ha registrado como {instance.get_role_display()}.',
-            priority=NotificationPriority.NORMAL,
-            action_url=f'/users/{instance.id}',
-            metadata={
-                'user_id': instance.id,
-                'role': instance.role
-            }
-        )
-        
-        # Enviar notificación de bienvenida al usuario
-        Notification.create_notification(
-            recipient=instance,
-            notification_type=NotificationType.SYSTEM_MESSAGE,
-            title='¡Bienvenido a nuestro sistema!',
-            message=f'Hola {instance.name}, tu cuenta ha sido creada exitosamente. Estamos para ayudarte en lo que necesites.',
-            priority=NotificationPriority.NORMAL,
-            action_url='/',
-            metadata={'is_welcome': True}
-        )
+        NotificationOutboxService.enqueue('user.created', {'user_id': instance.id})
+    else:
+        _enqueue_changes('user.changed', instance, user_id=instance.id)
+
+
+@outbox_handler('user.created')
+def build_user_created(payload):
+    user = CustomUser.objects.filter(pk=payload['user_id']).first()
+    if user is None:
+        return []
+
+    # Notificar a los admins sobre el nuevo usuario
+    admins = NotificationLookupCache.role_user_ids('admin')
+    notifications = Notification.build_bulk_notifications(
+        recipients=admins,
+        notification_type=NotificationType.USER_REGISTERED,
+        title='Nuevo usuario registrado',
+        message=f'{user.full_name} se ha registrado como {user.get_role_display()}.',
+        priority=NotificationPriority.NORMAL,
+        action_url=f'/users/{user.id}',
+        metadata={
+            'user_id': user.id,
+            'role': user.role
+        }
+    )
+
+    # Enviar notificación de bienvenida al usuario
+    notifications.append(Notification.build_notification(
+        recipient=user,
+        notification_type=NotificationType.SYSTEM_MESSAGE,
+        title='¡Bienvenido a nuestro sistema!',
+        message=f'Hola {user.name}, tu cuenta ha sido creada exitosamente. Estamos para ayudarte en lo que necesites.',
+        priority=NotificationPriority.NORMAL,
+        action_url='/',
+        metadata={'is_welcome': True}
+    ))
+    return notifications
 
 
 @receiver(pre_save, sender=CustomUser)
@@ -426,51 +635,107 @@ def notify_user_verified(sender, instance, **kwargs):
     """
     Notificar cuando un usuario es verificado.
     """
+    instance._notification_changes = None
     if instance.pk:
-        try:
-            old_instance = CustomUser.objects.get(pk=instance.pk)
-            
-            # Si el usuario fue verificado
-            if not old_instance.is_verified and instance.is_verified:
-                Notification.create_notification(
-                    recipient=instance,
-                    notification_type=NotificationType.USER_VERIFIED,
-                    title='¡Cuenta verificada!',
-                    message='Tu cuenta ha sido verificada exitosamente. Ahora puedes acceder a todas las funcionalidades.',
-                    priority=NotificationPriority.HIGH,
-                    action_url='/',
-                    metadata={'verified_at': str(instance.updated_at)}
-                )
-            
-            # Si cambió el rol del usuario
-            if old_instance.role != instance.role:
-                Notification.create_notification(
-                    recipient=instance,
-                    notification_type=NotificationType.USER_ROLE_CHANGED,
-                    title='Tu rol ha cambiado',
-                    message=f'Tu rol ha sido actualizado de {old_instance.get_role_display()} a {instance.get_role_display()}.',
-                    priority=NotificationPriority.HIGH,
-                    action_url='/',
-                    metadata={
-                        'old_role': old_instance.role,
-                        'new_role': instance.role
-                    }
-                )
-        except CustomUser.DoesNotExist:
-            pass
+        old = CustomUser.objects.filter(pk=instance.pk).values('is_verified', 'role').first()
+        if old is None:
+            return
+
+        changes = {}
+        # Si el usuario fue verificado
+        if not old['is_verified'] and instance.is_verified:
+            changes['verified_at'] = str(instance.updated_at)
+        # Si cambió el rol del usuario
+        if old['role'] != instance.role:
+            changes.update(old_role=old['role'], new_role=instance.role)
+        instance._notification_changes = changes
+
+
+@outbox_handler('user.changed')
+def build_user_changed(payload):
+    user = CustomUser.objects.filter(pk=payload['user_id']).first()
+    if user is None:
+        return []
+
+    notifications = []
+    if 'verified_at' in payload:
+        notifications.append(Notification.build_notification(
+            recipient=user,
+            notification_type=NotificationType.USER_VERIFIED,
+            title='¡Cuenta verificada!',
+            message='Tu cuenta ha sido verificada exitosamente. Ahora puedes acceder a todas las funcionalidades.',
+            priority=NotificationPriority.HIGH,
+            action_url='/',
+            metadata={'verified_at': payload['verified_at']}
+        ))
+
+    if 'new_role' in payload:
+        roles = dict(CustomUser._meta.get_field('role').flatchoices)
+        old_role, new_role = payload['old_role'], payload['new_role']
+        notifications.append(Notification.build_notification(
+            recipient=user,
+            notification_type=NotificationType.USER_ROLE_CHANGED,
+            title='Tu rol ha cambiado',
+            message=f'Tu rol ha sido actualizado de {roles.get(old_role, old_role)} a {roles.get(new_role, new_role)}.',
+            priority=NotificationPriority.HIGH,
+            action_url='/',
+            metadata={
+                'old_role': old_role,
+                'new_role': new_role
+            }
+        ))
+    return notifications
+
+
+# ============================================================================
+# INVALIDACIÓN DE LA CACHE DE PREFERENCIAS Y ROLES
+# ============================================================================
+
+@receiver(post_save, sender=NotificationPreference)
+@receiver(post_delete, sender=NotificationPreference)
+def invalidate_cached_preferences(sender, instance, **kwargs):
+    """
+    Invalida las preferencias cacheadas del usuario; otra vez al confirmar la
+    transacción, por si una lectura concurrente las rellenó con las anteriores.
+    """
+    user_ids = [instance.user_id]
+    NotificationLookupCache.invalidate_preferences(user_ids)
+    transaction.on_commit(lambda: NotificationLookupCache.invalidate_preferences(user_ids))
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_cached_user_lookups(sender, instance, created=False, update_fields=None, **kwargs):
+    """
+    Invalida los usuarios por rol (el rol anterior no se conoce aquí, así que
+    se invalidan todos) salvo en guardados parciales que no tocan el rol, como
+    el de last_login. Un usuario nuevo invalida además sus preferencias, por si
+    su id coincide con el de uno borrado.
+    """
+    if created or kwargs.get('signal') is post_delete:
+        NotificationLookupCache.invalidate_preferences([instance.pk])
+    if update_fields is None or 'role' in update_fields:
+        NotificationLookupCache.invalidate_roles()
+        transaction.on_commit(NotificationLookupCache.invalidate_roles)
 
 
 # ============================================================================
 # SEÑAL DE PUSH EN TIEMPO REAL (SSE)
 # ============================================================================
 
-from api.notifications.realtime_notifications import NotificationSSE
+from api.notifications.realtime_notifications import NotificationRelay, NotificationSSE
 from api.notifications.serializers_notifications import NotificationSerializer
 
 @receiver(post_save, sender=Notification)
 def push_realtime_notification(sender, instance, created, **kwargs):
-    """Push new notifications to SSE subscribers."""
-    if created and instance.recipient_id:
+    """
+    Push new notifications to SSE subscribers.
+
+    Cubre las notificaciones creadas con save(); las del outbox se insertan
+    con bulk_create y las publica el dispatcher tras el commit. Con
+    NOTIFICATION_OUTBOX_WORKER=True las publica NotificationRelay.
+    """
+    if created and instance.recipient_id and not NotificationRelay.enabled():
         try:
             serializer = NotificationSerializer(instance)
             NotificationSSE.publish_notification(
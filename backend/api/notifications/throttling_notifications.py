@@ -3,13 +3,29 @@ Sistema de throttling para prevenir spam de notificaciones.
 
 Este módulo implementa límites de tasa para la creación de notificaciones,
 evitando que se generen demasiadas notificaciones en poco tiempo.
+
+Los contadores usan una ventana deslizante aproximada: cada límite guarda un
+contador por ventana fija (la actual y la anterior) y el uso estimado es
+
+    anterior * (1 - fracción transcurrida de la actual) + actual
+
+Los incrementos se hacen con cache.incr (atómico en Redis y memcached), de
+modo que los envíos concurrentes no pierden cuentas, y la evaluación de N
+destinatarios se hace con un único get_many.
+
+En un envío masivo, con Redis como cache las marcas de duplicado (SET NX) y
+los incrementos de todos los destinatarios van en un único pipeline, así que
+el envío cuesta un número fijo de viajes (get_many, pipeline y, solo si hay
+rechazos, un pipeline para deshacerlos). La API de cache de Django no tiene
+add/incr por lotes, de modo que con otros backends cada destinatario cuesta un
+add y un incr por contador (en LocMemCache no hay red de por medio).
 """
 
-from django.core.cache import cache
-from django.utils import timezone
-from datetime import timedelta
-from typing import Optional, Tuple
+from django.core.cache import cache, caches
+from django.core.cache.backends.redis import RedisCache
+from typing import Dict, Iterable, List, Optional, Tuple
 import hashlib
+import time
 
 from api.notifications.models_notifications import NotificationType, NotificationPriority
 
@@ -17,42 +33,216 @@ from api.notifications.models_notifications import NotificationType, Notificatio
 class NotificationThrottle:
     """
     Clase para gestionar throttling de notificaciones.
-    
+
     Límites por defecto:
     - Por usuario general: 100 notificaciones/hora
     - Por tipo de notificación: 10 del mismo tipo/hora
     - Notificaciones idénticas: 1/5 minutos
     - Urgentes: 20/hora
     """
-    
+
     # Límites por defecto
     DEFAULT_USER_LIMIT = 100  # Notificaciones por hora
     DEFAULT_TYPE_LIMIT = 10   # Del mismo tipo por hora
     DEFAULT_DUPLICATE_WINDOW = 300  # 5 minutos en segundos
     URGENT_LIMIT = 20  # Notificaciones urgentes por hora
-    
-    # Duración de cache (1 hora)
-    CACHE_TTL = 3600
-    
+
+    # Ventana deslizante de los límites (1 hora)
+    WINDOW_SECONDS = 3600
+
+    # Duración de cache: el contador de una ventana se sigue leyendo durante la siguiente
+    CACHE_TTL = 2 * WINDOW_SECONDS
+
+    URGENT_PRIORITIES = (NotificationPriority.HIGH, NotificationPriority.URGENT)
+
+    DUPLICATE_REASON = "Notificación duplicada enviada recientemente (últimos 5 minutos)"
+
     @classmethod
     def _get_cache_key(cls, key_type: str, user_id: int, **kwargs) -> str:
         """Generar clave de cache única"""
         base = f"notif_throttle:{key_type}:{user_id}"
-        
+
         if kwargs:
             # Agregar parámetros adicionales a la clave
             params = ":".join(f"{k}={v}" for k, v in sorted(kwargs.items()))
             base = f"{base}:{params}"
-        
+
         return base
-    
+
     @classmethod
-    def _get_duplicate_hash(cls, recipient_id: int, notification_type: str, 
+    def _get_duplicate_hash(cls, recipient_id: int, notification_type: str,
                            title: str, message: str) -> str:
         """Generar hash único para detectar duplicados"""
         content = f"{recipient_id}:{notification_type}:{title}:{message}"
         return hashlib.md5(content.encode()).hexdigest()
-    
+
+    @classmethod
+    def _get_duplicate_key(cls, recipient_id: int, notification_type: str,
+                           title: str, message: str) -> Optional[str]:
+        """Clave de la marca de duplicado (solo si hay título y mensaje)"""
+        if not (title and message):
+            return None
+        return f"notif_dup:{cls._get_duplicate_hash(recipient_id, notification_type, title, message)}"
+
+    # ------------------------------------------------------------------
+    # Ventana deslizante
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def _window(cls, now: Optional[float] = None) -> Tuple[int, float]:
+        """Índice de la ventana actual y fracción transcurrida de ella"""
+        now = time.time() if now is None else now
+        index, offset = divmod(now, cls.WINDOW_SECONDS)
+        return int(index), offset / cls.WINDOW_SECONDS
+
+    @staticmethod
+    def _windowed(base: str, index: int) -> str:
+        return f"{base}:w{index}"
+
+    @classmethod
+    def _counters(cls, recipient_id: int, notification_type: str, priority: str) -> Dict[str, str]:
+        """Límites que aplican a una notificación → clave base de su contador"""
+        counters = {
+            'user': cls._get_cache_key("user", recipient_id),
+            'type': cls._get_cache_key("type", recipient_id, type=notification_type),
+        }
+        if priority in cls.URGENT_PRIORITIES:
+            counters['urgent'] = cls._get_cache_key("urgent", recipient_id)
+        return counters
+
+    @classmethod
+    def _limit(cls, counter: str) -> int:
+        return {
+            'user': cls.DEFAULT_USER_LIMIT,
+            'type': cls.DEFAULT_TYPE_LIMIT,
+            'urgent': cls.URGENT_LIMIT,
+        }[counter]
+
+    @classmethod
+    def _reason(cls, counter: str, notification_type: str) -> str:
+        if counter == 'user':
+            return f"Límite de {cls.DEFAULT_USER_LIMIT} notificaciones por hora alcanzado"
+        if counter == 'type':
+            return f"Límite de {cls.DEFAULT_TYPE_LIMIT} notificaciones del tipo '{notification_type}' por hora alcanzado"
+        return f"Límite de {cls.URGENT_LIMIT} notificaciones urgentes por hora alcanzado"
+
+    @staticmethod
+    def _estimate(previous: int, current: int, elapsed: float) -> float:
+        """Uso estimado en la última hora a partir de los contadores de dos ventanas"""
+        return previous * (1 - elapsed) + current
+
+    @classmethod
+    def _usage(cls, bases: Iterable[str], now: Optional[float] = None) -> Dict[str, float]:
+        """Uso estimado de varios contadores con un único get_many"""
+        index, elapsed = cls._window(now)
+        bases = list(bases)
+        keys = [cls._windowed(base, i) for base in bases for i in (index - 1, index)]
+        values = cache.get_many(keys)
+        return {
+            base: cls._estimate(
+                values.get(cls._windowed(base, index - 1), 0),
+                values.get(cls._windowed(base, index), 0),
+                elapsed
+            )
+            for base in bases
+        }
+
+    @classmethod
+    def _incr(cls, key: str, delta: int = 1, missing: bool = False) -> int:
+        """
+        Incremento atómico; crea el contador si aún no existe. Con missing=True
+        (la evaluación no lo encontró) se intenta crear primero y se ahorra
+        el incr fallido.
+        """
+        if missing and cache.add(key, delta, cls.CACHE_TTL):
+            return delta
+        try:
+            return cache.incr(key, delta)
+        except ValueError:
+            if cache.add(key, delta, cls.CACHE_TTL):
+                return delta
+            # Otro proceso lo creó entre ambas llamadas
+            return cache.incr(key, delta)
+
+    @staticmethod
+    def _decr(key: str):
+        try:
+            cache.decr(key)
+        except ValueError:
+            pass
+
+    # ------------------------------------------------------------------
+    # Evaluación y registro
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def _evaluate(
+        cls,
+        recipient_ids: List[int],
+        notification_type: str,
+        priority: str,
+        title: str,
+        message: str,
+        now: Optional[float] = None
+    ) -> Dict[int, Tuple[Optional[str], Dict[str, Tuple[float, bool]]]]:
+        """
+        Evalúa los límites de varios destinatarios con un único get_many.
+
+        Returns:
+            dict: {recipient_id: (razón o None, {clave base: (uso de la ventana
+            anterior ponderado, contador actual inexistente)})}
+        """
+        index, elapsed = cls._window(now)
+        plans = {}
+        keys = []
+        for recipient_id in recipient_ids:
+            counters = cls._counters(recipient_id, notification_type, priority)
+            duplicate_key = cls._get_duplicate_key(recipient_id, notification_type, title, message)
+            plans[recipient_id] = (counters, duplicate_key)
+            for base in counters.values():
+                keys.extend((cls._windowed(base, index - 1), cls._windowed(base, index)))
+            if duplicate_key:
+                keys.append(duplicate_key)
+
+        values = cache.get_many(keys)
+
+        results = {}
+        for recipient_id, (counters, duplicate_key) in plans.items():
+            reason = None
+            previous = {}
+            for counter, base in counters.items():
+                current = values.get(cls._windowed(base, index))
+                weighted = values.get(cls._windowed(base, index - 1), 0) * (1 - elapsed)
+                previous[base] = (weighted, current is None)
+                usage = weighted + (current or 0)
+                if reason is None and usage >= cls._limit(counter):
+                    reason = cls._reason(counter, notification_type)
+            if reason is None and duplicate_key and values.get(duplicate_key):
+                reason = cls.DUPLICATE_REASON
+            results[recipient_id] = (reason, previous)
+        return results
+
+    @classmethod
+    def _consume(cls, recipient_id: int, notification_type: str, priority: str,
+                 previous: Dict[str, Tuple[float, bool]], now: Optional[float] = None) -> Optional[str]:
+        """
+        Incrementa los contadores de un envío ya evaluado. Si un envío
+        concurrente agotó el límite entre la evaluación y el incremento, se
+        deshacen los incrementos y se devuelve la razón.
+        """
+        index, _ = cls._window(now)
+        incremented = []
+        for counter, base in cls._counters(recipient_id, notification_type, priority).items():
+            weighted, missing = previous.get(base, (0, False))
+            key = cls._windowed(base, index)
+            current = cls._incr(key, missing=missing)
+            incremented.append(key)
+            if weighted + current > cls._limit(counter):
+                for key in incremented:
+                    cls._decr(key)
+                return cls._reason(counter, notification_type)
+        return None
+
     @classmethod
     def can_send_notification(
         cls,
@@ -64,8 +254,8 @@ class NotificationThrottle:
         bypass_throttle: bool = False
     ) -> Tuple[bool, Optional[str]]:
         """
-        Verificar si se puede enviar una notificación.
-        
+        Verificar si se puede enviar una notificación (sin registrarla).
+
         Args:
             recipient_id: ID del usuario receptor
             notification_type: Tipo de notificación
@@ -73,47 +263,16 @@ class NotificationThrottle:
             title: Título (para detectar duplicados)
             message: Mensaje (para detectar duplicados)
             bypass_throttle: Si es True, omite el throttling
-        
+
         Returns:
             Tuple[bool, Optional[str]]: (puede_enviar, razón_si_no)
         """
         if bypass_throttle:
             return True, None
-        
-        # 1. Verificar límite general del usuario
-        user_key = cls._get_cache_key("user", recipient_id)
-        user_count = cache.get(user_key, 0)
-        
-        if user_count >= cls.DEFAULT_USER_LIMIT:
-            return False, f"Límite de {cls.DEFAULT_USER_LIMIT} notificaciones por hora alcanzado"
-        
-        # 2. Verificar límite por tipo de notificación
-        type_key = cls._get_cache_key("type", recipient_id, type=notification_type)
-        type_count = cache.get(type_key, 0)
-        
-        if type_count >= cls.DEFAULT_TYPE_LIMIT:
-            return False, f"Límite de {cls.DEFAULT_TYPE_LIMIT} notificaciones del tipo '{notification_type}' por hora alcanzado"
-        
-        # 3. Verificar límite de urgentes si aplica
-        if priority in [NotificationPriority.HIGH, NotificationPriority.URGENT]:
-            urgent_key = cls._get_cache_key("urgent", recipient_id)
-            urgent_count = cache.get(urgent_key, 0)
-            
-            if urgent_count >= cls.URGENT_LIMIT:
-                return False, f"Límite de {cls.URGENT_LIMIT} notificaciones urgentes por hora alcanzado"
-        
-        # 4. Verificar duplicados recientes
-        if title and message:
-            duplicate_hash = cls._get_duplicate_hash(
-                recipient_id, notification_type, title, message
-            )
-            duplicate_key = f"notif_dup:{duplicate_hash}"
-            
-            if cache.get(duplicate_key):
-                return False, "Notificación duplicada enviada recientemente (últimos 5 minutos)"
-        
-        return True, None
-    
+
+        reason, _ = cls._evaluate([recipient_id], notification_type, priority, title, message)[recipient_id]
+        return reason is None, reason
+
     @classmethod
     def record_notification(
         cls,
@@ -125,7 +284,7 @@ class NotificationThrottle:
     ):
         """
         Registrar que se envió una notificación (incrementar contadores).
-        
+
         Args:
             recipient_id: ID del usuario receptor
             notification_type: Tipo de notificación
@@ -133,55 +292,196 @@ class NotificationThrottle:
             title: Título
             message: Mensaje
         """
-        # Incrementar contador general del usuario
-        user_key = cls._get_cache_key("user", recipient_id)
-        user_count = cache.get(user_key, 0)
-        cache.set(user_key, user_count + 1, cls.CACHE_TTL)
-        
-        # Incrementar contador por tipo
-        type_key = cls._get_cache_key("type", recipient_id, type=notification_type)
-        type_count = cache.get(type_key, 0)
-        cache.set(type_key, type_count + 1, cls.CACHE_TTL)
-        
-        # Incrementar contador de urgentes si aplica
-        if priority in [NotificationPriority.HIGH, NotificationPriority.URGENT]:
-            urgent_key = cls._get_cache_key("urgent", recipient_id)
-            urgent_count = cache.get(urgent_key, 0)
-            cache.set(urgent_key, urgent_count + 1, cls.CACHE_TTL)
-        
+        index, _ = cls._window()
+        for base in cls._counters(recipient_id, notification_type, priority).values():
+            cls._incr(cls._windowed(base, index))
+
         # Marcar como duplicado por 5 minutos
-        if title and message:
-            duplicate_hash = cls._get_duplicate_hash(
-                recipient_id, notification_type, title, message
-            )
-            duplicate_key = f"notif_dup:{duplicate_hash}"
+        duplicate_key = cls._get_duplicate_key(recipient_id, notification_type, title, message)
+        if duplicate_key:
             cache.set(duplicate_key, True, cls.DEFAULT_DUPLICATE_WINDOW)
-    
+
+    @classmethod
+    def acquire(
+        cls,
+        recipient_id: int,
+        notification_type: str,
+        priority: str = NotificationPriority.NORMAL,
+        title: str = "",
+        message: str = "",
+        bypass_throttle: bool = False
+    ) -> Tuple[bool, Optional[str]]:
+        """
+        Verificar y registrar un envío en un solo paso. A diferencia de
+        can_send_notification + record_notification, dos envíos concurrentes
+        no pueden superar juntos el límite.
+
+        Returns:
+            Tuple[bool, Optional[str]]: (puede_enviar, razón_si_no)
+        """
+        if bypass_throttle:
+            return True, None
+
+        now = time.time()
+        reason, previous = cls._evaluate([recipient_id], notification_type, priority, title, message, now)[recipient_id]
+        if not reason:
+            reason = cls._claim(recipient_id, notification_type, priority, title, message, previous, now)
+        return reason is None, reason
+
+    @classmethod
+    def _claim(cls, recipient_id: int, notification_type: str, priority: str, title: str, message: str,
+               previous: Dict[str, Tuple[float, bool]], now: float) -> Optional[str]:
+        """
+        Reclama la marca de duplicado (cache.add) y consume el límite; si el
+        límite rechaza el envío, libera la marca. Devuelve la razón del rechazo.
+        """
+        duplicate_key = cls._get_duplicate_key(recipient_id, notification_type, title, message)
+        if duplicate_key and not cache.add(duplicate_key, True, cls.DEFAULT_DUPLICATE_WINDOW):
+            return cls.DUPLICATE_REASON
+
+        reason = cls._consume(recipient_id, notification_type, priority, previous, now)
+        if reason and duplicate_key:
+            cache.delete(duplicate_key)
+        return reason
+
+    @classmethod
+    def acquire_bulk(
+        cls,
+        recipient_ids: List[int],
+        notification_type: str,
+        priority: str = NotificationPriority.NORMAL,
+        title: str = "",
+        message: str = "",
+        bypass_throttle: bool = False
+    ) -> Tuple[List[int], Dict[int, str]]:
+        """
+        Versión de acquire para muchos destinatarios: la evaluación se hace
+        con un único get_many; cada destinatario admitido reclama su marca de
+        duplicado (como acquire, dos envíos concurrentes del mismo aviso no
+        pasan ambos) y se incrementan sus contadores. Con Redis ambas cosas
+        van en un pipeline para todos (_claim_many); con otros backends, una
+        por una (_claim).
+
+        Returns:
+            Tuple[List[int], Dict[int, str]]: (ids admitidos, {id bloqueado: razón})
+        """
+        recipient_ids = list(dict.fromkeys(recipient_ids))
+        if bypass_throttle:
+            return recipient_ids, {}
+
+        now = time.time()
+        reasons = {}
+        candidates = {}
+        for recipient_id, (reason, previous) in cls._evaluate(
+            recipient_ids, notification_type, priority, title, message, now
+        ).items():
+            if reason:
+                reasons[recipient_id] = reason
+            else:
+                candidates[recipient_id] = previous
+
+        client = cls._redis_client()
+        if client is not None:
+            reasons.update(cls._claim_many(client, candidates, notification_type, priority, title, message, now))
+        else:
+            for recipient_id, previous in candidates.items():
+                reason = cls._claim(recipient_id, notification_type, priority, title, message, previous, now)
+                if reason:
+                    reasons[recipient_id] = reason
+        allowed = [recipient_id for recipient_id in recipient_ids if recipient_id not in reasons]
+        return allowed, reasons
+
+    @staticmethod
+    def _redis_client():
+        """Cliente de redis-py de la cache por defecto, o None si no es RedisCache."""
+        backend = caches['default']
+        if isinstance(backend, RedisCache):
+            return backend._cache.get_client(write=True)
+        return None
+
+    @classmethod
+    def _claim_many(cls, client, candidates: Dict[int, Dict[str, Tuple[float, bool]]], notification_type: str,
+                    priority: str, title: str, message: str, now: float) -> Dict[int, str]:
+        """
+        _claim de muchos destinatarios en un pipeline de Redis: SET NX de las
+        marcas de duplicado y SET NX + INCR de los contadores, en un solo
+        viaje. Los rechazados (duplicado o límite superado por un envío
+        concurrente) se deshacen en un segundo pipeline.
+
+        Returns:
+            dict: {id rechazado: razón}
+        """
+        if not candidates:
+            return {}
+        backend = caches['default']
+        index, _ = cls._window(now)
+
+        plans = []
+        pipeline = client.pipeline(transaction=False)
+        for recipient_id, previous in candidates.items():
+            duplicate_key = cls._get_duplicate_key(recipient_id, notification_type, title, message)
+            if duplicate_key:
+                duplicate_key = backend.make_and_validate_key(duplicate_key)
+                pipeline.set(duplicate_key, 1, nx=True, ex=cls.DEFAULT_DUPLICATE_WINDOW)
+            counters = []
+            for counter, base in cls._counters(recipient_id, notification_type, priority).items():
+                key = backend.make_and_validate_key(cls._windowed(base, index))
+                # Los enteros se guardan sin serializar (RedisSerializer), así que INCR es compatible con cache.get
+                pipeline.set(key, 0, nx=True, ex=cls.CACHE_TTL)
+                pipeline.incr(key)
+                counters.append((counter, key, previous.get(base, (0, False))[0]))
+            plans.append((recipient_id, duplicate_key, counters))
+        results = iter(pipeline.execute())
+
+        reasons = {}
+        undo = client.pipeline(transaction=False)
+        for recipient_id, duplicate_key, counters in plans:
+            claimed = bool(next(results)) if duplicate_key else True
+            reason = None if claimed else cls.DUPLICATE_REASON
+            for counter, key, weighted in counters:
+                next(results)
+                current = next(results)
+                if reason is None and weighted + current > cls._limit(counter):
+                    reason = cls._reason(counter, notification_type)
+            if reason:
+                reasons[recipient_id] = reason
+                for _, key, _ in counters:
+                    undo.decr(key)
+                if claimed and duplicate_key:
+                    undo.delete(duplicate_key)
+        if reasons:
+            undo.execute()
+        return reasons
+
     @classmethod
     def get_user_stats(cls, recipient_id: int) -> dict:
         """
         Obtener estadísticas de throttling para un usuario.
-        
+
         Args:
             recipient_id: ID del usuario
-        
+
         Returns:
             dict: Estadísticas de uso
         """
         user_key = cls._get_cache_key("user", recipient_id)
         urgent_key = cls._get_cache_key("urgent", recipient_id)
-        
-        user_count = cache.get(user_key, 0)
-        urgent_count = cache.get(urgent_key, 0)
-        
-        # Calcular contadores por tipo
+        type_keys = {
+            notif_type: cls._get_cache_key("type", recipient_id, type=notif_type)
+            for notif_type, _ in NotificationType.choices
+        }
+
+        usage = cls._usage([user_key, urgent_key, *type_keys.values()])
+        user_count = round(usage[user_key])
+        urgent_count = round(usage[urgent_key])
+
+        # Contadores por tipo
         type_counts = {}
-        for notif_type, label in NotificationType.choices:
-            type_key = cls._get_cache_key("type", recipient_id, type=notif_type)
-            count = cache.get(type_key, 0)
+        for notif_type, type_key in type_keys.items():
+            count = round(usage[type_key])
             if count > 0:
                 type_counts[notif_type] = count
-        
+
         return {
             'user_id': recipient_id,
             'total_sent_last_hour': user_count,
@@ -194,30 +494,26 @@ class NotificationThrottle:
                 'type_limit': cls.DEFAULT_TYPE_LIMIT,
                 'urgent_limit': cls.URGENT_LIMIT,
                 'duplicate_window_seconds': cls.DEFAULT_DUPLICATE_WINDOW,
+                'window_seconds': cls.WINDOW_SECONDS,
             }
         }
-    
+
     @classmethod
     def reset_user_throttle(cls, recipient_id: int):
         """
         Resetear throttling para un usuario (útil para admins).
-        
+
         Args:
             recipient_id: ID del usuario
         """
-        # Limpiar contador general
-        user_key = cls._get_cache_key("user", recipient_id)
-        cache.delete(user_key)
-        
-        # Limpiar contador urgente
-        urgent_key = cls._get_cache_key("urgent", recipient_id)
-        cache.delete(urgent_key)
-        
-        # Limpiar contadores por tipo
-        for notif_type, _ in NotificationType.choices:
-            type_key = cls._get_cache_key("type", recipient_id, type=notif_type)
-            cache.delete(type_key)
-    
+        index, _ = cls._window()
+        bases = [cls._get_cache_key("user", recipient_id), cls._get_cache_key("urgent", recipient_id)]
+        bases.extend(
+            cls._get_cache_key("type", recipient_id, type=notif_type)
+            for notif_type, _ in NotificationType.choices
+        )
+        cache.delete_many([cls._windowed(base, i) for base in bases for i in (index - 1, index)])
+
     @classmethod
     def configure_limits(
         cls,
@@ -228,7 +524,7 @@ class NotificationThrottle:
     ):
         """
         Configurar límites personalizados (en runtime).
-        
+
         Args:
             user_limit: Límite general por usuario/hora
             type_limit: Límite por tipo/hora
@@ -245,22 +541,22 @@ class NotificationThrottle:
             cls.DEFAULT_DUPLICATE_WINDOW = duplicate_window
 
 
-def create_throttled_notification(recipient, notification_type, title, message, 
+def create_throttled_notification(recipient, notification_type, title, message,
                                   sender=None, priority=NotificationPriority.NORMAL,
-                                  related_object=None, action_url=None, 
+                                  related_object=None, action_url=None,
                                   metadata=None, expires_at=None,
                                   bypass_throttle=False):
     """
     Wrapper de Notification.create_notification con throttling integrado.
-    
+
     Args:
         (mismos que Notification.create_notification)
         bypass_throttle: Si es True, omite verificación de throttling
-    
+
     Returns:
-        Tuple[Optional[Notification], bool, Optional[str]]: 
+        Tuple[Optional[Notification], bool, Optional[str]]:
             (notificación_creada, fue_throttled, razón)
-    
+
     Example:
         notification, throttled, reason = create_throttled_notification(
             recipient=user,
@@ -269,16 +565,16 @@ def create_throttled_notification(recipient, notification_type, title, message,
             message="Tu orden fue creada",
             priority=NotificationPriority.HIGH
         )
-        
+
         if throttled:
             print(f"Notificación bloqueada: {reason}")
         else:
             print(f"Notificación enviada: {notification.id}")
     """
-    from api.models_notifications import Notification
-    
-    # Verificar si puede enviar
-    can_send, reason = NotificationThrottle.can_send_notification(
+    from api.notifications.models_notifications import Notification
+
+    # Verificar y registrar el envío de forma atómica
+    can_send, reason = NotificationThrottle.acquire(
         recipient_id=recipient.id,
         notification_type=notification_type,
         priority=priority,
@@ -286,10 +582,10 @@ def create_throttled_notification(recipient, notification_type, title, message,
         message=message,
         bypass_throttle=bypass_throttle
     )
-    
+
     if not can_send:
         return None, True, reason
-    
+
     # Crear notificación
     notification = Notification.create_notification(
         recipient=recipient,
@@ -303,16 +599,7 @@ def create_throttled_notification(recipient, notification_type, title, message,
         metadata=metadata,
         expires_at=expires_at
     )
-    
-    # Registrar envío
-    NotificationThrottle.record_notification(
-        recipient_id=recipient.id,
-        notification_type=notification_type,
-        priority=priority,
-        title=title,
-        message=message
-    )
-    
+
     return notification, False, None
 
 
@@ -322,7 +609,10 @@ def create_bulk_throttled_notifications(recipients, notification_type, title, me
                                        bypass_throttle=False):
     """
     Wrapper de create_bulk_notifications con throttling.
-    
+
+    Los límites de todos los destinatarios se evalúan con una sola lectura de
+    cache y las notificaciones admitidas se insertan con un único bulk_create.
+
     Returns:
         dict: {
             'created': [lista de notificaciones creadas],
@@ -330,46 +620,31 @@ def create_bulk_throttled_notifications(recipients, notification_type, title, me
             'reasons': {user_id: reason}
         }
     """
-    from api.models_notifications import Notification
-    
-    created = []
-    throttled = []
-    reasons = {}
-    
-    for recipient in recipients:
-        can_send, reason = NotificationThrottle.can_send_notification(
-            recipient_id=recipient.id,
-            notification_type=notification_type,
-            priority=priority,
-            title=title,
-            message=message,
-            bypass_throttle=bypass_throttle
-        )
-        
-        if can_send:
-            notification = Notification.create_notification(
-                recipient=recipient,
-                notification_type=notification_type,
-                title=title,
-                message=message,
-                sender=sender,
-                priority=priority,
-                action_url=action_url,
-                metadata=metadata or {}
-            )
-            created.append(notification)
-            
-            NotificationThrottle.record_notification(
-                recipient_id=recipient.id,
-                notification_type=notification_type,
-                priority=priority,
-                title=title,
-                message=message
-            )
-        else:
-            throttled.append(recipient.id)
-            reasons[recipient.id] = reason
-    
+    from api.notifications.models_notifications import Notification
+
+    recipients = list(recipients)
+    allowed, reasons = NotificationThrottle.acquire_bulk(
+        recipient_ids=[recipient.id for recipient in recipients],
+        notification_type=notification_type,
+        priority=priority,
+        title=title,
+        message=message,
+        bypass_throttle=bypass_throttle
+    )
+
+    by_id = {recipient.id: recipient for recipient in recipients}
+    created = Notification.create_bulk_notifications(
+        recipients=[by_id[recipient_id] for recipient_id in allowed],
+        notification_type=notification_type,
+        title=title,
+        message=message,
+        sender=sender,
+        priority=priority,
+        action_url=action_url,
+        metadata=metadata or {}
+    )
+    throttled = list(reasons)
+
     return {
         'created': created,
         'throttled': throttled,
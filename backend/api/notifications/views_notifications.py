@@ -8,7 +8,7 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
-from django.db.models import Q, Count
+from django.db.models import Q
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample
 from drf_spectacular.types import OpenApiTypes
 
@@ -22,6 +22,8 @@ from api.notifications.serializers_notifications import (
     GroupedNotificationsSerializer,
 )
 from api.notifications.throttling_notifications import NotificationThrottle
+from api.notifications.counters_notifications import NotificationCounterService
+from api.pagination import SwitchablePagination
 from api.notifications.grouping_notifications import NotificationGrouper, NotificationGroup
 
 
@@ -43,6 +45,7 @@ class NotificationViewSet(viewsets.ModelViewSet):
     search_fields = ['title', 'message']
     ordering_fields = ['created_at', 'priority', 'is_read']
     ordering = ['-created_at']
+    pagination_class = SwitchablePagination
     
     def get_queryset(self):
         """
@@ -59,7 +62,7 @@ class NotificationViewSet(viewsets.ModelViewSet):
     
     @extend_schema(
         summary="Listar notificaciones del usuario",
-        description="Obtiene todas las notificaciones del usuario autenticado, ordenadas por fecha de creación (más recientes primero).",
+        description="Obtiene todas las notificaciones del usuario autenticado, ordenadas por fecha de creación (más recientes primero). Con `?pagination=cursor` se pagina por cursor sobre (created_at, id).",
         responses={200: NotificationSerializer(many=True)},
         tags=["Notificaciones"]
     )
@@ -146,11 +149,9 @@ class NotificationViewSet(viewsets.ModelViewSet):
             # Marcar todas las notificaciones no leídas
             notifications = self.get_queryset().filter(is_read=False)
         
-        count = notifications.count()
-        
         # Marcar como leídas
         from django.utils import timezone
-        notifications.update(is_read=True, read_at=timezone.now())
+        count = notifications.update(is_read=True, read_at=timezone.now())
         
         return Response({
             'success': True,
@@ -188,7 +189,7 @@ class NotificationViewSet(viewsets.ModelViewSet):
     
     @extend_schema(
         summary="Obtener conteo de notificaciones no leídas",
-        description="Obtiene el número total de notificaciones no leídas del usuario.",
+        description="Obtiene el número total de notificaciones no leídas del usuario. Se lee de los contadores precalculados (NotificationCounter), normalmente desde cache.",
         responses={200: OpenApiTypes.OBJECT},
         tags=["Notificaciones"],
         examples=[
@@ -202,12 +203,12 @@ class NotificationViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def unread_count(self, request):
         """Obtener el conteo de notificaciones no leídas"""
-        count = self.get_queryset().filter(is_read=False).count()
+        count = NotificationCounterService.unread_count(request.user.id)
         return Response({'unread_count': count})
     
     @extend_schema(
         summary="Obtener estadísticas de notificaciones",
-        description="Obtiene estadísticas detalladas de las notificaciones del usuario: total, no leídas, por tipo y por prioridad.",
+        description="Obtiene estadísticas detalladas de las notificaciones del usuario: total, no leídas, por tipo y por prioridad (totales y solo no leídas). Se leen de los contadores precalculados.",
         responses={200: NotificationStatsSerializer},
         tags=["Notificaciones"],
         examples=[
@@ -225,6 +226,14 @@ class NotificationViewSet(viewsets.ModelViewSet):
                         "high": 15,
                         "normal": 30,
                         "low": 5
+                    },
+                    "unread_by_type": {
+                        "order_created": 3,
+                        "payment_received": 2
+                    },
+                    "unread_by_priority": {
+                        "high": 4,
+                        "normal": 1
                     }
                 },
                 response_only=True
@@ -234,33 +243,7 @@ class NotificationViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def stats(self, request):
         """Obtener estadísticas de notificaciones"""
-        queryset = self.get_queryset()
-        
-        # Conteo total y no leídas
-        total = queryset.count()
-        unread = queryset.filter(is_read=False).count()
-        
-        # Conteo por tipo
-        by_type = dict(
-            queryset.values('notification_type')
-            .annotate(count=Count('id'))
-            .values_list('notification_type', 'count')
-        )
-        
-        # Conteo por prioridad
-        by_priority = dict(
-            queryset.values('priority')
-            .annotate(count=Count('id'))
-            .values_list('priority', 'count')
-        )
-        
-        stats_data = {
-            'total': total,
-            'unread': unread,
-            'by_type': by_type,
-            'by_priority': by_priority,
-        }
-        
+        stats_data = NotificationCounterService.summary(request.user.id)
         serializer = NotificationStatsSerializer(stats_data)
         return Response(serializer.data)
     
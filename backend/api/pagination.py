@@ -0,0 +1,243 @@
+"""
+Paginación de la API.
+
+- KeysetPagination: paginación por cursor sobre (created_at, id). Cada página
+  es un `WHERE (created_at, id) < (cursor)` + LIMIT apoyado en un índice
+  compuesto, así que las páginas profundas cuestan lo mismo que la primera.
+- SwitchablePagination: mantiene PageNumberPagination por defecto y activa
+  KeysetPagination con `?pagination=cursor` (o al recibir `?cursor=`).
+"""
+import base64
+import json
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def estimate_count(queryset):
+    """
+    Número aproximado de filas del queryset.
+
+    En PostgreSQL se usa la estimación del planificador (EXPLAIN), que no
+    recorre la tabla. En otros motores se hace un COUNT(*) exacto.
+
+    Returns:
+        (count, is_estimate)
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count(), False
+
+    try:
+        sql, params = queryset.order_by().values('pk').query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows']), True
+    except Exception:
+        return queryset.count(), False
+
+
+class KeysetPagination(BasePagination):
+    """
+    Paginación por cursor (keyset) sobre (created_at, id), de más reciente a más antiguo.
+
+    Parámetros:
+        cursor: cursor opaco devuelto en `next` / `previous`
+        page_size: tamaño de página (máximo MAX_PAGE_SIZE)
+        count=exact: total exacto en lugar de la estimación del planificador
+    """
+
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    count_query_param = 'count'
+    date_field = 'created_at'
+
+    def __init__(self):
+        self.page_size = settings.REST_FRAMEWORK.get('PAGE_SIZE', 100)
+        self.max_page_size = settings.REST_FRAMEWORK.get('MAX_PAGE_SIZE', 5000)
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+            if size > 0:
+                return min(size, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    def encode_cursor(self, obj, reverse):
+        payload = {
+            't': getattr(obj, self.date_field).isoformat(),
+            'i': str(obj.pk),
+            'r': int(reverse),
+        }
+        token = base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+            position = parse_datetime(payload['t'])
+            if position is None:
+                raise ValueError
+            return position, payload['i'], bool(payload.get('r'))
+        except (ValueError, KeyError, TypeError, UnicodeDecodeError):
+            raise NotFound('Cursor inválido')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.count_queryset = queryset
+
+        cursor = self.decode_cursor(request)
+        field = self.date_field
+        reverse = bool(cursor and cursor[2])
+
+        if reverse:
+            # Página anterior: recorrer hacia registros más recientes y luego invertir
+            queryset = queryset.order_by(field, 'pk')
+            position, pk, _ = cursor
+            queryset = queryset.filter(Q(**{f'{field}__gt': position}) | Q(**{field: position, 'pk__gt': pk}))
+        else:
+            queryset = queryset.order_by(f'-{field}', '-pk')
+            if cursor:
+                position, pk, _ = cursor
+                queryset = queryset.filter(Q(**{f'{field}__lt': position}) | Q(**{field: position, 'pk__lt': pk}))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.page = rows
+        if reverse:
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None
+        return rows
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_count(self):
+        if self.request.query_params.get(self.count_query_param) == 'exact':
+            return self.count_queryset.count(), False
+        return estimate_count(self.count_queryset)
+
+    def get_paginated_response(self, data):
+        count, is_estimate = self.get_count()
+        return Response({
+            'count': count,
+            'count_is_estimate': is_estimate,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'count': {'type': 'integer', 'example': 123},
+                'count_is_estimate': {'type': 'boolean'},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Cursor de paginación (valor devuelto en next/previous).',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Número de resultados por página.',
+                'schema': {'type': 'integer'},
+            },
+            {
+                'name': self.count_query_param,
+                'required': False,
+                'in': 'query',
+                'description': "'exact' para obtener el total exacto en lugar de la estimación.",
+                'schema': {'type': 'string', 'enum': ['exact']},
+            },
+        ]
+
+
+class SwitchablePagination(PageNumberPagination):
+    """
+    PageNumberPagination por defecto; KeysetPagination con `?pagination=cursor`
+    o cuando la petición ya trae un `?cursor=`.
+    """
+
+    page_size_query_param = 'page_size'
+    mode_query_param = 'pagination'
+
+    def __init__(self):
+        self.max_page_size = settings.REST_FRAMEWORK.get('MAX_PAGE_SIZE', 5000)
+        self.keyset = None
+
+    def use_keyset(self, request):
+        params = request.query_params
+        return params.get(self.mode_query_param) == 'cursor' or KeysetPagination.cursor_query_param in params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_keyset(request):
+            self.keyset = KeysetPagination()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_schema_operation_parameters(self, view):
+        params = super().get_schema_operation_parameters(view)
+        params.append({
+            'name': self.mode_query_param,
+            'required': False,
+            'in': 'query',
+            'description': "'cursor' para paginación por cursor sobre (created_at, id).",
+            'schema': {'type': 'string', 'enum': ['cursor']},
+        })
+        names = {p['name'] for p in params}
+        params.extend(
+            p for p in KeysetPagination().get_schema_operation_parameters(view)
+            if p['name'] not in names
+        )
+        return params
@@ -0,0 +1,123 @@
+"""
+Renderers y parsers de la API basados en orjson y MessagePack.
+
+- OrjsonRenderer / OrjsonParser sustituyen a JSONRenderer / JSONParser de DRF
+  (mismo media type `application/json`) con un codificador nativo mucho más
+  rápido. Las fechas se formatean con el propio encoder de DRF (que según la
+  versión conserva o trunca los microsegundos), y Decimal y UUID igual que él,
+  para que la salida no cambie para los clientes existentes.
+- MessagePackRenderer / MessagePackParser se negocian con
+  `Accept: application/msgpack` (o `?format=msgpack`). Requieren el paquete
+  `msgpack`; si no está instalado no se registran (ver REST_FRAMEWORK en settings).
+"""
+import datetime
+import decimal
+import uuid
+
+import orjson
+from django.db.models.query import QuerySet
+from django.utils.encoding import force_str
+from django.utils.functional import Promise
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - dependencia opcional
+    msgpack = None
+
+_drf_encoder = JSONEncoder()
+
+
+def encode_default(obj):
+    """
+    Convierte a tipos básicos lo que orjson / msgpack no codifican, con el mismo
+    resultado que rest_framework.utils.encoders.JSONEncoder.
+    """
+    if isinstance(obj, Promise):
+        return force_str(obj)
+    if isinstance(obj, (datetime.date, datetime.time)):
+        # datetime incluido: mismo formato que DRF ('Z' para UTC, precisión y
+        # error con time con zona horaria según la versión instalada)
+        return _drf_encoder.default(obj)
+    if isinstance(obj, datetime.timedelta):
+        return str(obj.total_seconds())
+    if isinstance(obj, decimal.Decimal):
+        # Igual que DRF: los Decimal sueltos (p. ej. de ProfitCalculationService) salen como número
+        return float(obj)
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, bytes):
+        return obj.decode()
+    if isinstance(obj, QuerySet):
+        return tuple(obj)
+    if hasattr(obj, '__getitem__') and not isinstance(obj, str):
+        try:
+            return dict(obj)
+        except (TypeError, ValueError):
+            pass
+    if hasattr(obj, '__iter__'):
+        return tuple(obj)
+    raise TypeError(f'Tipo no serializable: {type(obj).__name__}')
+
+
+# orjson codifica UUID de forma nativa (igual que DRF); las fechas se le pasan a
+# encode_default (OPT_PASSTHROUGH_DATETIME) para formatearlas como DRF
+ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+
+class OrjsonRenderer(JSONRenderer):
+    """JSONRenderer de DRF con codificación orjson."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        options = ORJSON_OPTIONS
+        renderer_context = renderer_context or {}
+        # La API navegable pide sangría; orjson solo admite 2 espacios
+        if self.get_indent(accepted_media_type, renderer_context):
+            options |= orjson.OPT_INDENT_2
+
+        return orjson.dumps(data, default=encode_default, option=options)
+
+
+class OrjsonParser(JSONParser):
+    """JSONParser de DRF con decodificación orjson."""
+
+    renderer_class = OrjsonRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return orjson.loads(stream.read() if stream is not None else b'')
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
+
+
+class MessagePackRenderer(BaseRenderer):
+    """Respuestas en MessagePack para los frontends que lo negocien."""
+
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=encode_default, use_bin_type=True)
+
+
+class MessagePackParser(BaseParser):
+    """Cuerpos de petición en MessagePack."""
+
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False, strict_map_key=False)
+        except (ValueError, msgpack.ExtraData, msgpack.FormatError, msgpack.StackError) as exc:
+            raise ParseError(f'MessagePack parse error - {exc}')
+
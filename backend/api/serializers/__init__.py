@@ -19,6 +19,8 @@ from .products_serializers import (
     ProductReceivedTimelineSerializer,
     ProductDeliveryTimelineSerializer,
     ProductTimelineFormattedSerializer,
+    validate_bulk_received_amounts,
+    validate_bulk_delivery_amounts,
 )
 from .orders_serializers import (
     OrderSerializer,
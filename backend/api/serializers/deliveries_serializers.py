@@ -5,9 +5,11 @@ from .users_serializers import UserSerializer
 from .products_serializers import CategorySerializer, ProductReceivedSerializer
 from .products_serializers import ProductDeliverySerializer
 from drf_spectacular.utils import extend_schema_field
+from .mixins import NestedDiffMixin, SparseFieldsetMixin
+from api.services.bulk_write_service import BulkWriteService
 
 
-class DeliverReceipSerializer(serializers.ModelSerializer):
+class DeliverReceipSerializer(NestedDiffMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Serializador para recibos de entrega, incluye productos entregados y cálculo de costo total de entrega.
     """
@@ -64,6 +66,8 @@ class DeliverReceipSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = DeliverReceip
+        # ?expand= (ver SparseFieldsetMixin)
+        expandable_fields = ("client", "category", "delivered_products")
         fields = [
             "id",
             "client_id",  # Para escritura (requerido)
@@ -103,34 +107,16 @@ class DeliverReceipSerializer(serializers.ModelSerializer):
         # Extraer productos solo si están presentes en la solicitud
         if 'delivered_products' in validated_data:
             delivered_products_data = validated_data.pop('delivered_products')
-            
-            # Manejar la actualización de productos entregados
-            existing_product_delivery_ids = [pd.id for pd in instance.delivered_products.all()]
-            incoming_product_delivery_ids = []
-
-            for product_data in delivered_products_data:
-                product_delivery_id = product_data.get('id', None)
-
-                if product_delivery_id in existing_product_delivery_ids:
-                    # Actualizar producto entregado existente
-                    product_delivery = ProductDelivery.objects.get(id=product_delivery_id, deliver_receip=instance)
-                    if 'amount_delivered' in product_data:
-                        product_delivery.amount_delivered = product_data['amount_delivered']
-                    
-                    product_delivery.save()
-                    incoming_product_delivery_ids.append(product_delivery_id)
-                else:
-                    # Crear nuevo producto entregado
-                    if 'original_product' not in product_data:
-                        raise serializers.ValidationError({"delivered_products": "original_product es requerido para nuevos productos entregados."})
-                    
-                    new_product_delivery = ProductDelivery.objects.create(deliver_receip=instance, **product_data)
-                    incoming_product_delivery_ids.append(new_product_delivery.id)
-            
-            # Eliminar productos entregados que ya no están en la lista
-            for existing_id in existing_product_delivery_ids:
-                if existing_id not in incoming_product_delivery_ids:
-                    ProductDelivery.objects.filter(id=existing_id, deliver_receip=instance).delete()
+
+            # Diff por id contra las entregas existentes (ver NestedDiffMixin)
+            self.sync_nested_lines(
+                instance,
+                'delivered_products',
+                delivered_products_data,
+                model=ProductDelivery,
+                parent_field='deliver_receip',
+                quantity_fields=('amount_delivered',),
+            )
 
         # Manejar payment_amount de forma acumulativa (similar a órdenes)
         if 'payment_amount' in validated_data:
@@ -159,8 +145,9 @@ class DeliverReceipSerializer(serializers.ModelSerializer):
     def to_representation(self, instance):
         """Ensure deliver_picture is returned as a string."""
         ret = super().to_representation(instance)
-        raw = getattr(instance, 'deliver_picture', None)
-        ret['deliver_picture'] = raw if raw is not None else ''
+        if 'deliver_picture' in ret:  # puede excluirse con ?fields=
+            raw = getattr(instance, 'deliver_picture', None)
+            ret['deliver_picture'] = raw if raw is not None else ''
         return ret
 
 
@@ -177,7 +164,7 @@ class DeliverReceipSerializer(serializers.ModelSerializer):
         return float(obj.system_delivery_profit) if hasattr(obj, 'system_delivery_profit') else 0.0
 
 
-class PackageSerializer(serializers.ModelSerializer):
+class PackageSerializer(NestedDiffMixin, serializers.ModelSerializer):
     """
     Serializador para paquetes, muestra productos contenidos y fotos asociadas.
     """
@@ -223,35 +210,17 @@ class PackageSerializer(serializers.ModelSerializer):
         # Extraer productos solo si están presentes en la solicitud
         if 'package_products' in validated_data:
             contained_products_data = validated_data.pop('package_products')
-            
-            # Manejar la actualización de productos recibidos
-            existing_product_received_ids = [pr.id for pr in instance.package_products.all()]
-            incoming_product_received_ids = []
-
-            for product_data in contained_products_data:
-                product_received_id = product_data.get('id', None)
-
-                if product_received_id in existing_product_received_ids:
-                    # Actualizar producto recibido existente
-                    product_received = ProductReceived.objects.get(id=product_received_id, package=instance)
-                    if 'amount_received' in product_data:
-                        product_received.amount_received = product_data['amount_received']
-                    if 'observation' in product_data:
-                        product_received.observation = product_data['observation']
-                    product_received.save()
-                    incoming_product_received_ids.append(product_received_id)
-                else:
-                    # Crear nuevo producto recibido
-                    if 'original_product' not in product_data:
-                        raise serializers.ValidationError({"contained_products": "original_product es requerido para nuevos productos recibidos."})
-                    
-                    new_product_received = ProductReceived.objects.create(package=instance, **product_data)
-                    incoming_product_received_ids.append(new_product_received.id)
-            
-            # Eliminar productos recibidos que ya no están en la lista
-            for existing_id in existing_product_received_ids:
-                if existing_id not in incoming_product_received_ids:
-                    ProductReceived.objects.filter(id=existing_id, package=instance).delete()
+
+            # Diff por id contra las recepciones existentes (ver NestedDiffMixin)
+            result = self.sync_nested_lines(
+                instance,
+                'contained_products',
+                contained_products_data,
+                model=ProductReceived,
+                parent_field='package',
+                quantity_fields=('amount_received',),
+            )
+            BulkWriteService.notify_products_received(result['created'])
 
         # Actualizar campos directos del paquete
         instance.agency_name = validated_data.get('agency_name', instance.agency_name)
@@ -0,0 +1,226 @@
+"""
+Mixins compartidos por los serializers de la API.
+"""
+from typing import Iterable, List, Optional, Tuple
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import models, transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+
+def _split_param(value) -> Optional[Tuple[str, ...]]:
+    if value is None:
+        return None
+    return tuple(part.strip() for part in value.split(',') if part.strip())
+
+
+def parse_fieldset_params(request) -> Tuple[Optional[Tuple[str, ...]], Optional[Tuple[str, ...]]]:
+    """
+    Lee `?fields=` y `?expand=` de una petición GET.
+
+    Returns:
+        (fields, expand): tuplas de nombres o None si el parámetro no se envió.
+    """
+    if request is None or request.method != 'GET':
+        return None, None
+    params = request.query_params
+    return _split_param(params.get('fields')), _split_param(params.get('expand'))
+
+
+class SparseFieldsetMixin:
+    """
+    Permite elegir los campos serializados y expandir relaciones bajo demanda.
+
+    - `?fields=id,status,client`: solo se serializan esos campos.
+    - `?expand=products,client`: los campos listados en `Meta.expandable_fields`
+      se devuelven como objetos anidados; el resto se reduce a su clave primaria.
+
+    Sin ninguno de los dos parámetros el serializer se comporta como siempre
+    (todas las relaciones anidadas). Solo se aplica al serializer raíz de una
+    petición GET, o cuando se pasan explícitamente `fields=` / `expand=`.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._requested_fields = kwargs.pop('fields', None)
+        self._requested_expand = kwargs.pop('expand', None)
+        super().__init__(*args, **kwargs)
+
+    def _is_root(self):
+        parent = self.parent
+        if parent is None:
+            return True
+        return isinstance(parent, serializers.ListSerializer) and parent.parent is None
+
+    def get_fieldset_options(self):
+        if self._requested_fields is not None or self._requested_expand is not None:
+            return self._requested_fields, self._requested_expand
+        if not self._is_root():
+            return None, None
+        return parse_fieldset_params(self.context.get('request'))
+
+    def get_fields(self):
+        fields = super().get_fields()
+        requested, expand = self.get_fieldset_options()
+        if requested is None and expand is None:
+            return fields
+
+        expand = set(expand or ())
+        for name in getattr(self.Meta, 'expandable_fields', ()):
+            field = fields.get(name)
+            if field is None or name in expand or field.write_only:
+                continue
+            many = isinstance(field, serializers.ListSerializer)
+            fields[name] = serializers.PrimaryKeyRelatedField(
+                read_only=True, many=many, source=field.source
+            )
+
+        if requested:
+            allowed = set(requested)
+            fields = {
+                name: field for name, field in fields.items()
+                if name in allowed or field.write_only
+            }
+        return fields
+
+
+class NestedDiffMixin:
+    """
+    Aplica una lista anidada de líneas (compras, recepciones, entregas) como un
+    diff contra las líneas existentes del objeto padre, emparejándolas por id:
+
+    - Línea con id existente: se actualiza solo si algún valor cambió.
+    - Línea sin id (o con un id ajeno al padre): se inserta.
+    - Línea existente que no aparece en la lista: se elimina.
+
+    Inserciones, modificaciones y borrados se hacen con bulk_create, bulk_update
+    y un DELETE único, sin señales por línea. Después se recalculan una sola vez
+    los productos cuyas cantidades cambiaron realmente (y el estado de sus órdenes).
+
+    Los serializers anidados exponen `id` como solo lectura, así que el id de
+    cada línea se toma de `initial_data` en la misma posición.
+    """
+
+    def get_nested_line_ids(self, field_name: str, model, count: int) -> List:
+        """Ids enviados para cada línea de `field_name` (None si no trae o no es válido)."""
+        raw = self.initial_data.get(field_name) if hasattr(self.initial_data, 'get') else None
+        if not isinstance(raw, list):
+            raw = []
+
+        ids = []
+        for index in range(count):
+            item = raw[index] if index < len(raw) else None
+            value = item.get('id') if isinstance(item, dict) else None
+            try:
+                ids.append(model._meta.pk.to_python(value) if value not in (None, '') else None)
+            except DjangoValidationError:
+                ids.append(None)
+        return ids
+
+    @staticmethod
+    def _field_value(line, field, value):
+        """Valor comparable del campo: la clave para relaciones, el valor para el resto."""
+        if isinstance(field, models.ForeignKey):
+            return getattr(line, field.attname), getattr(value, 'pk', value)
+        return getattr(line, field.attname), value
+
+    def sync_nested_lines(
+        self,
+        instance,
+        field_name: str,
+        rows: List[dict],
+        model,
+        parent_field: str,
+        quantity_fields: Iterable[str],
+        insert_defaults: Optional[dict] = None,
+    ) -> dict:
+        """
+        Sincroniza las líneas de `instance` con los datos validados recibidos.
+
+        Args:
+            instance: Objeto padre (recibo, paquete, entrega)
+            field_name: Nombre del campo anidado en la petición (para ids y errores)
+            rows: Datos validados de cada línea
+            model: Modelo de las líneas
+            parent_field: Clave foránea de la línea hacia el padre
+            quantity_fields: Campos cuyo cambio afecta a las cantidades del producto
+            insert_defaults: Valores para las líneas nuevas que no los traen
+
+        Returns:
+            dict: `created`, `updated` (listas de líneas), `deleted` (número) y
+            `product_ids` (productos recalculados)
+        """
+        from api.services.agent_ownership_service import AgentOwnershipService
+        from api.services.bulk_write_service import BulkWriteService
+
+        meta = model._meta
+        quantity_fields = set(quantity_fields)
+        line_ids = self.get_nested_line_ids(field_name, model, len(rows))
+        existing = {line.pk: line for line in model.objects.filter(**{parent_field: instance})}
+
+        to_create, to_update, seen = [], [], set()
+        changed_fields, product_ids = set(), set()
+        now = timezone.now()
+
+        for line_id, data in zip(line_ids, rows):
+            data = {key: value for key, value in data.items() if key != parent_field}
+            line = existing.get(line_id) if line_id not in seen else None
+
+            if line is None:
+                if 'original_product' not in data:
+                    raise serializers.ValidationError({
+                        field_name: "original_product es requerido para las líneas nuevas."
+                    })
+                for key, value in (insert_defaults or {}).items():
+                    if data.get(key) is None:
+                        data[key] = value
+                new_line = model(**data, **{parent_field: instance})
+                to_create.append(new_line)
+                product_ids.add(new_line.original_product_id)
+                continue
+
+            seen.add(line_id)
+            previous_product_id = line.original_product_id
+            line_changed = set()
+            for key, value in data.items():
+                current, incoming = self._field_value(line, meta.get_field(key), value)
+                if current != incoming:
+                    line_changed.add(key)
+                    setattr(line, key, value)
+            if not line_changed:
+                continue
+
+            if line_changed & (quantity_fields | {'original_product'}):
+                # Si cambia el producto, el anterior también pierde la cantidad
+                product_ids.update({previous_product_id, line.original_product_id})
+            line.updated_at = now
+            changed_fields |= line_changed
+            to_update.append(line)
+
+        to_delete = [line for pk, line in existing.items() if pk not in seen]
+        product_ids.update(line.original_product_id for line in to_delete)
+
+        # Agente propietario de las líneas nuevas o que cambian de producto
+        AgentOwnershipService.stamp(to_create)
+        if 'original_product' in changed_fields:
+            AgentOwnershipService.stamp(to_update)
+            changed_fields.add('agent')
+
+        with transaction.atomic():
+            if to_delete:
+                # Un único DELETE; las señales post_delete de cada línea (estado
+                # del producto y resumen financiero diario) se siguen emitiendo
+                model.objects.filter(pk__in=[line.pk for line in to_delete]).delete()
+            if to_update:
+                model.objects.bulk_update(to_update, sorted(changed_fields | {'updated_at'}))
+            if to_create:
+                model.objects.bulk_create(to_create)
+            if product_ids:
+                BulkWriteService.refresh_products(product_ids)
+
+        return {
+            'created': to_create,
+            'updated': to_update,
+            'deleted': len(to_delete),
+            'product_ids': product_ids,
+        }
@@ -2,10 +2,11 @@ from rest_framework import serializers
 from api.models import Order, CustomUser
 from .users_serializers import UserSerializer
 from .products_serializers import ProductSerializer
+from .mixins import SparseFieldsetMixin
 from drf_spectacular.utils import extend_schema_field
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Serializador para órdenes. Incluye validaciones de agente y campos calculados relacionados con pagos y productos.
     Acepta ID para cliente y agente.
@@ -52,6 +53,8 @@ class OrderSerializer(serializers.ModelSerializer):
         """Class of model"""
 
         model = Order
+        # ?expand= (ver SparseFieldsetMixin)
+        expandable_fields = ("client", "sales_manager", "products")
         fields = [
             "id",
             # Readable nested objects
@@ -1,11 +1,14 @@
 from rest_framework import serializers
 from api.models import Product, Category, ProductBuyed, ProductReceived, ProductDelivery, Shop, Order, ShoppingReceip, Package, DeliverReceip
+from collections import defaultdict
 from django.db.models import Sum
 import json
 from drf_spectacular.utils import extend_schema_field
+from api.services.timeline_service import ProductTimelineService
+from .mixins import SparseFieldsetMixin
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Serializador para productos. Proporciona información detallada, validaciones y campos calculados para el modelo Product.
     """
@@ -51,8 +54,8 @@ class ProductSerializer(serializers.ModelSerializer):
     amount_delivered = serializers.SerializerMethodField(read_only=True)
     amount_received = serializers.SerializerMethodField(read_only=True)
     cost_per_product = serializers.SerializerMethodField(read_only=True)
-    system_expenses = serializers.SerializerMethodField(read_only=True)
-    system_profit = serializers.SerializerMethodField(read_only=True)
+    system_expenses = serializers.FloatField(read_only=True)
+    system_profit = serializers.FloatField(read_only=True)
 
     class Meta:
         """MetaClassName"""
@@ -97,8 +100,9 @@ class ProductSerializer(serializers.ModelSerializer):
     def to_representation(self, instance):
         """Return product_pictures exactly as stored (string)."""
         ret = super().to_representation(instance)
-        raw = getattr(instance, 'product_pictures', None)
-        ret['product_pictures'] = raw if raw is not None else ''
+        if 'product_pictures' in ret:  # puede excluirse con ?fields=
+            raw = getattr(instance, 'product_pictures', None)
+            ret['product_pictures'] = raw if raw is not None else ''
         return ret
 
     @extend_schema_field(str)
@@ -127,16 +131,6 @@ class ProductSerializer(serializers.ModelSerializer):
     def get_cost_per_product(self, obj):
         return getattr(obj, 'cost_per_product', 0.0)
 
-    @extend_schema_field(float)
-    def get_system_expenses(self, obj):
-        """Retorna los gastos del sistema para este producto"""
-        return float(obj.system_expenses) if hasattr(obj, 'system_expenses') else 0.0
-
-    @extend_schema_field(float)
-    def get_system_profit(self, obj):
-        """Retorna la ganancia del sistema para este producto"""
-        return float(obj.system_profit) if hasattr(obj, 'system_profit') else 0.0
-
     def validate_shop_cost(self, value):
         """Ensure shop_cost is not negative."""
         if value < 0:
@@ -234,6 +228,12 @@ class ProductBuyedSerializer(serializers.ModelSerializer):
         """Class of model"""
 
         model = ProductBuyed
+        # original_product_details serializa el producto con ProductSerializer
+        eager_load_related = (
+            'original_product__order__client',
+            'original_product__shop',
+            'original_product__category',
+        )
         fields = [
             "id",
             "original_product",
@@ -403,6 +403,71 @@ class ProductDeliverySerializer(serializers.ModelSerializer):
         return attrs
 
 
+def _check_bulk_amounts(entries, current_totals, limits, message):
+    """
+    Comprueba que la suma de los incrementos de un lote no supere el límite de cada producto.
+
+    Args:
+        entries: lista de (índice, producto, incremento)
+        current_totals: producto.pk → total actual
+        limits: producto.pk → máximo permitido
+
+    Returns:
+        dict: índice → mensaje, para cada elemento de un producto que se excede
+    """
+    by_product = defaultdict(list)
+    for index, product, delta in entries:
+        by_product[product.pk].append((index, delta))
+
+    errors = {}
+    for pk, items in by_product.items():
+        total = (current_totals.get(pk) or 0) + sum(delta for _, delta in items)
+        if total > limits[pk]:
+            errors.update({index: message for index, _ in items})
+    return errors
+
+
+def validate_bulk_received_amounts(entries):
+    """
+    Valida en conjunto las cantidades de un lote de ProductReceived: lo recibido
+    (existente + lote) no puede superar lo solicitado.
+
+    Args:
+        entries: lista de (índice, producto, incremento de amount_received)
+    """
+    product_ids = {product.pk for _, product, _ in entries}
+    received = dict(
+        ProductReceived.objects.filter(original_product__in=product_ids).order_by()
+        .values('original_product').annotate(total=Sum('amount_received'))
+        .values_list('original_product', 'total')
+    )
+    limits = {product.pk: product.amount_requested for _, product, _ in entries}
+    return _check_bulk_amounts(
+        entries, received, limits, "La cantidad recibida no puede ser mayor a la solicitada."
+    )
+
+
+def validate_bulk_delivery_amounts(entries):
+    """
+    Valida en conjunto las cantidades de un lote de ProductDelivery: lo entregado
+    (existente + lote) no puede superar lo recibido.
+
+    Args:
+        entries: lista de (índice, producto, incremento de amount_delivered)
+    """
+    product_ids = {product.pk for _, product, _ in entries}
+    received = dict(
+        ProductReceived.objects.filter(original_product__in=product_ids).order_by()
+        .values('original_product').annotate(total=Sum('amount_received'))
+        .values_list('original_product', 'total')
+    )
+    delivered = {product.pk: product.amount_delivered for _, product, _ in entries}
+    limits = {pk: received.get(pk) or 0 for pk in product_ids}
+    return _check_bulk_amounts(
+        entries, delivered, limits, "La cantidad entregada no puede ser mayor a la recibida."
+    )
+
+
 class ProductCreateSerializer(serializers.ModelSerializer):
     """
     Serializador para crear productos.
@@ -665,99 +730,12 @@ class ProductTimelineFormattedSerializer(serializers.ModelSerializer):
         """
         Construye y retorna los eventos de la timeline ya formateados.
         Cada evento incluye toda la información necesaria para renderizar.
-        """
-        events = []
-
-        # Estado config mapping
-        status_config = {
-            'created': {
-                'label': 'Registro Creado',
-                'icon': 'check-circle-2',
-                'color': 'text-gray-600',
-                'bgColor': 'bg-gray-100',
-            },
-            'purchased': {
-                'label': 'Comprado',
-                'icon': 'shopping-cart',
-                'color': 'text-blue-600',
-                'bgColor': 'bg-blue-100',
-            },
-            'received': {
-                'label': 'Recibido',
-                'icon': 'package',
-                'color': 'text-yellow-600',
-                'bgColor': 'bg-yellow-100',
-            },
-            'delivered': {
-                'label': 'Entregado',
-                'icon': 'truck',
-                'color': 'text-green-600',
-                'bgColor': 'bg-green-100',
-            },
-        }
-
-        # Evento de creación
-        if obj.created_at:
-            events.append({
-                'status': 'created',
-                'date': obj.created_at.isoformat(),
-                'label': status_config['created']['label'],
-                'description': 'El producto fue registrado en el sistema',
-                'icon': status_config['created']['icon'],
-                'color': status_config['created']['color'],
-                'bgColor': status_config['created']['bgColor'],
-                'isCompleted': True,
-            })
 
-        # Evento de compra
-        if obj.buys.exists() and obj.amount_purchased and obj.amount_purchased > 0:
-            first_buy = obj.buys.first()
-            total_amount = obj.buys.aggregate(Sum('amount_buyed'))['amount_buyed__sum'] or 0
-            
-            events.append({
-                'status': 'purchased',
-                'date': (first_buy.buy_date or obj.created_at).isoformat(),
-                'label': status_config['purchased']['label'],
-                'description': f'Se compraron {int(total_amount)} unidad(es) del producto',
-                'icon': status_config['purchased']['icon'],
-                'color': status_config['purchased']['color'],
-                'bgColor': status_config['purchased']['bgColor'],
-                'isCompleted': True,
-            })
-
-        # Evento de recepción
-        if obj.receiveds.exists() and obj.amount_received and obj.amount_received > 0:
-            first_received = obj.receiveds.first()
-            total_amount = obj.receiveds.aggregate(Sum('amount_received'))['amount_received__sum'] or 0
-            
-            events.append({
-                'status': 'received',
-                'date': first_received.created_at.isoformat(),
-                'label': status_config['received']['label'],
-                'description': f'Se recibieron {int(total_amount)} unidad(es) del producto',
-                'icon': status_config['received']['icon'],
-                'color': status_config['received']['color'],
-                'bgColor': status_config['received']['bgColor'],
-                'isCompleted': True,
-            })
-
-        # Evento de entrega
-        if obj.delivers.exists() and obj.amount_delivered and obj.amount_delivered > 0:
-            first_delivery = obj.delivers.first()
-            total_amount = obj.delivers.aggregate(Sum('amount_delivered'))['amount_delivered__sum'] or 0
-            
-            events.append({
-                'status': 'delivered',
-                'date': first_delivery.created_at.isoformat(),
-                'label': status_config['delivered']['label'],
-                'description': f'Se entregaron {int(total_amount)} unidad(es) al cliente',
-                'icon': status_config['delivered']['icon'],
-                'color': status_config['delivered']['color'],
-                'bgColor': status_config['delivered']['bgColor'],
-                'isCompleted': True,
-            })
-
-        # Ordenar eventos por fecha
-        events.sort(key=lambda x: x['date'])
-
-        return events
\ No newline at end of file
+        Con many=True la vista pasa en el contexto `timeline_movements` (ver
+        ProductTimelineService.movement_summaries) calculado para todos los
+        productos; si no, se calcula para este producto.
+        """
+        movements = self.context.get('timeline_movements')
+        if movements is None:
+            movements = ProductTimelineService.movement_summaries([obj.pk])
+        return ProductTimelineService.build_events(obj, movements.get(obj.pk, {}))
@@ -2,6 +2,8 @@ from rest_framework import serializers
 from api.models import Shop, BuyingAccounts, ShoppingReceip, ProductBuyed
 from .products_serializers import ProductBuyedSerializer
 from drf_spectacular.utils import extend_schema_field
+from .mixins import NestedDiffMixin, SparseFieldsetMixin
+from api.notifications.signals_notifications import notify_product_purchased
 
 
 class BuyingAccountsSerializer(serializers.ModelSerializer):
@@ -51,7 +53,7 @@ class ShopSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "created_at", "updated_at"]
 
 
-class ShoppingReceipSerializer(serializers.ModelSerializer):
+class ShoppingReceipSerializer(NestedDiffMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     """
     Serializador para recibos de compra, incluye productos comprados y cálculo de costo total.
     Permite crear un ShoppingReceip con sus ProductBuyed asociados.
@@ -87,35 +89,40 @@ class ShoppingReceipSerializer(serializers.ModelSerializer):
     real_cost_paid = serializers.SerializerMethodField(read_only=True)
     operational_expenses = serializers.SerializerMethodField(read_only=True)
 
+    # Los valores salen de las anotaciones de annotate_receipt_costs cuando el
+    # queryset las trae (listado/detalle); si no, el modelo los calcula.
+
     @extend_schema_field(float)
     def get_total_cost_of_shopping(self, obj):
         """Suma del costo total de todos los productos en esta compra"""
-        return float(obj.total_cost_of_shopping) if hasattr(obj, 'total_cost_of_shopping') else 0.0
+        return float(obj.total_cost_of_shopping)
 
     @extend_schema_field(float)
     def get_total_cost_excluding_refunds(self, obj):
         """Suma del costo total excluyendo productos reembolsados"""
-        return float(obj.total_cost_excluding_refunds) if hasattr(obj, 'total_cost_excluding_refunds') else 0.0
+        return float(obj.total_cost_excluding_refunds)
 
     @extend_schema_field(float)
     def get_total_refunded(self, obj):
         """Suma total de los montos reembolsados"""
-        return float(obj.total_refunded) if hasattr(obj, 'total_refunded') else 0.0
+        return float(obj.total_refunded)
 
     @extend_schema_field(float)
     def get_real_cost_paid(self, obj):
         """Costo real pagado después de restar los reembolsos"""
-        return float(obj.real_cost_paid) if hasattr(obj, 'real_cost_paid') else 0.0
+        return float(obj.real_cost_paid)
 
     @extend_schema_field(float)
     def get_operational_expenses(self, obj):
         """Gastos operativos de la compra (diferencia entre costo de compra y suma de productos sin reembolsos)"""
-        return float(obj.operational_expenses) if hasattr(obj, 'operational_expenses') else 0.0
+        return float(getattr(obj, 'operational_expenses', 0.0))
 
     class Meta:
         """Class of model"""
 
         model = ShoppingReceip
+        # ?expand= (ver SparseFieldsetMixin)
+        expandable_fields = ("buyed_products",)
         fields = [
             "id",
             "shopping_account",
@@ -153,24 +160,24 @@ class ShoppingReceipSerializer(serializers.ModelSerializer):
         # Manejar productos comprados solo si se proporcionan en la solicitud
         if 'buyed_products' in validated_data:
             buyed_products_data = validated_data.pop('buyed_products')
-            
-            # NOTA: La lógica actual del sistema es reemplazar todos los productos vinculados
-            # al actualizar el recibo. Mantenemos este comportamiento pero SOLO si se 
-            # envían productos en la petición.
-            
-            # Eliminar los ProductBuyed existentes vinculados a este recibo
-            instance.buyed_products.all().delete()
-
-            # Crear los nuevos ProductBuyed asociados
-            for product_data in buyed_products_data:
-                # Si no se especifica buy_date, usar la del shopping_receip
-                if 'buy_date' not in product_data or product_data['buy_date'] is None:
-                    product_data['buy_date'] = instance.buy_date
-                
-                # Crear y vincular a la instancia actual
-                product_buyed = ProductBuyed.objects.create(shoping_receip=instance, **product_data)
-
-        # Actualizar los campos propios del ShoppingReceip
+
+            # Diff por id contra los ProductBuyed del recibo: solo se tocan las
+            # líneas que cambian y se recalculan los productos afectados.
+            # Las líneas nuevas sin buy_date toman la del recibo.
+            result = self.sync_nested_lines(
+                instance,
+                'buyed_products',
+                buyed_products_data,
+                model=ProductBuyed,
+                parent_field='shoping_receip',
+                quantity_fields=('amount_buyed', 'quantity_refuned'),
+                insert_defaults={'buy_date': instance.buy_date},
+            )
+            for product_buyed in result['created']:
+                notify_product_purchased(sender=ProductBuyed, instance=product_buyed, created=True)
+
+        # Actualizar los campos propios del ShoppingReceip (su guardado refresca
+        # también el resumen diario de las compras de producto)
         return super().update(instance, validated_data)
 
 
@@ -21,6 +21,8 @@ class UserCreateSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = CustomUser
+        # agent_name lee assigned_agent (ver EagerLoadingMixin)
+        eager_load_related = ('assigned_agent',)
         fields = [
             "id",
             "email",
@@ -82,6 +84,8 @@ class UserUpdateSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = CustomUser
+        # agent_name lee assigned_agent (ver EagerLoadingMixin)
+        eager_load_related = ('assigned_agent',)
         fields = [
             "id",
             "email",
@@ -154,6 +158,8 @@ class UserSerializer(serializers.ModelSerializer):
         """Class of model"""
 
         model = CustomUser
+        # agent_name lee assigned_agent (ver EagerLoadingMixin)
+        eager_load_related = ('assigned_agent',)
         fields = [
             "id",  # Cambiado de user_id a id
             "email",
@@ -268,6 +274,8 @@ class UserProfileSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = CustomUser
+        # agent_name lee assigned_agent (ver EagerLoadingMixin)
+        eager_load_related = ('assigned_agent',)
         fields = [
             "id",  # Cambiado de user_id a id
             "email",
@@ -0,0 +1,146 @@
+"""
+Agente propietario desnormalizado (campo `agent`) de pedidos, entregas,
+productos y movimientos de producto.
+
+Las vistas de agente filtraban con `client__assigned_agent` o
+`original_product__order__client__assigned_agent` (3-4 joins por consulta).
+Cada modelo guarda ahora el agente del cliente en una columna indexada y el
+filtro por rol es `agent=user`.
+
+El valor se hereda de la relación padre:
+
+    CustomUser.assigned_agent → Order.agent / DeliverReceip.agent
+    Order.agent → Product.agent → ProductBuyed / ProductReceived / ProductDelivery
+
+Se asigna al crear (señal pre_save o `stamp` en las escrituras masivas) y se
+vuelve a propagar con UPDATE masivos cuando cambia el agente de un cliente o
+el padre de un objeto.
+"""
+
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, Optional
+
+from django.db.models import OuterRef, Subquery
+
+from api.models import (
+    CustomUser, DeliverReceip, Order, Product, ProductBuyed, ProductDelivery, ProductReceived,
+)
+
+logger = logging.getLogger(__name__)
+
+# Modelo → relación de la que hereda el agente
+OWNERSHIP_PARENT = {
+    Order: 'client',
+    DeliverReceip: 'client',
+    Product: 'order',
+    ProductBuyed: 'original_product',
+    ProductReceived: 'original_product',
+    ProductDelivery: 'original_product',
+}
+
+MOVEMENT_MODELS = (ProductBuyed, ProductReceived, ProductDelivery)
+
+
+def _parent_agent_field(model) -> str:
+    """Campo del padre que contiene el agente."""
+    parent = model._meta.get_field(OWNERSHIP_PARENT[model]).related_model
+    return 'assigned_agent' if parent is CustomUser else 'agent'
+
+
+class AgentOwnershipService:
+    """Asignación y propagación del agente propietario."""
+
+    @staticmethod
+    def agent_id_for(instance) -> Optional[int]:
+        """
+        Agente que le corresponde a la instancia según su padre. Usa el padre
+        cacheado si lo hay; si no, lo lee con una consulta de una columna.
+        """
+        model = type(instance)
+        field = model._meta.get_field(OWNERSHIP_PARENT[model])
+        parent_id = getattr(instance, field.attname)
+        if parent_id is None:
+            return None
+
+        agent_field = _parent_agent_field(model)
+        if field.is_cached(instance):
+            parent = field.get_cached_value(instance)
+            if parent is not None and parent.pk == parent_id:
+                return getattr(parent, f'{agent_field}_id')
+        return (
+            field.related_model.objects
+            .filter(pk=parent_id)
+            .values_list(agent_field, flat=True)
+            .first()
+        )
+
+    @staticmethod
+    def stamp(instances: Iterable) -> list:
+        """
+        Asigna `agent` a objetos en memoria antes de un bulk_create / bulk_update.
+        Los padres que no están cacheados se leen con una consulta por modelo.
+        """
+        instances = list(instances)
+        pending = defaultdict(list)
+        for instance in instances:
+            model = type(instance)
+            field = model._meta.get_field(OWNERSHIP_PARENT[model])
+            parent_id = getattr(instance, field.attname)
+            parent = field.get_cached_value(instance) if field.is_cached(instance) else None
+            if parent_id is None:
+                instance.agent_id = None
+            elif parent is not None and parent.pk == parent_id:
+                instance.agent_id = getattr(parent, f'{_parent_agent_field(model)}_id')
+            else:
+                pending[model].append(instance)
+
+        for model, items in pending.items():
+            field = model._meta.get_field(OWNERSHIP_PARENT[model])
+            agents = dict(
+                field.related_model.objects
+                .filter(pk__in={getattr(item, field.attname) for item in items})
+                .values_list('pk', _parent_agent_field(model))
+            )
+            for item in items:
+                item.agent_id = agents.get(getattr(item, field.attname))
+        return instances
+
+    @staticmethod
+    def restamp_client(client: CustomUser) -> Dict[str, int]:
+        """
+        Propaga el agente asignado de un cliente a sus pedidos, entregas,
+        productos y movimientos con un UPDATE por tabla.
+
+        Returns:
+            dict: filas actualizadas por modelo
+        """
+        agent_id = client.assigned_agent_id
+        counts = {
+            'orders': Order.objects.filter(client=client).update(agent_id=agent_id),
+            'deliveries': DeliverReceip.objects.filter(client=client).update(agent_id=agent_id),
+            'products': Product.objects.filter(order__client=client).update(agent_id=agent_id),
+        }
+        for model in MOVEMENT_MODELS:
+            counts[model._meta.model_name] = (
+                model.objects.filter(original_product__order__client=client).update(agent_id=agent_id)
+            )
+        logger.info(f"Agente {agent_id} propagado a los datos del cliente {client.pk}: {counts}")
+        return counts
+
+    @staticmethod
+    def restamp_order(order: Order) -> None:
+        """Propaga el agente de un pedido a sus productos y movimientos."""
+        Product.objects.filter(order=order).update(agent_id=order.agent_id)
+        for model in MOVEMENT_MODELS:
+            model.objects.filter(original_product__order=order).update(agent_id=order.agent_id)
+
+    @staticmethod
+    def restamp_movements(product_ids: Iterable) -> None:
+        """Recalcula el agente de los movimientos de los productos indicados."""
+        product_ids = {pk for pk in product_ids if pk is not None}
+        if not product_ids:
+            return
+        product_agent = Product.objects.filter(pk=OuterRef('original_product_id')).values('agent_id')[:1]
+        for model in MOVEMENT_MODELS:
+            model.objects.filter(original_product_id__in=product_ids).update(agent_id=Subquery(product_agent))
@@ -7,7 +7,7 @@ from typing import Dict, Any, Optional, Tuple
 from decimal import Decimal
 
 from api.models.balance import Balance
-from api.models import Order, ProductBuyed, DeliverReceip
+from api.services.rollup_service import FinancialRollupService
 
 
 class BalanceService:
@@ -33,69 +33,30 @@ class BalanceService:
             start = datetime.strptime(start_date, '%Y-%m-%d').date()
             end = datetime.strptime(end_date, '%Y-%m-%d').date()
 
-            # Calculate delivery data
-            deliveries = DeliverReceip.objects.filter(
-                deliver_date__date__gte=start,
-                deliver_date__date__lte=end
-            )
-
-            delivery_data = deliveries.aggregate(
-                total_weight=Sum('weight'),
-                total_delivery_cost=Sum('weight_cost')
-            )
-
-            total_weight_raw = delivery_data['total_weight'] or 0
-            total_delivery_cost_raw = delivery_data['total_delivery_cost'] or 0
-            total_weight = Decimal(str(total_weight_raw)) if total_weight_raw is not None else Decimal('0')
-            total_delivery_cost = Decimal(str(total_delivery_cost_raw)) if total_delivery_cost_raw is not None else Decimal('0')
+            # Sum the precomputed daily rows instead of scanning every operation in the range
+            totals = FinancialRollupService.aggregate_range(start, end)
 
-            # Calculate orders data
-            orders = Order.objects.filter(
-                created_at__date__gte=start,
-                created_at__date__lte=end
-            )
-
-            orders_data = orders.aggregate(
-                total_revenue=Sum('received_value_of_client')
-            )
-
-            total_revenue_raw = orders_data['total_revenue'] or 0
-            total_revenue = Decimal(str(total_revenue_raw)) if total_revenue_raw is not None else Decimal('0')
-
-            # Calculate total profit as revenue - cost for each order
-            total_order_profit = Decimal('0')
-            for order in orders:
-                total_order_profit += Decimal(str(order.balance))  # balance = received - cost
-
-            # Calculate purchase costs
-            products_bought = ProductBuyed.objects.filter(
-                shoping_receip__buy_date__date__gte=start,
-                shoping_receip__buy_date__date__lte=end
-            )
-
-            purchase_data = products_bought.aggregate(
-                total_purchase_cost=Sum('total_cost_of_purchase')
-            )
-            total_purchase_cost_raw = purchase_data['total_purchase_cost'] or 0
-            total_purchase_cost = Decimal(str(total_purchase_cost_raw)) if total_purchase_cost_raw is not None else Decimal('0')
+            total_delivery_cost = totals['total_delivery_cost']
+            total_purchase_cost = totals['total_purchase_cost']
 
             # Calculate totals
             total_cost = total_delivery_cost + total_purchase_cost
-            total_profit = total_order_profit
+            # balance = received + applied balance - cost, summed per day
+            total_profit = totals['total_order_balance']
 
             return {
                 'success': True,
                 'start_date': start_date,
                 'end_date': end_date,
-                'total_weight': total_weight,
+                'total_weight': totals['total_weight'],
                 'total_delivery_cost': total_delivery_cost,
                 'total_purchase_cost': total_purchase_cost,
                 'total_cost': total_cost,
-                'total_revenue': total_revenue,
+                'total_revenue': totals['total_revenue'],
                 'total_profit': total_profit,
-                'orders_count': orders.count(),
-                'deliveries_count': deliveries.count(),
-                'products_bought_count': products_bought.count(),
+                'orders_count': totals['orders_count'],
+                'deliveries_count': totals['deliveries_count'],
+                'products_bought_count': totals['products_bought_count'],
             }
 
         except ValueError as e:
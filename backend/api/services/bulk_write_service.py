@@ -0,0 +1,236 @@
+"""
+Escritura masiva de productos, recepciones y entregas.
+
+Cada operación se ejecuta en una única transacción con bulk_create / bulk_update,
+que no disparan post_save. Los recálculos que las señales harían elemento a
+elemento se ejecutan una sola vez por objeto afectado:
+
+- Producto: cantidades y estado (ProductStatusService.recalculate_products_status)
+- Orden: total (update_total_costs) y estado (update_status_based_on_products).
+  El guardado de la orden recalcula el balance del cliente mediante su señal.
+- Notificaciones: un evento del outbox por lote, que genera una notificación
+  agregada por destinatario en lugar de una por elemento.
+- Índice de búsqueda: un upsert de los documentos de los productos del lote.
+- Agente propietario: se asigna en memoria antes de insertar y se vuelve a
+  calcular si cambia la relación padre (AgentOwnershipService).
+"""
+
+import logging
+from typing import Iterable, List, Tuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from api.models import Order, Product, ProductReceived, ProductDelivery
+from api.notifications.outbox_notifications import NotificationOutboxService
+from api.services.agent_ownership_service import AgentOwnershipService, OWNERSHIP_PARENT
+from api.services.product_status_service import ProductStatusService
+from api.services.search_service import SearchService, PRODUCT_INDEXED_FIELDS
+
+logger = logging.getLogger(__name__)
+
+
+class BulkWriteService:
+    """Altas y modificaciones masivas con recálculos diferidos."""
+
+    @staticmethod
+    def create_products(order: Order, rows: List[dict]) -> List[Product]:
+        """
+        Crea varios productos en una orden.
+
+        Args:
+            order: Orden destino
+            rows: Datos validados de cada producto (sin `order`)
+
+        Returns:
+            List[Product]: Productos creados
+        """
+        if not rows:
+            return []
+
+        products = []
+        for data in rows:
+            product = Product(**{**data, 'order': order})
+            product.prepare_financials()
+            products.append(product)
+        AgentOwnershipService.stamp(products)
+
+        with transaction.atomic():
+            Product.objects.bulk_create(products)
+            SearchService.index_instances(products)
+            BulkWriteService._refresh_order_totals(order)
+            BulkWriteService._notify_products_added(order, products)
+
+        logger.info(f"{len(products)} productos creados en lote en la orden {order.id}")
+        return products
+
+    @staticmethod
+    def update_products(order: Order, changes: List[Tuple[Product, dict]]) -> List[Product]:
+        """
+        Actualiza varios productos de una orden.
+
+        Args:
+            order: Orden a la que pertenecen los productos
+            changes: Pares (producto, datos validados)
+
+        Returns:
+            List[Product]: Productos actualizados
+        """
+        if not changes:
+            return []
+
+        fields = BulkWriteService._apply_changes(changes)
+        products = [product for product, _ in changes]
+        for product in products:
+            product.prepare_financials()
+        fields |= {'system_expenses', 'system_profit'}
+
+        with transaction.atomic():
+            Product.objects.bulk_update(products, sorted(fields))
+            if 'agent' in fields:
+                AgentOwnershipService.restamp_movements(product.pk for product in products)
+            if fields & PRODUCT_INDEXED_FIELDS:
+                SearchService.index_instances(products)
+            BulkWriteService._refresh_order_totals(order)
+
+        return products
+
+    @staticmethod
+    def create_received(package, rows: List[dict]) -> List[ProductReceived]:
+        """
+        Registra varios productos recibidos en un paquete.
+
+        Args:
+            package: Paquete destino
+            rows: Datos validados de cada recepción (sin `package`)
+
+        Returns:
+            List[ProductReceived]: Recepciones creadas
+        """
+        if not rows:
+            return []
+
+        received = AgentOwnershipService.stamp(
+            ProductReceived(**{**data, 'package': package}) for data in rows
+        )
+
+        with transaction.atomic():
+            ProductReceived.objects.bulk_create(received)
+            BulkWriteService.refresh_products(item.original_product_id for item in received)
+            BulkWriteService.notify_products_received(received)
+
+        logger.info(f"{len(received)} productos recibidos en lote en el paquete {package.id}")
+        return received
+
+    @staticmethod
+    def update_received(changes: List[Tuple[ProductReceived, dict]]) -> List[ProductReceived]:
+        """Actualiza varias recepciones y recalcula sus productos y órdenes una sola vez."""
+        if not changes:
+            return []
+
+        fields = BulkWriteService._apply_changes(changes)
+        received = [item for item, _ in changes]
+
+        with transaction.atomic():
+            ProductReceived.objects.bulk_update(received, sorted(fields))
+            BulkWriteService.refresh_products(item.original_product_id for item in received)
+
+        return received
+
+    @staticmethod
+    def create_deliveries(deliver_receip, rows: List[dict]) -> List[ProductDelivery]:
+        """
+        Registra varios productos entregados en un recibo de entrega.
+
+        Args:
+            deliver_receip: Recibo de entrega destino
+            rows: Datos validados de cada entrega (sin `deliver_receip`)
+
+        Returns:
+            List[ProductDelivery]: Entregas creadas
+        """
+        if not rows:
+            return []
+
+        deliveries = AgentOwnershipService.stamp(
+            ProductDelivery(**{**data, 'deliver_receip': deliver_receip}) for data in rows
+        )
+
+        with transaction.atomic():
+            ProductDelivery.objects.bulk_create(deliveries)
+            BulkWriteService.refresh_products(item.original_product_id for item in deliveries)
+
+        logger.info(f"{len(deliveries)} productos entregados en lote en la entrega {deliver_receip.id}")
+        return deliveries
+
+    @staticmethod
+    def update_deliveries(changes: List[Tuple[ProductDelivery, dict]]) -> List[ProductDelivery]:
+        """Actualiza varias entregas y recalcula sus productos y órdenes una sola vez."""
+        if not changes:
+            return []
+
+        fields = BulkWriteService._apply_changes(changes)
+        deliveries = [item for item, _ in changes]
+
+        with transaction.atomic():
+            ProductDelivery.objects.bulk_update(deliveries, sorted(fields))
+            BulkWriteService.refresh_products(item.original_product_id for item in deliveries)
+
+        return deliveries
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _apply_changes(changes) -> set:
+        """
+        Asigna los datos validados a cada instancia y devuelve los campos modificados.
+        Si cambia la relación padre, recalcula también el agente propietario.
+        """
+        now = timezone.now()
+        fields = {'updated_at'}
+        for instance, data in changes:
+            for field, value in data.items():
+                setattr(instance, field, value)
+            instance.updated_at = now
+            fields.update(data)
+
+        model = type(changes[0][0])
+        if OWNERSHIP_PARENT.get(model) in fields:
+            AgentOwnershipService.stamp(instance for instance, _ in changes)
+            fields.add('agent')
+        return fields
+
+    @staticmethod
+    def _refresh_order_totals(order: Order) -> None:
+        """Recalcula el total de la orden (y, vía su señal, el balance del cliente)."""
+        # refresh_from_db descarta los productos precargados por la vista
+        order.refresh_from_db()
+        order.update_total_costs()
+
+    @staticmethod
+    def refresh_products(product_ids: Iterable) -> None:
+        """Recalcula cantidades y estado de los productos y el estado de sus órdenes."""
+        product_ids = set(product_ids)
+        ProductStatusService.recalculate_products_status(product_ids)
+
+        order_ids = Product.objects.filter(pk__in=product_ids).values_list('order_id', flat=True).distinct()
+        for order in Order.objects.filter(pk__in=order_ids):
+            order.update_status_based_on_products()
+
+    @staticmethod
+    def _notify_products_added(order: Order, products: List[Product]) -> None:
+        """Una notificación a cada comprador por lote en lugar de una por producto (vía outbox)."""
+        NotificationOutboxService.enqueue('products.added', {
+            'order_id': order.id,
+            'product_ids': [str(product.id) for product in products],
+        })
+
+    @staticmethod
+    def notify_products_received(received: List[ProductReceived]) -> None:
+        """Una notificación por orden al agente y al cliente con el resumen del lote (vía outbox)."""
+        if received:
+            NotificationOutboxService.enqueue('products.received', {
+                'received_ids': [item.id for item in received],
+            })
@@ -5,10 +5,10 @@ Functions that aggregate and analyze DeliverReceip data for reports and dashboar
 """
 from typing import Dict, Any, List, DefaultDict
 from collections import defaultdict
-from django.db.models.functions import TruncMonth
 from django.utils import timezone
-from django.db.models import Count, F, Sum
+from django.db.models import Count, F, Sum, Case, When, FloatField
 from api.models import DeliverReceip, CustomUser
+from api.services.time_series_service import bucket_series, months_back_start
 
 
 def analyze_deliveries(start_date=None, end_date=None, months_back=12, include_unpaid=True, filter_by_payment_date=False) -> Dict[str, Any]:
@@ -247,41 +247,37 @@ def analyze_deliveries(start_date=None, end_date=None, months_back=12, include_u
     now = timezone.now()
     if not start_date and not end_date:
         end_date = now
-        from datetime import timedelta
-        start_date = (now.replace(day=1) - timedelta(days=months_back * 31)).replace(day=1)
+        start_date = months_back_start(months_back, now)
 
     date_field = 'payment_date' if filter_by_payment_date else 'deliver_date'
-    trend_qs = DeliverReceip.objects.filter(**{f'{date_field}__gte': start_date, f'{date_field}__lte': end_date})
-    trend_qs = trend_qs.annotate(month=TruncMonth(date_field)).values('month').annotate(count=Count('id')).order_by('month')
+    trend_rows = bucket_series(
+        DeliverReceip.objects.all(),
+        date_field,
+        {
+            'total': Sum('weight_cost'),
+            # Ingreso real: payment_amount si hay pago registrado, si no weight_cost
+            'payment_total': Sum(
+                Case(
+                    When(payment_amount__gt=0, then=F('payment_amount')),
+                    default=F('weight_cost'),
+                    output_field=FloatField()
+                )
+            ),
+            'total_weight': Sum('weight'),
+        },
+        granularity='month',
+        start=start_date,
+        end=end_date,
+    )
 
-    monthly_trend: List[Dict[str, Any]] = []
-    monthly_payment_trend: List[Dict[str, Any]] = []
-    
-    # We cannot aggregate derived fields easily in ORM so we iterate for accurate sums per month
-    for row in trend_qs:
-        mo = row['month']
-        mo_start = mo
-        # Filter by month to compute sum
-        month_items = DeliverReceip.objects.filter(**{f'{date_field}__year': mo_start.year, f'{date_field}__month': mo_start.month})
-        month_total = 0.0
-        month_payment_total = 0.0
-        month_weight = 0.0
-        for d in month_items:
-            try:
-                # Calculate expected revenue (weight_cost)
-                month_total += float(d.weight_cost or 0.0)
-                # Calculate actual payment revenue (payment_amount or weight_cost)
-                payment_amt = float(d.payment_amount or 0.0)
-                month_payment_total += payment_amt if payment_amt > 0 else float(d.weight_cost or 0.0)
-            except Exception:
-                month_total += 0.0
-                month_payment_total += 0.0
-            try:
-                month_weight += float(d.weight or 0.0)
-            except Exception:
-                month_weight += 0.0
-        monthly_trend.append({'month': mo.strftime('%Y-%m') if mo else None, 'total': float(month_total), 'total_weight': float(month_weight)})
-        monthly_payment_trend.append({'month': mo.strftime('%Y-%m') if mo else None, 'total': float(month_payment_total), 'total_weight': float(month_weight)})
+    monthly_trend: List[Dict[str, Any]] = [
+        {'month': row['label'], 'total': float(row['total']), 'total_weight': float(row['total_weight'])}
+        for row in trend_rows
+    ]
+    monthly_payment_trend: List[Dict[str, Any]] = [
+        {'month': row['label'], 'total': float(row['payment_total']), 'total_weight': float(row['total_weight'])}
+        for row in trend_rows
+    ]
 
     # Convert agent_profits to list and sort by total_revenue (descending)
     agent_breakdown = sorted(
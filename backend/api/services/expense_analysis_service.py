@@ -4,9 +4,9 @@ Service: Expense analysis helpers
 Functions that aggregate and analyze Expense data for reports and dashboards.
 """
 from django.db.models import Sum, Avg
-from django.db.models.functions import TruncMonth
 from django.utils import timezone
 from api.models import Expense
+from api.services.time_series_service import bucket_series, months_back_start
 
 
 def analyze_expenses(start_date=None, end_date=None, months_back=12):
@@ -40,17 +40,22 @@ def analyze_expenses(start_date=None, end_date=None, months_back=12):
     if not start_date and not end_date:
         # build last months_back months window
         end_date = now
-        from datetime import timedelta
-        start_date = (now.replace(day=1) - timedelta(days=months_back*31)).replace(day=1)
+        start_date = months_back_start(months_back, now)
 
-    trend_qs = Expense.objects.filter(date__gte=start_date, date__lte=end_date)
-    trend_qs = trend_qs.annotate(month=TruncMonth('date')).values('month').annotate(total=Sum('amount')).order_by('month')
+    trend_rows = bucket_series(
+        Expense.objects.all(),
+        'date',
+        {'total': Sum('amount')},
+        granularity='month',
+        start=start_date,
+        end=end_date,
+    )
     monthly_trend = [
         {
-            'month': row['month'].strftime('%Y-%m') if row['month'] else None,
-            'total': float(row['total']) if row['total'] else 0.0,
+            'month': row['label'],
+            'total': float(row['total']),
         }
-        for row in trend_qs
+        for row in trend_rows
     ]
 
     return {
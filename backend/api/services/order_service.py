@@ -4,11 +4,39 @@ Service: Order financial analysis helpers
 Functions that aggregate and analyze Order data for reports and dashboards.
 """
 from typing import Dict, Any, List, Optional
-from datetime import datetime, timedelta
-from django.db.models import Sum, Count, Case, When, FloatField, Q, Avg, Subquery, OuterRef
-from django.db.models.functions import TruncMonth
+from datetime import datetime
+from django.db.models import Sum, Count, Case, When, FloatField, Q, Avg, Subquery, OuterRef, F, QuerySet
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from api.models import Order, Product
+from api.services.time_series_service import bucket_series, months_back_start
+
+
+def annotate_product_financials(queryset: QuerySet) -> QuerySet:
+    """
+    Annotate orders with the SQL-side sum of their products' system expenses and profit.
+
+    Adds `products_system_expenses_total` and `products_system_profit_total`
+    (SUM(column × amount_purchased)) as correlated subqueries, so the order
+    list can filter and sort by profit without grouping the outer query.
+    Order.total_expenses / Order.total_profit reuse these values when present.
+    """
+    def product_sum(field):
+        return Coalesce(
+            Subquery(
+                Product.objects.filter(order=OuterRef('pk')).order_by().values('order').annotate(
+                    total=Sum(F(field) * F('amount_purchased'), output_field=FloatField())
+                ).values('total')[:1],
+                output_field=FloatField()
+            ),
+            0.0,
+            output_field=FloatField()
+        )
+
+    return queryset.annotate(
+        products_system_expenses_total=product_sum('system_expenses'),
+        products_system_profit_total=product_sum('system_profit'),
+    )
 
 
 def analyze_orders(
@@ -36,7 +64,7 @@ def analyze_orders(
     if not end_date:
         end_date = timezone.now()
     if not start_date:
-        start_date = (end_date.replace(day=1) - timedelta(days=months_back * 31)).replace(day=1)
+        start_date = months_back_start(months_back, end_date)
     
     # Base queryset with date filters
     orders = Order.objects.filter(
@@ -157,24 +185,29 @@ def analyze_orders(
     }
     
     # ===== MONTHLY TRENDS =====
-    monthly_data = orders.annotate(
-        month=TruncMonth('created_at')
-    ).values('month').annotate(
-        order_count=Count('id'),
-        total_revenue=Sum('total_costs'),
-        paid_revenue=Sum(
-            Case(
-                When(pay_status='Pagado', then='received_value_of_client'),
-                default=0,
-                output_field=FloatField()
-            )
-        ),
-        paid_count=Count('id', filter=Q(pay_status='Pagado')),
-    ).order_by('month')
+    monthly_data = bucket_series(
+        orders,
+        'created_at',
+        {
+            'order_count': Count('id'),
+            'total_revenue': Sum('total_costs'),
+            'paid_revenue': Sum(
+                Case(
+                    When(pay_status='Pagado', then='received_value_of_client'),
+                    default=0,
+                    output_field=FloatField()
+                )
+            ),
+            'paid_count': Count('id', filter=Q(pay_status='Pagado')),
+        },
+        granularity='month',
+        start=start_date,
+        end=end_date,
+    )
     
     trends = [
         {
-            'month': row['month'].strftime('%Y-%m'),
+            'month': row['label'],
             'order_count': row['order_count'],
             'total_revenue': round(float(row['total_revenue'] or 0), 2),
             'paid_revenue': round(float(row['paid_revenue'] or 0), 2),
@@ -5,8 +5,11 @@ debuggeabilidad y evitar race conditions.
 """
 
 import logging
+from typing import Iterable, List
 from django.db import transaction
-from api.models import Product
+from django.db.models import F, Sum
+from django.utils import timezone
+from api.models import Product, ProductBuyed, ProductReceived, ProductDelivery
 from api.signals import _determine_product_status
 
 logger = logging.getLogger(__name__)
@@ -142,6 +145,74 @@ class ProductStatusService:
             logger.error(f"Error actualizando producto {product.id}: {e}", exc_info=True)
             raise
     
+    @staticmethod
+    def recalculate_products_status(product_ids: Iterable) -> List[Product]:
+        """
+        Versión por lotes de recalculate_product_status para escrituras masivas.
+
+        Obtiene los totales de compra, recepción y entrega de todos los productos
+        con tres consultas agrupadas y guarda los cambios con un único bulk_update.
+
+        Args:
+            product_ids: IDs de los productos a recalcular
+
+        Returns:
+            List[Product]: Productos cuyo estado o cantidades cambiaron
+        """
+        product_ids = set(product_ids)
+        if not product_ids:
+            return []
+
+        def totals(queryset, expression):
+            return dict(
+                queryset.filter(original_product__in=product_ids).order_by()
+                .values('original_product').annotate(total=Sum(expression))
+                .values_list('original_product', 'total')
+            )
+
+        changed = []
+        with transaction.atomic():
+            # Bloquear los productos antes de leer los totales
+            products = list(Product.objects.select_for_update().filter(pk__in=product_ids))
+            purchased = totals(ProductBuyed.objects, F('amount_buyed') - F('quantity_refuned'))
+            received = totals(ProductReceived.objects, F('amount_received'))
+            delivered = totals(ProductDelivery.objects, F('amount_delivered'))
+
+            for product in products:
+                amount_purchased = max(0, purchased.get(product.pk) or 0)
+                amount_received = received.get(product.pk) or 0
+                amount_delivered = delivered.get(product.pk) or 0
+                new_status = _determine_product_status(
+                    amount_purchased=amount_purchased,
+                    amount_received=amount_received,
+                    amount_delivered=amount_delivered,
+                    amount_requested=product.amount_requested,
+                    current_status=product.status
+                )
+
+                current = (product.amount_purchased, product.amount_received, product.amount_delivered, product.status)
+                if current == (amount_purchased, amount_received, amount_delivered, new_status):
+                    continue
+
+                product.amount_purchased = amount_purchased
+                product.amount_received = amount_received
+                product.amount_delivered = amount_delivered
+                product.status = new_status
+                product.updated_at = timezone.now()
+                changed.append(product)
+
+            if changed:
+                Product.objects.bulk_update(changed, [
+                    'amount_purchased',
+                    'amount_received',
+                    'amount_delivered',
+                    'status',
+                    'updated_at'
+                ])
+                logger.info(f"{len(changed)} productos actualizados en lote")
+
+        return changed
+
     @staticmethod
     def verify_product_consistency(product: Product) -> dict:
         """
@@ -5,12 +5,12 @@ Functions that aggregate and analyze ShoppingReceip data for reports and dashboa
 """
 from typing import Dict, Any, List, DefaultDict
 from collections import defaultdict
-from django.db.models.functions import TruncMonth
 from django.utils import timezone
-from django.db.models import Sum, Count, Q, F, Case, When, Value, CharField, FloatField, IntegerField
-from django.db.models.functions import Coalesce
+from django.db.models import Sum, Count, Q, F, Case, When, Value, CharField, FloatField, IntegerField, DecimalField, OuterRef, Subquery, QuerySet
+from django.db.models.functions import Coalesce, Cast, Round
 from api.models import ShoppingReceip, ProductBuyed
 from api.enums import PaymentStatusEnum
+from api.services.time_series_service import bucket_series, truncate_date
 
 
 def calculate_product_buyed_cost(product_buyed) -> float:
@@ -49,11 +49,74 @@ def calculate_product_buyed_cost(product_buyed) -> float:
     return round(total, 2)
 
 
+def product_buyed_cost_expression():
+    """
+    Expresión SQL equivalente a calculate_product_buyed_cost para una fila de ProductBuyed.
+
+    Se redondea cada fila a 2 decimales como en Python; el redondeo se hace sobre
+    NUMERIC porque PostgreSQL no admite ROUND(double precision, int).
+    """
+    decimal = DecimalField(max_digits=20, decimal_places=6)
+    product = 'original_product__'
+
+    base = F(f'{product}shop_cost') * F('amount_buyed') + F(f'{product}shop_delivery_cost')
+    base_impuesto = Case(
+        When(**{f'{product}charge_iva': False}, then=Value(0.0)),
+        default=base * Value(0.07),
+        output_field=FloatField()
+    )
+    tarifa_tienda = (base + base_impuesto) * F(f'{product}shop_taxes') / Value(100.0)
+    total = base + base_impuesto + tarifa_tienda + F(f'{product}added_taxes') + F(f'{product}own_taxes')
+
+    return Case(
+        When(amount_buyed=F(f'{product}amount_requested'), then=Cast(f'{product}total_cost', decimal)),
+        default=Round(Cast(total, decimal), 2),
+        output_field=decimal
+    )
+
+
+def annotate_receipt_costs(queryset: QuerySet) -> QuerySet:
+    """
+    Annotate shopping receipts with their product costs computed in SQL.
+
+    Adds, as correlated subqueries (no GROUP BY on the outer query):
+    - `buyed_cost_total`: expected cost of every bought product
+    - `buyed_cost_excluding_refunds`: the same, skipping refunded products
+    - `buyed_refunded_total`: sum of refund_amount of refunded products
+
+    ShoppingReceip.total_cost_of_shopping / total_cost_excluding_refunds /
+    total_refunded / real_cost_paid reuse these values when present.
+    """
+    def buyed_sum(expression, condition=Q()):
+        return Coalesce(
+            Subquery(
+                ProductBuyed.objects.filter(condition, shoping_receip=OuterRef('pk')).order_by()
+                .values('shoping_receip').annotate(
+                    total=Cast(Sum(expression), FloatField())
+                ).values('total')[:1],
+                output_field=FloatField()
+            ),
+            0.0,
+            output_field=FloatField()
+        )
+
+    cost = product_buyed_cost_expression()
+    return queryset.annotate(
+        buyed_cost_total=buyed_sum(cost),
+        buyed_cost_excluding_refunds=buyed_sum(cost, Q(is_refunded=False) | Q(is_refunded__isnull=True)),
+        buyed_refunded_total=buyed_sum(F('refund_amount'), Q(is_refunded=True)),
+    )
+
+
 def get_receipt_expected_cost(purchase) -> float:
     """
     Calcula el costo esperado de un recibo de compra, excluyendo productos reembolsados.
     Usa la lógica de cálculo proporcional.
     """
+    annotated = getattr(purchase, 'buyed_cost_excluding_refunds', None)
+    if annotated is not None:
+        return round(float(annotated), 2)
+
     total = 0.0
     for product_buyed in purchase.buyed_products.select_related('original_product').filter(
         Q(is_refunded=False) | Q(is_refunded__isnull=True)
@@ -80,17 +143,15 @@ def analyze_purchases(start_date=None, end_date=None, months_back=12) -> Dict[st
     if end_date:
         qs = qs.filter(buy_date__lte=end_date)
 
-    # 2. Annotate with Refund Totals and product count
-    annotated_qs = qs.annotate(
+    # 2. Annotate with Refund Totals, product count and expected cost (SQL)
+    annotated_qs = annotate_receipt_costs(qs.annotate(
         receipt_refunded=Coalesce(
             Sum('buyed_products__refund_amount', filter=Q(buyed_products__is_refunded=True)),
             0.0,
             output_field=FloatField()
         ),
         products_count=Count('buyed_products')
-    ).select_related('shop_of_buy', 'shopping_account').prefetch_related(
-        'buyed_products__original_product'
-    ).order_by('buy_date')
+    )).select_related('shop_of_buy', 'shopping_account').order_by('buy_date')
 
     # 3. Aggregation in Python to avoid "Sum over Sum" and Join Duplicate errors
     total_count = 0
@@ -103,10 +164,10 @@ def analyze_purchases(start_date=None, end_date=None, months_back=12) -> Dict[st
     card_breakdown = {}
     by_payment_status = {}
     by_account = {}
-    trend_map = defaultdict(lambda: {'count': 0, 'expected': 0.0, 'gross': 0.0, 'refunded': 0.0})
+    expected_by_month = defaultdict(float)
 
     for purchase in annotated_qs:
-        # Calcular el costo esperado usando la nueva lógica
+        # Costo esperado calculado en SQL (annotate_receipt_costs)
         expected = get_receipt_expected_cost(purchase)
         gross = float(purchase.total_cost_of_purchase or 0.0)
         refunded = float(purchase.receipt_refunded or 0.0)
@@ -184,12 +245,8 @@ def analyze_purchases(start_date=None, end_date=None, months_back=12) -> Dict[st
         by_account[acc_name]['total_refunded'] += refunded
         by_account[acc_name]['total_real_cost_paid'] += (gross - refunded)
         
-        # Monthly Trend
-        month_key = purchase.buy_date.strftime('%Y-%m')
-        trend_map[month_key]['count'] += 1
-        trend_map[month_key]['expected'] += expected
-        trend_map[month_key]['gross'] += gross
-        trend_map[month_key]['refunded'] += refunded
+        # Monthly Trend: costo esperado por mes
+        expected_by_month[truncate_date(purchase.buy_date, 'month')] += expected
 
     # Finalize derived metrics
     total_net = total_gross - total_refunded
@@ -200,16 +257,39 @@ def analyze_purchases(start_date=None, end_date=None, months_back=12) -> Dict[st
         if s_data['count'] > 0:
             s_data['avg_amount'] = s_data['total_amount'] / s_data['count']
 
-    # Convert Trend Map to list
+    # Monthly Trend: conteo, bruto y reembolsos en una sola consulta agrupada.
+    # El reembolso se suma con una subconsulta por recibo para no duplicar
+    # total_cost_of_purchase con el JOIN a buyed_products.
+    receipt_refunds = ProductBuyed.objects.filter(
+        shoping_receip=OuterRef('pk'),
+        is_refunded=True
+    ).values('shoping_receip').annotate(
+        total=Sum('refund_amount')
+    ).values('total')
+
+    trend_rows = bucket_series(
+        qs,
+        'buy_date',
+        {
+            'count': Count('id'),
+            'gross': Sum('total_cost_of_purchase'),
+            'refunded': Sum(Coalesce(Subquery(receipt_refunds), 0.0, output_field=FloatField())),
+        },
+        granularity='month',
+        start=start_date,
+        end=end_date,
+    )
+
     monthly_trend = []
-    for m_key in sorted(trend_map.keys()):
-        m_data = trend_map[m_key]
+    for row in trend_rows:
+        gross = float(row['gross'])
+        refunded = float(row['refunded'])
         monthly_trend.append({
-            'month': m_key,
-            'count': m_data['count'],
-            'total_purchase_amount': m_data['expected'],
-            'total_refunded': m_data['refunded'],
-            'net_cost': m_data['gross'] - m_data['refunded']
+            'month': row['label'],
+            'count': row['count'],
+            'total_purchase_amount': expected_by_month.get(row['bucket'], 0.0),
+            'total_refunded': refunded,
+            'net_cost': gross - refunded
         })
 
     # Refund Analysis
@@ -257,67 +337,66 @@ def get_purchases_summary(start_date=None, end_date=None) -> Dict[str, Any]:
     }
 
 
-def analyze_product_buys(start_date=None, end_date=None) -> Dict[str, Any]:
-    """Analyze individual product purchases with refund metrics."""
+def analyze_product_buys(start_date=None, end_date=None, top_n=10) -> Dict[str, Any]:
+    """Analyze individual product purchases with refund metrics.
+
+    Totals come from a single conditional aggregate and the most refunded
+    products from a GROUP BY product name ordered by refunded amount, so
+    the cost does not grow with the purchase history.
+
+    Args:
+        start_date (datetime, optional): Start of the range
+        end_date (datetime, optional): End of the range
+        top_n (int): Number of most refunded products to return
+
+    Returns:
+        dict: totals plus `top_refunded_products` keyed by product name, ordered
+              by total refunded amount (descending)
+    """
     qs = ProductBuyed.objects.all()
     if start_date:
         qs = qs.filter(buy_date__gte=start_date)
     if end_date:
         qs = qs.filter(buy_date__lte=end_date)
 
-    total_buys = qs.count()
-    total_amount_buyed = 0.0
-    total_cost = 0.0
-    total_refunded_items = 0
-    total_refund_amount = 0.0
-
-    for buy in qs:
-        try:
-            total_amount_buyed += buy.amount_buyed
-        except Exception:
-            pass
-        
-        try:
-            total_cost += buy.amount_buyed
-        except Exception:
-            pass
-        
-        if buy.is_refunded:
-            total_refunded_items += buy.amount_buyed
-            try:
-                total_refund_amount += float(buy.refund_amount or 0.0)
-            except Exception:
-                pass
-
-    # By refund status
-    refunded_count = qs.filter(is_refunded=True).count()
+    refunded = Q(is_refunded=True)
+    totals = qs.aggregate(
+        total_buys=Count('id'),
+        total_amount_buyed=Coalesce(Sum('amount_buyed'), 0),
+        total_refunded_items=Coalesce(Sum('amount_buyed', filter=refunded), 0),
+        total_refund_amount=Coalesce(Sum('refund_amount', filter=refunded), 0.0, output_field=FloatField()),
+        refunded_count=Count('id', filter=refunded),
+    )
+
+    total_buys = totals['total_buys']
+    refunded_count = totals['refunded_count']
     non_refunded_count = total_buys - refunded_count
     refund_percentage = (refunded_count / total_buys * 100) if total_buys else 0.0
 
-    # Top refunded products
-    top_refunded = {}
-    refunded_products = qs.filter(is_refunded=True).select_related('original_product')
-    for buy in refunded_products:
-        product_name = buy.original_product.name if buy.original_product else 'Unknown'
-        
-        if product_name not in top_refunded:
-            top_refunded[product_name] = {
-                'refund_count': 0,
-                'total_refund_amount': 0.0,
-            }
-        
-        top_refunded[product_name]['refund_count'] += 1
-        try:
-            top_refunded[product_name]['total_refund_amount'] += float(buy.refund_amount or 0.0)
-        except Exception:
-            pass
+    # Top refunded products. Se agrupa por nombre (la clave del resultado)
+    # antes de ordenar y limitar, de modo que productos con el mismo nombre
+    # suman en SQL y el ranking y el límite se aplican a esa misma clave
+    top_refunded_qs = qs.filter(refunded).values(
+        'original_product__name'
+    ).annotate(
+        refund_count=Count('id'),
+        total_refund_amount=Coalesce(Sum('refund_amount'), 0.0, output_field=FloatField()),
+    ).order_by('-total_refund_amount', '-refund_count', 'original_product__name')[:max(int(top_n), 0)]
+
+    top_refunded = {
+        row['original_product__name'] or 'Unknown': {
+            'refund_count': row['refund_count'],
+            'total_refund_amount': float(row['total_refund_amount'] or 0.0),
+        }
+        for row in top_refunded_qs
+    }
 
     return {
         'total_product_buys': int(total_buys),
-        'total_amount_buyed': float(total_amount_buyed),
-        'total_cost': float(total_cost),
-        'total_refunded_items': int(total_refunded_items),
-        'total_refund_amount': float(total_refund_amount),
+        'total_amount_buyed': float(totals['total_amount_buyed']),
+        'total_cost': float(totals['total_amount_buyed']),
+        'total_refunded_items': int(totals['total_refunded_items']),
+        'total_refund_amount': float(totals['total_refund_amount']),
         'refunded_purchases_count': int(refunded_count),
         'non_refunded_purchases_count': int(non_refunded_count),
         'refund_percentage': float(refund_percentage),
@@ -0,0 +1,235 @@
+"""Service for the daily financial rollup table"""
+
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, Any, Iterable, Optional
+
+from django.db import transaction
+from django.db.models import Sum, Count, F, DecimalField, ExpressionWrapper, FloatField
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from api.models import (
+    DailyFinancialRollup, DeliverReceip, Order, ShoppingReceip, ProductBuyed, Invoice, Tag
+)
+
+
+MONEY_FIELDS = (
+    'total_weight',
+    'total_delivery_cost',
+    'total_revenue',
+    'total_order_balance',
+    'total_purchase_cost',
+    'total_invoices_amount',
+    'total_tag_weight',
+    'total_fixed_cost',
+    'total_tag_subtotal',
+    'total_shipping_cost',
+)
+
+COUNT_FIELDS = (
+    'deliveries_count',
+    'orders_count',
+    'shopping_receipts_count',
+    'products_bought_count',
+    'invoices_count',
+    'tags_count',
+)
+
+
+def _build_sources() -> Dict[str, Dict[str, Any]]:
+    """
+    Fuentes que alimentan el resumen diario.
+
+    Cada fuente indica el modelo, el campo de fecha que determina el día y los
+    agregados que produce. Los nombres de los agregados coinciden con los campos
+    de DailyFinancialRollup, así el mismo diccionario sirve para recalcular un
+    día (aggregate) y para reconstruir rangos completos (GROUP BY día).
+    """
+    return {
+        'deliveries': {
+            'model': DeliverReceip,
+            'date_field': 'deliver_date',
+            'aggregates': {
+                'deliveries_count': Count('id'),
+                'total_weight': Sum('weight'),
+                'total_delivery_cost': Sum('weight_cost'),
+            },
+        },
+        'orders': {
+            'model': Order,
+            'date_field': 'created_at',
+            'aggregates': {
+                'orders_count': Count('id'),
+                'total_revenue': Sum('received_value_of_client'),
+                'total_order_balance': Sum(
+                    ExpressionWrapper(
+                        F('received_value_of_client') + F('balance_applied') - F('total_costs'),
+                        output_field=FloatField()
+                    )
+                ),
+            },
+        },
+        'purchases': {
+            'model': ShoppingReceip,
+            'date_field': 'buy_date',
+            'aggregates': {
+                'shopping_receipts_count': Count('id'),
+                'total_purchase_cost': Sum('total_cost_of_purchase'),
+            },
+        },
+        'product_buys': {
+            'model': ProductBuyed,
+            'date_field': 'shoping_receip__buy_date',
+            'aggregates': {
+                'products_bought_count': Count('id'),
+            },
+        },
+        'invoices': {
+            'model': Invoice,
+            'date_field': 'date',
+            'aggregates': {
+                'invoices_count': Count('id'),
+                'total_invoices_amount': Sum('total'),
+            },
+        },
+        'tags': {
+            'model': Tag,
+            'date_field': 'invoice__date',
+            'aggregates': {
+                'tags_count': Count('id'),
+                'total_tag_weight': Sum('weight'),
+                'total_fixed_cost': Sum('fixed_cost'),
+                'total_tag_subtotal': Sum('subtotal'),
+                'total_shipping_cost': Sum(
+                    ExpressionWrapper(
+                        F('weight') * F('cost_per_lb'),
+                        output_field=DecimalField(max_digits=14, decimal_places=2)
+                    )
+                ),
+            },
+        },
+    }
+
+
+def _to_decimal(value) -> Decimal:
+    if value is None:
+        return Decimal('0.00')
+    return Decimal(str(value)).quantize(Decimal('0.01'))
+
+
+def _normalize(values: Dict[str, Any]) -> Dict[str, Any]:
+    """Convierte los resultados de los agregados a los tipos de los campos del resumen."""
+    normalized = {}
+    for key, value in values.items():
+        if key in MONEY_FIELDS:
+            normalized[key] = _to_decimal(value)
+        elif key in COUNT_FIELDS:
+            normalized[key] = int(value or 0)
+    return normalized
+
+
+class FinancialRollupService:
+    """
+    Mantiene y consulta la tabla DailyFinancialRollup.
+
+    - refresh_day: recalcula las fuentes indicadas para un único día (se usa desde signals).
+    - backfill: reconstruye el resumen para un rango (o todo el histórico) con un
+      GROUP BY por día y por fuente.
+    - aggregate_range: suma las filas diarias de un rango.
+    """
+
+    SOURCES = _build_sources()
+
+    @staticmethod
+    def to_day(value) -> Optional[date]:
+        """Devuelve el día (en la zona horaria actual) de un datetime o date."""
+        if value is None:
+            return None
+        if isinstance(value, datetime):
+            if timezone.is_aware(value):
+                return timezone.localdate(value)
+            return value.date()
+        if isinstance(value, date):
+            return value
+        return None
+
+    @classmethod
+    def refresh_day(cls, day: date, sources: Optional[Iterable[str]] = None) -> Optional[DailyFinancialRollup]:
+        """
+        Recalcula las fuentes indicadas (todas por defecto) para `day` y guarda la fila.
+
+        Cada fuente es un único aggregate filtrado a ese día.
+        """
+        if day is None:
+            return None
+
+        source_names = list(sources) if sources else list(cls.SOURCES.keys())
+        values: Dict[str, Any] = {}
+        for name in source_names:
+            source = cls.SOURCES[name]
+            qs = source['model'].objects.filter(**{f"{source['date_field']}__date": day})
+            values.update(_normalize(qs.aggregate(**source['aggregates'])))
+
+        rollup, _ = DailyFinancialRollup.objects.update_or_create(day=day, defaults=values)
+        return rollup
+
+    @classmethod
+    def backfill(cls, start: Optional[date] = None, end: Optional[date] = None) -> int:
+        """
+        Reconstruye el resumen diario entre `start` y `end` (inclusive).
+        Sin fechas se reconstruye todo el histórico.
+
+        Returns:
+            int: número de días con datos escritos.
+        """
+        rows: Dict[date, Dict[str, Any]] = defaultdict(dict)
+
+        for source in cls.SOURCES.values():
+            date_field = source['date_field']
+            qs = source['model'].objects.all()
+            if start:
+                qs = qs.filter(**{f'{date_field}__date__gte': start})
+            if end:
+                qs = qs.filter(**{f'{date_field}__date__lte': end})
+
+            grouped = qs.annotate(
+                rollup_day=TruncDate(date_field)
+            ).values('rollup_day').annotate(**source['aggregates']).order_by()
+
+            for row in grouped:
+                day = row.pop('rollup_day')
+                if day is None:
+                    continue
+                rows[day].update(_normalize(row))
+
+        with transaction.atomic():
+            existing = DailyFinancialRollup.objects.all()
+            if start:
+                existing = existing.filter(day__gte=start)
+            if end:
+                existing = existing.filter(day__lte=end)
+            existing.delete()
+
+            DailyFinancialRollup.objects.bulk_create(
+                [DailyFinancialRollup(day=day, **values) for day, values in rows.items()],
+                batch_size=500,
+            )
+
+        return len(rows)
+
+    @staticmethod
+    def aggregate_range(start: date, end: date) -> Dict[str, Any]:
+        """
+        Suma las filas del resumen entre `start` y `end` (inclusive).
+
+        Returns:
+            Dict con un valor Decimal por cada campo monetario y un int por cada contador.
+        """
+        aggregates = {field: Sum(field) for field in MONEY_FIELDS + COUNT_FIELDS}
+        totals = DailyFinancialRollup.objects.filter(
+            day__gte=start,
+            day__lte=end
+        ).aggregate(**aggregates)
+        return _normalize(totals)
@@ -0,0 +1,274 @@
+"""
+Índice de búsqueda de usuarios, pedidos y productos (SearchDocument).
+
+Cada objeto indexado tiene un documento con su texto buscable normalizado
+(minúsculas y sin tildes). La consulta depende del motor:
+
+- PostgreSQL: coincidencia por palabras (tsvector 'simple' con prefijos) o por
+  subcadena (LIKE acelerado por el índice trigram). El ranking combina
+  SearchRank y la similitud trigram.
+- SQLite: tabla FTS5 con prefijos; ranking por bm25.
+- Otros motores (o SQLite sin FTS5): LIKE sobre `content`, sin ranking.
+"""
+
+import re
+import unicodedata
+from typing import Iterable, List, Optional
+
+from django.db import connection
+from django.db.models import BigIntegerField, Q, UUIDField, Value
+from django.db.models.functions import Cast
+
+from api.models import CustomUser, Order, Product, SearchDocument
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Campos cuyo cambio obliga a reindexar (si un save trae update_fields sin
+# ninguno de ellos, el documento no cambia)
+USER_INDEXED_FIELDS = {'name', 'last_name', 'email', 'phone_number', 'role'}
+ORDER_INDEXED_FIELDS = {'client', 'sales_manager'}
+PRODUCT_INDEXED_FIELDS = {'name', 'sku', 'description', 'observation', 'shop', 'category', 'order'}
+
+ENTITY_MODELS = {
+    SearchDocument.ENTITY_USER: CustomUser,
+    SearchDocument.ENTITY_ORDER: Order,
+    SearchDocument.ENTITY_PRODUCT: Product,
+}
+
+
+def normalize_text(value) -> str:
+    """Minúsculas, sin tildes y con los espacios colapsados."""
+    if value is None:
+        return ''
+    text = unicodedata.normalize('NFKD', str(value))
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(text.lower().split())
+
+
+def _join(*parts) -> str:
+    return normalize_text(' '.join(str(part) for part in parts if part))
+
+
+class SearchService:
+    """Mantenimiento y consulta del índice de búsqueda."""
+
+    _fts_available = {}
+
+    # ------------------------------------------------------------------
+    # Documentos
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _user_document(user: CustomUser) -> dict:
+        return {
+            'title': user.full_name,
+            'subtitle': user.email or user.phone_number,
+            'content': _join(user.name, user.last_name, user.email, user.phone_number, user.role),
+        }
+
+    @staticmethod
+    def _order_document(order: Order) -> dict:
+        client = order.client
+        manager = order.sales_manager
+        return {
+            'title': f'Pedido #{order.id}',
+            'subtitle': client.full_name if client else '',
+            'content': _join(
+                order.id,
+                client.name if client else '', client.last_name if client else '',
+                client.email if client else '', client.phone_number if client else '',
+                manager.name if manager else '', manager.last_name if manager else '',
+            ),
+        }
+
+    @staticmethod
+    def _product_document(product: Product) -> dict:
+        shop = product.shop
+        category = product.category
+        return {
+            'title': product.name,
+            'subtitle': f'Pedido #{product.order_id}',
+            'content': _join(
+                product.name, product.sku, product.description, product.observation,
+                shop.name if shop else '', category.name if category else '',
+            ),
+        }
+
+    @staticmethod
+    def _entity_for(instance) -> Optional[str]:
+        for entity_type, model in ENTITY_MODELS.items():
+            if isinstance(instance, model):
+                return entity_type
+        return None
+
+    @staticmethod
+    def build_document(instance) -> SearchDocument:
+        """Documento (sin guardar) de un usuario, pedido o producto."""
+        entity_type = SearchService._entity_for(instance)
+        builder = {
+            SearchDocument.ENTITY_USER: SearchService._user_document,
+            SearchDocument.ENTITY_ORDER: SearchService._order_document,
+            SearchDocument.ENTITY_PRODUCT: SearchService._product_document,
+        }[entity_type]
+        data = builder(instance)
+        return SearchDocument(
+            entity_type=entity_type,
+            object_id=str(instance.pk),
+            title=data['title'][:255],
+            subtitle=(data['subtitle'] or '')[:255],
+            content=data['content'],
+        )
+
+    @staticmethod
+    def index_instances(instances: Iterable) -> int:
+        """
+        Crea o actualiza los documentos de varios objetos con un bulk_create
+        (upsert sobre entity_type + object_id).
+        """
+        documents = [SearchService.build_document(instance) for instance in instances]
+        if not documents:
+            return 0
+        SearchDocument.objects.bulk_create(
+            documents,
+            update_conflicts=True,
+            unique_fields=['entity_type', 'object_id'],
+            update_fields=['title', 'subtitle', 'content', 'updated_at'],
+        )
+        return len(documents)
+
+    @staticmethod
+    def index_instance(instance) -> None:
+        SearchService.index_instances([instance])
+
+    @staticmethod
+    def remove_instance(instance) -> None:
+        entity_type = SearchService._entity_for(instance)
+        SearchDocument.objects.filter(entity_type=entity_type, object_id=str(instance.pk)).delete()
+
+    @staticmethod
+    def reindex_user_orders(user: CustomUser) -> int:
+        """Los pedidos incluyen datos del cliente y del agente: se reindexan al cambiar estos."""
+        orders = Order.objects.filter(Q(client=user) | Q(sales_manager=user)).select_related('client', 'sales_manager')
+        return SearchService.index_instances(orders.iterator(chunk_size=500))
+
+    @staticmethod
+    def rebuild(batch_size: int = 500) -> dict:
+        """Reconstruye el índice completo. Devuelve el número de documentos por tipo."""
+        querysets = {
+            SearchDocument.ENTITY_USER: CustomUser.objects.all(),
+            SearchDocument.ENTITY_ORDER: Order.objects.select_related('client', 'sales_manager'),
+            SearchDocument.ENTITY_PRODUCT: Product.objects.select_related('shop', 'category'),
+        }
+        SearchDocument.objects.all().delete()
+        counts = {}
+        for entity_type, queryset in querysets.items():
+            batch, total = [], 0
+            for instance in queryset.iterator(chunk_size=batch_size):
+                batch.append(instance)
+                if len(batch) >= batch_size:
+                    total += SearchService.index_instances(batch)
+                    batch = []
+            total += SearchService.index_instances(batch)
+            counts[entity_type] = total
+        return counts
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def tokenize(query: str) -> List[str]:
+        return _TOKEN_RE.findall(normalize_text(query))
+
+    @classmethod
+    def _has_fts(cls) -> bool:
+        alias = connection.alias
+        if alias not in cls._fts_available:
+            cls._fts_available[alias] = 'api_searchdocument_fts' in connection.introspection.table_names()
+        return cls._fts_available[alias]
+
+    @staticmethod
+    def _sqlite_matches(tokens: List[str], entity_types: Iterable[str], limit: Optional[int]):
+        """(entity_type, object_id, rank) desde FTS5, mejor rank primero."""
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        entity_types = list(entity_types)
+        placeholders = ', '.join(['%s'] * len(entity_types))
+        sql = (
+            "SELECT d.entity_type, d.object_id, -bm25(api_searchdocument_fts) AS score "
+            "FROM api_searchdocument_fts JOIN api_searchdocument d ON d.id = api_searchdocument_fts.rowid "
+            f"WHERE api_searchdocument_fts MATCH %s AND d.entity_type IN ({placeholders}) "
+            "ORDER BY score DESC"
+        )
+        params = [match, *entity_types]
+        if limit:
+            sql += " LIMIT %s"
+            params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    @staticmethod
+    def _postgres_documents(tokens: List[str], normalized: str):
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity
+
+        vector = SearchVector('content', config='simple')
+        query = SearchQuery(' & '.join(f'{token}:*' for token in tokens), search_type='raw', config='simple')
+        return (
+            SearchDocument.objects
+            .annotate(vector=vector)
+            .filter(Q(vector=query) | Q(content__contains=normalized))
+            .annotate(rank=SearchRank(vector, query) + TrigramWordSimilarity(Value(normalized), 'content'))
+        )
+
+    @staticmethod
+    def search(query: str, entity_types: Optional[Iterable[str]] = None, limit: Optional[int] = None) -> List[tuple]:
+        """
+        Documentos que coinciden con la búsqueda, ordenados por relevancia.
+
+        Returns:
+            List[tuple]: (entity_type, object_id, rank)
+        """
+        entity_types = list(entity_types or ENTITY_MODELS)
+        tokens = SearchService.tokenize(query)
+        if not tokens:
+            return []
+        normalized = ' '.join(tokens)
+
+        if connection.vendor == 'sqlite' and SearchService._has_fts():
+            return SearchService._sqlite_matches(tokens, entity_types, limit)
+
+        if connection.vendor == 'postgresql':
+            documents = SearchService._postgres_documents(tokens, normalized).order_by('-rank', 'id')
+        else:
+            documents = SearchDocument.objects.filter(content__contains=normalized).annotate(rank=Value(0.0)).order_by('id')
+
+        documents = documents.filter(entity_type__in=entity_types).values_list('entity_type', 'object_id', 'rank')
+        return list(documents[:limit] if limit else documents)
+
+    @staticmethod
+    def _pk_cast_field(model):
+        return UUIDField() if isinstance(model._meta.pk, UUIDField) else BigIntegerField()
+
+    @staticmethod
+    def filter_queryset(queryset, entity_type: str, query: str):
+        """
+        Filtra un queryset de CustomUser, Order o Product por el índice de búsqueda,
+        manteniendo su orden.
+        """
+        tokens = SearchService.tokenize(query)
+        if not tokens:
+            return queryset
+
+        model = ENTITY_MODELS[entity_type]
+        if connection.vendor == 'postgresql':
+            # Subconsulta: el filtro se resuelve en la base de datos con el índice
+            ids = (
+                SearchService._postgres_documents(tokens, ' '.join(tokens))
+                .filter(entity_type=entity_type)
+                .values_list(Cast('object_id', output_field=SearchService._pk_cast_field(model)), flat=True)
+            )
+            return queryset.filter(pk__in=ids)
+
+        pk_field = model._meta.pk
+        ids = [pk_field.to_python(object_id) for _, object_id, _ in SearchService.search(query, [entity_type])]
+        return queryset.filter(pk__in=ids)
@@ -0,0 +1,168 @@
+"""
+Service: Time series bucketing helpers
+
+Shared engine used by every trend chart (orders, deliveries, purchases,
+expenses, profit reports). A series is built from a single grouped query
+(Trunc + GROUP BY) and then gap-filled in Python, so empty buckets show up
+as zeros and all reports agree on bucket boundaries.
+
+Buckets are computed in the current Django timezone: a record created at
+23:30 local time on the last day of a month belongs to that month, no matter
+what UTC says.
+"""
+from datetime import date, datetime, timedelta
+from typing import Dict, Any, List, Optional, Iterator, Union
+
+from django.db.models import DateField, QuerySet
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+
+GRANULARITIES = ('day', 'week', 'month')
+
+LABEL_FORMATS = {
+    'day': '%Y-%m-%d',
+    'week': '%Y-%m-%d',
+    'month': '%Y-%m',
+}
+
+
+def _validate_granularity(granularity: str) -> None:
+    if granularity not in GRANULARITIES:
+        raise ValueError(
+            f"Granularidad inválida: {granularity}. Opciones válidas: {', '.join(GRANULARITIES)}"
+        )
+
+
+def _local_date(value: Union[date, datetime]) -> date:
+    """Convierte un datetime/date al día local (zona horaria actual)."""
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            return timezone.localdate(value)
+        return value.date()
+    return value
+
+
+def truncate_date(value: Union[date, datetime], granularity: str = 'month') -> date:
+    """
+    Devuelve el inicio del bucket que contiene `value`.
+
+    - day: el mismo día
+    - week: el lunes de esa semana (igual que TruncWeek / ISO 8601)
+    - month: el día 1 del mes
+    """
+    _validate_granularity(granularity)
+    day = _local_date(value)
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(bucket: date, granularity: str = 'month') -> date:
+    """Devuelve el inicio del bucket siguiente a `bucket`."""
+    _validate_granularity(granularity)
+    if granularity == 'day':
+        return bucket + timedelta(days=1)
+    if granularity == 'week':
+        return bucket + timedelta(days=7)
+    if bucket.month == 12:
+        return bucket.replace(year=bucket.year + 1, month=1, day=1)
+    return bucket.replace(month=bucket.month + 1, day=1)
+
+
+def iter_buckets(start: Union[date, datetime], end: Union[date, datetime], granularity: str = 'month') -> Iterator[date]:
+    """Itera los inicios de bucket entre `start` y `end` (ambos inclusive)."""
+    current = truncate_date(start, granularity)
+    last = truncate_date(end, granularity)
+    while current <= last:
+        yield current
+        current = next_bucket(current, granularity)
+
+
+def months_back_start(months_back: int, end: Optional[datetime] = None) -> datetime:
+    """
+    Inicio (local, 00:00) del mes que queda `months_back` meses antes de `end`.
+
+    Sustituye el cálculo aproximado `now - timedelta(days=months_back * 31)`.
+    """
+    end = end or timezone.now()
+    bucket = truncate_date(end, 'month')
+    year, month = divmod(bucket.year * 12 + bucket.month - 1 - months_back, 12)
+    start = date(year, month + 1, 1)
+    return timezone.make_aware(datetime.combine(start, datetime.min.time()))
+
+
+def bucket_label(bucket: date, granularity: str = 'month') -> str:
+    """Etiqueta de texto del bucket ('2025-01' para meses, '2025-01-06' para días/semanas)."""
+    _validate_granularity(granularity)
+    return bucket.strftime(LABEL_FORMATS[granularity])
+
+
+def bucket_series(
+    queryset: QuerySet,
+    date_field: str,
+    aggregates: Dict[str, Any],
+    granularity: str = 'month',
+    start: Optional[Union[date, datetime]] = None,
+    end: Optional[Union[date, datetime]] = None,
+    fill_value: Any = 0,
+) -> List[Dict[str, Any]]:
+    """
+    Construye una serie temporal densa a partir de un queryset.
+
+    Args:
+        queryset: Queryset base (ya filtrado por el llamador si hace falta)
+        date_field: Campo de fecha que determina el bucket (admite lookups, p.ej. 'invoice__date')
+        aggregates: Agregados a calcular por bucket ({'total': Sum('amount'), ...})
+        granularity: 'day', 'week' o 'month'
+        start: Inicio del rango. Si se indica, también filtra el queryset
+        end: Fin del rango (inclusive). Si se indica, también filtra el queryset
+        fill_value: Valor usado para agregados nulos y buckets sin datos
+
+    Returns:
+        Lista ordenada de dicts con 'bucket' (date), 'label' (str) y un valor por agregado.
+        Sin start/end, la serie cubre desde el primer hasta el último bucket con datos.
+    """
+    _validate_granularity(granularity)
+
+    if start is not None:
+        queryset = queryset.filter(**{f'{date_field}__gte': start})
+    if end is not None:
+        queryset = queryset.filter(**{f'{date_field}__lte': end})
+
+    grouped = queryset.annotate(
+        _bucket=Trunc(
+            date_field,
+            granularity,
+            output_field=DateField(),
+            tzinfo=timezone.get_current_timezone(),
+        )
+    ).values('_bucket').annotate(**aggregates).order_by('_bucket')
+
+    rows: Dict[date, Dict[str, Any]] = {}
+    for row in grouped:
+        bucket = row.pop('_bucket')
+        if bucket is None:
+            continue
+        rows[bucket] = {
+            key: (fill_value if value is None else value)
+            for key, value in row.items()
+        }
+
+    if not rows and (start is None or end is None):
+        return []
+
+    first = start if start is not None else min(rows)
+    last = end if end is not None else max(rows)
+
+    series = []
+    for bucket in iter_buckets(first, last, granularity):
+        values = rows.get(bucket) or {key: fill_value for key in aggregates}
+        series.append({
+            'bucket': bucket,
+            'label': bucket_label(bucket, granularity),
+            **values,
+        })
+    return series
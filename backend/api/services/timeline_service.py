@@ -0,0 +1,122 @@
+"""
+Timeline de productos (registro, compra, recepción y entrega) calculada por lotes.
+
+En lugar de consultar exists(), first() y aggregate() por producto y tipo de
+movimiento, se ejecuta una consulta agrupada por tipo (fecha del primer
+movimiento y cantidad total por producto) para todos los productos a la vez:
+tres consultas para la timeline de un producto o de todos los de un pedido.
+"""
+
+from collections import defaultdict
+from typing import Dict, Iterable, List
+
+from django.db.models import Min, Sum
+
+from api.models import Product, ProductBuyed, ProductDelivery, ProductReceived
+
+TIMELINE_STATUS_CONFIG = {
+    'created': {
+        'label': 'Registro Creado',
+        'icon': 'check-circle-2',
+        'color': 'text-gray-600',
+        'bgColor': 'bg-gray-100',
+    },
+    'purchased': {
+        'label': 'Comprado',
+        'icon': 'shopping-cart',
+        'color': 'text-blue-600',
+        'bgColor': 'bg-blue-100',
+    },
+    'received': {
+        'label': 'Recibido',
+        'icon': 'package',
+        'color': 'text-yellow-600',
+        'bgColor': 'bg-yellow-100',
+    },
+    'delivered': {
+        'label': 'Entregado',
+        'icon': 'truck',
+        'color': 'text-green-600',
+        'bgColor': 'bg-green-100',
+    },
+}
+
+# Evento → (modelo, campo de fecha, campo de cantidad, acumulado en Product, descripción)
+_MOVEMENTS = (
+    ('purchased', ProductBuyed, 'buy_date', 'amount_buyed', 'amount_purchased',
+     'Se compraron {} unidad(es) del producto'),
+    ('received', ProductReceived, 'created_at', 'amount_received', 'amount_received',
+     'Se recibieron {} unidad(es) del producto'),
+    ('delivered', ProductDelivery, 'created_at', 'amount_delivered', 'amount_delivered',
+     'Se entregaron {} unidad(es) al cliente'),
+)
+
+
+class ProductTimelineService:
+    """Construcción de la timeline de uno o varios productos."""
+
+    @staticmethod
+    def movement_summaries(product_ids: Iterable) -> Dict[object, Dict[str, dict]]:
+        """
+        Primer movimiento y cantidad total por producto y tipo de movimiento.
+
+        Returns:
+            dict: {product_id: {'purchased': {'date', 'total'}, 'received': ..., 'delivered': ...}}
+        """
+        product_ids = list(product_ids)
+        summaries = defaultdict(dict)
+        if not product_ids:
+            return summaries
+
+        for event, model, date_field, amount_field, _, _ in _MOVEMENTS:
+            rows = (
+                model.objects
+                .filter(original_product_id__in=product_ids)
+                .order_by()
+                .values('original_product')
+                .annotate(first_date=Min(date_field), total=Sum(amount_field))
+            )
+            for row in rows:
+                summaries[row['original_product']][event] = {
+                    'date': row['first_date'],
+                    'total': row['total'] or 0,
+                }
+        return summaries
+
+    @staticmethod
+    def build_events(product: Product, movements: Dict[str, dict]) -> List[dict]:
+        """
+        Eventos de la timeline de un producto, ordenados por fecha y listos para
+        renderizar en el frontend.
+
+        Args:
+            product: Producto
+            movements: Resumen de sus movimientos (ver movement_summaries)
+        """
+        def event(status, date, description):
+            config = TIMELINE_STATUS_CONFIG[status]
+            return {
+                'status': status,
+                'date': date.isoformat(),
+                'label': config['label'],
+                'description': description,
+                'icon': config['icon'],
+                'color': config['color'],
+                'bgColor': config['bgColor'],
+                'isCompleted': True,
+            }
+
+        events = []
+        if product.created_at:
+            events.append(event('created', product.created_at, 'El producto fue registrado en el sistema'))
+
+        for status, _, _, _, product_amount_field, description in _MOVEMENTS:
+            summary = movements.get(status)
+            product_amount = getattr(product, product_amount_field)
+            if summary is None or not product_amount or product_amount <= 0:
+                continue
+            date = summary['date'] or product.created_at
+            events.append(event(status, date, description.format(int(summary['total']))))
+
+        events.sort(key=lambda item: item['date'])
+        return events
@@ -2,7 +2,8 @@ import logging
 from django.db.models.signals import post_save, post_delete, pre_save
 from django.dispatch import receiver
 from api.models import (
-    Product, Order, ProductBuyed, ProductReceived, ProductDelivery, DeliverReceip, CustomUser
+    Product, Order, ProductBuyed, ProductReceived, ProductDelivery, DeliverReceip, CustomUser,
+    ShoppingReceip, Invoice, Tag
 )
 from api.enums import ProductStatusEnum, OrderStatusEnum
 
@@ -331,3 +332,211 @@ def update_client_balance_on_delivery_delete(sender, instance, **kwargs):
     Actualiza el saldo (balance) del cliente cuando se elimina una entrega.
     """
     _update_client_balance(instance.client)
+
+
+# ============================================================================
+# DAILY FINANCIAL ROLLUP SIGNALS
+# ============================================================================
+
+# Modelo → campo que decide el día (o la relación que lo contiene), lookup hasta
+# la fecha y fuentes de DailyFinancialRollup que hay que recalcular.
+_ROLLUP_TRACKING = {
+    DeliverReceip: {'field': 'deliver_date', 'lookup': 'deliver_date', 'sources': ('deliveries',)},
+    Order: {'field': 'created_at', 'lookup': 'created_at', 'sources': ('orders',)},
+    ShoppingReceip: {'field': 'buy_date', 'lookup': 'buy_date', 'sources': ('purchases', 'product_buys')},
+    ProductBuyed: {'field': 'shoping_receip', 'lookup': 'shoping_receip__buy_date', 'sources': ('product_buys',)},
+    Invoice: {'field': 'date', 'lookup': 'date', 'sources': ('invoices', 'tags')},
+    Tag: {'field': 'invoice', 'lookup': 'invoice__date', 'sources': ('tags',)},
+}
+
+
+def _rollup_current_day(instance, lookup):
+    """Sigue el lookup sobre la instancia y devuelve el día de la fecha encontrada."""
+    from api.services.rollup_service import FinancialRollupService
+
+    value = instance
+    for part in lookup.split('__'):
+        value = getattr(value, part, None)
+        if value is None:
+            return None
+    return FinancialRollupService.to_day(value)
+
+
+def _refresh_rollup_days(days, sources):
+    """Recalcula las fuentes indicadas del resumen diario para cada día afectado."""
+    from api.services.rollup_service import FinancialRollupService
+
+    for day in {d for d in days if d}:
+        try:
+            FinancialRollupService.refresh_day(day, sources)
+        except Exception as e:
+            logger.error(f"Error actualizando resumen financiero del día {day}: {e}", exc_info=True)
+
+
+def _rollup_pre_save(sender, instance, update_fields=None, **kwargs):
+    """
+    Guarda el día anterior de la instancia para poder recalcularlo si la fecha
+    (o la relación que la aporta) cambia. Solo consulta la BD cuando el campo
+    puede cambiar en este save.
+    """
+    from api.services.rollup_service import FinancialRollupService
+
+    config = _ROLLUP_TRACKING[sender]
+    instance._rollup_previous_day = None
+    if instance._state.adding or instance.pk is None:
+        return
+    if update_fields is not None and config['field'] not in update_fields:
+        return
+
+    previous = sender.objects.filter(pk=instance.pk).values_list(config['lookup'], flat=True).first()
+    instance._rollup_previous_day = FinancialRollupService.to_day(previous)
+
+
+def _rollup_post_save(sender, instance, **kwargs):
+    """Recalcula el día actual (y el anterior si cambió) del resumen financiero."""
+    config = _ROLLUP_TRACKING[sender]
+    days = [
+        _rollup_current_day(instance, config['lookup']),
+        getattr(instance, '_rollup_previous_day', None),
+    ]
+    _refresh_rollup_days(days, config['sources'])
+
+
+def _rollup_post_delete(sender, instance, **kwargs):
+    """Recalcula el día de la instancia eliminada en el resumen financiero."""
+    config = _ROLLUP_TRACKING[sender]
+    try:
+        day = _rollup_current_day(instance, config['lookup'])
+    except Exception:
+        # La relación que aporta la fecha puede haberse eliminado en cascada
+        day = None
+    _refresh_rollup_days([day], config['sources'])
+
+
+for _model in _ROLLUP_TRACKING:
+    pre_save.connect(_rollup_pre_save, sender=_model, dispatch_uid=f'rollup_pre_save_{_model.__name__}')
+    post_save.connect(_rollup_post_save, sender=_model, dispatch_uid=f'rollup_post_save_{_model.__name__}')
+    post_delete.connect(_rollup_post_delete, sender=_model, dispatch_uid=f'rollup_post_delete_{_model.__name__}')
+
+
+# ============================================================================
+# SEARCH INDEX SIGNALS
+# ============================================================================
+
+def _touches_indexed_fields(update_fields, indexed_fields):
+    """Un save con update_fields que no incluye campos indexados no cambia el documento."""
+    return update_fields is None or bool(set(update_fields) & indexed_fields)
+
+
+@receiver(post_save, sender=CustomUser)
+def index_user_on_save(sender, instance, created, update_fields=None, **kwargs):
+    """Actualiza el documento de búsqueda del usuario y el de sus pedidos."""
+    from api.services.search_service import SearchService, USER_INDEXED_FIELDS
+
+    if not _touches_indexed_fields(update_fields, USER_INDEXED_FIELDS):
+        return
+    try:
+        SearchService.index_instance(instance)
+        if not created:
+            SearchService.reindex_user_orders(instance)
+    except Exception as e:
+        logger.error(f"Error indexando usuario {instance.pk} para búsqueda: {e}", exc_info=True)
+
+
+@receiver(post_save, sender=Order)
+def index_order_on_save(sender, instance, update_fields=None, **kwargs):
+    from api.services.search_service import SearchService, ORDER_INDEXED_FIELDS
+
+    if not _touches_indexed_fields(update_fields, ORDER_INDEXED_FIELDS):
+        return
+    try:
+        SearchService.index_instance(instance)
+    except Exception as e:
+        logger.error(f"Error indexando pedido {instance.pk} para búsqueda: {e}", exc_info=True)
+
+
+@receiver(post_save, sender=Product)
+def index_product_on_save(sender, instance, update_fields=None, **kwargs):
+    from api.services.search_service import SearchService, PRODUCT_INDEXED_FIELDS
+
+    if not _touches_indexed_fields(update_fields, PRODUCT_INDEXED_FIELDS):
+        return
+    try:
+        SearchService.index_instance(instance)
+    except Exception as e:
+        logger.error(f"Error indexando producto {instance.pk} para búsqueda: {e}", exc_info=True)
+
+
+@receiver(post_delete, sender=CustomUser)
+@receiver(post_delete, sender=Order)
+@receiver(post_delete, sender=Product)
+def remove_search_document_on_delete(sender, instance, **kwargs):
+    from api.services.search_service import SearchService
+
+    SearchService.remove_instance(instance)
+
+
+# ============================================================================
+# AGENT OWNERSHIP SIGNALS
+# ============================================================================
+
+def _agent_pre_save(sender, instance, update_fields=None, **kwargs):
+    """
+    Asigna `agent` desde el padre al crear o cuando el save puede cambiar la
+    relación padre. Marca la instancia si el agente cambió en un objeto existente.
+    """
+    from api.services.agent_ownership_service import AgentOwnershipService, OWNERSHIP_PARENT
+
+    instance._agent_changed = False
+    parent_field = OWNERSHIP_PARENT[sender]
+    if not instance._state.adding and update_fields is not None and parent_field not in update_fields:
+        return
+
+    agent_id = AgentOwnershipService.agent_id_for(instance)
+    if agent_id != instance.agent_id:
+        instance.agent_id = agent_id
+        instance._agent_changed = not instance._state.adding
+
+
+def _agent_post_save(sender, instance, update_fields=None, **kwargs):
+    """Guarda el agente si el save no lo incluía y lo propaga a los hijos."""
+    from api.services.agent_ownership_service import AgentOwnershipService
+
+    if not getattr(instance, '_agent_changed', False):
+        return
+    instance._agent_changed = False
+    if update_fields is not None and 'agent' not in update_fields:
+        sender.objects.filter(pk=instance.pk).update(agent_id=instance.agent_id)
+    if sender is Order:
+        AgentOwnershipService.restamp_order(instance)
+    elif sender is Product:
+        AgentOwnershipService.restamp_movements([instance.pk])
+
+
+for _model in (Order, DeliverReceip, Product, ProductBuyed, ProductReceived, ProductDelivery):
+    pre_save.connect(_agent_pre_save, sender=_model, dispatch_uid=f'agent_pre_save_{_model.__name__}')
+    post_save.connect(_agent_post_save, sender=_model, dispatch_uid=f'agent_post_save_{_model.__name__}')
+
+
+@receiver(pre_save, sender=CustomUser)
+def track_assigned_agent_change(sender, instance, update_fields=None, **kwargs):
+    """Guarda el agente anterior del usuario si este save puede cambiarlo."""
+    instance._previous_assigned_agent_id = instance.assigned_agent_id
+    if instance._state.adding or instance.pk is None:
+        return
+    if update_fields is not None and 'assigned_agent' not in update_fields:
+        return
+    instance._previous_assigned_agent_id = (
+        CustomUser.objects.filter(pk=instance.pk).values_list('assigned_agent', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=CustomUser)
+def restamp_client_agent_on_save(sender, instance, created, **kwargs):
+    """Propaga el nuevo agente del cliente a sus pedidos, entregas, productos y movimientos."""
+    from api.services.agent_ownership_service import AgentOwnershipService
+
+    if created or instance.assigned_agent_id == getattr(instance, '_previous_assigned_agent_id', None):
+        return
+    AgentOwnershipService.restamp_client(instance)
+    instance._previous_assigned_agent_id = instance.assigned_agent_id
@@ -0,0 +1,102 @@
+"""
+Tests for the denormalized agent ownership column (`agent`) on orders,
+deliveries, products and product movements (AgentOwnershipService).
+"""
+
+from django.contrib.auth import get_user_model
+
+from api.tests import BaseAPITestCase
+from api.models import (
+    DeliverReceip, Order, Product, ProductBuyed, ProductDelivery, ProductReceived,
+)
+from api.services.bulk_write_service import BulkWriteService
+
+
+API = '/arye_system/api_data'
+User = get_user_model()
+
+
+class AgentOwnershipTest(BaseAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.other_agent = User.objects.create_user(
+            email='agent2@test.com', phone_number='5555555555', name='Otro',
+            last_name='Agente', password='testpass123', role='agent'
+        )
+        self.customer = User.objects.create_user(
+            email='cliente@test.com', phone_number='6666666666', name='Cliente',
+            last_name='Asignado', password='testpass123', role='client',
+            assigned_agent=self.agent_user
+        )
+        self.order = Order.objects.create(client=self.customer, sales_manager=self.agent_user)
+        self.product = Product.objects.create(
+            name='Producto', shop=self.test_shop, order=self.order,
+            amount_requested=3, shop_cost=10, total_cost=12
+        )
+        self.delivery = DeliverReceip.objects.create(client=self.customer, weight=1)
+        self.movements = [
+            ProductBuyed.objects.create(original_product=self.product, amount_buyed=1),
+            ProductReceived.objects.create(original_product=self.product, amount_received=1),
+            ProductDelivery.objects.create(
+                original_product=self.product, deliver_receip=self.delivery, amount_delivered=1
+            ),
+        ]
+
+    def _owned(self):
+        objects = [self.order, self.product, self.delivery, *self.movements]
+        for obj in objects:
+            obj.refresh_from_db(fields=['agent'])
+        return {type(obj).__name__: obj.agent_id for obj in objects}
+
+    def test_agent_is_stamped_on_creation(self):
+        self.assertEqual(set(self._owned().values()), {self.agent_user.id})
+
+    def test_assign_agent_restamps_client_data(self):
+        self.customer.assign_agent(self.other_agent)
+        self.assertEqual(set(self._owned().values()), {self.other_agent.id})
+
+        self.customer.assigned_agent = None
+        self.customer.save()
+        self.assertEqual(set(self._owned().values()), {None})
+
+    def test_changing_order_client_restamps_products_and_movements(self):
+        other_client = User.objects.create_user(
+            email='cliente2@test.com', phone_number='7777777777', name='Cliente',
+            last_name='Dos', password='testpass123', role='client', assigned_agent=self.other_agent
+        )
+        self.order.client = other_client
+        self.order.save(update_fields=['client'])
+        owned = self._owned()
+        owned.pop('DeliverReceip')
+        self.assertEqual(set(owned.values()), {self.other_agent.id})
+
+    def test_bulk_writes_stamp_agent(self):
+        products = BulkWriteService.create_products(self.order, [
+            {'name': 'Lote 1', 'shop': self.test_shop, 'amount_requested': 1},
+            {'name': 'Lote 2', 'shop': self.test_shop, 'amount_requested': 1},
+        ])
+        self.assertEqual(
+            set(Product.objects.filter(pk__in=[p.pk for p in products]).values_list('agent', flat=True)),
+            {self.agent_user.id}
+        )
+        deliveries = BulkWriteService.create_deliveries(self.delivery, [
+            {'original_product': products[0], 'amount_delivered': 1},
+        ])
+        deliveries[0].refresh_from_db()
+        self.assertEqual(deliveries[0].agent_id, self.agent_user.id)
+
+    def test_agent_endpoints_filter_by_agent_column(self):
+        self.authenticate_user(self.agent_user)
+        endpoints = ['order', 'product', 'delivery_receips', 'buyed_product', 'product_received', 'product_delivery']
+        for endpoint in endpoints:
+            with self.subTest(endpoint):
+                response = self.client.get(f'{API}/{endpoint}/')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.data['count'], 1)
+
+        self.customer.assign_agent(self.other_agent)
+        for endpoint in endpoints:
+            with self.subTest(endpoint):
+                response = self.client.get(f'{API}/{endpoint}/')
+                self.assertEqual(response.data['count'], 0)
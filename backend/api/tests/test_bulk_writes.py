@@ -0,0 +1,180 @@
+"""
+Tests for the bulk write endpoints (order products, package receptions and
+delivery receipt deliveries).
+"""
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.tests import BaseAPITestCase
+from api.models import Order, Product, ProductBuyed, ProductReceived, ProductDelivery, Package, DeliverReceip
+from api.notifications.models_notifications import Notification, NotificationType
+from api.notifications.outbox_notifications import OutboxDispatcher
+
+
+API = '/arye_system/api_data'
+
+
+class BulkWriteTest(BaseAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.admin_user.role = 'admin'
+        self.admin_user.save()
+        self.client_user.role = 'client'
+        self.client_user.save()
+        self.authenticate_user(self.admin_user)
+        self.order = Order.objects.create(client=self.client_user, sales_manager=self.agent_user)
+
+    def _product_payload(self, index, **extra):
+        return {
+            'shop': self.test_shop.id, 'name': f'Producto {index}',
+            'amount_requested': 2, 'shop_cost': 10, 'total_cost': 15.254, **extra,
+        }
+
+    def _purchased_products(self, count):
+        products = []
+        for index in range(count):
+            product = Product.objects.create(
+                name=f'Comprado {index}', shop=self.test_shop, order=self.order,
+                amount_requested=2, shop_cost=10, total_cost=15
+            )
+            ProductBuyed.objects.create(original_product=product, amount_buyed=2)
+            products.append(product)
+        return products
+
+    def test_bulk_create_products_recalculates_order_once(self):
+        items = [self._product_payload(index) for index in range(5)]
+        response = self.client.post(
+            f'{API}/order/{self.order.id}/add_products/', {'products': items}, format='json'
+        )
+
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(len(response.data['created']), 5)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.products.count(), 5)
+        self.assertAlmostEqual(self.order.total_costs, 76.25)
+        product = self.order.products.first()
+        self.assertEqual(product.system_profit, product.calculate_system_profit())
+
+        OutboxDispatcher.dispatch_pending()
+        notifications = Notification.objects.filter(
+            recipient=self.buyer_user, notification_type=NotificationType.PRODUCT_ADDED
+        )
+        self.assertEqual(notifications.count(), 1)
+        self.assertEqual(notifications.get().metadata['count'], 5)
+
+    def test_bulk_create_query_count_does_not_grow_with_items(self):
+        def run(count):
+            order = Order.objects.create(client=self.client_user, sales_manager=self.agent_user)
+            items = [self._product_payload(index) for index in range(count)]
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.post(
+                    f'{API}/order/{order.id}/add_products/', {'products': items}, format='json'
+                )
+            self.assertEqual(response.status_code, 201, response.data)
+            return len(ctx.captured_queries)
+
+        few, many = run(2), run(12)
+        # Solo la validación por elemento (claves de tienda y orden) escala con el lote
+        self.assertLessEqual(many - few, 2 * 10)
+
+    def test_validation_errors_are_reported_per_item(self):
+        items = [self._product_payload(0), self._product_payload(1, amount_requested=0)]
+        response = self.client.post(
+            f'{API}/order/{self.order.id}/add_products/', {'products': items}, format='json'
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['products'][0], {})
+        self.assertIn('amount_requested', response.data['products'][1])
+        self.assertFalse(Product.objects.filter(order=self.order).exists())
+
+    def test_bulk_update_products(self):
+        products = [
+            Product.objects.create(
+                name=f'P{index}', shop=self.test_shop, order=self.order,
+                amount_requested=1, shop_cost=10, total_cost=10
+            )
+            for index in range(3)
+        ]
+        items = [{'id': str(product.id), 'total_cost': 20} for product in products]
+        items.append({'id': 'no-existe', 'total_cost': 1})
+
+        response = self.client.patch(
+            f'{API}/order/{self.order.id}/update_products/', {'products': items}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('id', response.data['products'][3])
+
+        response = self.client.patch(
+            f'{API}/order/{self.order.id}/update_products/', {'products': items[:3]}, format='json'
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.total_costs, 60)
+
+    def test_bulk_receive_updates_statuses_and_notifies_once(self):
+        products = self._purchased_products(3)
+        package = Package.objects.create(agency_name='Agencia', number_of_tracking='T1')
+        items = [{'original_product_id': str(product.id), 'amount_received': 2} for product in products]
+
+        response = self.client.post(
+            f'{API}/package/{package.id}/add_products/', {'products': items}, format='json'
+        )
+
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(ProductReceived.objects.filter(package=package).count(), 3)
+        for product in products:
+            product.refresh_from_db()
+            self.assertEqual(product.amount_received, 2)
+            self.assertEqual(product.status, 'Recibido')
+        OutboxDispatcher.dispatch_pending()
+        self.assertEqual(
+            Notification.objects.filter(
+                recipient=self.client_user, notification_type=NotificationType.PRODUCT_RECEIVED
+            ).count(),
+            1
+        )
+
+    def test_bulk_receive_checks_batch_total(self):
+        product = self._purchased_products(1)[0]
+        package = Package.objects.create(agency_name='Agencia', number_of_tracking='T2')
+        items = [{'original_product_id': str(product.id), 'amount_received': 1}] * 3
+
+        response = self.client.post(
+            f'{API}/package/{package.id}/add_products/', {'products': items}, format='json'
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(all('non_field_errors' in error for error in response.data['products']))
+        self.assertFalse(ProductReceived.objects.exists())
+
+    def test_bulk_deliver_and_update(self):
+        products = self._purchased_products(2)
+        package = Package.objects.create(agency_name='Agencia', number_of_tracking='T3')
+        for product in products:
+            ProductReceived.objects.create(original_product=product, package=package, amount_received=2)
+        delivery = DeliverReceip.objects.create(client=self.client_user, weight=2)
+        items = [{'original_product_id': str(product.id), 'amount_delivered': 1} for product in products]
+
+        response = self.client.post(
+            f'{API}/delivery_receips/{delivery.id}/add_products/', {'products': items}, format='json'
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+
+        items = [
+            {'id': row.id, 'amount_delivered': 2}
+            for row in ProductDelivery.objects.filter(deliver_receip=delivery)
+        ]
+        response = self.client.patch(
+            f'{API}/delivery_receips/{delivery.id}/update_products/', {'products': items}, format='json'
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+
+        for product in products:
+            product.refresh_from_db()
+            self.assertEqual(product.amount_delivered, 2)
+            self.assertEqual(product.status, 'Entregado')
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'Completado')
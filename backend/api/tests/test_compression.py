@@ -0,0 +1,103 @@
+"""
+Tests for the br/gzip response compression middleware.
+"""
+
+import gzip
+import json
+
+import brotli
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from api.tests import BaseAPITestCase
+from api.models import Order
+from api.middleware.compression_middleware import CompressionMiddleware
+
+
+API = '/arye_system/api_data'
+BODY = json.dumps([{'id': index, 'name': f'Producto {index}', 'status': 'Encargado'} for index in range(200)])
+
+
+class CompressionMiddlewareUnitTest(SimpleTestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        CompressionMiddleware.reset_stats()
+
+    def _run(self, response, accept_encoding='br, gzip', path='/arye_system/api_data/order/'):
+        middleware = CompressionMiddleware(lambda request: response)
+        request = self.factory.get(path, HTTP_ACCEPT_ENCODING=accept_encoding)
+        return middleware(request)
+
+    def test_negotiation_prefers_brotli_and_honours_quality(self):
+        self.assertEqual(CompressionMiddleware._negotiate('gzip, deflate, br'), 'br')
+        self.assertEqual(CompressionMiddleware._negotiate('br;q=0.5, gzip'), 'gzip')
+        self.assertEqual(CompressionMiddleware._negotiate('br;q=0, *'), 'gzip')
+        self.assertIsNone(CompressionMiddleware._negotiate('identity'))
+        self.assertIsNone(CompressionMiddleware._negotiate(''))
+
+    def test_compresses_large_json_with_brotli(self):
+        response = self._run(HttpResponse(BODY, content_type='application/json'))
+
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(int(response['Content-Length']), len(response.content))
+        self.assertEqual(brotli.decompress(response.content).decode(), BODY)
+
+        stats = CompressionMiddleware.stats()['br']
+        self.assertEqual(stats['responses'], 1)
+        self.assertEqual(stats['original_bytes'], len(BODY))
+        self.assertLess(stats['ratio'], 0.5)
+        self.assertGreaterEqual(stats['cpu_ms'], 0)
+
+    def test_small_responses_are_not_compressed(self):
+        response = self._run(HttpResponse('{"ok": true}', content_type='application/json'), 'gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    @override_settings(COMPRESSION_GZIP_LEVEL=9)
+    def test_streaming_response_is_compressed_by_chunks(self):
+        chunks = [BODY[index:index + 500].encode() for index in range(0, len(BODY), 500)]
+        response = self._run(StreamingHttpResponse(iter(chunks), content_type='text/csv'), 'gzip')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertFalse(response.has_header('Content-Length'))
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)).decode(), BODY)
+        self.assertEqual(CompressionMiddleware.stats()['gzip']['original_bytes'], len(BODY))
+
+    def test_sse_is_never_compressed(self):
+        response = self._run(
+            StreamingHttpResponse(iter([b'data: {}\n\n']), content_type='text/event-stream'),
+            path='/arye_system/api_data/notifications/stream/'
+        )
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+        response = self._run(StreamingHttpResponse(iter([b'data: {}\n\n']), content_type='text/event-stream'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_already_encoded_responses_are_left_alone(self):
+        original = HttpResponse(BODY, content_type='application/json')
+        original['Content-Encoding'] = 'gzip'
+        response = self._run(original)
+        self.assertEqual(response.content.decode(), BODY)
+
+
+class CompressionIntegrationTest(BaseAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.admin_user.role = 'admin'
+        self.admin_user.save()
+        self.authenticate_user(self.admin_user)
+        for _ in range(30):
+            Order.objects.create(client=self.client_user, sales_manager=self.agent_user)
+
+    def test_api_list_is_compressed_and_metrics_are_exposed(self):
+        response = self.client.get(f'{API}/order/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertGreaterEqual(len(json.loads(gzip.decompress(response.content))['results']), 30)
+
+        response = self.client.get(f'{API}/system/info/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('gzip', response.data['data']['compression'])
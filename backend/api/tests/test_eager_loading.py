@@ -0,0 +1,74 @@
+"""
+Tests for EagerLoadingMixin: list endpoints must run a constant number of
+queries regardless of how many rows are on the page.
+"""
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.tests import BaseAPITestCase
+from api.models import (
+    CustomUser, Order, Product, ProductBuyed, ProductReceived, ProductDelivery,
+    Package, DeliverReceip, Category
+)
+from api.views.mixins import get_eager_loading
+from api.serializers import OrderSerializer
+
+
+API = '/arye_system/api_data'
+
+
+class EagerLoadingTest(BaseAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.admin_user.role = 'admin'
+        self.admin_user.save()
+        self.client_user.assigned_agent = self.agent_user
+        self.client_user.save()
+        self.category = Category.objects.create(name='Ropa', shipping_cost_per_pound=2.0)
+        self.authenticate_user(self.admin_user)
+        self._counter = 0
+
+    def _add_rows(self, count):
+        """Crea `count` órdenes, cada una con producto, compra, recepción, entrega y paquete."""
+        for _ in range(count):
+            self._counter += 1
+            order = Order.objects.create(client=self.client_user, sales_manager=self.agent_user)
+            product = Product.objects.create(
+                name=f'Producto {self._counter}', shop=self.test_shop, order=order,
+                category=self.category, amount_requested=3, shop_cost=10, total_cost=15
+            )
+            ProductBuyed.objects.create(original_product=product, amount_buyed=1)
+            package = Package.objects.create(agency_name='Agencia', number_of_tracking=f'T{self._counter}')
+            ProductReceived.objects.create(original_product=product, package=package, amount_received=1)
+            delivery = DeliverReceip.objects.create(client=self.client_user, category=self.category, weight=2)
+            ProductDelivery.objects.create(original_product=product, deliver_receip=delivery, amount_delivered=1)
+
+    def _count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return len(ctx.captured_queries)
+
+    def test_list_query_count_is_constant(self):
+        endpoints = [
+            'order', 'product', 'buyed_product', 'product_received',
+            'product_delivery', 'package', 'delivery_receips',
+        ]
+        self._add_rows(2)
+        baseline = {name: self._count_queries(f'{API}/{name}/') for name in endpoints}
+
+        self._add_rows(5)
+        for name in endpoints:
+            with self.subTest(endpoint=name):
+                self.assertEqual(self._count_queries(f'{API}/{name}/'), baseline[name])
+
+    def test_nested_relations_are_detected(self):
+        select, prefetch = get_eager_loading(OrderSerializer, Order)
+
+        self.assertIn('client__assigned_agent', select)
+        self.assertIn('sales_manager__assigned_agent', select)
+        self.assertIn('products', prefetch)
+        self.assertIn('products__shop', prefetch)
+        self.assertIn('products__order__client', prefetch)
@@ -0,0 +1,107 @@
+from datetime import timedelta, datetime
+from decimal import Decimal
+
+from django.test import TestCase
+from django.utils import timezone
+
+from api.models import (
+    CustomUser, Order, DeliverReceip, Shop, BuyingAccounts, ShoppingReceip,
+    Invoice, Tag, DailyFinancialRollup
+)
+from api.services.balance_service import BalanceService
+from api.services.rollup_service import FinancialRollupService
+
+
+class DailyFinancialRollupTest(TestCase):
+    def setUp(self):
+        self.client_user = CustomUser.objects.create_user(
+            email='rollup@test.com',
+            phone_number='5550001111',
+            name='Rollup',
+            last_name='Client',
+            password='testpass123',
+            role='client',
+        )
+        self.agent = CustomUser.objects.create_user(
+            email='rollup-agent@test.com',
+            phone_number='5550002222',
+            name='Rollup',
+            last_name='Agent',
+            password='testpass123',
+            role='agent',
+        )
+        self.shop = Shop.objects.create(name='Rollup Shop', link='https://rollup.example.com')
+        self.account = BuyingAccounts.objects.create(account_name='Cuenta', shop=self.shop)
+        self.today = timezone.localdate()
+        self.yesterday = self.today - timedelta(days=1)
+
+    def _at(self, day):
+        return timezone.make_aware(datetime.combine(day, datetime.min.time()).replace(hour=12))
+
+    def test_rollup_maintained_on_write(self):
+        Order.objects.create(client=self.client_user, sales_manager=self.agent, received_value_of_client=80, total_costs=100)
+        DeliverReceip.objects.create(client=self.client_user, weight=10, weight_cost=50)
+        ShoppingReceip.objects.create(
+            shopping_account=self.account, shop_of_buy=self.shop, total_cost_of_purchase=30
+        )
+
+        rollup = DailyFinancialRollup.objects.get(day=self.today)
+        self.assertEqual(rollup.orders_count, 1)
+        self.assertEqual(rollup.total_revenue, Decimal('80.00'))
+        self.assertEqual(rollup.total_order_balance, Decimal('-20.00'))
+        self.assertEqual(rollup.deliveries_count, 1)
+        self.assertEqual(rollup.total_weight, Decimal('10.00'))
+        self.assertEqual(rollup.total_delivery_cost, Decimal('50.00'))
+        self.assertEqual(rollup.total_purchase_cost, Decimal('30.00'))
+
+    def test_rollup_moves_rows_when_date_changes(self):
+        delivery = DeliverReceip.objects.create(client=self.client_user, weight=4, weight_cost=20)
+        delivery.deliver_date = self._at(self.yesterday)
+        delivery.save()
+
+        self.assertEqual(DailyFinancialRollup.objects.get(day=self.today).deliveries_count, 0)
+        self.assertEqual(DailyFinancialRollup.objects.get(day=self.yesterday).deliveries_count, 1)
+
+        delivery.delete()
+        self.assertEqual(DailyFinancialRollup.objects.get(day=self.yesterday).deliveries_count, 0)
+
+    def test_backfill_matches_incremental_rollup(self):
+        Order.objects.create(client=self.client_user, sales_manager=self.agent, received_value_of_client=40, total_costs=10)
+        invoice = Invoice.objects.create(date=self._at(self.yesterday), total=Decimal('90.00'))
+        Tag.objects.create(
+            invoice=invoice, type='t', weight=Decimal('2'), cost_per_lb=Decimal('3.00'),
+            fixed_cost=Decimal('1.00'), subtotal=Decimal('10.00')
+        )
+        expected = {
+            r.day: (r.orders_count, r.total_order_balance, r.invoices_count, r.total_shipping_cost)
+            for r in DailyFinancialRollup.objects.all()
+        }
+
+        DailyFinancialRollup.objects.all().delete()
+        days = FinancialRollupService.backfill()
+
+        self.assertEqual(days, 2)
+        rebuilt = {
+            r.day: (r.orders_count, r.total_order_balance, r.invoices_count, r.total_shipping_cost)
+            for r in DailyFinancialRollup.objects.all()
+        }
+        self.assertEqual(rebuilt, expected)
+
+    def test_balance_range_data_uses_rollup(self):
+        Order.objects.create(client=self.client_user, sales_manager=self.agent, received_value_of_client=150, total_costs=100)
+        DeliverReceip.objects.create(client=self.client_user, weight=3, weight_cost=15)
+        ShoppingReceip.objects.create(
+            shopping_account=self.account, shop_of_buy=self.shop, total_cost_of_purchase=60
+        )
+
+        result = BalanceService.calculate_range_data(
+            self.yesterday.strftime('%Y-%m-%d'), self.today.strftime('%Y-%m-%d')
+        )
+
+        self.assertTrue(result['success'])
+        self.assertEqual(result['total_revenue'], Decimal('150.00'))
+        self.assertEqual(result['total_profit'], Decimal('50.00'))
+        self.assertEqual(result['total_purchase_cost'], Decimal('60.00'))
+        self.assertEqual(result['total_cost'], Decimal('75.00'))
+        self.assertEqual(result['orders_count'], 1)
+        self.assertEqual(result['deliveries_count'], 1)
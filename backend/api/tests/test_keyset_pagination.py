@@ -0,0 +1,92 @@
+"""
+Tests for cursor (keyset) pagination over (created_at, id).
+"""
+
+from datetime import timedelta
+
+from django.utils import timezone
+
+from api.tests import BaseAPITestCase
+from api.models import Order
+
+
+API = '/arye_system/api_data'
+
+
+class KeysetPaginationTest(BaseAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.admin_user.role = 'admin'
+        self.admin_user.save()
+        self.authenticate_user(self.admin_user)
+
+        # Varias órdenes comparten created_at para forzar el desempate por id
+        now = timezone.now()
+        for index in range(7):
+            Order.objects.create(
+                client=self.client_user, sales_manager=self.agent_user,
+                created_at=now - timedelta(minutes=index // 3)
+            )
+        self.expected = list(
+            Order.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+
+    def _get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return response.data
+
+    def _walk_forward(self, url):
+        pages = []
+        while url:
+            data = self._get(url)
+            pages.append(data)
+            url = data['next']
+        return pages
+
+    def test_default_pagination_is_unchanged(self):
+        data = self._get(f'{API}/order/')
+
+        self.assertNotIn('count_is_estimate', data)
+        self.assertEqual(data['count'], len(self.expected))
+
+    def test_cursor_traversal_has_no_gaps_or_duplicates(self):
+        pages = self._walk_forward(f'{API}/order/?pagination=cursor&page_size=2&fields=id')
+        ids = [row['id'] for page in pages for row in page['results']]
+
+        self.assertEqual(ids, self.expected)
+        self.assertIsNone(pages[0]['previous'])
+        self.assertIsNone(pages[-1]['next'])
+
+    def test_previous_link_returns_prior_page(self):
+        first = self._get(f'{API}/order/?pagination=cursor&page_size=3&fields=id')
+        second = self._get(first['next'])
+        back = self._get(second['previous'])
+
+        self.assertEqual(
+            [row['id'] for row in back['results']],
+            [row['id'] for row in first['results']],
+        )
+        self.assertIsNone(back['previous'])
+
+    def test_count_is_exact_on_sqlite(self):
+        data = self._get(f'{API}/order/?pagination=cursor&page_size=2')
+
+        self.assertEqual(data['count'], len(self.expected))
+        self.assertFalse(data['count_is_estimate'])
+
+        data = self._get(f'{API}/order/?pagination=cursor&count=exact&status=nonexistent')
+        self.assertEqual(data['count'], 0)
+        self.assertEqual(data['results'], [])
+
+    def test_invalid_cursor_returns_404(self):
+        response = self.client.get(f'{API}/order/?cursor=not-a-cursor')
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_product_buyed_and_notifications_accept_cursor(self):
+        for name in ('buyed_product', 'product', 'notifications'):
+            with self.subTest(endpoint=name):
+                data = self._get(f'{API}/{name}/?pagination=cursor')
+                self.assertIn('count_is_estimate', data)
@@ -0,0 +1,145 @@
+"""
+Tests for the nested line diff used by shopping receipt, package and delivery
+receipt updates (NestedDiffMixin).
+"""
+
+from unittest import mock
+
+from api.tests import BaseAPITestCase
+from api.models import (
+    DailyFinancialRollup, Order, Product, ProductBuyed, ProductReceived, ProductDelivery, Package,
+    DeliverReceip, ShoppingReceip,
+)
+from api.services.product_status_service import ProductStatusService
+from api.services.rollup_service import FinancialRollupService
+
+
+API = '/arye_system/api_data'
+
+
+class NestedDiffTest(BaseAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.admin_user.role = 'admin'
+        self.admin_user.save()
+        self.client_user.role = 'client'
+        self.client_user.save()
+        self.authenticate_user(self.admin_user)
+        self.order = Order.objects.create(client=self.client_user, sales_manager=self.agent_user)
+        self.products = [
+            Product.objects.create(
+                name=f'Producto {index}', shop=self.test_shop, order=self.order,
+                amount_requested=5, shop_cost=10, total_cost=10
+            )
+            for index in range(3)
+        ]
+        self.receipt = ShoppingReceip.objects.create(
+            shopping_account=self.test_buying_account, shop_of_buy=self.test_shop,
+            total_cost_of_purchase=50
+        )
+        for product in self.products[:2]:
+            ProductBuyed.objects.create(original_product=product, shoping_receip=self.receipt, amount_buyed=2)
+
+    def _receipt_payload(self, lines):
+        return {
+            'shopping_account': self.test_buying_account.id,
+            'shop_of_buy': self.test_shop.name,
+            'total_cost_of_purchase': 50,
+            'buyed_products': lines,
+        }
+
+    def _current_lines(self):
+        return [
+            {'id': line.id, 'original_product': str(line.original_product_id), 'amount_buyed': line.amount_buyed}
+            for line in self.receipt.buyed_products.order_by('id')
+        ]
+
+    def _patch_receipt(self, lines):
+        with mock.patch.object(
+            ProductStatusService, 'recalculate_products_status',
+            wraps=ProductStatusService.recalculate_products_status
+        ) as recalc:
+            response = self.client.patch(
+                f'{API}/shopping_reciep/{self.receipt.id}/', self._receipt_payload(lines), format='json'
+            )
+        self.assertEqual(response.status_code, 200, response.data)
+        return recalc
+
+    def test_unchanged_resubmit_keeps_lines_and_skips_recalculation(self):
+        before = self._current_lines()
+        recalc = self._patch_receipt(before)
+
+        recalc.assert_not_called()
+        self.assertEqual(self._current_lines(), before)
+
+    def test_update_insert_and_delete_recalculate_only_changed_products(self):
+        lines = self._current_lines()
+        lines[0]['amount_buyed'] = 3
+        lines.pop(1)
+        lines.append({'original_product': str(self.products[2].id), 'amount_buyed': 1})
+
+        recalc = self._patch_receipt(lines)
+
+        recalc.assert_called_once()
+        self.assertEqual(
+            set(recalc.call_args.args[0]),
+            {product.id for product in self.products}
+        )
+        amounts = {product.id: product for product in Product.objects.filter(order=self.order)}
+        self.assertEqual(amounts[self.products[0].id].amount_purchased, 3)
+        self.assertEqual(amounts[self.products[1].id].amount_purchased, 0)
+        self.assertEqual(amounts[self.products[2].id].amount_purchased, 1)
+
+        new_line = self.receipt.buyed_products.get(original_product=self.products[2])
+        self.assertEqual(new_line.buy_date, self.receipt.buy_date)
+
+    def test_only_the_edited_line_is_written(self):
+        lines = self._current_lines()
+        untouched = ProductBuyed.objects.get(pk=lines[1]['id'])
+        lines[0]['amount_buyed'] = 4
+
+        recalc = self._patch_receipt(lines)
+
+        self.assertEqual(set(recalc.call_args.args[0]), {self.products[0].id})
+        self.assertEqual(ProductBuyed.objects.get(pk=lines[1]['id']).updated_at, untouched.updated_at)
+
+    def test_deleted_line_updates_product_status_and_daily_rollup(self):
+        day = FinancialRollupService.to_day(self.receipt.buy_date)
+        self.assertEqual(DailyFinancialRollup.objects.get(day=day).products_bought_count, 2)
+        removed = self.products[1]
+        never_bought = self.products[2]
+        lines = self._current_lines()
+        lines[1]['amount_buyed'] = removed.amount_requested
+        self._patch_receipt(lines)
+        removed.refresh_from_db()
+        never_bought.refresh_from_db()
+        self.assertNotEqual(removed.status, never_bought.status)
+
+        self._patch_receipt(self._current_lines()[:1])
+
+        # Los receivers post_delete de la línea siguen ejecutándose
+        removed.refresh_from_db()
+        self.assertEqual((removed.amount_purchased, removed.status), (0, never_bought.status))
+        self.assertEqual(DailyFinancialRollup.objects.get(day=day).products_bought_count, 1)
+
+    def test_package_and_delivery_updates_use_the_diff(self):
+        product = self.products[0]
+        package = Package.objects.create(agency_name='Agencia', number_of_tracking='T1')
+        received = ProductReceived.objects.create(original_product=product, package=package, amount_received=1)
+
+        response = self.client.patch(f'{API}/package/{package.id}/', {
+            'contained_products': [{'id': received.id, 'original_product_id': str(product.id), 'amount_received': 2}]
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(list(package.package_products.values_list('id', 'amount_received')), [(received.id, 2)])
+
+        delivery = DeliverReceip.objects.create(client=self.client_user, weight=1)
+        line = ProductDelivery.objects.create(original_product=product, deliver_receip=delivery, amount_delivered=1)
+        response = self.client.patch(f'{API}/delivery_receips/{delivery.id}/', {'delivered_products': []}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertFalse(ProductDelivery.objects.filter(pk=line.pk).exists())
+
+        product.refresh_from_db()
+        self.assertEqual(product.amount_received, 2)
+        self.assertEqual(product.amount_delivered, 0)
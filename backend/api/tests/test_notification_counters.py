@@ -0,0 +1,210 @@
+"""
+Tests for the per-user notification counters (NotificationCounter) kept by
+NotificationQuerySet/Notification and read by unread_count and stats.
+"""
+
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count, Q
+from django.test.utils import CaptureQueriesContext
+
+from api.tests import BaseAPITestCase
+from api.notifications import counters_notifications
+from api.notifications.counters_notifications import NotificationCounterService
+from api.notifications.grouping_notifications import NotificationGrouper
+from api.notifications.models_notifications import (
+    Notification, NotificationCounter, NotificationPriority, NotificationType,
+)
+from api.notifications.outbox_notifications import OutboxDispatcher
+
+API = '/arye_system/api_data/notifications'
+
+
+class NotificationCounterTest(BaseAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        OutboxDispatcher.dispatch_pending()
+        Notification.objects.all().delete()
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = self.client_user
+
+    def _notify(self, notification_type=NotificationType.ORDER_CREATED, priority=NotificationPriority.NORMAL, **kwargs):
+        return Notification.create_notification(
+            recipient=self.user, notification_type=notification_type, priority=priority,
+            title='Aviso', message='Mensaje', **kwargs
+        )
+
+    def assertCountersMatch(self, user=None):
+        user = user or self.user
+        notifications = Notification.objects.filter(recipient=user)
+        expected = {
+            (row['notification_type'], row['priority']): (row['total'], row['unread'])
+            for row in notifications.order_by().values('notification_type', 'priority').annotate(
+                total=Count('id'), unread=Count('id', filter=Q(is_read=False))
+            )
+        }
+        actual = {
+            (row.notification_type, row.priority): (row.total, row.unread)
+            for row in NotificationCounter.objects.filter(user=user) if row.total or row.unread
+        }
+        self.assertEqual(actual, expected)
+        self.assertEqual(NotificationCounterService.unread_count(user.id), notifications.filter(is_read=False).count())
+
+    def test_counters_follow_creation_and_read_state(self):
+        first = self._notify()
+        self._notify(priority=NotificationPriority.URGENT)
+        Notification.create_bulk_notifications(
+            recipients=[self.user, self.agent_user], notification_type=NotificationType.PAYMENT_RECEIVED,
+            title='Pago', message='Recibido'
+        )
+        self.assertCountersMatch()
+        self.assertCountersMatch(self.agent_user)
+
+        first.mark_as_read()
+        self.assertCountersMatch()
+        first.mark_as_read()  # sin cambio de estado
+        self.assertCountersMatch()
+        Notification.objects.get(pk=first.pk).mark_as_unread()
+        self.assertCountersMatch()
+
+        Notification.objects.filter(recipient=self.user).update(is_read=True)
+        self.assertCountersMatch()
+        self.assertEqual(NotificationCounterService.unread_count(self.user.id), 0)
+        self.assertEqual(NotificationCounterService.summary(self.user.id)['total'], 3)
+
+    def test_outbox_batch_updates_counters(self):
+        from api.models import Order
+
+        Order.objects.create(client=self.user, sales_manager=self.agent_user)
+        OutboxDispatcher.dispatch_pending()
+        self.assertTrue(Notification.objects.filter(recipient=self.user).exists())
+        self.assertCountersMatch()
+        self.assertCountersMatch(self.agent_user)
+
+    def test_endpoints_keep_counters_in_sync(self):
+        self.authenticate_user(self.user)
+        notifications = [self._notify() for _ in range(3)]
+        self._notify(NotificationType.PAYMENT_RECEIVED, NotificationPriority.HIGH)
+
+        response = self.client.post(f'{API}/{notifications[0].pk}/mark_as_read/')
+        self.assertEqual(response.status_code, 200)
+        self.assertCountersMatch()
+
+        response = self.client.patch(f'{API}/{notifications[1].pk}/', {'is_read': True}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertCountersMatch()
+
+        response = self.client.post(f'{API}/mark_all_as_read/', {'notification_ids': [notifications[2].pk]}, format='json')
+        self.assertEqual(response.data['count'], 1)
+        self.assertCountersMatch()
+
+        response = self.client.delete(f'{API}/clear_read/')
+        self.assertEqual(response.data['deleted_count'], 3)
+        self.assertCountersMatch()
+
+        response = self.client.delete(f'{API}/{Notification.objects.get(recipient=self.user).pk}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertCountersMatch()
+        self.assertEqual(NotificationCounterService.summary(self.user.id)['total'], 0)
+
+    def test_concurrent_mark_all_counts_each_row_once(self):
+        for _ in range(3):
+            self._notify()
+        unread = Notification.objects.filter(recipient=self.user, is_read=False)
+
+        # Un segundo "marcar todas" se cuela justo antes del UPDATE del primero
+        state = {'raced': False}
+
+        def race(execute, sql, params, many, context):
+            if sql.startswith('UPDATE "api_notification"') and not state['raced']:
+                state['raced'] = True
+                self.assertEqual(unread.update(is_read=True), 3)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(race):
+            self.assertEqual(unread.update(is_read=True), 0)
+        self.assertTrue(state['raced'])
+        self.assertEqual(self.user.notifications.filter(is_read=False).count(), 0)
+        self.assertCountersMatch()
+
+    def test_stale_instances_mark_as_read_once(self):
+        notification = self._notify()
+        first, second = Notification.objects.get(pk=notification.pk), Notification.objects.get(pk=notification.pk)
+        first.mark_as_read()
+        second.mark_as_read()
+        self.assertCountersMatch()
+        self.assertEqual(NotificationCounterService.unread_count(self.user.id), 0)
+
+    def test_group_mark_as_read_updates_counters(self):
+        notifications = [self._notify(NotificationType.PRODUCT_PURCHASED) for _ in range(3)]
+        group = None
+        for notification in notifications:
+            group = NotificationGrouper.create_or_update_group(notification) or group
+        self.assertIsNotNone(group)
+
+        NotificationGrouper.mark_group_as_read(group.id)
+        self.assertCountersMatch()
+
+    def test_badge_poll_is_one_cache_read(self):
+        self.authenticate_user(self.user)
+        self._notify()
+        self._notify(NotificationType.PAYMENT_RECEIVED, NotificationPriority.HIGH)
+
+        response = self.client.get(f'{API}/unread_count/')
+        self.assertEqual(response.data, {'unread_count': 2})
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(f'{API}/unread_count/')
+        self.assertEqual(response.data, {'unread_count': 2})
+        self.assertFalse([q for q in ctx.captured_queries if 'api_notification' in q['sql']])
+
+        response = self.client.get(f'{API}/stats/')
+        self.assertEqual(response.data['total'], 2)
+        self.assertEqual(response.data['unread'], 2)
+        self.assertEqual(response.data['by_priority'], {'normal': 1, 'high': 1})
+        self.assertEqual(response.data['unread_by_type'], {'order_created': 1, 'payment_received': 1})
+
+        # Una escritura invalida la cache
+        self._notify()
+        self.assertEqual(self.client.get(f'{API}/unread_count/').data, {'unread_count': 3})
+
+    def test_summary_ttl_depends_on_cache_backend(self):
+        self._notify()
+        # Con la LocMemCache de los tests (de proceso) el resumen caduca pronto
+        with mock.patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            NotificationCounterService.summary(self.user.id)
+        self.assertEqual(cache_set.call_args.args[2], NotificationCounterService.LOCAL_CACHE_TTL)
+
+        cache.clear()
+        with mock.patch.object(counters_notifications, 'cache_is_process_local', return_value=False), \
+                mock.patch.object(cache, 'set', wraps=cache.set) as cache_set:
+            NotificationCounterService.summary(self.user.id)
+        self.assertEqual(cache_set.call_args.args[2], NotificationCounterService.CACHE_TTL)
+
+    def test_reconcile_command_fixes_drift(self):
+        self._notify()
+        self._notify(NotificationType.PAYMENT_RECEIVED)
+        # Desvío: contador alterado, fila huérfana y fila que falta
+        NotificationCounter.objects.filter(user=self.user, notification_type=NotificationType.ORDER_CREATED).update(unread=7)
+        NotificationCounter.objects.filter(user=self.user, notification_type=NotificationType.PAYMENT_RECEIVED).delete()
+        NotificationCounter.objects.create(
+            user=self.agent_user, notification_type=NotificationType.SYSTEM_ALERT,
+            priority=NotificationPriority.LOW, total=4, unread=4
+        )
+
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('reconcile_notification_counters', stdout=out)
+        self.assertIn('Contadores corregidos: 3 (2 usuarios con desvío)', out.getvalue())
+        self.assertCountersMatch()
+        self.assertCountersMatch(self.agent_user)
+
+        out = StringIO()
+        call_command('reconcile_notification_counters', '--user', str(self.user.id), stdout=out)
+        self.assertIn('Contadores corregidos: 0', out.getvalue())
@@ -0,0 +1,170 @@
+"""
+Tests for batched notification emails (NotificationEmailService): one
+preferences query, one render per notification, one reused connection with
+chunked send_messages, and the scheduled per-user digests.
+"""
+
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from api.tests import BaseAPITestCase
+from api.models import Order
+from api.notifications import email_notifications
+from api.notifications.email_notifications import NotificationEmailService
+from api.notifications.models_notifications import (
+    Notification, NotificationOutbox, NotificationPreference, NotificationType,
+)
+from api.notifications.outbox_notifications import OutboxDispatcher
+
+
+User = get_user_model()
+
+
+class NotificationEmailBatchTest(BaseAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.users = [
+            User.objects.create_user(
+                email=f'lote{index}@test.com', phone_number=f'70000000{index}', name=f'Usuario<{index}>',
+                last_name='Lote', password='testpass123', role='client'
+            )
+            for index in range(5)
+        ]
+        OutboxDispatcher.dispatch_pending()
+        NotificationOutbox.objects.all().delete()
+        Notification.objects.all().delete()
+        mail.outbox = []
+
+    def _count_connections(self):
+        opened = []
+
+        def get_connection(*args, **kwargs):
+            backend = mail.get_connection(*args, **kwargs)
+            opened.append(backend)
+            backend.send_messages = mock.Mock(wraps=backend.send_messages)
+            return backend
+
+        patcher = mock.patch.object(email_notifications, 'get_connection', side_effect=get_connection)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return opened
+
+    def test_bulk_emails_render_once_and_reuse_one_connection(self):
+        NotificationPreference.objects.create(user=self.users[0], email_notifications=False)
+        NotificationPreference.objects.create(user=self.users[1], digest_frequency='daily')
+        opened = self._count_connections()
+
+        with mock.patch.object(NotificationEmailService, 'BATCH_SIZE', 2), \
+                mock.patch.object(email_notifications, 'render_to_string',
+                                  wraps=email_notifications.render_to_string) as render, \
+                CaptureQueriesContext(connection) as ctx:
+            result = NotificationEmailService.send_bulk_notification_emails(
+                recipients=self.users + [self.client_user],
+                title='Aviso', message='Mensaje común',
+                notification_type=NotificationType.SYSTEM_MESSAGE, priority='high'
+            )
+
+        self.assertEqual(result['total_sent'], 4)
+        self.assertEqual(sorted(result['skipped']), ['lote0@test.com', 'lote1@test.com'])
+        self.assertEqual(len(ctx.captured_queries), 1)  # preferencias
+        self.assertEqual(render.call_count, 2)  # texto + HTML, una sola vez
+        self.assertEqual(len(opened), 1)
+        self.assertEqual(opened[0].send_messages.call_count, 2)  # bloques de 2
+
+        self.assertEqual(len(mail.outbox), 4)
+        message = next(m for m in mail.outbox if m.to == ['lote2@test.com'])
+        self.assertEqual(message.subject, '[IMPORTANTE] Aviso')
+        self.assertIn('Hola Usuario<2> Lote', message.body)
+        self.assertIn('Hola Usuario&lt;2&gt; Lote', message.alternatives[0][0])
+
+    def test_send_notifications_groups_rendering_by_content(self):
+        shared = Notification.build_bulk_notifications(
+            recipients=self.users[:3], notification_type=NotificationType.SYSTEM_MESSAGE,
+            title='Común', message='Igual para todos'
+        )
+        single = Notification.build_notification(
+            recipient=self.users[3], notification_type=NotificationType.ORDER_CREATED,
+            title='Propia', message='Solo para uno'
+        )
+        with mock.patch.object(email_notifications, 'render_to_string',
+                               wraps=email_notifications.render_to_string) as render:
+            result = NotificationEmailService.send_notifications(shared + [single])
+
+        self.assertEqual(result['total_sent'], 4)
+        self.assertEqual(render.call_count, 4)  # dos contenidos distintos
+        self.assertEqual({m.subject for m in mail.outbox}, {'Común', 'Propia'})
+
+    @override_settings(ENABLE_NOTIFICATION_EMAILS=True)
+    def test_outbox_dispatch_sends_emails_after_commit(self):
+        Order.objects.create(client=self.client_user, sales_manager=self.agent_user)
+        with self.captureOnCommitCallbacks(execute=True):
+            OutboxDispatcher.dispatch_pending()
+        self.assertEqual(
+            {tuple(m.to) for m in mail.outbox},
+            {(self.client_user.email,), (self.agent_user.email,)}
+        )
+
+
+class NotificationDigestTest(BaseAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        OutboxDispatcher.dispatch_pending()
+        Notification.objects.all().delete()
+        mail.outbox = []
+        self.now = timezone.now()
+        NotificationPreference.objects.create(
+            user=self.client_user, digest_frequency='daily',
+            enabled_notification_types=[NotificationType.ORDER_CREATED, NotificationType.PAYMENT_RECEIVED]
+        )
+        # Usuario con envío inmediato: no recibe resumen
+        NotificationPreference.objects.create(user=self.agent_user, digest_frequency='immediate')
+
+    def _notify(self, recipient, notification_type, title, hours_ago=1, is_read=False):
+        notification = Notification.create_notification(
+            recipient=recipient, notification_type=notification_type, title=title, message=title
+        )
+        Notification.objects.filter(pk=notification.pk).update(
+            created_at=self.now - timedelta(hours=hours_ago), is_read=is_read
+        )
+
+    def test_daily_digest_batches_unread_enabled_notifications(self):
+        self._notify(self.client_user, NotificationType.ORDER_CREATED, 'Orden nueva')
+        self._notify(self.client_user, NotificationType.PAYMENT_RECEIVED, 'Pago recibido')
+        self._notify(self.client_user, NotificationType.ORDER_CREATED, 'Leída', is_read=True)
+        self._notify(self.client_user, NotificationType.ORDER_CREATED, 'Antigua', hours_ago=30)
+        self._notify(self.client_user, NotificationType.SYSTEM_MESSAGE, 'Tipo deshabilitado')
+        self._notify(self.agent_user, NotificationType.ORDER_CREATED, 'Del agente')
+
+        totals = NotificationEmailService.send_digests('daily', now=self.now)
+
+        self.assertEqual(totals, {'users': 1, 'failed': 0, 'notifications': 2})
+        self.assertEqual(len(mail.outbox), 1)
+        digest = mail.outbox[0]
+        self.assertEqual(digest.to, [self.client_user.email])
+        self.assertEqual(digest.subject, 'Resumen de notificaciones - 2 nuevas')
+        for included in ('Orden nueva', 'Pago recibido'):
+            self.assertIn(included, digest.body)
+        for excluded in ('Leída', 'Antigua', 'Tipo deshabilitado'):
+            self.assertNotIn(excluded, digest.body)
+
+        prefs = NotificationPreference.objects.get(user=self.client_user)
+        self.assertEqual(prefs.last_digest_sent_at, self.now)
+
+        # La siguiente ejecución solo incluye lo posterior al último resumen
+        mail.outbox = []
+        totals = NotificationEmailService.send_digests('daily', now=self.now + timedelta(minutes=5))
+        self.assertEqual(totals['users'], 0)
+        self.assertEqual(mail.outbox, [])
+
+    def test_immediate_emails_skip_digest_users(self):
+        self.assertFalse(NotificationEmailService.should_send_email(self.client_user, NotificationType.ORDER_CREATED))
+        self.assertTrue(NotificationEmailService.should_send_email(self.agent_user, NotificationType.ORDER_CREATED))
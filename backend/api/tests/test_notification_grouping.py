@@ -0,0 +1,123 @@
+"""
+Tests for batched notification grouping: NotificationGrouper.group_notifications,
+the coalesce() window, outbox batch grouping and the grouped listing summary.
+"""
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.tests import BaseAPITestCase
+from api.notifications.grouping_notifications import (
+    NotificationGroup, NotificationGrouper, create_notification_with_grouping,
+)
+from api.notifications.models_notifications import Notification, NotificationType
+from api.notifications.outbox_notifications import OutboxDispatcher
+
+API = '/arye_system/api_data/notifications'
+
+
+class NotificationGroupingTest(BaseAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        OutboxDispatcher.dispatch_pending()
+        Notification.objects.all().delete()
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = self.client_user
+
+    def _notifications(self, count, notification_type=NotificationType.PRODUCT_PURCHASED):
+        return [
+            Notification.create_notification(
+                recipient=self.user, notification_type=notification_type,
+                title=f'Producto {index}', message=f'Comprado {index}', action_url=f'/products/{index}'
+            )
+            for index in range(count)
+        ]
+
+    def test_batch_is_one_write_per_group(self):
+        small = self._notifications(3)
+        with CaptureQueriesContext(connection) as small_ctx:
+            NotificationGrouper.group_notifications(small)
+        Notification.objects.all().delete()
+
+        receipt = self._notifications(30) + self._notifications(2, NotificationType.SYSTEM_MESSAGE)
+        with CaptureQueriesContext(connection) as ctx:
+            groups = NotificationGrouper.group_notifications(receipt)
+
+        self.assertEqual(len(ctx.captured_queries), len(small_ctx.captured_queries))
+        self.assertEqual(len(groups), 1)
+        group = NotificationGroup.objects.get(recipient=self.user)
+        self.assertEqual(group.count, 30)
+        self.assertEqual(len(group.aggregated_data), 30)
+        self.assertEqual(group.first_notification_id, receipt[0].pk)
+        self.assertEqual(group.last_notification_id, receipt[29].pk)
+        self.assertEqual(group.title, '30 productos fueron comprados')
+        self.assertEqual([item['title'] for item in group.summary['preview']], ['Producto 29', 'Producto 28', 'Producto 27'])
+        self.assertEqual(group.summary['last_action_url'], '/products/29')
+
+    def test_merges_into_active_group(self):
+        first = self._notifications(1)[0]
+        group = NotificationGrouper.create_or_update_group(first)
+        self.assertEqual(group.count, 1)
+
+        NotificationGrouper.group_notifications(self._notifications(4))
+        group.refresh_from_db()
+        self.assertEqual(group.count, 5)
+        self.assertEqual(NotificationGroup.objects.count(), 1)
+        self.assertEqual(len(group.get_notification_ids()), 5)
+
+    def test_coalesce_window(self):
+        with NotificationGrouper.coalesce():
+            for index in range(5):
+                with NotificationGrouper.coalesce():
+                    _, group = create_notification_with_grouping(
+                        recipient=self.user, notification_type=NotificationType.PAYMENT_RECEIVED,
+                        title=f'Pago {index}', message='Recibido'
+                    )
+                self.assertIsNone(group)
+            self.assertFalse(NotificationGroup.objects.exists())
+        self.assertEqual(NotificationGroup.objects.get().count, 5)
+
+        with self.assertRaises(RuntimeError):
+            with NotificationGrouper.coalesce():
+                NotificationGrouper.create_or_update_group(self._notifications(1)[0])
+                raise RuntimeError('fallo')
+        self.assertEqual(NotificationGroup.objects.filter(notification_type=NotificationType.PRODUCT_PURCHASED).count(), 0)
+        self.assertIsNotNone(NotificationGrouper.create_or_update_group(self._notifications(1)[0]))
+
+    def test_outbox_batch_is_grouped(self):
+        from api.models import Order
+
+        for _ in range(3):
+            Order.objects.create(client=self.user, sales_manager=self.agent_user)
+        OutboxDispatcher.dispatch_pending()
+
+        for recipient_id, notification_type in (
+            Notification.objects.order_by().values_list('recipient_id', 'notification_type').distinct()
+        ):
+            if not NotificationGrouper.should_group(notification_type):
+                continue
+            expected = Notification.objects.filter(recipient_id=recipient_id, notification_type=notification_type).count()
+            group = NotificationGroup.objects.get(recipient_id=recipient_id, notification_type=notification_type)
+            self.assertEqual(group.count, expected)
+        self.assertTrue(NotificationGroup.objects.filter(count=3).exists())
+
+    def test_grouped_listing_uses_summary(self):
+        NotificationGrouper.group_notifications(self._notifications(4))
+        NotificationGrouper.group_notifications(self._notifications(2, NotificationType.PACKAGE_SHIPPED))
+        self.authenticate_user(self.user)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(f'{API}/grouped/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_groups'], 2)
+        self.assertEqual(response.data['total_notifications_in_groups'], 6)
+        group = next(item for item in response.data['groups'] if item['count'] == 4)
+        self.assertNotIn('aggregated_data', group)
+        self.assertEqual(group['last_action_url'], '/products/3')
+        self.assertEqual(len(group['summary']['preview']), 3)
+        group_queries = [q['sql'] for q in ctx.captured_queries if 'api_notificationgroup' in q['sql']]
+        self.assertEqual(len(group_queries), 1)
+        self.assertNotIn('aggregated_data', group_queries[0])
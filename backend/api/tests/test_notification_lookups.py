@@ -0,0 +1,132 @@
+"""
+Tests for the cached notification preferences and role membership lookups
+(NotificationLookupCache) and their post_save invalidation.
+"""
+
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.tests import BaseAPITestCase
+from api.notifications.email_notifications import NotificationEmailService
+from api.notifications import lookups_notifications
+from api.notifications.lookups_notifications import NotificationLookupCache, _LocalLRU
+from api.notifications.models_notifications import (
+    Notification, NotificationPreference, NotificationType,
+)
+from api.notifications.outbox_notifications import OutboxDispatcher
+
+User = get_user_model()
+
+
+class NotificationLookupCacheTest(BaseAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        OutboxDispatcher.dispatch_pending()
+        cache.clear()
+        NotificationLookupCache.clear_local()
+        self.addCleanup(cache.clear)
+        self.addCleanup(NotificationLookupCache.clear_local)
+        self.user = self.client_user
+
+    def test_preferences_are_cached_and_invalidated(self):
+        with self.assertNumQueries(1):
+            prefs = NotificationLookupCache.preferences_for([self.user.id, self.buyer_user.id])
+        self.assertTrue(prefs[self.user.id].email_notifications)
+        with self.assertNumQueries(0):
+            self.assertTrue(NotificationEmailService.should_send_email(self.user, NotificationType.ORDER_CREATED))
+
+        # Crear y modificar las preferencias invalida la cache (post_save)
+        stored = NotificationPreference.get_or_create_preferences(self.user)
+        stored.enabled_notification_types = [NotificationType.PAYMENT_RECEIVED]
+        stored.save()
+        with self.assertNumQueries(1):
+            self.assertFalse(NotificationEmailService.should_send_email(self.user, NotificationType.ORDER_CREATED))
+        with self.assertNumQueries(0):
+            prefs = NotificationLookupCache.preferences(self.user.id)
+        self.assertTrue(prefs.is_notification_enabled(NotificationType.PAYMENT_RECEIVED))
+
+        # Las instancias devueltas no comparten estado con la cache
+        prefs.enabled_notification_types.append(NotificationType.ORDER_CREATED)
+        self.assertFalse(NotificationLookupCache.preferences(self.user.id).is_notification_enabled(NotificationType.ORDER_CREATED))
+
+        stored.delete()
+        self.assertEqual(NotificationLookupCache.preferences(self.user.id).enabled_notification_types, [])
+
+    def test_shared_cache_survives_local_eviction(self):
+        NotificationLookupCache.preferences(self.user.id)
+        NotificationLookupCache.clear_local()
+        with self.assertNumQueries(0):
+            NotificationLookupCache.preferences(self.user.id)
+        cache.clear()
+        with self.assertNumQueries(0):
+            # El LRU local sigue sirviendo dentro de LOCAL_TTL
+            NotificationLookupCache.preferences(self.user.id)
+
+    def test_shared_ttl_depends_on_cache_backend(self):
+        # La LocMemCache de los tests es de proceso: el segundo nivel caduca en LOCAL_TTL
+        self.assertTrue(lookups_notifications.cache_is_process_local())
+        with mock.patch.object(cache, 'set_many', wraps=cache.set_many) as set_many:
+            NotificationLookupCache.preferences(self.user.id)
+        self.assertEqual(set_many.call_args.args[1], NotificationLookupCache.LOCAL_TTL)
+
+        NotificationLookupCache.clear_local()
+        cache.clear()
+        with mock.patch.object(lookups_notifications, 'cache_is_process_local', return_value=False), \
+                mock.patch.object(cache, 'set_many', wraps=cache.set_many) as set_many:
+            NotificationLookupCache.preferences(self.user.id)
+        self.assertEqual(set_many.call_args.args[1], NotificationLookupCache.SHARED_TTL)
+
+    def test_role_user_ids_invalidation(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(NotificationLookupCache.role_user_ids('buyer'), [self.buyer_user.id])
+        with self.assertNumQueries(0):
+            NotificationLookupCache.role_user_ids('buyer')
+
+        # Un guardado parcial que no toca el rol no invalida
+        self.agent_user.save(update_fields=['last_login'])
+        with self.assertNumQueries(0):
+            NotificationLookupCache.role_user_ids('buyer')
+
+        self.agent_user.role = 'buyer'
+        self.agent_user.save()
+        self.assertEqual(NotificationLookupCache.role_user_ids('buyer'), sorted([self.buyer_user.id, self.agent_user.id]))
+
+        self.buyer_user.delete()
+        self.assertEqual(NotificationLookupCache.role_user_ids('buyer'), [self.agent_user.id])
+
+    def test_paid_order_does_not_query_roles(self):
+        accountant = User.objects.create_user(
+            email='accountant@test.com', phone_number='5555555555', name='Accountant', last_name='User',
+            password='testpass123', role='accountant', is_active=True, is_verified=True
+        )
+        OutboxDispatcher.dispatch_pending()  # evento user.created del contador
+        self.assertEqual(NotificationLookupCache.role_user_ids('accountant'), [accountant.id])
+
+        self.test_order.pay_status = 'Pagado'
+        self.test_order.save()
+        with CaptureQueriesContext(connection) as ctx:
+            OutboxDispatcher.dispatch_pending()
+
+        role_queries = [q['sql'] for q in ctx.captured_queries if 'WHERE "api_customuser"."role"' in q['sql']]
+        self.assertEqual(role_queries, [])
+        self.assertTrue(Notification.objects.filter(
+            recipient=accountant, notification_type=NotificationType.PAYMENT_RECEIVED
+        ).exists())
+
+    def test_local_lru_bounds(self):
+        lru = _LocalLRU(max_size=2, ttl=60)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+        self.assertEqual(lru.get('b', None), None)
+        self.assertEqual((lru.get('a'), lru.get('c')), (1, 3))
+
+        expired = _LocalLRU(max_size=2, ttl=-1)
+        expired.set('a', 1)
+        self.assertIsNone(expired.get('a', None))
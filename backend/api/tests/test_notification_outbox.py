@@ -0,0 +1,150 @@
+"""
+Tests for the transactional notification outbox (NotificationOutboxService)
+and its batch dispatcher (OutboxDispatcher).
+"""
+
+from unittest import mock
+
+from django.core import mail
+from django.db import connection, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from api.tests import BaseAPITestCase
+from api.models import Order
+from api.notifications import outbox_notifications
+from api.notifications.models_notifications import (
+    Notification, NotificationOutbox, NotificationType,
+)
+from api.notifications.outbox_notifications import (
+    NotificationOutboxService, OutboxDispatcher,
+)
+from api.notifications.realtime_notifications import NotificationRelay
+
+
+class NotificationOutboxTest(BaseAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.admin_user.role = 'admin'
+        self.admin_user.save()
+        # Eventos generados al crear los usuarios de prueba
+        OutboxDispatcher.dispatch_pending()
+        NotificationOutbox.objects.all().delete()
+        Notification.objects.all().delete()
+
+    def _events(self, event_type):
+        return NotificationOutbox.objects.filter(event_type=event_type)
+
+    def test_writes_enqueue_events_and_dispatch_creates_notifications(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            order = Order.objects.create(client=self.client_user, sales_manager=self.agent_user)
+        self.assertIn(OutboxDispatcher.wake, callbacks)
+        self.assertEqual(self._events('order.created').get().payload, {'order_id': order.id})
+        self.assertFalse(Notification.objects.exists())
+
+        with mock.patch('api.notifications.realtime_notifications.NotificationSSE.publish_notification') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(OutboxDispatcher.dispatch_pending(), 1)
+
+        recipients = set(Notification.objects.values_list('recipient', 'notification_type'))
+        self.assertEqual(recipients, {
+            (self.client_user.id, NotificationType.ORDER_CREATED),
+            (self.agent_user.id, NotificationType.ORDER_ASSIGNED),
+            (self.admin_user.id, NotificationType.ORDER_CREATED),
+        })
+        self.assertEqual(publish.call_count, 3)
+        event = self._events('order.created').get()
+        self.assertEqual(event.status, NotificationOutbox.Status.DONE)
+        self.assertIsNotNone(event.processed_at)
+
+    @override_settings(NOTIFICATION_OUTBOX_WORKER=True, ENABLE_NOTIFICATION_EMAILS=True)
+    def test_worker_mode_leaves_sse_to_web_process_relay(self):
+        Order.objects.create(client=self.client_user, sales_manager=self.agent_user)
+
+        # Worker: inserta y envía emails, sin publicar en el broker de su proceso
+        with mock.patch('api.notifications.realtime_notifications.NotificationSSE.publish_notification') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                OutboxDispatcher.dispatch_pending()
+        publish.assert_not_called()
+        self.assertEqual(Notification.objects.count(), 3)
+        self.assertEqual(len(mail.outbox), 3)
+
+        # Proceso web: publica las notificaciones de sus usuarios conectados, una sola vez
+        connected = [self.client_user.id, self.admin_user.id]
+        with mock.patch('api.notifications.realtime_notifications.broker.user_ids', return_value=connected), \
+                mock.patch.object(NotificationRelay, '_published', {}), \
+                mock.patch.object(NotificationRelay, '_started_at', None), \
+                mock.patch('api.notifications.realtime_notifications.NotificationSSE.publish_notification') as publish:
+            self.assertEqual(NotificationRelay.poll_once(), 2)
+            self.assertEqual(NotificationRelay.poll_once(), 0)
+        self.assertEqual(sorted(call.kwargs['user_id'] for call in publish.call_args_list), sorted(connected))
+
+    def test_rolled_back_write_leaves_no_event(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                Order.objects.create(client=self.client_user, sales_manager=self.agent_user)
+                raise RuntimeError('rollback')
+        self.assertFalse(self._events('order.created').exists())
+
+    def test_status_changes_are_captured_at_save_time(self):
+        order = Order.objects.create(client=self.client_user, sales_manager=self.agent_user)
+        order.save()
+        self.assertFalse(self._events('order.changed').exists())
+
+        order.status = 'Completado'
+        order.save()
+        self.assertEqual(self._events('order.changed').get().payload['new_status'], 'Completado')
+
+        OutboxDispatcher.dispatch_pending()
+        self.assertTrue(Notification.objects.filter(
+            recipient=self.client_user, notification_type=NotificationType.ORDER_STATUS_CHANGED,
+            metadata__new_status='Completado'
+        ).exists())
+        self.assertTrue(Notification.objects.filter(
+            recipient=self.agent_user, notification_type=NotificationType.ORDER_COMPLETED
+        ).exists())
+
+    def test_batch_is_inserted_with_one_query(self):
+        for _ in range(5):
+            Order.objects.create(client=self.client_user, sales_manager=self.agent_user)
+
+        with CaptureQueriesContext(connection) as ctx:
+            OutboxDispatcher.dispatch_pending()
+        inserts = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('INSERT INTO "api_notification"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(Notification.objects.count(), 15)
+
+    def test_failing_handler_is_retried_then_marked_failed(self):
+        def boom(payload):
+            raise ValueError('sin datos')
+
+        with mock.patch.dict(outbox_notifications._HANDLERS, {'test.boom': boom}):
+            failing = NotificationOutboxService.enqueue('test.boom', {})
+            Order.objects.create(client=self.client_user, sales_manager=self.agent_user)
+
+            OutboxDispatcher.dispatch_pending()
+            failing.refresh_from_db()
+            self.assertEqual(failing.status, NotificationOutbox.Status.PENDING)
+            self.assertEqual(failing.attempts, 1)
+            self.assertIn('sin datos', failing.last_error)
+            self.assertGreater(failing.available_at, failing.created_at)
+            # El resto del lote se procesó
+            self.assertEqual(self._events('order.created').get().status, NotificationOutbox.Status.DONE)
+
+            for _ in range(OutboxDispatcher.MAX_ATTEMPTS - 1):
+                NotificationOutbox.objects.filter(pk=failing.pk).update(available_at=failing.created_at)
+                OutboxDispatcher.dispatch_pending()
+            failing.refresh_from_db()
+            self.assertEqual(failing.status, NotificationOutbox.Status.FAILED)
+            self.assertEqual(failing.attempts, OutboxDispatcher.MAX_ATTEMPTS)
+
+    def test_stats_report_dispatch_lag(self):
+        Order.objects.create(client=self.client_user, sales_manager=self.agent_user)
+        self.assertEqual(OutboxDispatcher.stats()['pending'], 1)
+
+        OutboxDispatcher.dispatch_pending()
+        stats = OutboxDispatcher.stats()
+        self.assertEqual(stats['pending'], 0)
+        self.assertIsNone(stats['oldest_pending_seconds'])
+        self.assertGreaterEqual(stats['max_lag_seconds'], 0)
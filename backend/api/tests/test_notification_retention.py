@@ -0,0 +1,130 @@
+"""
+Tests for batched notification retention (NotificationRetentionService) and
+the clean_notifications command built on it.
+"""
+
+from datetime import timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from api.tests import BaseAPITestCase
+from api.notifications.counters_notifications import NotificationCounterService
+from api.notifications.grouping_notifications import NotificationGroup, NotificationGrouper
+from api.notifications.models_notifications import (
+    Notification, NotificationArchive, NotificationType,
+)
+from api.notifications.outbox_notifications import OutboxDispatcher
+from api.notifications.retention_notifications import NotificationRetentionService
+
+
+class NotificationRetentionTest(BaseAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        OutboxDispatcher.dispatch_pending()
+        Notification.objects.all().delete()
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = self.client_user
+
+    def _notify(self, count=1, days_old=0, is_read=False, **kwargs):
+        notifications = [
+            Notification.create_notification(
+                recipient=self.user, notification_type=NotificationType.ORDER_CREATED,
+                title='Aviso', message='Mensaje', **kwargs
+            )
+            for _ in range(count)
+        ]
+        ids = [notification.pk for notification in notifications]
+        if is_read:
+            Notification.objects.filter(pk__in=ids).update(is_read=True)
+        if days_old:
+            Notification.objects.filter(pk__in=ids).update(created_at=timezone.now() - timedelta(days=days_old))
+        return ids
+
+    def test_deletes_in_bounded_batches(self):
+        old = self._notify(5, days_old=40, is_read=True)
+        recent = self._notify(2, is_read=True)
+        unread = self._notify(1, days_old=40)
+
+        progress = []
+        with CaptureQueriesContext(connection) as ctx:
+            deleted = NotificationRetentionService.delete_old_read(
+                days=30, batch_size=2, pause=0, progress=progress.append
+            )
+
+        self.assertEqual(deleted, 5)
+        self.assertEqual(progress, [2, 4, 5])
+        deletes = [q for q in ctx.captured_queries if q['sql'].startswith('DELETE FROM "api_notification"')]
+        self.assertEqual(len(deletes), 3)
+        self.assertFalse(Notification.objects.filter(pk__in=old).exists())
+        self.assertEqual(Notification.objects.filter(pk__in=recent + unread).count(), 3)
+
+        summary = NotificationCounterService.summary(self.user.id)
+        self.assertEqual((summary['total'], summary['unread']), (3, 1))
+
+    def test_manager_methods_delegate_and_archive(self):
+        self._notify(3, expires_at=timezone.now() - timedelta(hours=1))
+        self._notify(1)
+
+        self.assertEqual(Notification.objects.delete_expired(batch_size=2, pause=0, archive=True), 3)
+        self.assertEqual(Notification.objects.filter(recipient=self.user).count(), 1)
+        archived = NotificationArchive.objects.filter(recipient_id=self.user.id)
+        self.assertEqual(archived.count(), 3)
+        self.assertEqual(set(archived.values_list('title', flat=True)), {'Aviso'})
+
+        self._notify(2, days_old=40, is_read=True)
+        self.assertEqual(Notification.objects.delete_old_read(days=30, pause=0), 2)
+        self.assertEqual(NotificationArchive.objects.count(), 3)
+
+    def test_drop_archive_before(self):
+        self._notify(3, days_old=400, is_read=True)
+        NotificationRetentionService.delete_old_read(days=30, pause=0, archive=True)
+        NotificationArchive.objects.update(created_at=timezone.now() - timedelta(days=400))
+        self._notify(1, is_read=True)
+        NotificationRetentionService.delete_in_batches(Notification.objects.all(), pause=0, archive=True)
+
+        result = NotificationRetentionService.drop_archive_before(timezone.now() - timedelta(days=365), pause=0)
+        self.assertEqual(result, {'partitions': 0, 'rows': 3})
+        self.assertEqual(NotificationArchive.objects.count(), 1)
+
+    def test_cleanup_old_groups(self):
+        group = None
+        for _ in range(3):
+            notification = Notification.create_notification(
+                recipient=self.user, notification_type=NotificationType.PRODUCT_PURCHASED,
+                title='Compra', message='Producto'
+            )
+            group = NotificationGrouper.create_or_update_group(notification) or group
+        self.assertIsNotNone(group)
+        NotificationGroup.objects.filter(pk=group.pk).update(
+            is_read=True, updated_at=timezone.now() - timedelta(days=40)
+        )
+
+        self.assertEqual(NotificationGrouper.cleanup_old_groups(days=30, batch_size=1, pause=0), 1)
+        self.assertFalse(NotificationGroup.objects.filter(pk=group.pk).exists())
+
+    def test_clean_notifications_command(self):
+        self._notify(4, days_old=40, is_read=True)
+        self._notify(2)
+
+        out = StringIO()
+        call_command('clean_notifications', '--dry-run', stdout=out)
+        self.assertIn('Se eliminarían 4 notificaciones leídas antiguas', out.getvalue())
+        self.assertEqual(Notification.objects.count(), 6)
+
+        out = StringIO()
+        call_command(
+            'clean_notifications', '--batch-size', '3', '--pause', '0', '--archive',
+            '--archive-months', '12', '--groups', stdout=out
+        )
+        output = out.getvalue()
+        self.assertIn('Eliminadas 4 notificaciones leídas antiguas', output)
+        self.assertIn('Total de notificaciones: 2', output)
+        self.assertIn('No leídas: 2', output)
+        self.assertEqual(NotificationArchive.objects.count(), 4)
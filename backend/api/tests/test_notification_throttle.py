@@ -0,0 +1,258 @@
+"""
+Tests for the sliding-window notification throttle (NotificationThrottle):
+atomic counters under concurrent writers, window decay and the bulk path.
+"""
+
+import threading
+from unittest import mock
+
+from django.core.cache import cache
+
+from api.tests import BaseAPITestCase
+from api.notifications import throttling_notifications
+from api.notifications.models_notifications import Notification, NotificationPriority, NotificationType
+from api.notifications.throttling_notifications import (
+    NotificationThrottle, create_bulk_throttled_notifications,
+)
+
+
+class _RedisPipeline:
+    """Pipeline mínimo de redis-py (set NX, incr, decr, delete) sobre un dict."""
+
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def set(self, key, value, nx=False, ex=None):
+        self.commands.append(('set', key, value, nx))
+
+    def incr(self, key):
+        self.commands.append(('incr', key))
+
+    def decr(self, key):
+        self.commands.append(('decr', key))
+
+    def delete(self, key):
+        self.commands.append(('delete', key))
+
+    def execute(self):
+        self.client.round_trips += 1
+        data = self.client.data
+        results = []
+        for command, key, *args in self.commands:
+            if command == 'set':
+                value, nx = args
+                if nx and key in data:
+                    results.append(None)
+                else:
+                    data[key] = value
+                    results.append(True)
+            elif command in ('incr', 'decr'):
+                data[key] = int(data.get(key, 0)) + (1 if command == 'incr' else -1)
+                results.append(data[key])
+            else:
+                results.append(int(data.pop(key, None) is not None))
+        return results
+
+
+class _Redis:
+    def __init__(self):
+        self.data = {}
+        self.round_trips = 0
+
+    def pipeline(self, transaction=True):
+        return _RedisPipeline(self)
+
+
+class NotificationThrottleTest(BaseAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user_id = self.client_user.id
+
+    def _run_concurrently(self, threads, target):
+        barrier = threading.Barrier(threads)
+
+        def run():
+            barrier.wait()
+            target()
+
+        workers = [threading.Thread(target=run) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+    def test_concurrent_records_do_not_lose_increments(self):
+        def writer():
+            for _ in range(50):
+                NotificationThrottle.record_notification(self.user_id, NotificationType.SYSTEM_MESSAGE)
+
+        self._run_concurrently(8, writer)
+        stats = NotificationThrottle.get_user_stats(self.user_id)
+        self.assertEqual(stats['total_sent_last_hour'], 400)
+        self.assertEqual(stats['by_type'], {NotificationType.SYSTEM_MESSAGE: 400})
+
+    def test_concurrent_acquire_never_exceeds_limit(self):
+        admitted = []
+
+        def writer():
+            for _ in range(20):
+                if NotificationThrottle.acquire(self.user_id, NotificationType.SYSTEM_MESSAGE)[0]:
+                    admitted.append(1)
+
+        self._run_concurrently(8, writer)
+        self.assertEqual(len(admitted), NotificationThrottle.DEFAULT_TYPE_LIMIT)
+        allowed, reason = NotificationThrottle.can_send_notification(self.user_id, NotificationType.SYSTEM_MESSAGE)
+        self.assertFalse(allowed)
+        self.assertIn('del tipo', reason)
+
+    def test_previous_window_decays_linearly(self):
+        window = NotificationThrottle.WINDOW_SECONDS
+        start = 1000 * window
+
+        with mock.patch.object(throttling_notifications.time, 'time', return_value=start + window - 1):
+            for _ in range(NotificationThrottle.DEFAULT_TYPE_LIMIT):
+                self.assertTrue(NotificationThrottle.acquire(self.user_id, NotificationType.SYSTEM_MESSAGE)[0])
+            self.assertFalse(NotificationThrottle.acquire(self.user_id, NotificationType.SYSTEM_MESSAGE)[0])
+
+        # Al empezar la ventana siguiente el uso anterior aún cuenta entero
+        with mock.patch.object(throttling_notifications.time, 'time', return_value=start + window):
+            self.assertFalse(NotificationThrottle.can_send_notification(self.user_id, NotificationType.SYSTEM_MESSAGE)[0])
+
+        # A mitad de la ventana siguiente solo cuenta la mitad
+        with mock.patch.object(throttling_notifications.time, 'time', return_value=start + window * 1.5):
+            self.assertEqual(NotificationThrottle.get_user_stats(self.user_id)['total_sent_last_hour'], 5)
+            admitted = sum(
+                NotificationThrottle.acquire(self.user_id, NotificationType.SYSTEM_MESSAGE)[0] for _ in range(10)
+            )
+            self.assertEqual(admitted, 5)
+
+    def test_duplicates_and_urgent_limits(self):
+        self.assertTrue(NotificationThrottle.acquire(
+            self.user_id, NotificationType.SYSTEM_MESSAGE, title='Hola', message='Igual'
+        )[0])
+        allowed, reason = NotificationThrottle.acquire(
+            self.user_id, NotificationType.SYSTEM_MESSAGE, title='Hola', message='Igual'
+        )
+        self.assertFalse(allowed)
+        self.assertIn('duplicada', reason)
+
+        with mock.patch.object(NotificationThrottle, 'URGENT_LIMIT', 2):
+            for notification_type in (NotificationType.ORDER_CREATED, NotificationType.PACKAGE_DELIVERED):
+                self.assertTrue(NotificationThrottle.acquire(
+                    self.user_id, notification_type, priority=NotificationPriority.URGENT
+                )[0])
+            allowed, reason = NotificationThrottle.acquire(
+                self.user_id, NotificationType.PAYMENT_RECEIVED, priority=NotificationPriority.HIGH
+            )
+            self.assertFalse(allowed)
+            self.assertIn('urgentes', reason)
+        # El rechazo no consume cupo general
+        self.assertEqual(NotificationThrottle.get_user_stats(self.user_id)['total_sent_last_hour'], 3)
+
+        NotificationThrottle.reset_user_throttle(self.user_id)
+        self.assertEqual(NotificationThrottle.get_user_stats(self.user_id)['total_sent_last_hour'], 0)
+
+    def test_bulk_path_evaluates_all_recipients_with_one_read(self):
+        recipients = [self.client_user, self.agent_user, self.admin_user]
+        for _ in range(NotificationThrottle.DEFAULT_TYPE_LIMIT):
+            NotificationThrottle.record_notification(self.agent_user.id, NotificationType.SYSTEM_MESSAGE)
+
+        with mock.patch.object(cache, 'get_many', wraps=cache.get_many) as get_many, \
+                mock.patch.object(cache, 'add', wraps=cache.add) as add:
+            result = create_bulk_throttled_notifications(
+                recipients, NotificationType.SYSTEM_MESSAGE, title='Aviso', message='Para todos'
+            )
+        self.assertEqual(get_many.call_count, 1)
+        # Una marca de duplicado reclamada por destinatario admitido
+        self.assertEqual(len([call for call in add.call_args_list if 'dup' in call.args[0]]), 2)
+
+        self.assertEqual(result['total_sent'], 2)
+        self.assertEqual(result['throttled'], [self.agent_user.id])
+        self.assertEqual(
+            set(Notification.objects.filter(title='Aviso').values_list('recipient', flat=True)),
+            {self.client_user.id, self.admin_user.id}
+        )
+
+        repeated = create_bulk_throttled_notifications(
+            recipients, NotificationType.SYSTEM_MESSAGE, title='Aviso', message='Para todos'
+        )
+        self.assertEqual(repeated['total_sent'], 0)
+        self.assertIn('duplicada', repeated['reasons'][self.client_user.id])
+
+    def test_concurrent_bulk_admits_each_duplicate_once(self):
+        recipients = [self.client_user.id, self.agent_user.id, self.admin_user.id]
+        admitted = []
+        evaluate = NotificationThrottle._evaluate.__func__
+        evaluated = threading.Barrier(8)
+
+        def evaluate_together(cls, *args, **kwargs):
+            # Todos los hilos evalúan (sin duplicados a la vista) antes de registrar
+            result = evaluate(cls, *args, **kwargs)
+            evaluated.wait()
+            return result
+
+        def writer():
+            allowed, _ = NotificationThrottle.acquire_bulk(
+                recipients, NotificationType.SYSTEM_MESSAGE, title='Aviso', message='Igual'
+            )
+            admitted.extend(allowed)
+
+        with mock.patch.object(NotificationThrottle, '_evaluate', classmethod(evaluate_together)):
+            self._run_concurrently(8, writer)
+        self.assertEqual(sorted(admitted), sorted(recipients))
+
+    def test_bulk_releases_duplicate_claim_when_limit_rejects(self):
+        reason = 'Límite alcanzado'
+        with mock.patch.object(NotificationThrottle, '_consume', return_value=reason):
+            allowed, reasons = NotificationThrottle.acquire_bulk(
+                [self.user_id], NotificationType.SYSTEM_MESSAGE, title='Aviso', message='Igual'
+            )
+        self.assertEqual((allowed, reasons), ([], {self.user_id: reason}))
+        self.assertEqual(NotificationThrottle.acquire_bulk(
+            [self.user_id], NotificationType.SYSTEM_MESSAGE, title='Aviso', message='Igual'
+        ), ([self.user_id], {}))
+
+    def test_bulk_with_redis_costs_constant_round_trips(self):
+        redis = _Redis()
+        recipients = list(range(1000, 1040))
+        cache_calls = {
+            name: mock.patch.object(cache, name, wraps=getattr(cache, name))
+            for name in ('get_many', 'add', 'incr', 'decr', 'set', 'set_many', 'delete')
+        }
+
+        def bulk(message):
+            return NotificationThrottle.acquire_bulk(
+                recipients, NotificationType.SYSTEM_MESSAGE, title='Aviso', message=message
+            )
+
+        with mock.patch.object(NotificationThrottle, '_redis_client', return_value=redis):
+            mocks = {name: patcher.start() for name, patcher in cache_calls.items()}
+            try:
+                allowed, reasons = bulk('Uno')
+            finally:
+                for patcher in cache_calls.values():
+                    patcher.stop()
+            # 40 destinatarios: un get_many y un pipeline
+            self.assertEqual((allowed, reasons), (recipients, {}))
+            self.assertEqual({name: m.call_count for name, m in mocks.items() if m.call_count}, {'get_many': 1})
+            self.assertEqual(redis.round_trips, 1)
+
+            # El mismo aviso: las marcas ya reclamadas lo rechazan y se deshacen los incrementos
+            allowed, reasons = bulk('Uno')
+            self.assertEqual(allowed, [])
+            self.assertEqual(set(reasons.values()), {NotificationThrottle.DUPLICATE_REASON})
+            self.assertEqual(redis.round_trips, 3)
+
+            # El límite por tipo se comprueba con el valor devuelto por INCR
+            for index in range(2, NotificationThrottle.DEFAULT_TYPE_LIMIT + 1):
+                self.assertEqual(bulk(str(index))[0], recipients)
+            allowed, reasons = bulk('Otro')
+            self.assertEqual(allowed, [])
+            self.assertIn('del tipo', reasons[recipients[0]])
+
+        counters = [value for key, value in redis.data.items() if ':type:' in key]
+        self.assertEqual(set(counters), {NotificationThrottle.DEFAULT_TYPE_LIMIT})
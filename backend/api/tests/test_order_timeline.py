@@ -0,0 +1,81 @@
+"""
+Tests for the batched product timeline (ProductTimelineService) and the
+order-level GET order/{id}/timeline/ endpoint.
+"""
+
+from datetime import timedelta
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from api.tests import BaseAPITestCase
+from api.models import Order, Product, ProductBuyed, ProductReceived, ProductDelivery
+
+
+API = '/arye_system/api_data'
+
+
+class OrderTimelineTest(BaseAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.admin_user.role = 'admin'
+        self.admin_user.save()
+        self.authenticate_user(self.admin_user)
+        self.order = Order.objects.create(client=self.client_user, sales_manager=self.agent_user)
+        self.now = timezone.now()
+
+    def _product(self, name, buys=(), received=0, delivered=0):
+        """Producto con compras `buys` = [(cantidad, días atrás)], una recepción y una entrega."""
+        product = Product.objects.create(
+            name=name, shop=self.test_shop, order=self.order,
+            amount_requested=10, shop_cost=10, total_cost=12
+        )
+        for amount, days_ago in buys:
+            ProductBuyed.objects.create(
+                original_product=product, amount_buyed=amount, buy_date=self.now - timedelta(days=days_ago)
+            )
+        if received:
+            ProductReceived.objects.create(original_product=product, amount_received=received)
+        if delivered:
+            ProductDelivery.objects.create(original_product=product, amount_delivered=delivered)
+        return product
+
+    def test_order_timeline_returns_every_product(self):
+        full = self._product('Completo', buys=[(1, 1), (3, 3)], received=4, delivered=2)
+        pending = self._product('Pendiente')
+
+        response = self.client.get(f'{API}/order/{self.order.id}/timeline/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['order'], self.order.id)
+        timelines = {item['id']: item['events'] for item in response.data['products']}
+
+        statuses = [event['status'] for event in timelines[str(full.id)]]
+        self.assertEqual(statuses[0], 'purchased')  # la primera compra es anterior al registro
+        self.assertEqual(set(statuses), {'created', 'purchased', 'received', 'delivered'})
+        purchased = next(event for event in timelines[str(full.id)] if event['status'] == 'purchased')
+        self.assertEqual(purchased['description'], 'Se compraron 4 unidad(es) del producto')
+        self.assertEqual(purchased['date'], (self.now - timedelta(days=3)).isoformat())
+
+        self.assertEqual([event['status'] for event in timelines[str(pending.id)]], ['created'])
+
+    def test_product_timeline_matches_order_timeline(self):
+        product = self._product('Producto', buys=[(2, 1)], received=1)
+        order_data = self.client.get(f'{API}/order/{self.order.id}/timeline/').data
+        product_data = self.client.get(f'{API}/product/{product.id}/timeline/').data
+        self.assertEqual(order_data['products'][0]['events'], product_data['events'])
+
+    def test_query_count_does_not_depend_on_product_count(self):
+        def count_queries():
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(f'{API}/order/{self.order.id}/timeline/')
+            self.assertEqual(response.status_code, 200)
+            return len(ctx.captured_queries)
+
+        for index in range(2):
+            self._product(f'A{index}', buys=[(2, 1)], received=2, delivered=1)
+        few = count_queries()
+        for index in range(6):
+            self._product(f'B{index}', buys=[(2, 1)], received=2, delivered=1)
+        self.assertEqual(count_queries(), few)
@@ -255,6 +255,31 @@ class ProductModelTest(ModelTestCase):
         # Verify that own_taxes increases profit
         self.assertAlmostEqual(profit_with - profit_without, 0.5, places=2)
 
+    def test_system_columns_are_stored_and_refreshed(self):
+        """Test that system_expenses/system_profit are persisted and follow cost changes"""
+        stored = Product.objects.filter(pk=self.product.pk).values('system_expenses', 'system_profit').get()
+        self.assertAlmostEqual(stored['system_expenses'], 13.2, places=2)
+        self.assertAlmostEqual(stored['system_profit'], 7.3, places=2)
+
+        self.product.total_cost = 25.0
+        self.product.save(update_fields=['total_cost'])
+        self.assertAlmostEqual(Product.objects.get(pk=self.product.pk).system_profit, 12.3, places=2)
+
+    def test_order_totals_use_stored_columns(self):
+        """Test that Order.total_profit matches the annotated SQL value"""
+        from api.services.order_service import annotate_product_financials
+
+        Product.objects.filter(pk=self.product.pk).update(amount_purchased=2)
+        expected_profit = round(7.3 * 2, 2)
+
+        self.assertAlmostEqual(self.order.total_profit, expected_profit, places=2)
+        self.assertAlmostEqual(self.order.total_expenses, round(13.2 * 2, 2), places=2)
+
+        annotated = annotate_product_financials(Order.objects.filter(pk=self.order.pk)).get()
+        self.assertAlmostEqual(annotated.products_system_profit_total, expected_profit, places=2)
+        with self.assertNumQueries(0):
+            self.assertAlmostEqual(annotated.total_profit, expected_profit, places=2)
+
     def test_product_status_flow_encargado_to_comprado(self):
         """Test product status changes from ENCARGADO to COMPRADO when purchased"""
         # Initial status should be ENCARGADO
@@ -0,0 +1,95 @@
+from django.test import TestCase
+
+from api.models import CustomUser, Order, Product, ProductBuyed, Shop
+from api.services.purchases_service import analyze_product_buys
+
+
+class AnalyzeProductBuysTest(TestCase):
+    def setUp(self):
+        client = CustomUser.objects.create_user(
+            email='buys@test.com',
+            phone_number='5551110000',
+            name='Buys',
+            last_name='Client',
+            password='testpass123',
+            role='client',
+        )
+        agent = CustomUser.objects.create_user(
+            email='buys-agent@test.com',
+            phone_number='5551112222',
+            name='Buys',
+            last_name='Agent',
+            password='testpass123',
+            role='agent',
+        )
+        shop = Shop.objects.create(name='Buys Shop', link='https://buys.example.com')
+        order = Order.objects.create(client=client, sales_manager=agent)
+
+        self.products = [
+            Product.objects.create(
+                name=f'Producto {i}', shop=shop, order=order, amount_requested=5, shop_cost=10
+            )
+            for i in range(3)
+        ]
+
+    def _buy(self, product, amount, refund_amount=None):
+        return ProductBuyed.objects.create(
+            original_product=product,
+            amount_buyed=amount,
+            is_refunded=refund_amount is not None,
+            refund_amount=refund_amount or 0,
+        )
+
+    def test_totals_are_aggregated(self):
+        self._buy(self.products[0], 2)
+        self._buy(self.products[0], 3, refund_amount=15.5)
+        self._buy(self.products[1], 1, refund_amount=4.5)
+
+        result = analyze_product_buys()
+
+        self.assertEqual(result['total_product_buys'], 3)
+        self.assertEqual(result['total_amount_buyed'], 6.0)
+        self.assertEqual(result['total_cost'], 6.0)
+        self.assertEqual(result['total_refunded_items'], 4)
+        self.assertEqual(result['total_refund_amount'], 20.0)
+        self.assertEqual(result['refunded_purchases_count'], 2)
+        self.assertEqual(result['non_refunded_purchases_count'], 1)
+
+    def test_top_refunded_products_ordered_and_limited(self):
+        self._buy(self.products[0], 1, refund_amount=5)
+        self._buy(self.products[1], 1, refund_amount=20)
+        self._buy(self.products[1], 1, refund_amount=10)
+        self._buy(self.products[2], 1, refund_amount=12)
+
+        result = analyze_product_buys(top_n=2)
+        top = result['top_refunded_products']
+
+        self.assertEqual(list(top.keys()), ['Producto 1', 'Producto 2'])
+        self.assertEqual(top['Producto 1'], {'refund_count': 2, 'total_refund_amount': 30.0})
+
+    def test_empty_history(self):
+        result = analyze_product_buys()
+
+        self.assertEqual(result['total_product_buys'], 0)
+        self.assertEqual(result['total_refund_amount'], 0.0)
+        self.assertEqual(result['top_refunded_products'], {})
+
+    def test_products_sharing_a_name_are_ranked_together(self):
+        shop = self.products[0].shop
+        order = self.products[0].order
+        duplicate = Product.objects.create(
+            name='Producto 0', shop=shop, order=order, amount_requested=5, shop_cost=10
+        )
+        self._buy(self.products[0], 1, refund_amount=6)
+        self._buy(duplicate, 1, refund_amount=6)
+        self._buy(self.products[1], 1, refund_amount=10)
+        self._buy(self.products[2], 1, refund_amount=3)
+
+        result = analyze_product_buys(top_n=2)
+        top = result['top_refunded_products']
+
+        # Los dos "Producto 0" suman 12 y ocupan una sola posición del top
+        self.assertEqual(list(top.items()), [
+            ('Producto 0', {'refund_count': 2, 'total_refund_amount': 12.0}),
+            ('Producto 1', {'refund_count': 1, 'total_refund_amount': 10.0}),
+        ])
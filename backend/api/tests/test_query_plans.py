@@ -0,0 +1,170 @@
+"""
+Query-plan regression tests: runs EXPLAIN on the queries behind the dashboard,
+report and list views over a seeded database and fails when any of them needs
+a sequential scan of one of the large tables.
+
+On SQLite the plan comes from EXPLAIN QUERY PLAN (any `SCAN <table>` walks the
+whole table, `SEARCH` is an index lookup). On PostgreSQL sequential scans are disabled for the session
+so that a `Seq Scan` in the plan means there is no usable index at all,
+independently of the size of the seeded tables.
+"""
+
+import re
+from datetime import timedelta
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from api.tests import BaseAPITestCase
+from api.models import (
+    DeliverReceip, Expense, Order, Product, ProductBuyed, ShoppingReceip,
+)
+from api.services.client_services import get_all_clients_balances_summary
+
+
+LARGE_TABLES = {
+    model._meta.db_table
+    for model in (Product, Order, DeliverReceip, ProductBuyed, ShoppingReceip, Expense)
+}
+
+
+class QueryPlanTest(BaseAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.now = timezone.now()
+        self.orders = Order.objects.bulk_create([
+            Order(
+                client=self.client_user, sales_manager=self.agent_user,
+                status=['Encargado', 'Procesando', 'Completado'][i % 3],
+                created_at=self.now - timedelta(days=i),
+            )
+            for i in range(60)
+        ])
+        self.products = Product.objects.bulk_create([
+            Product(
+                name=f'Producto {i}', shop=self.test_shop, order=self.orders[i % 60],
+                status=['Encargado', 'Comprado', 'Recibido', 'Entregado'][i % 4],
+                amount_requested=1, shop_cost=10, total_cost=12,
+                created_at=self.now - timedelta(hours=i),
+            )
+            for i in range(240)
+        ])
+        receipts = ShoppingReceip.objects.bulk_create([
+            ShoppingReceip(
+                shopping_account=self.test_buying_account, shop_of_buy=self.test_shop,
+                card_id=f'4111{i % 5}', buy_date=self.now - timedelta(days=i),
+            )
+            for i in range(80)
+        ])
+        ProductBuyed.objects.bulk_create([
+            ProductBuyed(original_product=product, shoping_receip=receipts[i % 80], amount_buyed=1)
+            for i, product in enumerate(self.products)
+        ])
+        DeliverReceip.objects.bulk_create([
+            DeliverReceip(
+                client=self.client_user, weight=1, weight_cost=5,
+                payment_status=['Pagado', 'Parcial', 'No pagado'][i % 3],
+                deliver_date=self.now - timedelta(days=i),
+            )
+            for i in range(80)
+        ])
+        Expense.objects.bulk_create([
+            Expense(amount=10, date=self.now - timedelta(days=i)) for i in range(80)
+        ])
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+
+    def _plan(self, sql, params=()):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute(f'EXPLAIN {sql}', params)
+            else:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return '\n'.join(' '.join(str(col) for col in row) for row in cursor.fetchall())
+
+    def _sequential_scans(self, plan):
+        if connection.vendor == 'postgresql':
+            tables = re.findall(r'Seq Scan on (\w+)', plan)
+        else:
+            # SCAN recorre la tabla entera, también con `USING INDEX` (solo evita
+            # ordenar); SEARCH es un acceso por índice. Las subconsultas de Django
+            # usan alias U0, U1... sobre las mismas tablas.
+            tables = re.findall(r'\bSCAN (\w+)', plan)
+        return [table for table in tables if table in LARGE_TABLES or re.fullmatch(r'U\d+', table)]
+
+    def assertUsesIndexes(self, label, queryset):
+        sql, params = queryset.query.sql_with_params()
+        plan = self._plan(sql, params)
+        self.assertEqual(self._sequential_scans(plan), [], f'{label}:\n{plan}')
+        list(queryset)  # la consulta también debe ejecutarse
+
+    # ------------------------------------------------------------------
+    # Tests
+    # ------------------------------------------------------------------
+
+    def test_detects_sequential_scans(self):
+        queryset = Product.objects.filter(description='sin índice')
+        sql, params = queryset.query.sql_with_params()
+        self.assertEqual(self._sequential_scans(self._plan(sql, params)), [Product._meta.db_table])
+
+    def test_dashboard_queries(self):
+        agent = self.agent_user
+        queries = {
+            'productos por estado': Product.objects.filter(status='Comprado'),
+            'productos en estados activos': Product.objects.filter(status__in=['Comprado', 'Recibido', 'Entregado']),
+            'pedidos por estado': Order.objects.filter(status='Completado'),
+            'pedidos del agente': Order.objects.filter(sales_manager=agent),
+            'pedidos completados del agente': Order.objects.filter(sales_manager=agent, status='Completado'),
+        }
+        for label, queryset in queries.items():
+            with self.subTest(label):
+                self.assertUsesIndexes(label, queryset)
+
+    def test_report_queries(self):
+        start, end = self.now - timedelta(days=30), self.now
+        queries = {
+            'entregas pagadas por fecha': DeliverReceip.objects.filter(
+                payment_status__in=['Pagado', 'Parcial'], deliver_date__gte=start, deliver_date__lte=end
+            ),
+            'entregas no pagadas por fecha': DeliverReceip.objects.filter(
+                payment_status='No pagado', deliver_date__gte=start
+            ),
+            'entregas por fecha': DeliverReceip.objects.filter(deliver_date__gte=start, deliver_date__lte=end),
+            'compras por fecha': ShoppingReceip.objects.filter(buy_date__gte=start, buy_date__lte=end),
+            'operaciones por tarjeta': ShoppingReceip.objects.filter(card_id='41110', buy_date__gte=start),
+            'gastos por fecha': Expense.objects.filter(date__gte=start, date__lte=end),
+            'compras de un producto': ProductBuyed.objects.filter(original_product=self.products[0]),
+        }
+        for label, queryset in queries.items():
+            with self.subTest(label):
+                self.assertUsesIndexes(label, queryset)
+
+    def test_list_queries(self):
+        order = self.orders[0]
+        queries = {
+            'pedidos del cliente': Order.objects.filter(client=self.client_user).order_by('-created_at'),
+            'entregas del cliente': DeliverReceip.objects.filter(client=self.client_user).order_by('-deliver_date'),
+            'productos del pedido por estado': Product.objects.filter(order=order, status='Encargado'),
+            'productos del pedido': Product.objects.filter(order=order),
+            'pedidos de los clientes del agente': Order.objects.filter(agent=self.agent_user),
+            'productos de los clientes del agente': Product.objects.filter(agent=self.agent_user),
+            'entregas de los clientes del agente': DeliverReceip.objects.filter(agent=self.agent_user),
+            'compras de los clientes del agente': ProductBuyed.objects.filter(agent=self.agent_user),
+        }
+        for label, queryset in queries.items():
+            with self.subTest(label):
+                self.assertUsesIndexes(label, queryset)
+
+    def test_client_balances_report(self):
+        """Las subconsultas correlacionadas por cliente se resuelven con índices."""
+        with CaptureQueriesContext(connection) as ctx:
+            get_all_clients_balances_summary()
+        self.assertTrue(ctx.captured_queries)
+        for query in ctx.captured_queries:
+            plan = self._plan(query['sql'])
+            self.assertEqual(self._sequential_scans(plan), [], f"{query['sql']}\n{plan}")
@@ -0,0 +1,78 @@
+"""
+Tests for the SQL-computed shopping receipt costs (annotate_receipt_costs).
+"""
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.tests import BaseAPITestCase
+from api.models import Order, Product, ProductBuyed, ShoppingReceip
+from api.services.purchases_service import annotate_receipt_costs
+
+
+API = '/arye_system/api_data'
+
+
+class ReceiptCostsTest(BaseAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.admin_user.role = 'admin'
+        self.admin_user.save()
+        self.authenticate_user(self.admin_user)
+        self.order = Order.objects.create(client=self.client_user, sales_manager=self.agent_user)
+        self.full = Product.objects.create(
+            name='Completo', shop=self.test_shop, order=self.order,
+            amount_requested=2, shop_cost=10, total_cost=25
+        )
+        self.partial = Product.objects.create(
+            name='Parcial', shop=self.test_shop, order=self.order, amount_requested=5,
+            shop_cost=12.35, shop_delivery_cost=3.1, shop_taxes=5, added_taxes=1.25, own_taxes=0.5
+        )
+        self.no_iva = Product.objects.create(
+            name='Sin IVA', shop=self.test_shop, order=self.order, amount_requested=4,
+            shop_cost=7.77, shop_taxes=3, charge_iva=False
+        )
+
+    def _receipt(self):
+        receipt = ShoppingReceip.objects.create(
+            shopping_account=self.test_buying_account, shop_of_buy=self.test_shop,
+            total_cost_of_purchase=100
+        )
+        ProductBuyed.objects.create(original_product=self.full, shoping_receip=receipt, amount_buyed=2)
+        ProductBuyed.objects.create(original_product=self.partial, shoping_receip=receipt, amount_buyed=3)
+        ProductBuyed.objects.create(
+            original_product=self.no_iva, shoping_receip=receipt, amount_buyed=1,
+            is_refunded=True, refund_amount=8.5
+        )
+        return receipt
+
+    def test_annotations_match_python_calculation(self):
+        receipt = self._receipt()
+        annotated = annotate_receipt_costs(ShoppingReceip.objects.filter(pk=receipt.pk)).get()
+        plain = ShoppingReceip.objects.get(pk=receipt.pk)
+
+        self.assertAlmostEqual(annotated.total_cost_of_shopping, plain.total_cost_of_shopping, places=2)
+        self.assertAlmostEqual(annotated.total_cost_excluding_refunds, plain.total_cost_excluding_refunds, places=2)
+        self.assertEqual(annotated.total_refunded, plain.total_refunded)
+        self.assertEqual(annotated.real_cost_paid, plain.real_cost_paid)
+        self.assertEqual(annotated.total_refunded, 8.5)
+
+    def test_list_query_count_is_constant(self):
+        def count_queries():
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(f'{API}/shopping_reciep/')
+            self.assertEqual(response.status_code, 200)
+            return len(ctx.captured_queries), response.data['results']
+
+        self._receipt()
+        baseline, _ = count_queries()
+
+        for _ in range(6):
+            self._receipt()
+        queries, results = count_queries()
+
+        self.assertEqual(queries, baseline)
+        self.assertEqual(len(results), 7)
+        self.assertEqual(results[0]['total_refunded'], 8.5)
+        self.assertEqual(results[0]['real_cost_paid'], 91.5)
@@ -0,0 +1,108 @@
+"""
+Tests for the orjson / MessagePack renderers and parsers.
+"""
+
+import datetime
+import decimal
+import io
+import json
+import uuid
+
+import msgpack
+from django.core.management import call_command
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+
+from api.tests import BaseAPITestCase
+from api.models import Order, Product
+from api.renderers import OrjsonRenderer, MessagePackRenderer
+
+
+API = '/arye_system/api_data'
+
+
+class RenderersTest(BaseAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.admin_user.role = 'admin'
+        self.admin_user.save()
+        self.authenticate_user(self.admin_user)
+        self.order = Order.objects.create(client=self.client_user, sales_manager=self.agent_user)
+        Product.objects.create(
+            name='Producto', shop=self.test_shop, order=self.order,
+            amount_requested=2, shop_cost=10, total_cost=15
+        )
+
+    def test_orjson_output_matches_drf_encoder(self):
+        data = {
+            'decimal': decimal.Decimal('12.35'),
+            'uuid': uuid.uuid4(),
+            'datetime': datetime.datetime(2025, 1, 2, 3, 4, 5, 678901, tzinfo=datetime.timezone.utc),
+            'date': datetime.date(2025, 1, 2),
+            'duration': datetime.timedelta(hours=1),
+            'lazy': gettext_lazy('Pendiente'),
+            'nested': [{'n': 1, 'f': 1.5, 'none': None, 'text': 'ñandú'}],
+            1: 'clave numérica',
+        }
+        expected = json.loads(JSONRenderer().render(data))
+        self.assertEqual(json.loads(OrjsonRenderer().render(data)), expected)
+        self.assertEqual(expected['datetime'], '2025-01-02T03:04:05.678901Z')
+
+    def test_orjson_datetimes_match_drf_encoder(self):
+        # Respuestas con fechas sueltas (dashboard, estadísticas): mismo texto que DRF
+        data = {
+            'utc': datetime.datetime(2025, 1, 2, 3, 4, 5, 678901, tzinfo=datetime.timezone.utc),
+            'offset': datetime.datetime(2025, 7, 2, 3, 4, 5, 120000, tzinfo=datetime.timezone(datetime.timedelta(hours=-5))),
+            'naive': datetime.datetime(2025, 1, 2, 3, 4, 5, 1),
+            'whole_second': datetime.datetime(2025, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc),
+            'time': datetime.time(3, 4, 5, 120000),
+            'items': [{'at': datetime.datetime(2025, 1, 2, 3, 4, 5, 999999, tzinfo=datetime.timezone.utc)}],
+        }
+        self.assertEqual(OrjsonRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(
+            msgpack.unpackb(MessagePackRenderer().render(data)), json.loads(JSONRenderer().render(data))
+        )
+
+        aware_time = {'time': datetime.time(3, 4, tzinfo=datetime.timezone.utc)}
+        with self.assertRaises(ValueError):
+            JSONRenderer().render(aware_time)
+        with self.assertRaises((ValueError, TypeError)):
+            OrjsonRenderer().render(aware_time)
+
+    def test_default_json_response_uses_orjson(self):
+        response = self.client.get(f'{API}/order/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response.accepted_renderer, OrjsonRenderer)
+        self.assertEqual(json.loads(response.content)['results'][0]['id'], self.order.id)
+
+    def test_msgpack_is_negotiated_by_accept_header(self):
+        json_response = self.client.get(f'{API}/order/{self.order.id}/')
+        response = self.client.get(f'{API}/order/{self.order.id}/', HTTP_ACCEPT='application/msgpack')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertIsInstance(response.accepted_renderer, MessagePackRenderer)
+        self.assertEqual(msgpack.unpackb(response.content), json.loads(json_response.content))
+
+    def test_parsers_accept_json_and_msgpack_and_reject_invalid_json(self):
+        payload = {'client': self.client_user.id, 'sales_manager': self.agent_user.id}
+        response = self.client.post(
+            f'{API}/order/', data=msgpack.packb(payload), content_type='application/msgpack'
+        )
+        self.assertNotEqual(response.status_code, 415)
+
+        response = self.client.post(f'{API}/order/', data='{"client": ', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('JSON parse error', response.data['detail'])
+
+    def test_benchmark_command(self):
+        out = io.StringIO()
+        call_command(
+            'benchmark_renderers', iterations=1, user=self.admin_user.email,
+            paths=[f'{API}/order/', f'{API}/reports/profits/'], stdout=out
+        )
+        output = out.getvalue()
+        self.assertIn('orjson ms', output)
+        self.assertIn('/order/', output)
+        self.assertIn('Completado', output)
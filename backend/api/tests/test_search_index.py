@@ -0,0 +1,106 @@
+"""
+Tests for the search index (SearchDocument), the indexed ?search= filters and
+the unified /search endpoint.
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+
+from api.tests import BaseAPITestCase
+from api.models import Order, Product, SearchDocument
+from api.services.search_service import SearchService, normalize_text
+
+
+API = '/arye_system/api_data'
+User = get_user_model()
+
+
+class SearchIndexTest(BaseAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.admin_user.role = 'admin'
+        self.admin_user.save()
+        self.authenticate_user(self.admin_user)
+        self.maria = User.objects.create_user(
+            email='maria.lopez@example.com', phone_number='5550001', name='María',
+            last_name='López', password='x', role='client', assigned_agent=self.agent_user
+        )
+        self.pedro = User.objects.create_user(
+            email='pedro@example.com', phone_number='5550002', name='Pedro',
+            last_name='Gómez', password='x', role='client'
+        )
+        self.maria_order = Order.objects.create(client=self.maria, sales_manager=self.agent_user)
+        self.pedro_order = Order.objects.create(client=self.pedro, sales_manager=self.agent_user)
+        self.shoes = Product.objects.create(
+            name='Zapatillas running', sku='ZR-001', shop=self.test_shop, order=self.maria_order,
+            amount_requested=1, shop_cost=50, total_cost=60
+        )
+        self.jacket = Product.objects.create(
+            name='Chaqueta', shop=self.test_shop, order=self.pedro_order,
+            amount_requested=1, shop_cost=80, total_cost=90
+        )
+
+    def test_documents_are_maintained_on_save_and_delete(self):
+        document = SearchDocument.objects.get(entity_type='order', object_id=str(self.maria_order.id))
+        self.assertIn('maria lopez', document.content)
+
+        # Cambiar el cliente reindexa sus pedidos
+        self.maria.last_name = 'Fernández'
+        self.maria.save()
+        document.refresh_from_db()
+        self.assertIn('fernandez', document.content)
+
+        self.jacket.delete()
+        self.assertFalse(SearchDocument.objects.filter(entity_type='product', object_id=str(self.jacket.id)).exists())
+
+    def test_search_is_accent_and_case_insensitive_with_prefixes(self):
+        results = SearchService.search('MARIA lóp')
+        keys = {(kind, object_id) for kind, object_id, _ in results}
+        self.assertIn(('user', str(self.maria.id)), keys)
+        self.assertIn(('order', str(self.maria_order.id)), keys)
+        self.assertNotIn(('order', str(self.pedro_order.id)), keys)
+        self.assertEqual(normalize_text('  Gómez  PÉREZ '), 'gomez perez')
+
+    def test_viewsets_filter_with_the_index(self):
+        response = self.client.get(f'{API}/order/', {'search': 'pedro gom'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([order['id'] for order in response.data['results']], [self.pedro_order.id])
+
+        response = self.client.get(f'{API}/order/', {'search': str(self.maria_order.id)})
+        self.assertIn(self.maria_order.id, [order['id'] for order in response.data['results']])
+
+        response = self.client.get(f'{API}/product/', {'search': 'zapatillas'})
+        self.assertEqual([product['id'] for product in response.data['results']], [str(self.shoes.id)])
+
+        response = self.client.get(f'{API}/user/', {'search': '5550002'})
+        self.assertEqual([user['id'] for user in response.data['results']], [self.pedro.id])
+
+    def test_unified_search_is_ranked_paginated_and_scoped(self):
+        response = self.client.get(f'{API}/search/', {'q': 'maria', 'page_size': 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIsNotNone(response.data['next'])
+        first = response.data['results'][0]
+        self.assertEqual(set(first), {'type', 'id', 'title', 'subtitle', 'rank'})
+
+        response = self.client.get(f'{API}/search/', {'q': 'maria', 'types': 'order'})
+        self.assertEqual([(item['type'], item['id']) for item in response.data['results']],
+                         [('order', str(self.maria_order.id))])
+
+        # Un cliente solo ve sus propios pedidos y productos
+        self.authenticate_user(self.pedro)
+        response = self.client.get(f'{API}/search/', {'q': 'zapatillas chaqueta'})
+        self.assertEqual(response.data['count'], 0)
+        response = self.client.get(f'{API}/search/', {'q': 'chaqueta'})
+        self.assertEqual([item['id'] for item in response.data['results']], [str(self.jacket.id)])
+
+        response = self.client.get(f'{API}/search/')
+        self.assertEqual(response.status_code, 400)
+
+    def test_rebuild_command(self):
+        SearchDocument.objects.all().delete()
+        call_command('rebuild_search_index', stdout=open('/dev/null', 'w'))
+        self.assertEqual(SearchDocument.objects.filter(entity_type='product').count(), Product.objects.count())
+        self.assertTrue(SearchService.search('zapatillas'))
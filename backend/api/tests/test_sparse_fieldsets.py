@@ -0,0 +1,76 @@
+"""
+Tests for ?fields= / ?expand= on the order, product, delivery and shopping receipt lists.
+"""
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.tests import BaseAPITestCase
+from api.models import Order, Product, DeliverReceip
+from api.serializers import OrderSerializer
+from api.views.mixins import get_eager_loading
+
+
+API = '/arye_system/api_data'
+
+
+class SparseFieldsetTest(BaseAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.admin_user.role = 'admin'
+        self.admin_user.save()
+        self.authenticate_user(self.admin_user)
+        self.product = Product.objects.create(
+            name='Producto', shop=self.test_shop, order=self.test_order,
+            amount_requested=2, shop_cost=10, total_cost=15
+        )
+
+    def _first(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return response.data['results'][0]
+
+    def test_default_response_is_unchanged(self):
+        row = self._first(f'{API}/order/')
+
+        self.assertEqual(row['client']['id'], self.client_user.id)
+        self.assertEqual(row['products'][0]['name'], 'Producto')
+
+    def test_fields_restricts_output(self):
+        row = self._first(f'{API}/order/?fields=id,status,total_cost')
+
+        self.assertEqual(set(row.keys()), {'id', 'status', 'total_cost'})
+
+    def test_unexpanded_relations_collapse_to_ids(self):
+        row = self._first(f'{API}/order/?fields=id,client,sales_manager,products&expand=client')
+
+        self.assertEqual(row['client']['id'], self.client_user.id)
+        self.assertEqual(row['sales_manager'], self.agent_user.id)
+        self.assertEqual(row['products'], [self.product.id])
+
+    def test_product_and_delivery_fields(self):
+        DeliverReceip.objects.create(client=self.client_user, weight=2)
+
+        product = self._first(f'{API}/product/?fields=id,name,system_profit')
+        self.assertEqual(set(product.keys()), {'id', 'name', 'system_profit'})
+
+        delivery = self._first(f'{API}/delivery_receips/?fields=id,client')
+        self.assertEqual(delivery, {'id': delivery['id'], 'client': self.client_user.id})
+
+    def test_eager_loading_follows_fieldset(self):
+        select, prefetch = get_eager_loading(OrderSerializer, Order, ('id', 'status'), None)
+        self.assertEqual((select, prefetch), (frozenset(), frozenset()))
+
+        select, prefetch = get_eager_loading(OrderSerializer, Order, None, ('client',))
+        self.assertIn('client__assigned_agent', select)
+        self.assertNotIn('sales_manager__assigned_agent', select)
+        self.assertEqual(prefetch, frozenset({'products'}))
+
+    def test_slim_list_runs_fewer_queries(self):
+        with CaptureQueriesContext(connection) as full:
+            self.client.get(f'{API}/order/')
+        with CaptureQueriesContext(connection) as slim:
+            self.client.get(f'{API}/order/?fields=id,status')
+
+        self.assertLess(len(slim.captured_queries), len(full.captured_queries))
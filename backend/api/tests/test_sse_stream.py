@@ -0,0 +1,219 @@
+"""
+Tests for the async SSE notification stream served through the ASGI handler
+(NotificationBroker fan-out, Last-Event-ID resume, heartbeats and many idle
+connections).
+"""
+
+import asyncio
+import time
+from unittest import mock
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.handlers.asgi import ASGIHandler
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api.tests import BaseAPITestCase
+from api.notifications import realtime_notifications
+from api.notifications.realtime_notifications import NotificationBroker, NotificationSSE
+
+
+STREAM_PATH = '/arye_system/api_data/notifications/stream/'
+
+
+class _Connection:
+    """Petición HTTP en curso contra la aplicación ASGI."""
+
+    def __init__(self, app, path, headers=(), query_string=b''):
+        self.inbox = asyncio.Queue()
+        self.outbox = asyncio.Queue()
+        self.inbox.put_nowait({'type': 'http.request', 'body': b'', 'more_body': False})
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': 'GET', 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+            'query_string': query_string, 'root_path': '',
+            'headers': [(b'host', b'testserver'), *headers],
+            'client': ('127.0.0.1', 50000), 'server': ('testserver', 80),
+        }
+        self.task = asyncio.ensure_future(app(scope, self.inbox.get, self.outbox.put))
+
+    async def start(self):
+        message = await asyncio.wait_for(self.outbox.get(), timeout=10)
+        return message['status']
+
+    async def next_chunk(self):
+        message = await asyncio.wait_for(self.outbox.get(), timeout=10)
+        return message.get('body', b'').decode()
+
+    async def disconnect(self):
+        await self.inbox.put({'type': 'http.disconnect'})
+        await asyncio.wait_for(self.task, timeout=10)
+
+
+class SSEStreamTest(BaseAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        # Como el cliente de test de Django: las peticiones no deben cerrar la
+        # conexión de la transacción del test
+        request_started.disconnect(close_old_connections)
+        request_finished.disconnect(close_old_connections)
+        self.addCleanup(request_started.connect, close_old_connections)
+        self.addCleanup(request_finished.connect, close_old_connections)
+        self.app = ASGIHandler()
+        self.broker = NotificationBroker()
+        patcher = mock.patch.object(realtime_notifications, 'broker', self.broker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        token = RefreshToken.for_user(self.client_user).access_token
+        self.auth = [(b'authorization', f'Bearer {token}'.encode())]
+
+    def test_requires_authentication(self):
+        async def scenario():
+            connection = _Connection(self.app, STREAM_PATH)
+            self.assertEqual(await connection.start(), 401)
+            await connection.disconnect()
+
+        async_to_sync(scenario)()
+
+    def test_rejects_wsgi(self):
+        # El cliente de test usa el handler WSGI: debe responder al momento,
+        # sin quedarse consumiendo el generador
+        self.authenticate_user(self.client_user)
+        response = self.client.get(STREAM_PATH)
+        self.assertEqual(response.status_code, 503)
+        self.assertIn(b'ASGI', response.content)
+        self.assertEqual(self.broker.connection_count(), 0)
+
+    def test_stream_delivers_notifications_and_heartbeats(self):
+        async def scenario():
+            connection = _Connection(self.app, STREAM_PATH, self.auth)
+            self.assertEqual(await connection.start(), 200)
+            self.assertIn('event: connected', await connection.next_chunk())
+            self.assertEqual(self.broker.connection_count(self.client_user.id), 1)
+
+            self.assertIn('event: heartbeat', await connection.next_chunk())
+
+            # Las señales publican desde el hilo de la vista síncrona
+            await asyncio.to_thread(NotificationSSE.publish_notification, self.client_user.id, {'title': 'Hola'})
+            chunk = await connection.next_chunk()
+            self.assertIn('event: notification', chunk)
+            self.assertIn('"title": "Hola"', chunk)
+
+            await connection.disconnect()
+            self.assertEqual(self.broker.connection_count(self.client_user.id), 0)
+
+        with mock.patch.object(NotificationSSE, 'HEARTBEAT_INTERVAL', 0.05):
+            async_to_sync(scenario)()
+
+    def test_resume_from_last_event_id(self):
+        async def scenario():
+            connection = _Connection(self.app, STREAM_PATH, self.auth)
+            await connection.start()
+            await connection.next_chunk()
+            for title in ('Uno', 'Dos', 'Tres'):
+                await sync_to_async(NotificationSSE.publish_notification)(self.client_user.id, {'title': title})
+            chunks = [await connection.next_chunk() for _ in range(3)]
+            ids = [int(chunk.split('\n', 1)[0].removeprefix('id: ')) for chunk in chunks]
+            self.assertEqual(ids, [ids[0], ids[0] + 1, ids[0] + 2])
+            await connection.disconnect()
+
+            # Reconexión: solo se reenvía lo posterior al cursor, sin consumirlo
+            for _ in range(2):
+                resumed = _Connection(
+                    self.app, STREAM_PATH, [*self.auth, (b'last-event-id', str(ids[0]).encode())]
+                )
+                await resumed.start()
+                self.assertIn('event: connected', await resumed.next_chunk())
+                self.assertIn('"title": "Dos"', await resumed.next_chunk())
+                self.assertIn('"title": "Tres"', await resumed.next_chunk())
+                await resumed.disconnect()
+
+            by_query = _Connection(self.app, STREAM_PATH, self.auth, f'last_event_id={ids[2]}'.encode())
+            await by_query.start()
+            await by_query.next_chunk()
+            await sync_to_async(NotificationSSE.publish_notification)(self.client_user.id, {'title': 'Cuatro'})
+            chunk = await by_query.next_chunk()
+            self.assertTrue(chunk.startswith(f'id: {ids[2] + 1}\n'))
+            await by_query.disconnect()
+
+        async_to_sync(scenario)()
+
+    def test_cursor_older_than_buffer_requests_resync(self):
+        async def scenario():
+            # Solo se guardan mensajes de usuarios conectados (o desconectados hace poco)
+            first = _Connection(self.app, STREAM_PATH, self.auth)
+            await first.start()
+            await first.next_chunk()
+            for index in range(NotificationBroker.BUFFER_SIZE + 5):
+                await sync_to_async(NotificationSSE.publish_notification)(self.client_user.id, {'n': index})
+            await first.disconnect()
+
+            connection = _Connection(self.app, STREAM_PATH, [*self.auth, (b'last-event-id', b'1')])
+            await connection.start()
+            await connection.next_chunk()
+            self.assertIn('event: resync', await connection.next_chunk())
+            replayed = [await connection.next_chunk() for _ in range(NotificationBroker.BUFFER_SIZE)]
+            self.assertIn('"n": 5', replayed[0])
+            await connection.disconnect()
+
+        async_to_sync(scenario)()
+
+    def test_idle_buffers_are_evicted(self):
+        async def scenario():
+            # Sin conexiones no se guarda nada
+            await sync_to_async(NotificationSSE.publish_notification)(self.agent_user.id, {'title': 'Nadie'})
+            self.assertEqual(self.broker.buffer_count(), 0)
+
+            connection = _Connection(self.app, STREAM_PATH, self.auth)
+            await connection.start()
+            await connection.next_chunk()
+            await sync_to_async(NotificationSSE.publish_notification)(self.client_user.id, {'title': 'Uno'})
+            last_id = (await connection.next_chunk()).split('\n', 1)[0].removeprefix('id: ')
+            await connection.disconnect()
+
+            # Dentro de la ventana de reenvío el buffer sigue y acumula
+            await sync_to_async(NotificationSSE.publish_notification)(self.client_user.id, {'title': 'Dos'})
+            now = time.monotonic()
+            self.assertEqual(self.broker.evict_idle(now + NotificationBroker.REPLAY_WINDOW - 1), 0)
+            self.assertEqual(self.broker.buffer_count(), 1)
+
+            self.assertEqual(self.broker.evict_idle(now + NotificationBroker.REPLAY_WINDOW + 1), 1)
+            self.assertEqual(self.broker.buffer_count(), 0)
+
+            # Reconectar con un cursor cuyo buffer se descartó pide recargar
+            resumed = _Connection(self.app, STREAM_PATH, [*self.auth, (b'last-event-id', last_id.encode())])
+            await resumed.start()
+            await resumed.next_chunk()
+            self.assertIn('event: resync', await resumed.next_chunk())
+            await resumed.disconnect()
+
+        async_to_sync(scenario)()
+
+    def test_many_idle_connections_do_not_block_the_api(self):
+        connections_count = 1000
+
+        async def scenario():
+            connections = [_Connection(self.app, STREAM_PATH, self.auth) for _ in range(connections_count)]
+            statuses = await asyncio.gather(*(connection.start() for connection in connections))
+            self.assertEqual(set(statuses), {200})
+            await asyncio.gather(*(connection.next_chunk() for connection in connections))
+            self.assertEqual(self.broker.connection_count(self.client_user.id), connections_count)
+
+            # Una petición normal se atiende mientras todas siguen abiertas
+            started = time.perf_counter()
+            probe = _Connection(self.app, '/health/')
+            self.assertEqual(await probe.start(), 200)
+            self.assertLess(time.perf_counter() - started, 2)
+            await probe.disconnect()
+
+            # Fan-out a todas las conexiones del usuario
+            await sync_to_async(NotificationSSE.publish_notification)(self.client_user.id, {'title': 'Todos'})
+            chunks = await asyncio.gather(*(connection.next_chunk() for connection in connections))
+            self.assertTrue(all('"title": "Todos"' in chunk for chunk in chunks))
+
+            await asyncio.gather(*(connection.disconnect() for connection in connections))
+            self.assertEqual(self.broker.connection_count(), 0)
+
+        async_to_sync(scenario)()
@@ -0,0 +1,79 @@
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from django.db.models import Count, Sum
+from django.test import TestCase
+from django.utils import timezone
+
+from api.models import Expense
+from api.services.time_series_service import (
+    bucket_series, iter_buckets, months_back_start, truncate_date
+)
+
+
+class TimeSeriesEngineTest(TestCase):
+    def _expense(self, when, amount):
+        return Expense.objects.create(date=when, amount=amount, category='General')
+
+    def _at(self, year, month, day, hour=12):
+        return timezone.make_aware(datetime(year, month, day, hour))
+
+    def test_monthly_series_is_gap_filled(self):
+        self._expense(self._at(2025, 1, 10), 10)
+        self._expense(self._at(2025, 1, 20), 5)
+        self._expense(self._at(2025, 3, 2), 7)
+
+        series = bucket_series(
+            Expense.objects.all(), 'date',
+            {'total': Sum('amount'), 'count': Count('id')},
+            granularity='month',
+            start=self._at(2025, 1, 1, 0),
+            end=self._at(2025, 4, 30),
+        )
+
+        self.assertEqual([row['label'] for row in series], ['2025-01', '2025-02', '2025-03', '2025-04'])
+        self.assertEqual([row['total'] for row in series], [15, 0, 7, 0])
+        self.assertEqual([row['count'] for row in series], [2, 0, 1, 0])
+
+    def test_series_is_one_query(self):
+        self._expense(self._at(2025, 1, 10), 10)
+
+        with self.assertNumQueries(1):
+            bucket_series(
+                Expense.objects.all(), 'date', {'total': Sum('amount')},
+                granularity='day',
+                start=self._at(2025, 1, 1), end=self._at(2025, 1, 31),
+            )
+
+    def test_weekly_buckets_start_on_monday(self):
+        self._expense(self._at(2025, 1, 8), 3)  # miércoles
+        self._expense(self._at(2025, 1, 12), 4)  # domingo, misma semana
+
+        series = bucket_series(Expense.objects.all(), 'date', {'total': Sum('amount')}, granularity='week')
+
+        self.assertEqual(len(series), 1)
+        self.assertEqual(series[0]['bucket'], date(2025, 1, 6))
+        self.assertEqual(series[0]['total'], 7)
+
+    def test_buckets_use_current_timezone(self):
+        tz = ZoneInfo('America/Havana')
+        # 31 de enero 23:30 en La Habana es 1 de febrero en UTC
+        self._expense(datetime(2025, 1, 31, 23, 30, tzinfo=tz), 9)
+
+        with timezone.override(tz):
+            series = bucket_series(Expense.objects.all(), 'date', {'total': Sum('amount')})
+
+        self.assertEqual([(row['label'], row['total']) for row in series], [('2025-01', 9)])
+
+    def test_empty_series_without_range(self):
+        self.assertEqual(bucket_series(Expense.objects.all(), 'date', {'total': Sum('amount')}), [])
+
+    def test_helpers(self):
+        self.assertEqual(truncate_date(date(2025, 5, 17), 'month'), date(2025, 5, 1))
+        self.assertEqual(
+            list(iter_buckets(date(2024, 11, 15), date(2025, 2, 1))),
+            [date(2024, 11, 1), date(2024, 12, 1), date(2025, 1, 1), date(2025, 2, 1)]
+        )
+        self.assertEqual(months_back_start(11, self._at(2025, 3, 15)).date(), date(2024, 4, 1))
+        with self.assertRaises(ValueError):
+            truncate_date(date(2025, 1, 1), 'year')
@@ -53,6 +53,7 @@ from .invoice_views import (
 )
 
 from .balance_views import BalanceViewSet
+from .search_views import GlobalSearchView
 
 __all__ = [
     # Auth views
@@ -93,6 +94,7 @@ __all__ = [
     'DashboardMetricsView',
     'ProfitReportsView',
     'SystemInfoView',
+    'GlobalSearchView',
     'ExpenseAnalysisView',
     'DeliveryAnalysisView',
     'OrderAnalysisView',
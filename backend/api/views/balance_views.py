@@ -13,9 +13,10 @@ from api.serializers.balances_serializers import (
 )
 from api.permissions.permissions import AdminPermission, AccountantPermission
 from api.services.balance_service import BalanceService
+from api.views.mixins import EagerLoadingMixin
 
 
-class BalanceViewSet(viewsets.ModelViewSet):
+class BalanceViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     ViewSet for managing Expected Metrics.
     Provides CRUD operations and additional actions for calculating actual values.
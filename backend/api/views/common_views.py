@@ -13,10 +13,11 @@ from api.serializers import (
     ImageUploadSerializer
 )
 from api.permissions.permissions import ReadOnly, AdminPermission
+from api.views.mixins import EagerLoadingMixin
 import cloudinary.uploader
 
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     ViewSet para gestión de categorías.
     """
@@ -73,7 +74,7 @@ class CategoryViewSet(viewsets.ModelViewSet):
         return super().destroy(request, *args, **kwargs)
 
 
-class CommonInformationViewSet(viewsets.ModelViewSet):
+class CommonInformationViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     ViewSet para información común del sistema.
     """
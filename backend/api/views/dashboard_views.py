@@ -4,7 +4,7 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
 from drf_spectacular.utils import extend_schema
 from django.db.models import Q, Count, Sum, Avg, F, FloatField
-from django.db.models.functions import Coalesce, TruncMonth
+from django.db.models.functions import Coalesce
 from django.conf import settings
 import platform
 from django.db import connection
@@ -15,7 +15,9 @@ from api.services.client_services import get_all_clients_balances_summary
 from api.services.delivery_service import analyze_deliveries, get_unpaid_deliveries
 from api.services.purchases_service import get_purchases_summary, analyze_product_buys
 from api.services.profit_service import ProfitCalculationService
+from api.services.time_series_service import bucket_series, months_back_start
 from api.enums import ProductStatusEnum
+from api.middleware.compression_middleware import CompressionMiddleware
 
 
 class DashboardMetricsView(APIView):
@@ -271,7 +273,7 @@ class DashboardMetricsView(APIView):
         total_agent_clients = 0
         
         for agent in agents:
-            agent_deliveries = DeliverReceip.objects.filter(client__assigned_agent=agent)
+            agent_deliveries = DeliverReceip.objects.filter(agent=agent)
             agent_profit = agent_deliveries.aggregate(
                 total=Sum('manager_profit')
             )['total'] or 0.0
@@ -333,17 +335,13 @@ class DashboardMetricsView(APIView):
         delivery_rate = round((total_delivered / total_ordered * 100) if total_ordered > 0 else 0.0, 2)
         
         # Productos más reembolsados
-        product_buys_analysis = analyze_product_buys()
+        product_buys_analysis = analyze_product_buys(top_n=10)
         top_refunded_products = product_buys_analysis.get('top_refunded_products', {})
-        # Convertir a lista ordenada por monto de reembolso
-        top_refunded_list = sorted(
-            [
-                {'name': name, 'refund_count': data['refund_count'], 'total_refund_amount': data['total_refund_amount']}
-                for name, data in top_refunded_products.items()
-            ],
-            key=lambda x: x['total_refund_amount'],
-            reverse=True
-        )[:10]  # Top 10
+        # Ya viene ordenado por monto de reembolso (Top 10) desde la base de datos
+        top_refunded_list = [
+            {'name': name, 'refund_count': data['refund_count'], 'total_refund_amount': data['total_refund_amount']}
+            for name, data in top_refunded_products.items()
+        ]
         
         product_metrics = {
             'pending_purchase': products_pending_purchase,
@@ -468,7 +466,7 @@ class DashboardMetricsView(APIView):
         )
 
         # Entregas de mis clientes
-        my_deliveries = DeliverReceip.objects.filter(client__assigned_agent=user)
+        my_deliveries = DeliverReceip.objects.filter(agent=user)
         deliveries_data = my_deliveries.aggregate(
             total=Count('id'),
             pending=Count('id', filter=Q(status='Pendiente')),
@@ -546,50 +544,44 @@ class ProfitReportsView(APIView):
                 'errors': [{'message': 'Solo administradores pueden ver reportes de ganancias'}]
             }, status=status.HTTP_403_FORBIDDEN)
 
-        from django.db.models.functions import TruncMonth
-        from django.db.models import Sum, Count, Avg
-        from datetime import datetime
+        # Series mensuales de los últimos 12 meses (incluido el actual), con meses vacíos en cero
+        now = timezone.now()
+        twelve_months_ago = months_back_start(11, now)
 
-        # Calcular datos mensuales de forma eficiente (usando TruncMonth y aggregate)
-        twelve_months_ago = timezone.now().replace(day=1) - timedelta(days=365)
-        
         # Ingresos agrupados por mes
-        monthly_revenue = Order.objects.filter(created_at__gte=twelve_months_ago).annotate(
-            month=TruncMonth('created_at')
-        ).values('month').annotate(total=Sum('received_value_of_client')).order_by('month')
-        
+        revenue_series = bucket_series(
+            Order.objects.all(), 'created_at',
+            {'total': Sum('received_value_of_client')},
+            start=twelve_months_ago, end=now,
+        )
+
         # Gastos de productos agrupados por mes
-        monthly_product_expenses = Order.objects.filter(created_at__gte=twelve_months_ago).annotate(
-            month=TruncMonth('created_at')
-        ).values('month').annotate(total=Sum('products__total_cost')).order_by('month')
-        
+        product_expenses_series = bucket_series(
+            Order.objects.all(), 'created_at',
+            {'total': Sum('products__total_cost')},
+            start=twelve_months_ago, end=now,
+        )
+
         # Gastos de entrega agrupados por mes (basado en DeliverReceip)
         # Nota: Calculamos gastos operativos de entrega y comisiones de agentes aquí
-        monthly_delivery_data = DeliverReceip.objects.filter(deliver_date__gte=twelve_months_ago).annotate(
-            month=TruncMonth('deliver_date')
-        ).values('month').annotate(
-            expenses=Sum(F('weight') * F('category__shipping_cost_per_pound')),
-            agent_profits=Sum('manager_profit'),
-            system_delivery_profit=Sum(F('weight_cost') - F('manager_profit') - (F('weight') * F('category__shipping_cost_per_pound')))
-        ).order_by('month')
-
-        # Combinar datos en el reporte final
-        revenue_map = {r['month'].strftime('%Y-%m'): r['total'] for r in monthly_revenue}
-        product_expenses_map = {e['month'].strftime('%Y-%m'): e['total'] for e in monthly_product_expenses}
-        delivery_map = {d['month'].strftime('%Y-%m'): d for d in monthly_delivery_data}
+        delivery_series = bucket_series(
+            DeliverReceip.objects.all(), 'deliver_date',
+            {
+                'expenses': Sum(F('weight') * F('category__shipping_cost_per_pound')),
+                'agent_profits': Sum('manager_profit'),
+                'system_delivery_profit': Sum(F('weight_cost') - F('manager_profit') - (F('weight') * F('category__shipping_cost_per_pound'))),
+            },
+            start=twelve_months_ago, end=now,
+        )
 
+        # Combinar datos en el reporte final (las tres series comparten los mismos buckets)
         monthly_reports = []
-        for i in range(12):
-            m_date = timezone.now().replace(day=1) - timedelta(days=i*30)
-            m_key = m_date.strftime('%Y-%m')
-            
-            revenue = revenue_map.get(m_key, 0) or 0
-            product_expenses = product_expenses_map.get(m_key, 0) or 0
-            
-            d_data = delivery_map.get(m_key, {})
-            delivery_expenses = d_data.get('expenses', 0) or 0
-            agent_profits_real = d_data.get('agent_profits', 0) or 0
-            system_delivery_profit_real = d_data.get('system_delivery_profit', 0) or 0
+        for revenue_row, expenses_row, d_data in zip(revenue_series, product_expenses_series, delivery_series):
+            revenue = revenue_row['total']
+            product_expenses = expenses_row['total']
+            delivery_expenses = d_data['expenses']
+            agent_profits_real = d_data['agent_profits']
+            system_delivery_profit_real = d_data['system_delivery_profit']
             
             # Gastos operativos y fijos estimados
             purchase_operational_expenses = float(revenue) * 0.10
@@ -599,8 +591,8 @@ class ProfitReportsView(APIView):
             system_profit = float(revenue) - total_expenses
             
             monthly_reports.append({
-                'month': m_key,
-                'month_short': m_date.strftime('%b %Y'),
+                'month': revenue_row['label'],
+                'month_short': revenue_row['bucket'].strftime('%b %Y'),
                 'revenue': float(revenue),
                 'total_expenses': total_expenses,
                 'product_expenses': float(product_expenses),
@@ -613,9 +605,6 @@ class ProfitReportsView(APIView):
                 'projected_profit': system_profit * 1.1,
             })
 
-        # Invertir para mostrar del más antiguo al más reciente
-        monthly_reports.reverse()
-
         # Reportes de agentes optimizados - Single query with aggregation
         current_month_start = timezone.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
         
@@ -638,7 +627,7 @@ class ProfitReportsView(APIView):
         for agent in agents_data:
             # Reusing original logic but ensuring it's efficient
             # (Keeping simple for now as it's less critical than the 12-month loop)
-            agent_deliveries = DeleverReceip_objs = DeliverReceip.objects.filter(client__assigned_agent=agent)
+            agent_deliveries = DeleverReceip_objs = DeliverReceip.objects.filter(agent=agent)
             
             stats = agent_deliveries.aggregate(
                 total=Sum('manager_profit'),
@@ -822,6 +811,7 @@ class SystemInfoView(APIView):
                 'server': server_info,
                 'technology': technology_info,
                 'database': database_info,
+                'compression': CompressionMiddleware.stats(),
             })
         return Response({
             'success': True,
@@ -4,15 +4,18 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from drf_spectacular.utils import extend_schema
 from django.db.models import Q, Count
-from api.models import Package, DeliverReceip
+from api.models import Package, DeliverReceip, ProductReceived, ProductDelivery
 from api.serializers import (
     PackageSerializer, DeliverReceipSerializer,
     ProductReceivedSerializer, ProductDeliverySerializer,
+    validate_bulk_received_amounts, validate_bulk_delivery_amounts,
 )
+from api.services.bulk_write_service import BulkWriteService
 from api.permissions.permissions import ReadOnly, AdminPermission, LogisticalPermission, AgentReadOnlyPermission
+from api.views.mixins import EagerLoadingMixin, BulkWriteMixin
 
 
-class PackageViewSet(viewsets.ModelViewSet):
+class PackageViewSet(EagerLoadingMixin, BulkWriteMixin, viewsets.ModelViewSet):
     """
     ViewSet para gestión de paquetes.
     """
@@ -81,7 +84,12 @@ class PackageViewSet(viewsets.ModelViewSet):
 
     @extend_schema(
         summary="Agregar productos al paquete",
-        description="Agrega múltiples productos recibidos a un paquete (bulk).",
+        description=(
+            "Agrega múltiples productos recibidos a un paquete (bulk) en una sola transacción. "
+            "Las cantidades y estados de productos y órdenes se recalculan una vez por objeto "
+            "y se envía una notificación agregada por orden. Si algún elemento no es válido "
+            "no se crea ninguno y se devuelven los errores por elemento."
+        ),
         tags=["Paquetes"]
     )
     @action(detail=True, methods=["post"], permission_classes=[IsAuthenticated], url_path="add_products")
@@ -90,27 +98,57 @@ class PackageViewSet(viewsets.ModelViewSet):
         Se espera un payload: { "products": [{"original_product_id": <uuid>, "amount_received": <int>, "observation": "..."}, ...] }
         """
         package = self.get_object()
-        products = request.data.get("products", [])
-        if not isinstance(products, list):
-            return Response({"error": "Expected a list of products under 'products' key."}, status=status.HTTP_400_BAD_REQUEST)
-
-        created = []
-        for item in products:
-            data = {
+        items = [
+            {
                 "original_product_id": item.get("original_product_id") or item.get("original_product"),
                 "amount_received": item.get("amount_received"),
                 "observation": item.get("observation", ""),
-                "package_id": package.id,
             }
-            serializer = ProductReceivedSerializer(data=data, context={"request": request})
-            serializer.is_valid(raise_exception=True)
-            created_obj = serializer.save()
-            created.append(ProductReceivedSerializer(created_obj).data)
+            for item in self.get_bulk_items(request)
+        ]
+
+        rows, errors = self.validate_bulk_create(ProductReceivedSerializer, items, package_id=package.id)
+        self.add_bulk_errors(errors, validate_bulk_received_amounts([
+            (index, row["original_product"], row.get("amount_received", 1))
+            for index, row in enumerate(rows) if row is not None
+        ]))
+        if any(errors):
+            return self.bulk_error_response(errors)
+
+        for row in rows:
+            row.pop("package", None)
+        created = BulkWriteService.create_received(package, rows)
+        return self.bulk_response(ProductReceivedSerializer, created, "created", status.HTTP_201_CREATED)
+
+    @extend_schema(
+        summary="Actualizar productos del paquete",
+        description=(
+            "Actualiza varias recepciones del paquete en una sola transacción. "
+            "Body: `{\"products\": [{\"id\": <int>, \"amount_received\": <int>, \"observation\": \"...\"}, ...]}`."
+        ),
+        tags=["Paquetes"]
+    )
+    @action(detail=True, methods=["patch"], permission_classes=[IsAuthenticated], url_path="update_products")
+    def update_products(self, request, pk=None):
+        package = self.get_object()
+        items = self.get_bulk_items(request)
+
+        queryset = ProductReceived.objects.filter(package=package).select_related("original_product")
+        changes, errors = self.validate_bulk_update(
+            ProductReceivedSerializer, queryset, items, fields=("amount_received", "observation")
+        )
+        self.add_bulk_errors(errors, validate_bulk_received_amounts([
+            (index, instance.original_product, data.get("amount_received", instance.amount_received) - instance.amount_received)
+            for index, (instance, data) in self.valid_bulk_changes(changes)
+        ]))
+        if any(errors):
+            return self.bulk_error_response(errors)
 
-        return Response({"created": created}, status=status.HTTP_201_CREATED)
+        updated = BulkWriteService.update_received(changes)
+        return self.bulk_response(ProductReceivedSerializer, updated, "updated")
 
 
-class DeliverReceipViewSet(viewsets.ModelViewSet):
+class DeliverReceipViewSet(EagerLoadingMixin, BulkWriteMixin, viewsets.ModelViewSet):
     """
     ViewSet para recibos de entrega.
     """
@@ -124,7 +162,7 @@ class DeliverReceipViewSet(viewsets.ModelViewSet):
 
         if user.role == 'agent':
             # Agentes ven entregas de sus clientes asignados
-            queryset = queryset.filter(client__assigned_agent=user)
+            queryset = queryset.filter(agent=user)
         elif user.role == 'client':
             queryset = queryset.filter(client=user)
         # logistical users see all deliveries (same as admin)
@@ -133,7 +171,7 @@ class DeliverReceipViewSet(viewsets.ModelViewSet):
 
     @extend_schema(
         summary="Listar recibos de entrega",
-        description="Obtiene una lista de recibos de entrega.",
+        description="Obtiene una lista de recibos de entrega. `?fields=` limita los campos y `?expand=client,category,delivered_products` devuelve esas relaciones anidadas.",
         tags=["Recibos de Entrega"]
     )
     def list(self, request, *args, **kwargs):
@@ -258,7 +296,12 @@ class DeliverReceipViewSet(viewsets.ModelViewSet):
 
     @extend_schema(
         summary="Agregar productos al recibo de entrega",
-        description="Agrega múltiples productos entregados a un recibo de entrega (bulk).",
+        description=(
+            "Agrega múltiples productos entregados a un recibo de entrega (bulk) en una sola "
+            "transacción. Las cantidades y estados de productos y órdenes se recalculan una vez "
+            "por objeto. Si algún elemento no es válido no se crea ninguno y se devuelven los "
+            "errores por elemento."
+        ),
         tags=["Recibos de Entrega"]
     )
     @action(detail=True, methods=["post"], permission_classes=[IsAuthenticated], url_path="add_products")
@@ -267,23 +310,53 @@ class DeliverReceipViewSet(viewsets.ModelViewSet):
         Body: { "products": [{"original_product_id": <uuid>, "amount_delivered": <int>}, ...] }
         """
         deliver_receip = self.get_object()
-        products = request.data.get("products", [])
-        if not isinstance(products, list):
-            return Response({"error": "Expected a list of products under 'products' key."}, status=status.HTTP_400_BAD_REQUEST)
-
-        created = []
-        for item in products:
-            data = {
+        items = [
+            {
                 "original_product_id": item.get("original_product_id") or item.get("original_product"),
                 "amount_delivered": item.get("amount_delivered"),
-                "deliver_receip_id": deliver_receip.id,
             }
-            serializer = ProductDeliverySerializer(data=data, context={"request": request})
-            serializer.is_valid(raise_exception=True)
-            created_obj = serializer.save()
-            created.append(ProductDeliverySerializer(created_obj).data)
+            for item in self.get_bulk_items(request)
+        ]
+
+        rows, errors = self.validate_bulk_create(ProductDeliverySerializer, items, deliver_receip_id=deliver_receip.id)
+        self.add_bulk_errors(errors, validate_bulk_delivery_amounts([
+            (index, row["original_product"], row.get("amount_delivered", 0))
+            for index, row in enumerate(rows) if row is not None
+        ]))
+        if any(errors):
+            return self.bulk_error_response(errors)
 
-        return Response({"created": created}, status=status.HTTP_201_CREATED)
+        for row in rows:
+            row.pop("deliver_receip", None)
+        created = BulkWriteService.create_deliveries(deliver_receip, rows)
+        return self.bulk_response(ProductDeliverySerializer, created, "created", status.HTTP_201_CREATED)
+
+    @extend_schema(
+        summary="Actualizar productos del recibo de entrega",
+        description=(
+            "Actualiza varias entregas de productos del recibo en una sola transacción. "
+            "Body: `{\"products\": [{\"id\": <int>, \"amount_delivered\": <int>}, ...]}`."
+        ),
+        tags=["Recibos de Entrega"]
+    )
+    @action(detail=True, methods=["patch"], permission_classes=[IsAuthenticated], url_path="update_products")
+    def update_products(self, request, pk=None):
+        deliver_receip = self.get_object()
+        items = self.get_bulk_items(request)
+
+        queryset = ProductDelivery.objects.filter(deliver_receip=deliver_receip).select_related("original_product")
+        changes, errors = self.validate_bulk_update(
+            ProductDeliverySerializer, queryset, items, fields=("amount_delivered",)
+        )
+        self.add_bulk_errors(errors, validate_bulk_delivery_amounts([
+            (index, instance.original_product, data.get("amount_delivered", instance.amount_delivered) - instance.amount_delivered)
+            for index, (instance, data) in self.valid_bulk_changes(changes)
+        ]))
+        if any(errors):
+            return self.bulk_error_response(errors)
+
+        updated = BulkWriteService.update_deliveries(changes)
+        return self.bulk_response(ProductDeliverySerializer, updated, "updated")
 
     @extend_schema(
         summary="Aplicar saldo a favor como pago de una entrega",
@@ -9,10 +9,11 @@ from api.models import Expense
 from api.serializers import ExpenseSerializer
 from api.permissions.permissions import AdminPermission, ReadOnly, AccountantPermission
 from api.services.expense_analysis_service import analyze_expenses
+from api.views.mixins import EagerLoadingMixin
 from datetime import datetime
 
 
-class ExpenseViewSet(viewsets.ModelViewSet):
+class ExpenseViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """ViewSet para gestión de gastos."""
     queryset = Expense.objects.all().order_by('-date')
     serializer_class = ExpenseSerializer
@@ -7,9 +7,10 @@ from api.models import Invoice, Tag
 from api.serializers import InvoiceSerializer, TagSerializer, InvoiceCreateSerializer
 from api.services.invoice_service import InvoiceService
 from api.permissions.permissions import ReadOnly, AdminPermission
+from api.views.mixins import EagerLoadingMixin
 
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     ViewSet para gestión de tags.
     """
@@ -88,7 +89,7 @@ class TagViewSet(viewsets.ModelViewSet):
         return Response({'error': result.get('error')}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class InvoiceViewSet(viewsets.ModelViewSet):
+class InvoiceViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     ViewSet para gestión de invoices.
     """
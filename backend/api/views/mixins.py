@@ -0,0 +1,259 @@
+"""
+Mixins compartidos por los ViewSets de la API.
+"""
+from functools import lru_cache
+from typing import FrozenSet, Optional, Tuple
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from rest_framework import serializers, status
+from rest_framework.exceptions import ParseError
+from rest_framework.response import Response
+
+from api.serializers.mixins import SparseFieldsetMixin, parse_fieldset_params
+
+
+def _get_relation(model, name):
+    """Busca un campo por nombre o por accessor de relación inversa (p.ej. 'tag_set')."""
+    try:
+        return model._meta.get_field(name)
+    except FieldDoesNotExist:
+        for field in model._meta.get_fields():
+            if field.auto_created and not field.concrete and field.get_accessor_name() == name:
+                return field
+    return None
+
+
+def _resolve_relation_path(model, source_parts) -> Tuple[list, bool, Optional[type]]:
+    """
+    Recorre `source_parts` sobre el modelo mientras sean relaciones.
+
+    Returns:
+        (relaciones recorridas, si alguna es "a muchos", modelo final)
+    """
+    path = []
+    to_many = False
+    current = model
+    for part in source_parts:
+        field = _get_relation(current, part)
+        if field is None or not field.is_relation or field.related_model is None:
+            break
+        path.append(part)
+        if field.many_to_many or field.one_to_many:
+            to_many = True
+        current = field.related_model
+    return path, to_many, current
+
+
+def _add_path(path, to_many, prefix, in_prefetch, select, prefetch):
+    if not path:
+        return
+    lookup = '__'.join(prefix + path)
+    if in_prefetch or to_many:
+        prefetch.add(lookup)
+    else:
+        select.add(lookup)
+
+
+def _collect(serializer, model, prefix, in_prefetch, select, prefetch, depth=0):
+    """Recorre los campos de lectura del serializer acumulando select/prefetch."""
+    if depth > 5 or model is None:
+        return
+
+    # Relaciones que el serializer usa de forma no declarativa (SerializerMethodField,
+    # propiedades del modelo...), declaradas en Meta.eager_load_related
+    meta = getattr(serializer, 'Meta', None)
+    for extra in getattr(meta, 'eager_load_related', ()):
+        path, to_many, _ = _resolve_relation_path(model, extra.split('__'))
+        _add_path(path, to_many, prefix, in_prefetch, select, prefetch)
+
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*':
+            continue
+
+        # PrimaryKeyRelatedField solo necesita la columna <fk>_id
+        if isinstance(field, serializers.PrimaryKeyRelatedField):
+            continue
+
+        path, to_many, related_model = _resolve_relation_path(model, field.source.split('.'))
+        if not path:
+            continue
+
+        _add_path(path, to_many, prefix, in_prefetch, select, prefetch)
+
+        child = getattr(field, 'child', None)
+        nested = child if isinstance(child, serializers.BaseSerializer) else field
+        if isinstance(nested, serializers.BaseSerializer):
+            _collect(
+                nested, related_model, prefix + path, in_prefetch or to_many,
+                select, prefetch, depth + 1
+            )
+
+
+@lru_cache(maxsize=256)
+def get_eager_loading(serializer_class, model, fields=None, expand=None) -> Tuple[FrozenSet[str], FrozenSet[str]]:
+    """
+    Calcula (select_related, prefetch_related) necesarios para serializar `model`
+    con `serializer_class`. El resultado se cachea por clase de serializer y,
+    para serializers con SparseFieldsetMixin, por combinación de `fields`/`expand`.
+    """
+    if issubclass(serializer_class, SparseFieldsetMixin) and (fields is not None or expand is not None):
+        serializer = serializer_class(fields=fields, expand=expand)
+    else:
+        serializer = serializer_class()
+
+    select, prefetch = set(), set()
+    _collect(serializer, model, [], False, select, prefetch)
+
+    # select_related('a__b') ya incluye 'a'
+    select = {
+        lookup for lookup in select
+        if not any(other.startswith(f'{lookup}__') for other in select)
+    }
+    return frozenset(select), frozenset(prefetch)
+
+
+class EagerLoadingMixin:
+    """
+    Aplica select_related/prefetch_related según el serializer activo.
+
+    Inspecciona los campos de lectura del serializer (serializers anidados,
+    campos con `source` punteado, SlugRelatedField, relaciones many=True) y las
+    rutas declaradas en `Meta.eager_load_related`, de modo que los listados
+    ejecutan un número de consultas constante independiente del tamaño de página.
+    Con `?fields=` / `?expand=` solo se cargan las relaciones que se serializan.
+
+    Se engancha en filter_queryset para no interferir con los get_queryset
+    personalizados de cada ViewSet.
+    """
+
+    def get_eager_loading_serializer_class(self):
+        return self.get_serializer_class()
+
+    def apply_eager_loading(self, queryset):
+        serializer_class = self.get_eager_loading_serializer_class()
+        if serializer_class is None or not hasattr(queryset, 'model'):
+            return queryset
+
+        fields, expand = None, None
+        if issubclass(serializer_class, SparseFieldsetMixin):
+            # ?fields= / ?expand=: solo se cargan las relaciones que se van a serializar
+            fields, expand = parse_fieldset_params(getattr(self, 'request', None))
+            fields = tuple(sorted(fields)) if fields is not None else None
+            expand = tuple(sorted(expand)) if expand is not None else None
+
+        select, prefetch = get_eager_loading(serializer_class, queryset.model, fields, expand)
+        if select:
+            queryset = queryset.select_related(*sorted(select))
+        if prefetch:
+            queryset = queryset.prefetch_related(*sorted(prefetch))
+        return queryset
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        return self.apply_eager_loading(queryset)
+
+
+class BulkWriteMixin:
+    """
+    Utilidades para las acciones de escritura masiva (`{"products": [...]}`).
+
+    Cada elemento se valida con su propio serializer. Si alguno falla se responde
+    400 con los errores alineados con la entrada (`{}` para los elementos válidos)
+    y no se escribe nada; la escritura la hace BulkWriteService en una transacción.
+    """
+
+    bulk_items_key = 'products'
+
+    def get_bulk_items(self, request):
+        items = request.data.get(self.bulk_items_key, [])
+        if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+            raise ParseError({'error': f"Expected a list of products under '{self.bulk_items_key}' key."})
+        return items
+
+    def validate_bulk_create(self, serializer_class, items, **extra):
+        """
+        Returns:
+            (datos validados, errores por elemento)
+        """
+        context = self.get_serializer_context()
+        validated, errors = [], []
+        for item in items:
+            serializer = serializer_class(data={**item, **extra}, context=context)
+            if serializer.is_valid():
+                validated.append(dict(serializer.validated_data))
+                errors.append({})
+            else:
+                validated.append(None)
+                errors.append(dict(serializer.errors))
+        return validated, errors
+
+    def validate_bulk_update(self, serializer_class, queryset, items, fields=None):
+        """
+        Valida actualizaciones parciales; cada elemento debe incluir `id`.
+
+        Args:
+            queryset: Elementos que se pueden modificar (se cargan con una sola consulta)
+            fields: Si se indica, solo se aceptan estos campos
+
+        Returns:
+            ([(instancia, datos validados)], errores por elemento)
+        """
+        pk_field = queryset.model._meta.pk
+
+        def clean_pk(value):
+            try:
+                return pk_field.to_python(value) if value is not None else None
+            except DjangoValidationError:
+                return None
+
+        pks = [clean_pk(item.get('id')) for item in items]
+        instances = {obj.pk: obj for obj in queryset.filter(pk__in=[pk for pk in pks if pk is not None])}
+
+        context = self.get_serializer_context()
+        changes, errors = [], []
+        for pk, item in zip(pks, items):
+            instance = instances.get(pk)
+            if instance is None:
+                changes.append(None)
+                errors.append({'id': ['No existe un elemento con este id.']})
+                continue
+
+            data = {key: value for key, value in item.items() if key != 'id' and (fields is None or key in fields)}
+            serializer = serializer_class(instance, data=data, partial=True, context=context)
+            if serializer.is_valid():
+                changes.append((instance, dict(serializer.validated_data)))
+                errors.append({})
+            else:
+                changes.append(None)
+                errors.append(dict(serializer.errors))
+        return changes, errors
+
+    @staticmethod
+    def valid_bulk_changes(changes):
+        """(índice, (instancia, datos)) de los elementos válidos de validate_bulk_update."""
+        return [(index, change) for index, change in enumerate(changes) if change is not None]
+
+    @staticmethod
+    def add_bulk_errors(errors, extra):
+        """Añade a `errors` los errores de validación conjunta (índice → mensaje)."""
+        for index, message in extra.items():
+            errors[index].setdefault('non_field_errors', []).append(message)
+
+    def bulk_error_response(self, errors):
+        return Response({self.bulk_items_key: errors}, status=status.HTTP_400_BAD_REQUEST)
+
+    def bulk_response(self, serializer_class, instances, key, status_code=status.HTTP_200_OK):
+        """Serializa el resultado recargándolo con las relaciones que necesita el serializer."""
+        model = serializer_class.Meta.model
+        select, prefetch = get_eager_loading(serializer_class, model)
+        queryset = model.objects.filter(pk__in=[obj.pk for obj in instances])
+        if select:
+            queryset = queryset.select_related(*sorted(select))
+        if prefetch:
+            queryset = queryset.prefetch_related(*sorted(prefetch))
+
+        loaded = {obj.pk: obj for obj in queryset}
+        data = serializer_class(
+            [loaded[obj.pk] for obj in instances], many=True, context=self.get_serializer_context()
+        ).data
+        return Response({key: data}, status=status_code)
@@ -7,16 +7,27 @@ from django.db.models import Q, Sum, Count
 from django.utils import timezone
 from datetime import timedelta
 from api.models import Order
-from api.serializers import OrderSerializer, OrderCreateSerializer, OrderUpdateSerializer
+from api.services.order_service import annotate_product_financials
+from api.services.bulk_write_service import BulkWriteService
+from api.services.search_service import SearchService
+from api.services.timeline_service import ProductTimelineService
+from api.serializers import (
+    OrderSerializer, OrderCreateSerializer, OrderUpdateSerializer,
+    ProductSerializer, ProductCreateSerializer, ProductUpdateSerializer,
+    ProductTimelineFormattedSerializer,
+)
 from api.permissions.permissions import ReadOnly, AdminPermission, AgentPermission, BuyerPermission, LogisticalPermission
+from api.views.mixins import EagerLoadingMixin, BulkWriteMixin
+from api.pagination import SwitchablePagination
 
 
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(EagerLoadingMixin, BulkWriteMixin, viewsets.ModelViewSet):
     """
     ViewSet para gestión de órdenes.
     """
     queryset = Order.objects.all().order_by('-created_at')
     permission_classes = [IsAuthenticated]
+    pagination_class = SwitchablePagination
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -25,14 +36,20 @@ class OrderViewSet(viewsets.ModelViewSet):
             return OrderUpdateSerializer
         return OrderSerializer
 
+    def get_eager_loading_serializer_class(self):
+        # La timeline carga los productos y sus movimientos por su cuenta
+        if self.action == 'timeline':
+            return None
+        return super().get_eager_loading_serializer_class()
+
     def get_queryset(self):
         queryset = Order.objects.all().order_by('-created_at')
         user = self.request.user
 
         # Filtros por rol - aplicar restricción de seguridad
         if user.role == 'agent':
-            # Los agentes ven las órdenes de sus clientes asignados
-            queryset = queryset.filter(client__assigned_agent=user)
+            # Los agentes ven las órdenes de sus clientes asignados (agent desnormalizado)
+            queryset = queryset.filter(agent=user)
         elif user.role == 'client':
             # Los clientes solo ven sus propias órdenes
             queryset = queryset.filter(client=user)
@@ -78,30 +95,43 @@ class OrderViewSet(viewsets.ModelViewSet):
         if date_to:
             queryset = queryset.filter(created_at__date__lte=date_to)
 
-        # búsqueda por texto (id, cliente, email, sales_manager)
+        # búsqueda por texto (id, cliente, email, teléfono, sales_manager) con el índice de búsqueda
         search = self.request.query_params.get('search')
-        if search:
+        if search and search.strip():
+            matches = SearchService.filter_queryset(queryset, 'order', search)
+            if search.strip().isdigit():
+                # un número también puede ser el id exacto del pedido
+                matches = matches | queryset.filter(id=int(search))
+            queryset = matches
+
+        # ganancia / gastos de productos (calculados en SQL, ver annotate_product_financials)
+        queryset = annotate_product_financials(queryset)
+
+        min_profit = self.request.query_params.get('min_profit')
+        if min_profit:
             try:
-                # intentar buscar por id numérico
-                search_id = int(search)
-                queryset = queryset.filter(Q(id=search_id) |
-                                           Q(client__name__icontains=search) |
-                                           Q(client__last_name__icontains=search) |
-                                           Q(client__email__icontains=search) |
-                                           Q(sales_manager__name__icontains=search) |
-                                           Q(sales_manager__last_name__icontains=search))
+                queryset = queryset.filter(products_system_profit_total__gte=float(min_profit))
             except ValueError:
-                queryset = queryset.filter(Q(client__name__icontains=search) |
-                                           Q(client__last_name__icontains=search) |
-                                           Q(client__email__icontains=search) |
-                                           Q(sales_manager__name__icontains=search) |
-                                           Q(sales_manager__last_name__icontains=search))
+                pass
+
+        max_profit = self.request.query_params.get('max_profit')
+        if max_profit:
+            try:
+                queryset = queryset.filter(products_system_profit_total__lte=float(max_profit))
+            except ValueError:
+                pass
+
+        # ordenar por ganancia: ?ordering=profit o ?ordering=-profit
+        ordering = self.request.query_params.get('ordering')
+        if ordering in ('profit', '-profit'):
+            prefix = '-' if ordering.startswith('-') else ''
+            queryset = queryset.order_by(f'{prefix}products_system_profit_total', '-created_at')
 
         return queryset
 
     @extend_schema(
         summary="Listar órdenes",
-        description="Obtiene una lista de órdenes con filtros opcionales.",
+        description="Obtiene una lista de órdenes con filtros opcionales. Admite `min_profit`/`max_profit` y `ordering=profit` / `ordering=-profit`. `?fields=` limita los campos y `?expand=client,sales_manager,products` devuelve esas relaciones anidadas (sin expandir se devuelven sus IDs). Con `?pagination=cursor` se pagina por cursor sobre (created_at, id) y `count` es una estimación salvo `?count=exact`.",
         tags=["Órdenes"]
     )
     def list(self, request, *args, **kwargs):
@@ -376,3 +406,68 @@ class OrderViewSet(viewsets.ModelViewSet):
             },
             status=status.HTTP_200_OK
         )
+
+    @extend_schema(
+        summary="Obtener timeline de los productos de la orden",
+        description=(
+            "Devuelve la timeline de todos los productos de la orden (mismo formato que "
+            "`product/{id}/timeline/`). Compras, recepciones y entregas se resumen con una "
+            "consulta agrupada por tipo de movimiento para todos los productos."
+        ),
+        tags=["Órdenes"]
+    )
+    @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
+    def timeline(self, request, pk=None):
+        order = self.get_object()
+        products = list(order.products.order_by('created_at', 'id'))
+        movements = ProductTimelineService.movement_summaries(product.pk for product in products)
+        serializer = ProductTimelineFormattedSerializer(
+            products, many=True, context={'request': request, 'timeline_movements': movements}
+        )
+        return Response({'order': order.id, 'products': serializer.data})
+
+    @extend_schema(
+        summary="Agregar productos a la orden",
+        description=(
+            "Crea varios productos en la orden en una sola transacción. "
+            "Body: `{\"products\": [{...campos de producto...}, ...]}`. "
+            "El total de la orden y el balance del cliente se recalculan una sola vez "
+            "y los compradores reciben una única notificación. Si algún elemento no es "
+            "válido no se crea ninguno y se devuelven los errores por elemento."
+        ),
+        tags=["Órdenes"]
+    )
+    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated, AdminPermission], url_path='add_products')
+    def add_products(self, request, pk=None):
+        order = self.get_object()
+        items = self.get_bulk_items(request)
+
+        rows, errors = self.validate_bulk_create(ProductCreateSerializer, items, order=order.pk)
+        if any(errors):
+            return self.bulk_error_response(errors)
+
+        for row in rows:
+            row.pop('order', None)
+        products = BulkWriteService.create_products(order, rows)
+        return self.bulk_response(ProductSerializer, products, 'created', status.HTTP_201_CREATED)
+
+    @extend_schema(
+        summary="Actualizar productos de la orden",
+        description=(
+            "Actualiza parcialmente varios productos de la orden en una sola transacción. "
+            "Body: `{\"products\": [{\"id\": <uuid>, ...campos a modificar...}, ...]}`. "
+            "Si algún elemento no es válido no se modifica ninguno."
+        ),
+        tags=["Órdenes"]
+    )
+    @action(detail=True, methods=['patch'], permission_classes=[IsAuthenticated, AdminPermission], url_path='update_products')
+    def update_products(self, request, pk=None):
+        order = self.get_object()
+        items = self.get_bulk_items(request)
+
+        changes, errors = self.validate_bulk_update(ProductUpdateSerializer, order.products.all(), items)
+        if any(errors):
+            return self.bulk_error_response(errors)
+
+        products = BulkWriteService.update_products(order, changes)
+        return self.bulk_response(ProductSerializer, products, 'updated')
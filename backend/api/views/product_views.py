@@ -2,6 +2,8 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.filters import OrderingFilter
+from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.utils import extend_schema
 from django.db.models import Q, Sum, Count, Avg
 from api.models import Product, ProductBuyed, ProductReceived, ProductDelivery
@@ -11,14 +13,22 @@ from api.serializers import (
     ProductTimelineSerializer, ProductTimelineFormattedSerializer
 )
 from api.permissions.permissions import ReadOnly, AdminPermission, AgentPermission, AgentReadOnlyPermission, BuyerPermission
+from api.services.timeline_service import ProductTimelineService
+from api.views.mixins import EagerLoadingMixin
+from api.pagination import SwitchablePagination
+from api.filters import IndexedSearchFilter
 
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     ViewSet para gestión de productos.
     """
     queryset = Product.objects.all().order_by('-created_at')
     permission_classes = [IsAuthenticated, (AdminPermission | AgentPermission), AgentReadOnlyPermission]
+    pagination_class = SwitchablePagination
+    # ?search= usa el índice de búsqueda (nombre, sku, descripción, tienda, categoría)
+    filter_backends = [DjangoFilterBackend, IndexedSearchFilter, OrderingFilter]
+    search_entity_type = 'product'
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -41,7 +51,7 @@ class ProductViewSet(viewsets.ModelViewSet):
         # Filtros por rol
         if user.role == 'agent':
             # Los agentes ven productos de las órdenes de sus clientes asignados
-            queryset = queryset.filter(order__client__assigned_agent=user)
+            queryset = queryset.filter(agent=user)
         elif user.role == 'client':
             # Los clientes están relacionados en Order vía 'client'
             queryset = queryset.filter(order__client=user)
@@ -60,11 +70,26 @@ class ProductViewSet(viewsets.ModelViewSet):
         if client_id:
             queryset = queryset.filter(order__client_id=client_id)
 
+        # Filtrar por ganancia del sistema por unidad (columna calculada al guardar)
+        min_profit = self.request.query_params.get('min_profit')
+        if min_profit:
+            try:
+                queryset = queryset.filter(system_profit__gte=float(min_profit))
+            except ValueError:
+                pass
+
+        max_profit = self.request.query_params.get('max_profit')
+        if max_profit:
+            try:
+                queryset = queryset.filter(system_profit__lte=float(max_profit))
+            except ValueError:
+                pass
+
         return queryset
 
     @extend_schema(
         summary="Listar productos",
-        description="Obtiene una lista de productos con filtros opcionales.",
+        description="Obtiene una lista de productos con filtros opcionales. Admite `search` (nombre, sku, descripción, tienda o categoría), `min_profit`/`max_profit` y `ordering=system_profit` (o `system_expenses`). `?fields=` limita los campos devueltos. Con `?pagination=cursor` se pagina por cursor sobre (created_at, id) y `count` es una estimación salvo `?count=exact`.",
         tags=["Productos"]
     )
     def list(self, request, *args, **kwargs):
@@ -115,7 +140,7 @@ class ProductViewSet(viewsets.ModelViewSet):
 
     @extend_schema(
         summary="Obtener timeline del producto",
-        description="Obtiene los datos de la timeline del producto incluyendo buys, receiveds y delivers.",
+        description="Obtiene los datos de la timeline del producto incluyendo buys, receiveds y delivers. Para todos los productos de una orden usar `order/{id}/timeline/`.",
         tags=["Productos"]
     )
     @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
@@ -125,17 +150,19 @@ class ProductViewSet(viewsets.ModelViewSet):
         Retorna los eventos ya formateados y listos para renderizar en el frontend.
         """
         product = self.get_object()
-        serializer = ProductTimelineFormattedSerializer(product)
+        movements = ProductTimelineService.movement_summaries([product.pk])
+        serializer = ProductTimelineFormattedSerializer(product, context={'timeline_movements': movements})
         return Response(serializer.data)
 
 
-class ProductBuyedViewSet(viewsets.ModelViewSet):
+class ProductBuyedViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     ViewSet para productos comprados.
     """
     queryset = ProductBuyed.objects.all().order_by('-created_at')
     serializer_class = ProductBuyedSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = SwitchablePagination
 
     def get_queryset(self):
         queryset = ProductBuyed.objects.all().order_by('-created_at')
@@ -143,7 +170,7 @@ class ProductBuyedViewSet(viewsets.ModelViewSet):
 
         # Filtrar ProductBuyed por relaciones existentes en el modelo
         if user.role == 'agent':
-            queryset = queryset.filter(original_product__order__client__assigned_agent=user)
+            queryset = queryset.filter(agent=user)
         elif user.role == 'client':
             queryset = queryset.filter(original_product__order__client=user)
 
@@ -164,7 +191,7 @@ class ProductBuyedViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class ProductReceivedViewSet(viewsets.ModelViewSet):
+class ProductReceivedViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     ViewSet para productos recibidos.
     """
@@ -178,7 +205,7 @@ class ProductReceivedViewSet(viewsets.ModelViewSet):
 
         # Filtrar ProductReceived por relaciones existentes
         if user.role == 'agent':
-            queryset = queryset.filter(original_product__order__client__assigned_agent=user)
+            queryset = queryset.filter(agent=user)
 
         return queryset
 
@@ -197,7 +224,7 @@ class ProductReceivedViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class ProductDeliveryViewSet(viewsets.ModelViewSet):
+class ProductDeliveryViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     ViewSet para entregas de productos.
     """
@@ -213,7 +240,7 @@ class ProductDeliveryViewSet(viewsets.ModelViewSet):
         if user.role == 'client':
             queryset = queryset.filter(original_product__order__client=user)
         elif user.role == 'agent':
-            queryset = queryset.filter(original_product__order__client__assigned_agent=user)
+            queryset = queryset.filter(agent=user)
 
         return queryset
 
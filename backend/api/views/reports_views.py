@@ -208,7 +208,7 @@ class ProductBuysAnalysisView(APIView):
 
     @extend_schema(
         summary="Análisis de productos comprados",
-        description="Retorna un análisis agregado de los productos comprados con métricas de reembolsos.",
+        description="Retorna un análisis agregado de los productos comprados con métricas de reembolsos. Acepta `top_n` (por defecto 10) para limitar los productos más reembolsados.",
         tags=["Reportes"]
     )
     def get(self, request):
@@ -235,7 +235,12 @@ class ProductBuysAnalysisView(APIView):
             except Exception:
                 end_date = None
 
-        analysis = analyze_product_buys(start_date=start_date, end_date=end_date)
+        try:
+            top_n = int(request.query_params.get('top_n', 10))
+        except (TypeError, ValueError):
+            top_n = 10
+
+        analysis = analyze_product_buys(start_date=start_date, end_date=end_date, top_n=top_n)
         return Response({'success': True, 'data': analysis, 'message': 'Análisis de productos comprados obtenido'}, status=status.HTTP_200_OK)
 
 
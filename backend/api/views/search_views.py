@@ -0,0 +1,114 @@
+"""Búsqueda unificada sobre usuarios, pedidos y productos."""
+from django.db.models import Q
+from rest_framework import status
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from drf_spectacular.utils import extend_schema, OpenApiParameter
+
+from api.models import CustomUser, Order, Product, SearchDocument
+from api.services.search_service import SearchService
+
+# Candidatos que se leen del índice antes de filtrar por visibilidad y paginar
+MAX_SEARCH_CANDIDATES = 1000
+
+
+class SearchPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class GlobalSearchView(APIView):
+    """
+    Vista de búsqueda unificada. Devuelve los resultados ordenados por relevancia,
+    limitados a lo que el usuario puede ver en los listados correspondientes.
+    """
+    permission_classes = [IsAuthenticated]
+    pagination_class = SearchPagination
+
+    def _visible_querysets(self, user):
+        """Queryset visible por tipo de documento (mismas reglas que los viewsets)."""
+        if user.is_staff or user.role == 'admin':
+            return {
+                SearchDocument.ENTITY_USER: CustomUser.objects.all(),
+                SearchDocument.ENTITY_ORDER: Order.objects.all(),
+                SearchDocument.ENTITY_PRODUCT: Product.objects.all(),
+            }
+        if user.role == 'agent':
+            return {
+                SearchDocument.ENTITY_USER: CustomUser.objects.filter(Q(assigned_agent=user) | Q(pk=user.pk)),
+                SearchDocument.ENTITY_ORDER: Order.objects.filter(agent=user),
+                SearchDocument.ENTITY_PRODUCT: Product.objects.filter(agent=user),
+            }
+        if user.role == 'client':
+            return {
+                SearchDocument.ENTITY_ORDER: Order.objects.filter(client=user),
+                SearchDocument.ENTITY_PRODUCT: Product.objects.filter(order__client=user),
+            }
+        return {
+            SearchDocument.ENTITY_USER: CustomUser.objects.all(),
+            SearchDocument.ENTITY_ORDER: Order.objects.all(),
+        }
+
+    @extend_schema(
+        summary="Búsqueda unificada",
+        description="Busca en usuarios, pedidos y productos con el índice de búsqueda. Los resultados vienen ordenados por relevancia y paginados (`page`, `page_size`). `types=user,order,product` limita los tipos.",
+        parameters=[
+            OpenApiParameter('q', str, description='Texto a buscar'),
+            OpenApiParameter('types', str, description='Tipos separados por comas: user, order, product'),
+        ],
+        tags=["Búsqueda"]
+    )
+    def get(self, request):
+        query = (request.query_params.get('q') or request.query_params.get('search') or '').strip()
+        if not query:
+            return Response({'success': False, 'message': 'El parámetro q es requerido'}, status=status.HTTP_400_BAD_REQUEST)
+
+        visible = self._visible_querysets(request.user)
+        requested = request.query_params.get('types')
+        if requested:
+            types = [part.strip() for part in requested.split(',') if part.strip()]
+            unknown = set(types) - {choice for choice, _ in SearchDocument.ENTITY_CHOICES}
+            if unknown:
+                return Response(
+                    {'success': False, 'message': f"Tipos no válidos: {', '.join(sorted(unknown))}"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            visible = {entity_type: qs for entity_type, qs in visible.items() if entity_type in types}
+
+        matches = SearchService.search(query, visible.keys(), limit=MAX_SEARCH_CANDIDATES) if visible else []
+
+        # Una consulta por tipo para descartar lo que el usuario no puede ver
+        allowed = {}
+        for entity_type, queryset in visible.items():
+            pk_field = queryset.model._meta.pk
+            ids = [pk_field.to_python(object_id) for kind, object_id, _ in matches if kind == entity_type]
+            allowed[entity_type] = {str(pk) for pk in queryset.filter(pk__in=ids).values_list('pk', flat=True)} if ids else set()
+
+        keys = [(kind, object_id, rank) for kind, object_id, rank in matches if object_id in allowed[kind]]
+
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(keys, request, view=self)
+
+        documents = {
+            (document.entity_type, document.object_id): document
+            for document in SearchDocument.objects.filter(
+                Q(*[Q(entity_type=kind, object_id=object_id) for kind, object_id, _ in page], _connector=Q.OR)
+            )
+        } if page else {}
+
+        results = []
+        for kind, object_id, rank in page:
+            document = documents.get((kind, object_id))
+            if document is None:
+                continue
+            results.append({
+                'type': kind,
+                'id': object_id,
+                'title': document.title,
+                'subtitle': document.subtitle,
+                'rank': round(float(rank), 4),
+            })
+        return paginator.get_paginated_response(results)
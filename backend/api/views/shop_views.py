@@ -7,9 +7,11 @@ from django.db.models import Q, Count, Sum
 from api.models import Shop, BuyingAccounts, ShoppingReceip, CustomUser
 from api.serializers import ShopSerializer, ShopCreateSerializer, ShopUpdateSerializer, BuyingAccountsSerializer, ShoppingReceipSerializer
 from api.permissions.permissions import ReadOnly, AdminPermission, AgentPermission
+from api.services.purchases_service import annotate_receipt_costs
+from api.views.mixins import EagerLoadingMixin
 
 
-class ShopViewSet(viewsets.ModelViewSet):
+class ShopViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     ViewSet para gestión de tiendas.
     """
@@ -96,7 +98,7 @@ class ShopViewSet(viewsets.ModelViewSet):
         })
 
 
-class BuyingAccountsViewsSet(viewsets.ModelViewSet):
+class BuyingAccountsViewsSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     ViewSet para gestión de cuentas de compra.
     """
@@ -186,7 +188,7 @@ class BuyingAccountsViewsSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class ShoppingReceipViewSet(viewsets.ModelViewSet):
+class ShoppingReceipViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     ViewSet para gestión de recibos de compra.
     """
@@ -194,9 +196,17 @@ class ShoppingReceipViewSet(viewsets.ModelViewSet):
     serializer_class = ShoppingReceipSerializer
     permission_classes = [IsAuthenticated, AdminPermission | ReadOnly]
 
+    def get_queryset(self):
+        queryset = ShoppingReceip.objects.all().order_by('-created_at')
+        # Costos calculados en SQL solo en lectura: tras una escritura la
+        # respuesta debe reflejar los productos nuevos, no la anotación previa
+        if self.action in ('list', 'retrieve'):
+            queryset = annotate_receipt_costs(queryset)
+        return queryset
+
     @extend_schema(
         summary="Listar recibos de compra",
-        description="Obtiene una lista de recibos de compra.",
+        description="Obtiene una lista de recibos de compra. Los costos (total_cost_of_shopping, total_cost_excluding_refunds, total_refunded, real_cost_paid) se calculan en SQL. `?fields=` limita los campos y `?expand=buyed_products` devuelve los productos comprados anidados.",
         tags=["Recibos de Compra"]
     )
     def list(self, request, *args, **kwargs):
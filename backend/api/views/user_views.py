@@ -1,5 +1,5 @@
 from rest_framework import viewsets, status, views
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.filters import OrderingFilter
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -11,18 +11,21 @@ from api.models import CustomUser
 from api.serializers import UserSerializer, UserCreateSerializer, UserUpdateSerializer
 from api.permissions.permissions import ReadOnly, AdminPermission, AgentPermission, BuyerPermission, LogisticalPermission
 from api.services.client_services import get_client_balance_report
+from api.views.mixins import EagerLoadingMixin
+from api.filters import IndexedSearchFilter
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     ViewSet para gestión de usuarios.
     """
     queryset = CustomUser.objects.all().order_by('name')
     permission_classes = [IsAuthenticated, AdminPermission | ReadOnly]
     # Habilitar filtros y búsqueda para que los query params funcionen desde el frontend
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, IndexedSearchFilter, OrderingFilter]
     filterset_fields = ['role', 'is_active', 'is_verified']
-    search_fields = ['email', 'name', 'last_name', 'phone_number']
+    # ?search= usa el índice de búsqueda (email, nombre, apellidos, teléfono)
+    search_entity_type = 'user'
 
     def get_queryset(self):
         """
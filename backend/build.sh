@@ -14,4 +14,10 @@ pip install --only-binary=lxml,psycopg2-binary -r requirements.txt
 python manage.py collectstatic --no-input
 
 # Apply any outstanding database migrations
-python manage.py migrate
\ No newline at end of file
+python manage.py migrate
+
+# Rebuild the daily financial rollup (self-heals drift from bulk writes)
+python manage.py backfill_financial_rollups
+
+# Rebuild the search index (users, orders, products)
+python manage.py rebuild_search_index
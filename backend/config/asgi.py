@@ -3,6 +3,10 @@ ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Production runs this application (gunicorn with uvicorn workers) so that the
+async notification stream (api/notifications/realtime_notifications.py) keeps
+each open SSE connection as a coroutine instead of a blocked worker.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
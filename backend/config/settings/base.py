@@ -5,6 +5,8 @@ Base settings for all environments.
 from pathlib import Path
 from decouple import config
 from datetime import timedelta
+from importlib.util import find_spec
+from corsheaders.defaults import default_headers
 import os
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -30,6 +32,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework_simplejwt',
     'corsheaders',
@@ -41,6 +44,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'api.middleware.compression_middleware.CompressionMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -50,6 +54,18 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Compresión br/gzip de las respuestas (ver api/middleware/compression_middleware.py)
+COMPRESSION_MIN_SIZE = config('COMPRESSION_MIN_SIZE', default=1024, cast=int)
+COMPRESSION_BROTLI_QUALITY = config('COMPRESSION_BROTLI_QUALITY', default=4, cast=int)
+COMPRESSION_GZIP_LEVEL = config('COMPRESSION_GZIP_LEVEL', default=6, cast=int)
+# El stream SSE se excluye también por su content type (text/event-stream)
+COMPRESSION_EXCLUDED_PATHS = [
+    '/arye_system/api_data/notifications/stream/',
+]
+
+# Headers que envía el cliente SSE (Last-Event-ID para reanudar el stream)
+CORS_ALLOW_HEADERS = (*default_headers, 'cache-control', 'last-event-id')
+
 ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
@@ -124,8 +140,22 @@ REST_FRAMEWORK = {
         'rest_framework.filters.OrderingFilter',
     ],
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # JSON con orjson; MessagePack bajo demanda (Accept: application/msgpack)
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.OrjsonRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.renderers.OrjsonParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
+if find_spec('msgpack') is not None:
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].insert(1, 'api.renderers.MessagePackRenderer')
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'].insert(1, 'api.renderers.MessagePackParser')
+
 # JWT Configuration
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=config('ACCESS_TOKEN_LIFETIME_MINUTES', default=120, cast=int)),
@@ -212,6 +242,18 @@ EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=True, cast=bool)
 EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
 
+# Outbox de notificaciones (ver api/notifications/outbox_notifications.py).
+# False: cada proceso web despacha los eventos en un hilo al confirmar la transacción.
+# True: solo los escribe y los procesa un worker (`python manage.py dispatch_notifications`),
+# que inserta las notificaciones y envía los emails; cada proceso web las lee de la tabla
+# y las publica en SSE a sus conexiones (NotificationRelay).
+NOTIFICATION_OUTBOX_WORKER = config('NOTIFICATION_OUTBOX_WORKER', default=False, cast=bool)
+
+# Sin CACHES se usa LocMemCache, de cada proceso: el badge de no leídas y las
+# preferencias/roles de notificación cacheados solo se invalidan en el proceso
+# que escribe, así que se guardan unos segundos. Con varios procesos conviene
+# configurar una cache compartida (Redis, Memcached) para cachearlos más tiempo.
+
 # Website Configuration
 WEB_SITE_NAME = config('WEB_SITE_NAME', default='AR-E Web Platform')
 VERIFICATION_URL = config('VERIFICATION_URL', default='http://localhost:5173/verify?token=')
@@ -219,6 +261,11 @@ VERIFICATION_URL = config('VERIFICATION_URL', default='http://localhost:5173/ver
 # Email sending configuration
 ENABLE_EMAIL_VERIFICATION = config('ENABLE_EMAIL_VERIFICATION', default=False, cast=bool)
 
+# Emails de notificaciones (envío por lotes desde el outbox; los resúmenes
+# diarios/semanales los envía `python manage.py send_notification_digests`)
+ENABLE_NOTIFICATION_EMAILS = config('ENABLE_NOTIFICATION_EMAILS', default=False, cast=bool)
+NOTIFICATION_EMAIL_BATCH_SIZE = config('NOTIFICATION_EMAIL_BATCH_SIZE', default=50, cast=int)
+
 # Admin creation configuration
 ADMIN_CREATION_SECRET_KEY = config('ADMIN_CREATION_SECRET_KEY', default='change-this-secret-key-in-production')
 
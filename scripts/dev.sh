@@ -25,7 +25,8 @@ case $APP in
   "backend")
     echo "🐍 Iniciando Django Backend..."
     cd "$ROOT_DIR/backend"
-    python manage.py runserver
+    # ASGI: el stream SSE de notificaciones no funciona con runserver (WSGI)
+    uvicorn config.asgi:application --reload --port 8000
     ;;
   "all")
     echo "🎯 Iniciando todas las aplicaciones..."